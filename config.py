@@ -53,10 +53,38 @@ ST_LEN = 7
 ST_MULT = 3.0
 SQUEEZE_BB_LEN = 20
 SQUEEZE_KC_LEN = 20
+SQUEEZE_BB_STD = 2.0
+SQUEEZE_KC_SCALAR = 1.5
+SQUEEZE_MOM_LEN = 12
+SQUEEZE_MOM_SMOOTH = 6
 EMA_FAST = 20
 EMA_SLOW = 50
 EMA_VERY_SLOW = 200
 
+# Backend indicatori: "numpy" (kernel nativi) o "pandas_ta"
+INDICATOR_BACKEND = "numpy"
+INDICATOR_DTYPE = "float64"
+# Se True confronta ogni calcolo con pandas_ta e logga le differenze
+INDICATOR_PARITY_CHECK = False
+INDICATOR_PARITY_TOL = 1e-6
+
+# Sweep delle lunghezze (ottimizzatore): valori provati per campo di IndicatorLengths
+LENGTH_SWEEP_GRID = {
+    'rsi_len': [10, 14, 21],
+    'atr_len': [10, 14, 21],
+    'adx_len': [10, 14, 21],
+    'st_len': [7, 10],
+    'st_mult': [2.0, 3.0]
+}
+LENGTH_VARIANTS_CACHE_SIZE = 4  # Dataset di cui tenere in memoria le varianti calcolate
+
+# Cache indicatori (LRU per memoria, ricalcolo delle sole candele nuove)
+INDICATOR_CACHE_ENABLED = True
+INDICATOR_CACHE_MAX_MB = 128
+
+# Stati indicatori incrementali (scanner / AutoTrader)
+INCREMENTAL_MAX_STATES = 5000  # Simboli/timeframe tenuti "caldi"; oltre si scartano i meno usati
+
 # ============================================
 # SOGLIE PER SEGNALI
 # ============================================
@@ -95,6 +123,7 @@ MTF_EMA_1H = 50
 MTF_EMA_4H = 20
 MTF_EMA_FAST = 20
 MTF_EMA_SLOW = 50
+MTF_CACHE_SIZE = 256  # Serie MTF allineate tenute in memoria (LRU)
 
 # ============================================
 # PARAMETRI BACKTEST
@@ -103,6 +132,79 @@ MIN_DAYS_HISTORY = 30
 MAX_DAYS_HISTORY = 365
 POSITION_SIZE_PCT = 0.1
 MAX_POSITION_SIZE = 0.25
+EXIT_GRID_HORIZON = 256  # Candele di percorso precalcolate per trade nella griglia SL/TP
+
+# ============================================
+# STORICO BACKTEST (annuale, validazione, ottimizzatore)
+# ============================================
+HISTORY_INTERVAL = "1h"
+HISTORY_PERIOD = "2y"  # Massimo disponibile da Yahoo per candele 1h
+HISTORY_TTL = 3600  # Secondi prima di riscaricare lo storico di un simbolo
+HISTORY_CACHE_SIZE = 16  # Simboli tenuti in memoria
+
+# ============================================
+# ARCHIVIO OHLCV LOCALE (download incrementali)
+# ============================================
+OHLCV_STORE_ENABLED = True  # Provider e backtest leggono dall'archivio e scaricano solo le candele nuove
+OHLCV_STORE_DIR = "data/ohlcv"  # Una cartella per sorgente/simbolo/timeframe
+OHLCV_STORE_MAX_SEGMENTS = 32  # Oltre questo numero di aggiornamenti i segmenti vengono compattati
+
+# ============================================
+# CACHE PROVIDER (SQLite + LRU in memoria)
+# ============================================
+PROVIDER_CACHE_DIR = "cache"  # Un database <provider>.sqlite per provider
+PROVIDER_CACHE_MAX_MB = 64  # Oltre questa dimensione si eliminano le voci meno usate
+PROVIDER_CACHE_MEMORY_ITEMS = 32  # Voci per provider tenute anche in memoria
+
+# ============================================
+# BACKTEST DI PORTAFOGLIO (capitale condiviso)
+# ============================================
+PORTFOLIO_INITIAL_CAPITAL = 10000
+PORTFOLIO_MAX_ASSETS = 10  # Asset della watchlist inclusi nel portafoglio
+
+# ============================================
+# RICERCA ADATTIVA (successive halving)
+# ============================================
+HALVING_ETA = 3  # Ad ogni livello resta 1/ETA dei candidati e il tratto dati si allunga di ETA volte
+HALVING_RUNGS = 4  # Livelli (il primo usa 1/ETA^(RUNGS-1) dell'anno)
+OPTIMIZER_BUDGET = 300  # Budget della ricerca adattiva in backtest completi equivalenti
+
+# ============================================
+# PRUNING COMBINAZIONI (interruzione anticipata)
+# ============================================
+PRUNE_ENABLED = True  # Ferma le combinazioni senza speranza nella griglia dell'ottimizzatore
+PRUNE_MAX_DD_PCT = 30.0  # Drawdown massimo (somma PnL %) prima dell'interruzione (None = off)
+PRUNE_MIN_TRADES = 3  # Trade chiusi minimi entro PRUNE_CHECK_FRACTION del periodo (0 = off)
+PRUNE_CHECK_FRACTION = 0.5  # Frazione del periodo dopo il warm-up per il controllo dei trade
+PRUNE_MIN_SCORE = 35.0  # Score composito minimo ancora raggiungibile (None = off)
+PRUNE_CHECKPOINTS = 4  # Verifiche delle regole per simulazione (candele equidistanti)
+
+# ============================================
+# ARCHIVIO RISULTATI BACKTEST
+# ============================================
+BACKTEST_STORE_ENABLED = True  # Riusa risultati già calcolati (stessi dati e parametri)
+BACKTEST_STORE_DIR = "cache/backtests"
+BACKTEST_STORE_MAX_MB = 256  # Oltre questa dimensione si eliminano i meno usati
+
+# ============================================
+# JOB PERSISTENTI (ottimizzazione / validazione)
+# ============================================
+JOBS_DIR = "jobs"  # Checkpoint delle celle completate
+JOB_POLL_SECONDS = 1.0  # Intervallo di aggiornamento UI dei job in corso
+
+# ============================================
+# WALK-FORWARD
+# ============================================
+WF_TRAIN_MONTHS = 6  # Mesi della finestra di ottimizzazione
+WF_TEST_MONTHS = 1  # Mesi out-of-sample (passo di scorrimento)
+
+# ============================================
+# ESECUZIONE PARALLELA (ottimizzazione / validazione)
+# ============================================
+PARALLEL_ENABLED = True  # Default del selettore in UI
+PARALLEL_WORKERS = 0  # Processi worker (0 = tutti i core)
+PARALLEL_CHUNKS_PER_WORKER = 4  # Blocchi di lavoro per worker (bilanciamento carico)
+PARALLEL_START_METHOD = None  # "fork", "spawn", "forkserver" (None = default di sistema)
 
 # ============================================
 # LIMITI DI MERCATO
@@ -141,6 +243,7 @@ YF_MAX_RETRIES = 3
 TD_INTERVAL = "15min"
 TD_OUTPUTSIZE = 5000
 TD_MAX_RETRIES = 3
+TD_BATCH_SIZE = 8  # Simboli per richiesta time_series multi-simbolo (1 credito ciascuno, 8/minuto nel piano gratuito)
 
 # Nuovo provider Polygon
 POLYGON_BASE_URL = "https://api.polygon.io"
@@ -164,3 +267,25 @@ SCAN_TIMEOUT = 30
 MIN_DATA_POINTS = 50
 MIN_CANDLES_FOR_SIGNAL = 30
 MAX_DATA_POINTS = 10000
+
+# ============================================
+# MONTE CARLO (robustezza del backtest)
+# ============================================
+MONTE_CARLO_SIMS = 10000  # Ricampionamenti della lista dei trade
+MONTE_CARLO_BLOCK = 5  # Trade consecutivi per blocco nel block bootstrap
+MONTE_CARLO_CONFIDENCE = 0.95  # Livello degli intervalli di confidenza
+MONTE_CARLO_BATCH = 2000  # Simulazioni per blocco di calcolo (limita la memoria)
+MONTE_CARLO_SEED = 42  # Seme del generatore (None = casuale ad ogni esecuzione)
+
+# ============================================
+# ESECUZIONE FETCH CONCORRENTE
+# ============================================
+FETCH_MAX_WORKERS = 8  # Thread del pool condiviso dei fetch
+FETCH_DEFAULT_RATE_PER_MIN = 120  # Chiamate/minuto per i provider senza limite al minuto (Yahoo)
+
+# ============================================
+# DOWNLOAD YAHOO MULTI-TICKER
+# ============================================
+YF_BATCH_SIZE = 50  # Simboli per richiesta yf.download
+YF_CACHE_TTL = 300  # Secondi di validità delle candele in cache per simbolo
+YF_INFO_TTL = 86400  # Secondi di validità dei dati anagrafici (nome, settore, capitalizzazione)
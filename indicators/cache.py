@@ -0,0 +1,180 @@
+# indicators/cache.py
+# Cache indicatori indirizzata per contenuto con ricalcolo parziale della coda
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+import pandas as pd
+
+import config
+from config import INDICATOR_CACHE_ENABLED, INDICATOR_CACHE_MAX_MB
+from indicators.numpy_kernels import compute_indicators_numpy, can_resume
+from indicators.robust_ta import compute_indicators_15m
+
+# Parametri che influenzano il risultato di compute_indicators_15m
+_CONFIG_KEYS = (
+    'RSI_LEN', 'ATR_LEN', 'ADX_LEN', 'ST_LEN', 'ST_MULT',
+    'SQUEEZE_BB_LEN', 'SQUEEZE_KC_LEN', 'SQUEEZE_BB_STD', 'SQUEEZE_KC_SCALAR',
+    'SQUEEZE_MOM_LEN', 'SQUEEZE_MOM_SMOOTH',
+    'EMA_FAST', 'EMA_SLOW', 'EMA_VERY_SLOW',
+    'INDICATOR_BACKEND', 'INDICATOR_DTYPE'
+)
+
+def indicator_config_hash() -> str:
+    """Hash dei parametri indicatori correnti"""
+    values = tuple((k, getattr(config, k, None)) for k in _CONFIG_KEYS)
+    return hashlib.md5(repr(values).encode()).hexdigest()[:12]
+
+def _frame_bounds(df: pd.DataFrame):
+    """(primo timestamp, ultimo timestamp, numero righe, ultima chiusura) del DataFrame"""
+    last_close = float(df["close"].iloc[-1])
+    if "datetime" in df.columns:
+        return df["datetime"].iloc[0], df["datetime"].iloc[-1], len(df), last_close
+    return df.index[0], df.index[-1], len(df), last_close
+
+class IndicatorCache:
+    """
+    Cache LRU degli indicatori calcolati.
+
+    Chiave: (simbolo, timeframe, hash config, primo/ultimo timestamp, righe);
+    l'ultima chiusura distingue frame di provider diversi con le stesse date.
+    Con il backend NumPy ogni voce conserva anche lo stato dei kernel
+    (compute_indicators_numpy(state=...)): se un nuovo DataFrame estende
+    uno già in cache (stesso inizio, candele aggiunte in coda) vengono
+    calcolate solo le candele nuove, riprendendo dallo stato, con lo stesso
+    risultato del calcolo completo. Altrimenti si ricalcola tutto.
+    """
+
+    def __init__(self, max_mb: float = INDICATOR_CACHE_MAX_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()   # key -> (df_ind, bytes, stato kernel o None)
+        self._by_start = {}             # (simbolo, tf, cfg, primo ts) -> key più recente
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, df: pd.DataFrame, symbol: str, timeframe: str = "15m",
+                       compute: Callable[[pd.DataFrame], pd.DataFrame] = compute_indicators_15m) -> pd.DataFrame:
+        """Restituisce gli indicatori per df, dalla cache quando possibile"""
+        if df is None or df.empty:
+            return compute(df)
+
+        cfg = indicator_config_hash()
+        first_ts, last_ts, n, last_close = _frame_bounds(df)
+        key = (symbol, timeframe, cfg, first_ts, last_ts, n, last_close)
+        start_key = (symbol, timeframe, cfg, first_ts)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy(deep=False)
+            prev_key = self._by_start.get(start_key)
+            prev = self._entries.get(prev_key) if prev_key is not None else None
+
+        resumable = compute is compute_indicators_15m and config.INDICATOR_BACKEND.lower() == "numpy"
+        df_ind = state = None
+        if resumable and prev is not None and prev[2] is not None and self._extends(df, prev[0]):
+            df_ind, state = self._extend(df, prev[0], prev[2])
+            if df_ind is not None:
+                with self._lock:
+                    self.partial_hits += 1
+        if df_ind is None:
+            if resumable:
+                state = {}
+                df_ind = compute_indicators_numpy(df, dtype=config.INDICATOR_DTYPE, state=state)
+            else:
+                df_ind = compute(df)
+            with self._lock:
+                self.misses += 1
+
+        self._store(key, start_key, prev_key, df_ind, state)
+        return df_ind.copy(deep=False)
+
+    def _extends(self, df: pd.DataFrame, cached: pd.DataFrame) -> bool:
+        """True se df contiene le stesse candele di cached più altre in coda"""
+        m = len(cached)
+        if len(df) <= m:
+            return False
+        if "datetime" in df.columns:
+            if df["datetime"].iloc[m - 1] != cached["datetime"].iloc[-1]:
+                return False
+        elif df.index[m - 1] != cached.index[-1]:
+            return False
+        return float(df["close"].iloc[m - 1]) == float(cached["close"].iloc[-1])
+
+    def _extend(self, df: pd.DataFrame, cached: pd.DataFrame, state):
+        """
+        Calcola solo le nuove candele riprendendo dallo stato dei kernel.
+
+        Returns:
+            (DataFrame esteso, nuovo stato), o (None, None) se la ripresa non
+            coincide con il calcolo completo (vedi can_resume)
+        """
+        m = len(cached)
+        new_bars = df.iloc[m:]
+        if not can_resume(state, new_bars):
+            return None, None
+        # Lo stato della voce in cache resta valido per chi la sta ancora usando
+        state = copy.deepcopy(state)
+        new_rows = compute_indicators_numpy(new_bars, dtype=config.INDICATOR_DTYPE, state=state)
+        out = pd.concat([cached, new_rows[cached.columns]], axis=0)
+        out.index = df.index
+        return out, state
+
+    def _store(self, key, start_key, prev_key, df_ind: pd.DataFrame, state=None):
+        size = int(df_ind.memory_usage(index=True, deep=False).sum())
+        with self._lock:
+            # La versione estesa sostituisce quella precedente
+            if prev_key is not None and prev_key in self._entries:
+                old_size = self._entries.pop(prev_key)[1]
+                self._bytes -= old_size
+            if key in self._entries:
+                old_size = self._entries.pop(key)[1]
+                self._bytes -= old_size
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df_ind, size, state)
+            self._by_start[start_key] = key
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                old_key, (_, old_size, _) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                if self._by_start.get(old_key[:4]) == old_key:
+                    del self._by_start[old_key[:4]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_start.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contatori hit/miss e occupazione memoria"""
+        total = self.hits + self.partial_hits + self.misses
+        return {
+            'hits': self.hits,
+            'partial_hits': self.partial_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size_mb': round(self._bytes / (1024 * 1024), 2),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'hit_rate': round((self.hits + self.partial_hits) / total * 100, 1) if total > 0 else 0.0
+        }
+
+# Istanza globale
+indicator_cache = IndicatorCache()
+
+def compute_indicators_cached(df_15m: pd.DataFrame, symbol: Optional[str] = None, timeframe: str = "15m"):
+    """compute_indicators_15m con cache; senza simbolo calcola direttamente"""
+    if not INDICATOR_CACHE_ENABLED or not symbol:
+        return compute_indicators_15m(df_15m)
+    return indicator_cache.get_or_compute(df_15m, symbol, timeframe)
@@ -0,0 +1,490 @@
+# indicators/incremental.py
+# Stato indicatori incrementale: aggiornamento O(1) per ogni nuova candela
+import copy
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    RSI_LEN, ATR_LEN, ADX_LEN, ST_LEN, ST_MULT,
+    SQUEEZE_BB_LEN, SQUEEZE_KC_LEN, SQUEEZE_BB_STD, SQUEEZE_KC_SCALAR,
+    SQUEEZE_MOM_LEN, SQUEEZE_MOM_SMOOTH,
+    EMA_FAST, EMA_SLOW, EMA_VERY_SLOW, INCREMENTAL_MAX_STATES
+)
+from indicators.numpy_kernels import indicator_columns
+from indicators.robust_ta import classify_signals
+
+# Candele recenti conservate per decide_signal (pendenza EMA20 su 5 barre)
+RECENT_ROWS = 6
+
+_EPS = np.finfo(float).eps
+
+
+class _Ewm:
+    """Ricorrenza EWM identica a pandas ewm(...).mean() (adjust True/False, NaN inclusi)"""
+
+    def __init__(self, alpha: float, adjust: bool, min_periods: int = 0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(int(min_periods), 1)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x: float) -> float:
+        is_obs = not math.isnan(x)
+        self.nobs += is_obs
+        if not math.isnan(self.weighted):
+            # ignore_na=False: il peso decade anche sulle osservazioni mancanti
+            self.old_wt *= (1.0 - self.alpha)
+            if is_obs:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * x) / (self.old_wt + new_wt)
+                if self.adjust:
+                    self.old_wt += new_wt
+                else:
+                    self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.weighted if self.nobs >= self.min_periods else math.nan
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'weighted': self.weighted, 'old_wt': self.old_wt, 'nobs': self.nobs}
+
+    def load(self, d: Dict[str, Any]):
+        self.weighted = float(d['weighted'])
+        self.old_wt = float(d['old_wt'])
+        self.nobs = int(d['nobs'])
+
+
+class _Rolling:
+    """Finestra mobile a lunghezza fissa (equivalente a rolling(n) con min_periods=n)"""
+
+    def __init__(self, length: int):
+        self.length = int(length)
+        self.values = deque(maxlen=self.length)
+
+    def update(self, x: float):
+        self.values.append(x)
+
+    def _valid(self) -> Optional[np.ndarray]:
+        if len(self.values) < self.length:
+            return None
+        arr = np.fromiter(self.values, dtype=np.float64, count=len(self.values))
+        if np.isnan(arr).any():
+            return None
+        return arr
+
+    def mean(self) -> float:
+        arr = self._valid()
+        return float(arr.mean()) if arr is not None else math.nan
+
+    def std(self, ddof: int = 0) -> float:
+        arr = self._valid()
+        return float(arr.std(ddof=ddof)) if arr is not None else math.nan
+
+    def to_dict(self):
+        return list(self.values)
+
+    def load(self, values):
+        self.values = deque((float(v) for v in values), maxlen=self.length)
+
+
+def _rma(length: int) -> _Ewm:
+    """Media di Wilder come pandas_ta.rma"""
+    return _Ewm(alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+def _ema(span: int) -> _Ewm:
+    """EMA come Series.ewm(span=span, adjust=False)"""
+    return _Ewm(alpha=2.0 / (span + 1.0), adjust=False)
+
+
+class IncrementalIndicatorState:
+    """
+    Stato indicatori per simbolo/timeframe aggiornabile candela per candela.
+
+    Replica le colonne di compute_indicators_15m (ema20/50/200, rsi, atr,
+    ADX_*/DMP_*/DMN_*, SUPERT*_*, SQZ_*) senza ricalcolare lo storico:
+    ogni update costa O(1) grazie a ricorrenze Wilder/EMA e finestre
+    mobili a lunghezza fissa per Bollinger/Keltner.
+    """
+
+    def __init__(self, symbol: str = "", timeframe: str = "15m"):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.last_ts = None
+        self.n = 0
+
+        self.prev_close = math.nan
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+
+        # EMA
+        self.ema_fast = _ema(EMA_FAST)
+        self.ema_slow = _ema(EMA_SLOW)
+        self.ema_very_slow = _ema(EMA_VERY_SLOW)
+
+        # RSI
+        self.rsi_pos = _rma(RSI_LEN)
+        self.rsi_neg = _rma(RSI_LEN)
+
+        # ATR
+        self.atr = _rma(ATR_LEN)
+
+        # ADX / DI
+        self.adx_atr = _rma(ADX_LEN)
+        self.adx_pos = _rma(ADX_LEN)
+        self.adx_neg = _rma(ADX_LEN)
+        self.adx = _rma(ADX_LEN)
+
+        # SuperTrend
+        self.st_atr = _rma(ST_LEN)
+        self.st_dir = 1
+        self.st_upper = math.nan
+        self.st_lower = math.nan
+
+        # Squeeze (Bollinger + Keltner + momentum)
+        self.bb_close = _Rolling(SQUEEZE_BB_LEN)
+        self.kc_close = _Rolling(SQUEEZE_KC_LEN)
+        self.kc_tr = _Rolling(SQUEEZE_KC_LEN)
+        self.mom_close = deque(maxlen=SQUEEZE_MOM_LEN + 1)
+        self.mom = _Rolling(SQUEEZE_MOM_SMOOTH)
+
+        self.last = {}
+        self.recent = deque(maxlen=RECENT_ROWS)
+
+    # ------------------------------------------------------------------
+    # Nomi colonna compatibili con pandas_ta
+    # ------------------------------------------------------------------
+    @property
+    def columns(self) -> Dict[str, str]:
+        return indicator_columns()
+
+    # ------------------------------------------------------------------
+    # Aggiornamento
+    # ------------------------------------------------------------------
+    def update(self, open_: float, high: float, low: float, close: float,
+               volume: float = 0.0, ts=None) -> Dict[str, Any]:
+        """Aggiunge una candela e restituisce la riga indicatori aggiornata"""
+        high = float(high)
+        low = float(low)
+        close = float(close)
+        prev_close = self.prev_close
+
+        # True range (prima candela NaN come in pandas_ta)
+        if math.isnan(prev_close):
+            tr = math.nan
+        else:
+            tr = max(abs(high - low), abs(high - prev_close), abs(prev_close - low))
+
+        # EMA
+        ema20 = self.ema_fast.update(close)
+        ema50 = self.ema_slow.update(close)
+        ema200 = self.ema_very_slow.update(close)
+
+        # RSI (Wilder)
+        diff = close - prev_close
+        if math.isnan(diff):
+            pos, neg = math.nan, math.nan
+        else:
+            pos, neg = max(diff, 0.0), min(diff, 0.0)
+        p_avg = self.rsi_pos.update(pos)
+        n_avg = self.rsi_neg.update(neg)
+        rsi = 100.0 * p_avg / (p_avg + abs(n_avg)) if (p_avg + abs(n_avg)) != 0 else math.nan
+
+        # ATR
+        atr = self.atr.update(tr)
+
+        # ADX / DI
+        adx_atr = self.adx_atr.update(tr)
+        if math.isnan(self.prev_high):
+            dm_pos, dm_neg = math.nan, math.nan
+        else:
+            up = high - self.prev_high
+            dn = self.prev_low - low
+            dm_pos = up if (up > dn and up > 0) else 0.0
+            dm_neg = dn if (dn > up and dn > 0) else 0.0
+            dm_pos = 0.0 if abs(dm_pos) < _EPS else dm_pos
+            dm_neg = 0.0 if abs(dm_neg) < _EPS else dm_neg
+        k = 100.0 / adx_atr if adx_atr else math.nan
+        dmp = k * self.adx_pos.update(dm_pos)
+        dmn = k * self.adx_neg.update(dm_neg)
+        dx = 100.0 * abs(dmp - dmn) / (dmp + dmn) if (dmp + dmn) != 0 else math.nan
+        adx = self.adx.update(dx)
+
+        # SuperTrend: bande sulla candela precedente, direzione persistente
+        st_atr = self.st_atr.update(tr)
+        hl2 = (high + low) / 2.0
+        upper = hl2 + ST_MULT * st_atr
+        lower = hl2 - ST_MULT * st_atr
+        if self.n > 0:
+            if close > self.st_upper:
+                self.st_dir = 1
+            elif close < self.st_lower:
+                self.st_dir = -1
+            else:
+                if self.st_dir > 0 and lower < self.st_lower:
+                    lower = self.st_lower
+                if self.st_dir < 0 and upper > self.st_upper:
+                    upper = self.st_upper
+        self.st_upper, self.st_lower = upper, lower
+        st_trend = lower if self.st_dir > 0 else upper
+
+        # Squeeze
+        self.bb_close.update(close)
+        self.kc_close.update(close)
+        self.kc_tr.update(tr)
+        self.mom_close.append(close)
+        if len(self.mom_close) > SQUEEZE_MOM_LEN:
+            self.mom.update(close - self.mom_close[0])
+        else:
+            self.mom.update(math.nan)
+
+        bb_mid = self.bb_close.mean()
+        bb_dev = SQUEEZE_BB_STD * self.bb_close.std(ddof=0)
+        kc_mid = self.kc_close.mean()
+        kc_band = SQUEEZE_KC_SCALAR * self.kc_tr.mean()
+        lower_bb, upper_bb = bb_mid - bb_dev, bb_mid + bb_dev
+        lower_kc, upper_kc = kc_mid - kc_band, kc_mid + kc_band
+        sqz_on = int((lower_bb > lower_kc) and (upper_bb < upper_kc))
+        sqz_off = int((lower_bb < lower_kc) and (upper_bb > upper_kc))
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.last_ts = ts
+        self.n += 1
+
+        cols = self.columns
+        row = {
+            'datetime': ts,
+            'open': float(open_),
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': float(volume),
+            'ema20': ema20,
+            'ema50': ema50,
+            'ema200': ema200,
+            'rsi': rsi,
+            'atr': atr,
+            cols['adx']: adx,
+            cols['dmp']: dmp,
+            cols['dmn']: dmn,
+            cols['st']: st_trend,
+            cols['st_dir']: self.st_dir,
+            cols['st_long']: lower if self.st_dir > 0 else math.nan,
+            cols['st_short']: upper if self.st_dir < 0 else math.nan,
+            cols['sqz']: self.mom.mean(),
+            'SQZ_ON': sqz_on,
+            'SQZ_OFF': sqz_off,
+            'NO_SQZ': int(not sqz_on and not sqz_off),
+        }
+        self.last = row
+        self.recent.append(row)
+        return row
+
+    def preview(self, open_: float, high: float, low: float, close: float,
+                volume: float = 0.0, ts=None) -> Dict[str, Any]:
+        """Riga indicatori di una candela ancora in formazione, senza aggiornare lo stato"""
+        return copy.deepcopy(self).update(open_, high, low, close, volume, ts)
+
+    def sync(self, df: pd.DataFrame) -> int:
+        """
+        Applica solo le candele di df successive all'ultima vista.
+
+        La candela è identificata dalla colonna datetime o, in sua assenza,
+        dall'etichetta dell'indice (come IndicatorCache): df deve contenere
+        solo candele chiuse, quella in formazione verrebbe fissata nello stato.
+        """
+        if df is None or df.empty:
+            return 0
+        has_ts = "datetime" in df.columns
+        keys = df["datetime"] if has_ts else df.index.to_series(index=df.index)
+        new = df
+        if self.last_ts is not None:
+            new = df[(keys > self.last_ts).to_numpy()]
+        if new.empty:
+            return 0
+        ts = new["datetime"].tolist() if has_ts else [None] * len(new)
+        volume = new["volume"].to_numpy(dtype=np.float64) if "volume" in new.columns else np.zeros(len(new))
+        for o, h, l, c, v, t in zip(new["open"].to_numpy(dtype=np.float64),
+                                    new["high"].to_numpy(dtype=np.float64),
+                                    new["low"].to_numpy(dtype=np.float64),
+                                    new["close"].to_numpy(dtype=np.float64),
+                                    volume, ts):
+            self.update(o, h, l, c, v, t)
+        if not has_ts:
+            self.last_ts = new.index[-1]
+        return len(new)
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, symbol: str = "", timeframe: str = "15m"):
+        """Crea lo stato inizializzandolo con lo storico disponibile"""
+        state = cls(symbol, timeframe)
+        state.sync(df)
+        return state
+
+    def to_frame(self) -> pd.DataFrame:
+        """Ultime candele con indicatori, utilizzabile direttamente con decide_signal"""
+        return pd.DataFrame(list(self.recent))
+
+    # ------------------------------------------------------------------
+    # Serializzazione
+    # ------------------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        """Stato serializzabile (JSON/pickle) per mantenere i simboli 'caldi'"""
+        last_ts = self.last_ts
+        if isinstance(last_ts, pd.Timestamp):
+            last_ts = last_ts.isoformat()
+        elif isinstance(last_ts, np.integer):
+            last_ts = int(last_ts)
+        recent = []
+        for row in self.recent:
+            r = dict(row)
+            if isinstance(r.get('datetime'), pd.Timestamp):
+                r['datetime'] = r['datetime'].isoformat()
+            recent.append(r)
+        return {
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'last_ts': last_ts,
+            'n': self.n,
+            'prev': [self.prev_close, self.prev_high, self.prev_low],
+            'ewm': {name: getattr(self, name).to_dict() for name in self._EWM_FIELDS},
+            'rolling': {name: getattr(self, name).to_dict() for name in self._ROLLING_FIELDS},
+            'mom_close': list(self.mom_close),
+            'st': [self.st_dir, self.st_upper, self.st_lower],
+            'recent': recent,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]):
+        """Ricostruisce lo stato da to_dict"""
+        state = cls(d.get('symbol', ""), d.get('timeframe', "15m"))
+        last_ts = d.get('last_ts')
+        state.last_ts = pd.Timestamp(last_ts) if isinstance(last_ts, str) else last_ts
+        state.n = int(d.get('n', 0))
+        state.prev_close, state.prev_high, state.prev_low = (float(x) for x in d['prev'])
+        for name in cls._EWM_FIELDS:
+            getattr(state, name).load(d['ewm'][name])
+        for name in cls._ROLLING_FIELDS:
+            getattr(state, name).load(d['rolling'][name])
+        state.mom_close = deque((float(x) for x in d['mom_close']), maxlen=SQUEEZE_MOM_LEN + 1)
+        st_dir, st_upper, st_lower = d['st']
+        state.st_dir, state.st_upper, state.st_lower = int(st_dir), float(st_upper), float(st_lower)
+        for row in d.get('recent', []):
+            r = dict(row)
+            if isinstance(r.get('datetime'), str):
+                r['datetime'] = pd.Timestamp(r['datetime'])
+            state.recent.append(r)
+        state.last = state.recent[-1] if state.recent else {}
+        return state
+
+    _EWM_FIELDS = (
+        'ema_fast', 'ema_slow', 'ema_very_slow', 'rsi_pos', 'rsi_neg', 'atr',
+        'adx_atr', 'adx_pos', 'adx_neg', 'adx', 'st_atr'
+    )
+    _ROLLING_FIELDS = ('bb_close', 'kc_close', 'kc_tr', 'mom')
+
+
+# ============================================
+# REGISTRO STATI PER SIMBOLO/TIMEFRAME
+# ============================================
+# LRU: oltre INCREMENTAL_MAX_STATES si scartano gli stati usati meno di recente
+_states: "OrderedDict[tuple, IncrementalIndicatorState]" = OrderedDict()
+_states_lock = threading.Lock()
+
+def _store_state(key: tuple, state: IncrementalIndicatorState):
+    """Registra lo stato come il più recente e applica il limite del registro"""
+    _states[key] = state
+    _states.move_to_end(key)
+    while len(_states) > INCREMENTAL_MAX_STATES:
+        _states.popitem(last=False)
+
+def _first_key(df: pd.DataFrame):
+    """Identificativo della prima candela (datetime o etichetta dell'indice, come sync)"""
+    return df["datetime"].iloc[0] if "datetime" in df.columns else df.index[0]
+
+def get_incremental_state(symbol: str, timeframe: str, df: pd.DataFrame) -> IncrementalIndicatorState:
+    """
+    Restituisce lo stato 'caldo' del simbolo, aggiornato con le sole candele nuove.
+
+    Se df inizia dopo l'ultima candela vista (simbolo non aggiornato per
+    più della finestra scaricata) mancano candele intermedie: lo stato
+    viene ricostruito da df.
+    """
+    key = (symbol, timeframe)
+    with _states_lock:
+        state = _states.get(key)
+        if state is not None and state.last_ts is not None and df is not None and not df.empty \
+                and _first_key(df) > state.last_ts:
+            state = None
+        if state is None:
+            state = IncrementalIndicatorState.from_history(df, symbol, timeframe)
+        else:
+            state.sync(df)
+        _store_state(key, state)
+    return state
+
+def incremental_signal_table(frames: Dict[str, pd.DataFrame], timeframe: str = "15m",
+                             mtf_long=True, mtf_short=True) -> pd.DataFrame:
+    """
+    Tabella segnali sull'ultima candela di ogni simbolo dagli stati 'caldi'
+    (stesso schema di indicators.panel.panel_signal_table).
+
+    Le candele chiuse aggiornano lo stato del simbolo in O(1) ciascuna;
+    l'ultima, ancora in formazione, è calcolata su una copia dello stato,
+    così alla scansione successiva entra con i valori definitivi.
+    """
+    symbols, rows, slopes = [], [], []
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+        state = get_incremental_state(symbol, timeframe, df.iloc[:-1])
+        bar = df.iloc[-1]
+        with _states_lock:
+            last = state.preview(bar["open"], bar["high"], bar["low"], bar["close"],
+                                 bar.get("volume", 0.0), bar["datetime"] if "datetime" in df.columns else df.index[-1])
+            ema20 = [r['ema20'] for r in state.recent] + [last['ema20']]
+            bars = state.n + 1
+        # Pendenza EMA20 come decide_signal: sw = min(5, candele - 1)
+        sw = min(5, bars - 1)
+        slopes.append((ema20[-1] - ema20[-sw]) / sw if sw > 0 else 0.0)
+        row = {k: v for k, v in last.items() if k not in ('datetime', 'open', 'high', 'low', 'volume')}
+        rows.append({'datetime': last['datetime'], 'bars': bars, **row})
+        symbols.append(symbol)
+    if not symbols:
+        return pd.DataFrame()
+
+    table = pd.DataFrame(rows, index=pd.Index(symbols, name='symbol'))
+    sig = classify_signals(table, mtf_long, mtf_short, slope=np.asarray(slopes, dtype=np.float64))
+    table['slope'] = sig['slope']
+    table['signal'] = sig['signal']
+    table['strength'] = sig['strength']
+    return table
+
+def clear_states():
+    """Svuota il registro degli stati"""
+    with _states_lock:
+        _states.clear()
+
+def export_states() -> Dict[str, Dict[str, Any]]:
+    """Esporta tutti gli stati (es. per salvarli su disco tra un riavvio e l'altro)"""
+    with _states_lock:
+        return {f"{sym}|{tf}": st.to_dict() for (sym, tf), st in _states.items()}
+
+def import_states(data: Dict[str, Dict[str, Any]]):
+    """Ripristina gli stati esportati con export_states"""
+    with _states_lock:
+        for d in data.values():
+            state = IncrementalIndicatorState.from_dict(d)
+            _store_state((state.symbol, state.timeframe), state)
@@ -0,0 +1,196 @@
+# indicators/mtf.py
+# Trend multi-timeframe (1h/4h) allineato alle candele 15m con ricerca binaria sui timestamp
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import MTF_EMA_1H, MTF_EMA_4H, MTF_CACHE_SIZE
+from indicators.numpy_kernels import ema
+
+_HOUR_NS = 3600 * 10**9
+
+def _ts_ns(values) -> np.ndarray:
+    """Timestamp in int64 ns UTC (i timestamp naive sono trattati come UTC)"""
+    idx = pd.DatetimeIndex(pd.to_datetime(values, utc=True)).tz_convert(None)
+    return idx.values.astype("datetime64[ns]").astype(np.int64)
+
+def _frame_ts(df: pd.DataFrame) -> np.ndarray:
+    if "datetime" in df.columns:
+        return _ts_ns(df["datetime"])
+    return _ts_ns(df.index)
+
+def _usable(df) -> bool:
+    return df is not None and not df.empty and "close" in df.columns
+
+class MTFCache:
+    """LRU delle serie trend HTF e dei flag MTF già allineati"""
+
+    def __init__(self, max_entries: int = MTF_CACHE_SIZE):
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'hit_rate': round(self.hits / total * 100, 1) if total else 0.0
+        }
+
+# Istanza globale
+mtf_cache = MTFCache()
+
+# ============================================
+# SERIE HTF
+# ============================================
+def htf_trend(df_htf: pd.DataFrame, span: int, symbol: Optional[str] = None,
+              timeframe: str = "") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trend di un timeframe superiore: close > EMA(span) (ewm adjust=False).
+
+    Returns:
+        (timestamp int64 ns, array bool up) nell'ordine delle candele HTF
+    """
+    ts = _frame_ts(df_htf)
+    key = None
+    if symbol:
+        key = ('htf', symbol, timeframe, span, int(ts[-1]), len(ts))
+        cached = mtf_cache.get(key)
+        if cached is not None:
+            return cached
+
+    close = pd.to_numeric(df_htf["close"], errors="coerce").to_numpy(dtype=np.float64)
+    up = close > ema(close, span)
+    if len(ts) > 1 and (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind="stable")
+        ts, up = ts[order], up[order]
+
+    if key is not None:
+        mtf_cache.put(key, (ts, up))
+    return ts, up
+
+def bar_period(ts: np.ndarray) -> int:
+    """Durata (ns) di una candela: intervallo mediano fra timestamp consecutivi (0 con meno di 2 candele)"""
+    if len(ts) < 2:
+        return 0
+    steps = np.diff(ts)
+    steps = steps[steps > 0]
+    return int(np.median(steps)) if len(steps) else 0
+
+def align_to(ts_base: np.ndarray, ts_htf: np.ndarray, values: np.ndarray, default=False,
+             base_period: int = 0, htf_period: int = 0) -> np.ndarray:
+    """
+    Valore HTF noto alla chiusura di ogni candela base: ultima candela HTF
+    già chiusa (ts + htf_period) entro la chiusura della candela base
+    (ts + base_period). Le candele sono etichettate con il loro inizio:
+    una candela 1h/4h ancora in formazione non è mai visibile.
+
+    Con periodi 0 confronta i soli timestamp (valore in vigore a ogni ts base).
+    """
+    idx = np.searchsorted(ts_htf + htf_period, ts_base + base_period, side="right") - 1
+    out = np.asarray(values)[np.maximum(idx, 0)]
+    return np.where(idx >= 0, out, default)
+
+def resample_closes(df: pd.DataFrame, hours: int) -> pd.DataFrame:
+    """
+    Chiusure aggregate a `hours` ore (ultima chiusura di ogni intervallo).
+
+    L'intervallo è etichettato con il suo inizio, come le candele dei provider:
+    la chiusura è nota solo a fine intervallo (vedi align_to). Serve per
+    derivare un timeframe superiore da uno storico già scaricato.
+    """
+    ts = _frame_ts(df)
+    close = pd.to_numeric(df["close"], errors="coerce").to_numpy(dtype=np.float64)
+    bucket = ts // (hours * _HOUR_NS)
+    last = np.flatnonzero(np.append(bucket[1:] != bucket[:-1], True))
+    return pd.DataFrame({
+        "datetime": pd.to_datetime(bucket[last] * hours * _HOUR_NS, utc=True),
+        "close": close[last]
+    })
+
+# ============================================
+# FLAG MTF
+# ============================================
+def mtf_flags(df_15m: pd.DataFrame, df_1h=None, df_4h=None,
+              symbol: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flag MTF per ogni candela di df_15m.
+
+    mtf_long = trend up su tutti i timeframe disponibili, mtf_short = trend
+    down su tutti. Un timeframe mancante non filtra; senza dati HTF entrambi
+    i flag sono sempre True. Ogni candela usa solo candele HTF già chiuse
+    alla sua chiusura.
+
+    Returns:
+        (mtf_long, mtf_short) array bool lunghi len(df_15m)
+    """
+    n = len(df_15m)
+    htfs = [(tf, df, span) for tf, df, span in (("1h", df_1h, MTF_EMA_1H), ("4h", df_4h, MTF_EMA_4H))
+            if _usable(df)]
+    if not htfs or n == 0:
+        return np.ones(n, dtype=bool), np.ones(n, dtype=bool)
+
+    ts15 = _frame_ts(df_15m)
+    base_period = bar_period(ts15)
+    key = None
+    if symbol:
+        htf_key = tuple((tf, str(df["datetime"].iloc[-1] if "datetime" in df.columns else df.index[-1]), len(df))
+                        for tf, df, _ in htfs)
+        key = ('flags', symbol, int(ts15[0]), int(ts15[-1]), n, htf_key)
+        cached = mtf_cache.get(key)
+        if cached is not None:
+            return cached
+
+    mtf_long = np.ones(n, dtype=bool)
+    mtf_short = np.ones(n, dtype=bool)
+    for tf, df, span in htfs:
+        ts, up = htf_trend(df, span, symbol, tf)
+        # Allineamento sulle chiusure: nessuna candela vede il trend di una candela HTF non ancora chiusa
+        up15 = align_to(ts15, ts, up, default=False, base_period=base_period, htf_period=bar_period(ts))
+        mtf_long &= up15
+        mtf_short &= ~up15
+
+    if key is not None:
+        mtf_cache.put(key, (mtf_long, mtf_short))
+    return mtf_long, mtf_short
+
+def current_mtf(df_1h=None, df_4h=None, symbol: Optional[str] = None) -> Tuple[bool, bool]:
+    """Flag MTF sull'ultima candela HTF disponibile (analisi live)"""
+    mtf_long, mtf_short = True, True
+    for tf, df, span in (("1h", df_1h, MTF_EMA_1H), ("4h", df_4h, MTF_EMA_4H)):
+        if not _usable(df):
+            continue
+        up = bool(htf_trend(df, span, symbol, tf)[1][-1])
+        mtf_long = mtf_long and up
+        mtf_short = mtf_short and not up
+    return mtf_long, mtf_short
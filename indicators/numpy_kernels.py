@@ -0,0 +1,446 @@
+# indicators/numpy_kernels.py
+# Kernel NumPy nativi per gli indicatori (backend alternativo a pandas_ta)
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import (
+    RSI_LEN, ATR_LEN, ADX_LEN, ST_LEN, ST_MULT,
+    SQUEEZE_BB_LEN, SQUEEZE_KC_LEN, SQUEEZE_BB_STD, SQUEEZE_KC_SCALAR,
+    SQUEEZE_MOM_LEN, SQUEEZE_MOM_SMOOTH,
+    EMA_FAST, EMA_SLOW, EMA_VERY_SLOW
+)
+
+_EPS = np.finfo(float).eps
+
+# ============================================
+# PRIMITIVE
+# ============================================
+def _out(n: int, out=None, dtype=np.float64) -> np.ndarray:
+    """Restituisce l'array di output preallocato o ne crea uno nuovo"""
+    if out is None:
+        return np.empty(n, dtype=dtype)
+    if len(out) != n:
+        raise ValueError(f"Output di lunghezza {len(out)}, attesa {n}")
+    return out
+
+def ewm_mean(x: np.ndarray, alpha: float, adjust: bool, min_periods: int = 0, out=None,
+             state=None) -> np.ndarray:
+    """
+    EWM identica a pandas Series.ewm(alpha=..., adjust=..., min_periods=...).mean()
+
+    state: dict per il calcolo a pezzi; se già usato su un pezzo precedente
+    la media prosegue da lì (stesso risultato della serie intera) e a fine
+    calcolo viene aggiornato
+
+    Da zero la media è calcolata da pandas (ciclo compilato) e lo stato è
+    ricavato dal risultato; solo la ripresa da uno stato (le candele nuove)
+    usa il ciclo Python, con le stesse operazioni e quindi gli stessi bit.
+    """
+    n = len(x)
+    res = _out(n, out)
+    minp = max(int(min_periods), 1)
+    if state:
+        return _ewm_loop(x, alpha, adjust, minp, res, state)
+
+    x = np.asarray(x, dtype=np.float64)
+    obs = x == x
+    nobs = int(obs.sum())
+    if nobs < minp:
+        return _ewm_loop(x, alpha, adjust, minp, res, state)
+    res[:] = pd.Series(x).ewm(alpha=alpha, adjust=adjust, min_periods=minp).mean().to_numpy()
+    if state is not None:
+        state.update(weighted=float(res[-1]), old_wt=_ewm_old_wt(obs, alpha, adjust), nobs=nobs)
+    return res
+
+def _ewm_old_wt(obs: np.ndarray, alpha: float, adjust: bool) -> float:
+    """
+    Peso accumulato a fine serie (dipende solo dalle posizioni osservate).
+
+    Stessa ricorrenza di _ewm_loop dalla prima osservazione; nell'ultimo
+    tratto senza NaN il peso raggiunge un punto fisso in poche centinaia di
+    passi e da lì resta costante, quindi il ciclo si ferma.
+    """
+    new_wt = 1.0 if adjust else alpha
+    factor = 1.0 - alpha
+    first = int(np.argmax(obs))
+    gaps = np.flatnonzero(~obs[first:])
+    last_gap = first + int(gaps[-1]) if len(gaps) else first
+    old_wt = 1.0
+    for i in range(first + 1, len(obs)):
+        prev = old_wt
+        old_wt *= factor
+        if obs[i]:
+            old_wt = old_wt + new_wt if adjust else 1.0
+        if i > last_gap and old_wt == prev:
+            break
+    return old_wt
+
+def _ewm_loop(x: np.ndarray, alpha: float, adjust: bool, minp: int, res: np.ndarray, state=None) -> np.ndarray:
+    """Ricorrenza EWM candela per candela (stesse operazioni di pandas), ripresa da state"""
+    n = len(x)
+    vals = x.tolist()
+    new_wt = 1.0 if adjust else alpha
+    factor = 1.0 - alpha
+    weighted = float("nan")
+    old_wt = 1.0
+    nobs = 0
+    if state:
+        weighted, old_wt, nobs = state['weighted'], state['old_wt'], state['nobs']
+    for i in range(n):
+        cur = vals[i]
+        is_obs = cur == cur
+        nobs += is_obs
+        if weighted == weighted:
+            old_wt *= factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                old_wt = old_wt + new_wt if adjust else 1.0
+        elif is_obs:
+            weighted = cur
+        res[i] = weighted if nobs >= minp else np.nan
+    if state is not None:
+        state.update(weighted=weighted, old_wt=old_wt, nobs=nobs)
+    return res
+
+def ema(x: np.ndarray, span: int, out=None, state=None) -> np.ndarray:
+    """EMA come ewm(span=span, adjust=False)"""
+    return ewm_mean(x, 2.0 / (span + 1.0), adjust=False, out=out, state=state)
+
+def rma(x: np.ndarray, length: int, out=None, state=None) -> np.ndarray:
+    """Media di Wilder come pandas_ta.rma"""
+    return ewm_mean(x, 1.0 / length, adjust=True, min_periods=length, out=out, state=state)
+
+def rolling_mean(x: np.ndarray, length: int, out=None) -> np.ndarray:
+    """Media mobile semplice (NaN se la finestra contiene NaN o è incompleta)"""
+    n = len(x)
+    res = _out(n, out)
+    res[:] = np.nan
+    if n >= length:
+        win = sliding_window_view(x, length)
+        res[length - 1:] = win.mean(axis=1)
+    return res
+
+def rolling_std(x: np.ndarray, length: int, ddof: int = 0, out=None) -> np.ndarray:
+    """Deviazione standard mobile"""
+    n = len(x)
+    res = _out(n, out)
+    res[:] = np.nan
+    if n >= length:
+        win = sliding_window_view(x, length)
+        res[length - 1:] = win.std(axis=1, ddof=ddof)
+    return res
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, out=None,
+               zero_shift=None) -> np.ndarray:
+    """
+    True range (prima candela NaN come in pandas_ta)
+
+    zero_shift: se None, high - low è spostato di eps quando almeno una
+    candela ha high == low (come pandas_ta); True/False lo impone
+    """
+    n = len(close)
+    res = _out(n, out)
+    if n == 0:
+        return res
+    hl = high - low
+    if zero_shift if zero_shift is not None else (hl == 0).any():
+        hl = hl + _EPS
+    prev_close = np.empty(n)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    np.maximum(np.abs(hl), np.abs(high - prev_close), out=res)
+    np.maximum(res, np.abs(prev_close - low), out=res)
+    res[0] = np.nan
+    return res
+
+# ============================================
+# INDICATORI
+# ============================================
+def price_deltas(close: np.ndarray):
+    """Variazioni positive e negative della chiusura (intermedio dell'RSI, indipendente dalla lunghezza)"""
+    diff = np.empty(len(close))
+    diff[:1] = np.nan
+    diff[1:] = np.diff(close)
+    pos = np.where(diff < 0, 0.0, diff)
+    neg = np.where(diff > 0, 0.0, diff)
+    return pos, neg
+
+def directional_moves(high: np.ndarray, low: np.ndarray):
+    """DM+ e DM- per candela (intermedio dell'ADX, indipendente dalla lunghezza)"""
+    n = len(high)
+    up = np.empty(n)
+    dn = np.empty(n)
+    up[:1] = np.nan
+    dn[:1] = np.nan
+    up[1:] = high[1:] - high[:-1]
+    dn[1:] = low[:-1] - low[1:]
+    pos = np.where((up > dn) & (up > 0), up, 0.0)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[np.abs(pos) < _EPS] = 0.0
+    neg[np.abs(neg) < _EPS] = 0.0
+    pos[:1] = np.nan
+    neg[:1] = np.nan
+    return pos, neg
+
+def _sub(state, key):
+    """Stato di una media interna (None se il calcolo non è a pezzi)"""
+    return state.setdefault(key, {}) if state is not None else None
+
+def rsi(close: np.ndarray, length: int = RSI_LEN, out=None, deltas=None, state=None) -> np.ndarray:
+    """RSI di Wilder (deltas: price_deltas già calcolato; state come in ewm_mean)"""
+    pos, neg = deltas if deltas is not None else price_deltas(close)
+    p_avg = rma(pos, length, state=_sub(state, 'pos'))
+    n_avg = rma(neg, length, state=_sub(state, 'neg'))
+    res = _out(len(close), out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        res[:] = 100.0 * p_avg / (p_avg + np.abs(n_avg))
+    return res
+
+def atr(high, low, close, length: int = ATR_LEN, tr=None, out=None, state=None) -> np.ndarray:
+    """Average True Range (Wilder)"""
+    if tr is None:
+        tr = true_range(high, low, close)
+    return rma(tr, length, out=out, state=state)
+
+def adx(high, low, close, length: int = ADX_LEN, tr=None, out_adx=None, out_dmp=None, out_dmn=None,
+        atr_=None, moves=None, state=None):
+    """
+    ADX, DI+ e DI- (Wilder)
+
+    atr_: rma(tr, length) già calcolato; moves: directional_moves già calcolato
+    state: come in ewm_mean, per tutte le medie interne
+    """
+    n = len(close)
+    if atr_ is None:
+        if tr is None:
+            tr = true_range(high, low, close)
+        atr_ = rma(tr, length, state=_sub(state, 'atr'))
+    pos, neg = moves if moves is not None else directional_moves(high, low)
+
+    dmp = _out(n, out_dmp)
+    dmn = _out(n, out_dmn)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100.0 / atr_
+        dmp[:] = k * rma(pos, length, state=_sub(state, 'pos'))
+        dmn[:] = k * rma(neg, length, state=_sub(state, 'neg'))
+        dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    adx_ = rma(dx, length, out=out_adx, state=_sub(state, 'dx'))
+    return adx_, dmp, dmn
+
+def supertrend(high, low, close, length: int = ST_LEN, multiplier: float = ST_MULT, tr=None,
+               out_trend=None, out_long=None, out_short=None, atr_=None, state=None):
+    """
+    SuperTrend: trend, direzione (1/-1), banda long e banda short
+
+    atr_: rma(tr, length) già calcolato
+    state: come in ewm_mean; conserva anche direzione e bande dell'ultima candela
+    """
+    n = len(close)
+    if atr_ is None:
+        if tr is None:
+            tr = true_range(high, low, close)
+        atr_ = rma(tr, length, state=_sub(state, 'atr'))
+    matr = multiplier * atr_
+    hl2 = (high + low) / 2.0
+    upper = (hl2 + matr).tolist()
+    lower = (hl2 - matr).tolist()
+    closes = close.tolist()
+
+    trend = _out(n, out_trend)
+    long_ = _out(n, out_long)
+    short_ = _out(n, out_short)
+    direction = np.ones(n, dtype=np.int64)
+    if n == 0:
+        return trend, direction, long_, short_
+    long_[:] = np.nan
+    short_[:] = np.nan
+
+    # Ripresa: l'ultima candela del pezzo precedente fa da candela i - 1
+    resume = bool(state) and 'd' in state
+    off = 1 if resume else 0
+    if resume:
+        upper.insert(0, state['upper'])
+        lower.insert(0, state['lower'])
+        closes.insert(0, np.nan)
+        d = state['d']
+    else:
+        trend[0] = 0.0
+        d = 1
+    for i in range(1, n + off):
+        c = closes[i]
+        if c > upper[i - 1]:
+            d = 1
+        elif c < lower[i - 1]:
+            d = -1
+        else:
+            if d > 0 and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if d < 0 and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+        direction[i - off] = d
+        if d > 0:
+            trend[i - off] = long_[i - off] = lower[i]
+        else:
+            trend[i - off] = short_[i - off] = upper[i]
+    if state is not None:
+        state.update(d=d, upper=upper[-1], lower=lower[-1])
+    return trend, direction, long_, short_
+
+def squeeze(high, low, close, bb_length: int = SQUEEZE_BB_LEN, bb_std: float = SQUEEZE_BB_STD,
+            kc_length: int = SQUEEZE_KC_LEN, kc_scalar: float = SQUEEZE_KC_SCALAR,
+            mom_length: int = SQUEEZE_MOM_LEN, mom_smooth: int = SQUEEZE_MOM_SMOOTH,
+            tr=None, out_sqz=None):
+    """Squeeze (Bollinger dentro Keltner): momentum, SQZ_ON, SQZ_OFF, NO_SQZ"""
+    n = len(close)
+    if tr is None:
+        tr = true_range(high, low, close)
+    mid = rolling_mean(close, bb_length)
+    dev = bb_std * rolling_std(close, bb_length, ddof=0)
+    basis = mid if kc_length == bb_length else rolling_mean(close, kc_length)
+    band = kc_scalar * rolling_mean(tr, kc_length)
+
+    lower_bb, upper_bb = mid - dev, mid + dev
+    lower_kc, upper_kc = basis - band, basis + band
+
+    mom = np.full(n, np.nan)
+    if n > mom_length:
+        mom[mom_length:] = close[mom_length:] - close[:-mom_length]
+    sqz = rolling_mean(mom, mom_smooth, out=out_sqz)
+
+    on = (lower_bb > lower_kc) & (upper_bb < upper_kc)
+    off = (lower_bb < lower_kc) & (upper_bb > upper_kc)
+    no = ~on & ~off
+    return sqz, on.astype(np.int64), off.astype(np.int64), no.astype(np.int64)
+
+# ============================================
+# CALCOLO COMPLETO
+# ============================================
+def indicator_columns(adx_len: int = ADX_LEN, st_len: int = ST_LEN, st_mult: float = ST_MULT):
+    """Nomi colonna compatibili con pandas_ta"""
+    st_props = f"_{st_len}_{st_mult}"
+    return {
+        'adx': f"ADX_{adx_len}",
+        'dmp': f"DMP_{adx_len}",
+        'dmn': f"DMN_{adx_len}",
+        'st': f"SUPERT{st_props}",
+        'st_dir': f"SUPERTd{st_props}",
+        'st_long': f"SUPERTl{st_props}",
+        'st_short': f"SUPERTs{st_props}",
+        'sqz': f"SQZ_{SQUEEZE_BB_LEN}_{SQUEEZE_BB_STD}_{SQUEEZE_KC_LEN}_{SQUEEZE_KC_SCALAR}",
+    }
+
+# Colonne float scritte nel blocco preallocato, nell'ordine di compute_indicators_15m
+_FLOAT_COLS = ('ema20', 'ema50', 'ema200', 'rsi', 'atr', 'adx', 'dmp', 'dmn', 'st', 'st_long', 'st_short', 'sqz')
+
+# Candele precedenti necessarie alle finestre mobili dello squeeze nel calcolo a pezzi
+_SQUEEZE_LOOKBACK = max(SQUEEZE_BB_LEN, SQUEEZE_KC_LEN, SQUEEZE_MOM_LEN + SQUEEZE_MOM_SMOOTH)
+
+def can_resume(state, df_new: pd.DataFrame) -> bool:
+    """
+    True se compute_indicators_numpy(df_new, state=state) coincide con il
+    calcolo sull'intera serie: una candela con high == low, mai vista
+    prima, sposterebbe di eps il true range di tutta la serie (vedi true_range)
+    """
+    if not state or 'tail' not in state:
+        return True
+    zero = bool((df_new["high"].to_numpy(dtype=np.float64) == df_new["low"].to_numpy(dtype=np.float64)).any())
+    return state['hl_zero'] or not zero
+
+def compute_indicators_numpy(df_15m: pd.DataFrame, dtype=np.float64, state=None) -> pd.DataFrame:
+    """
+    Calcola gli stessi indicatori di compute_indicators_15m con kernel NumPy.
+
+    Tutti i valori float sono scritti in un unico blocco preallocato
+    (float64 o float32) e il DataFrame finale è costruito una sola volta,
+    senza join intermedie.
+
+    state: dict per il calcolo a pezzi (vuoto al primo). Conserva gli stati
+    delle medie, della SuperTrend e le ultime candele per true range e
+    finestre mobili: il pezzo successivo (candele nuove in coda) restituisce
+    solo le sue righe, uguali a quelle del calcolo sull'intera serie.
+    Prima di riprendere va verificato can_resume.
+    """
+    n = len(df_15m)
+    high = df_15m["high"].to_numpy(dtype=np.float64)
+    low = df_15m["low"].to_numpy(dtype=np.float64)
+    close = df_15m["close"].to_numpy(dtype=np.float64)
+
+    block = np.empty((len(_FLOAT_COLS), n), dtype=np.float64)
+    row = {name: block[i] for i, name in enumerate(_FLOAT_COLS)}
+
+    tail = state.get('tail') if state is not None else None
+    if tail is None:
+        tr = true_range(high, low, close)
+        deltas = price_deltas(close)
+        moves = directional_moves(high, low)
+        sq_high, sq_low, sq_close, sq_tr = high, low, close, tr
+    else:
+        # Candele precedenti in testa: la prima nuova vede la chiusura precedente
+        if not can_resume(state, df_15m):
+            raise ValueError("Candela con high == low: serve il ricalcolo completo")
+        k = len(tail['close'])
+        sq_high = np.concatenate([tail['high'], high])
+        sq_low = np.concatenate([tail['low'], low])
+        sq_close = np.concatenate([tail['close'], close])
+        tr = true_range(sq_high, sq_low, sq_close, zero_shift=state['hl_zero'])[k:]
+        deltas = tuple(a[k:] for a in price_deltas(sq_close))
+        moves = tuple(a[k:] for a in directional_moves(sq_high, sq_low))
+        sq_tr = np.concatenate([tail['tr'], tr])
+
+    ema(close, EMA_FAST, out=row['ema20'], state=_sub(state, 'ema20'))
+    ema(close, EMA_SLOW, out=row['ema50'], state=_sub(state, 'ema50'))
+    ema(close, EMA_VERY_SLOW, out=row['ema200'], state=_sub(state, 'ema200'))
+    rsi(close, RSI_LEN, out=row['rsi'], deltas=deltas, state=_sub(state, 'rsi'))
+    atr(high, low, close, ATR_LEN, tr=tr, out=row['atr'], state=_sub(state, 'atr'))
+    adx(high, low, close, ADX_LEN, tr=tr, out_adx=row['adx'], out_dmp=row['dmp'], out_dmn=row['dmn'],
+        moves=moves, state=_sub(state, 'adx'))
+    _, st_dir, _, _ = supertrend(high, low, close, ST_LEN, ST_MULT, tr=tr,
+                                 out_trend=row['st'], out_long=row['st_long'], out_short=row['st_short'],
+                                 state=_sub(state, 'supertrend'))
+    sqz, sqz_on, sqz_off, no_sqz = squeeze(sq_high, sq_low, sq_close, tr=sq_tr)
+    skip = len(sq_close) - n
+    row['sqz'][:] = sqz[skip:]
+    sqz_on, sqz_off, no_sqz = sqz_on[skip:], sqz_off[skip:], no_sqz[skip:]
+
+    if state is not None:
+        keep = slice(max(0, len(sq_close) - _SQUEEZE_LOOKBACK), None)
+        state['tail'] = {'high': sq_high[keep], 'low': sq_low[keep], 'close': sq_close[keep], 'tr': sq_tr[keep]}
+        state['hl_zero'] = bool(state.get('hl_zero')) or bool((high == low).any())
+
+    if np.dtype(dtype) != np.float64:
+        block = block.astype(dtype)
+        row = {name: block[i] for i, name in enumerate(_FLOAT_COLS)}
+
+    return indicator_frame(df_15m, row, st_dir, (sqz_on, sqz_off, no_sqz), indicator_columns())
+
+def indicator_frame(df_15m: pd.DataFrame, row, st_dir, sqz_flags, cols) -> pd.DataFrame:
+    """
+    DataFrame degli indicatori (schema di compute_indicators_15m).
+
+    row: array float per nome di _FLOAT_COLS; sqz_flags: (SQZ_ON, SQZ_OFF,
+    NO_SQZ); cols: nomi da indicator_columns
+    """
+    sqz_on, sqz_off, no_sqz = sqz_flags
+    new_cols = {
+        'ema20': row['ema20'],
+        'ema50': row['ema50'],
+        'ema200': row['ema200'],
+        'rsi': row['rsi'],
+        'atr': row['atr'],
+        cols['adx']: row['adx'],
+        cols['dmp']: row['dmp'],
+        cols['dmn']: row['dmn'],
+        cols['st']: row['st'],
+        cols['st_dir']: st_dir,
+        cols['st_long']: row['st_long'],
+        cols['st_short']: row['st_short'],
+        cols['sqz']: row['sqz'],
+        'SQZ_ON': sqz_on,
+        'SQZ_OFF': sqz_off,
+        'NO_SQZ': no_sqz,
+    }
+    ind = pd.DataFrame(new_cols, index=df_15m.index, copy=False)
+    base = df_15m.drop(columns=[c for c in new_cols if c in df_15m.columns])
+    return pd.concat([base, ind], axis=1)
@@ -0,0 +1,290 @@
+# indicators/panel.py
+# Motore indicatori multi-simbolo: un solo passaggio vettoriale su una matrice (simboli × candele)
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import (
+    RSI_LEN, ATR_LEN, ADX_LEN, ST_LEN, ST_MULT,
+    SQUEEZE_BB_LEN, SQUEEZE_KC_LEN, SQUEEZE_BB_STD, SQUEEZE_KC_SCALAR,
+    SQUEEZE_MOM_LEN, SQUEEZE_MOM_SMOOTH,
+    EMA_FAST, EMA_SLOW, EMA_VERY_SLOW
+)
+from indicators.numpy_kernels import indicator_columns
+from indicators.robust_ta import classify_signals
+
+_EPS = np.finfo(float).eps
+_OHLCV = ('open', 'high', 'low', 'close', 'volume')
+
+# ============================================
+# ALLINEAMENTO
+# ============================================
+class OHLCVPanel:
+    """
+    Matrici OHLCV (simboli × candele) allineate sull'ultima candela.
+
+    Ogni riga contiene le candele del proprio simbolo allineate a destra
+    (padding NaN a sinistra per gli storici più corti), così l'ultima
+    colonna è sempre l'ultima candela disponibile per ciascun simbolo.
+    Per simboli dello stesso mercato coincide con l'allineamento per
+    timestamp, senza introdurre buchi (es. notte/weekend per le azioni)
+    quando la watchlist mescola crypto e azioni.
+    """
+
+    def __init__(self, symbols: List[str], arrays: Dict[str, np.ndarray],
+                 bars: np.ndarray, last_ts: List):
+        self.symbols = symbols
+        self.arrays = arrays
+        self.bars = bars
+        self.last_ts = last_ts
+
+    @property
+    def shape(self):
+        return self.arrays['close'].shape
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], max_bars: Optional[int] = None):
+        """Costruisce il pannello da {simbolo: DataFrame OHLCV} (frame vuoti/None ignorati)"""
+        items = [(s, df) for s, df in frames.items()
+                 if df is not None and not df.empty and 'close' in df.columns]
+        symbols = [s for s, _ in items]
+        lengths = [len(df) if max_bars is None else min(len(df), max_bars) for _, df in items]
+        n = max(lengths) if lengths else 0
+
+        arrays = {k: np.full((len(items), n), np.nan) for k in _OHLCV}
+        last_ts = []
+        for r, ((_, df), m) in enumerate(zip(items, lengths)):
+            tail = df.iloc[len(df) - m:]
+            for k in _OHLCV:
+                src = tail[k] if k in tail.columns else tail['close']
+                arrays[k][r, n - m:] = pd.to_numeric(src, errors="coerce").to_numpy(dtype=np.float64)
+            if 'datetime' in tail.columns:
+                last_ts.append(tail['datetime'].iloc[-1])
+            else:
+                last_ts.append(tail.index[-1])
+
+        return cls(symbols, arrays, np.asarray(lengths, dtype=np.int64), last_ts)
+
+# ============================================
+# KERNEL 2D (riga = simbolo)
+# ============================================
+def ewm_mean_2d(x: np.ndarray, alpha: float, adjust: bool, min_periods: int = 0) -> np.ndarray:
+    """ewm_mean di numpy_kernels applicata a ogni riga, vettoriale sui simboli"""
+    s, n = x.shape
+    res = np.empty((s, n))
+    new_wt = 1.0 if adjust else alpha
+    factor = 1.0 - alpha
+    minp = max(int(min_periods), 1)
+    weighted = np.full(s, np.nan)
+    old_wt = np.ones(s)
+    nobs = np.zeros(s, dtype=np.int64)
+    for i in range(n):
+        cur = x[:, i]
+        is_obs = ~np.isnan(cur)
+        nobs += is_obs
+        has = ~np.isnan(weighted)
+        old_wt = np.where(has, old_wt * factor, old_wt)
+        upd = has & is_obs
+        mix = upd & (weighted != cur)
+        with np.errstate(invalid="ignore"):
+            blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(mix, blended, weighted)
+        old_wt = np.where(upd, old_wt + new_wt if adjust else 1.0, old_wt)
+        weighted = np.where(~has & is_obs, cur, weighted)
+        res[:, i] = np.where(nobs >= minp, weighted, np.nan)
+    return res
+
+def ema_2d(x: np.ndarray, span: int) -> np.ndarray:
+    return ewm_mean_2d(x, 2.0 / (span + 1.0), adjust=False)
+
+def rma_2d(x: np.ndarray, length: int) -> np.ndarray:
+    return ewm_mean_2d(x, 1.0 / length, adjust=True, min_periods=length)
+
+def rolling_mean_2d(x: np.ndarray, length: int) -> np.ndarray:
+    res = np.full(x.shape, np.nan)
+    if x.shape[1] >= length:
+        res[:, length - 1:] = sliding_window_view(x, length, axis=1).mean(axis=2)
+    return res
+
+def rolling_std_2d(x: np.ndarray, length: int, ddof: int = 0) -> np.ndarray:
+    res = np.full(x.shape, np.nan)
+    if x.shape[1] >= length:
+        res[:, length - 1:] = sliding_window_view(x, length, axis=1).std(axis=2, ddof=ddof)
+    return res
+
+def _shift_2d(x: np.ndarray, k: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] > k:
+        out[:, k:] = x[:, :-k]
+    return out
+
+def true_range_2d(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range per riga (epsilon aggiunto solo alle righe con high == low)"""
+    hl = high - low
+    zero_rows = (hl == 0).any(axis=1)
+    hl = hl + np.where(zero_rows, _EPS, 0.0)[:, None]
+    prev_close = _shift_2d(close)
+    return np.maximum(np.maximum(np.abs(hl), np.abs(high - prev_close)), np.abs(prev_close - low))
+
+def rsi_2d(close: np.ndarray, length: int = RSI_LEN) -> np.ndarray:
+    diff = close - _shift_2d(close)
+    pos = np.where(diff < 0, 0.0, diff)
+    neg = np.where(diff > 0, 0.0, diff)
+    p_avg = rma_2d(pos, length)
+    n_avg = rma_2d(neg, length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 * p_avg / (p_avg + np.abs(n_avg))
+
+def adx_2d(high, low, close, length: int = ADX_LEN, tr=None):
+    if tr is None:
+        tr = true_range_2d(high, low, close)
+    atr_ = rma_2d(tr, length)
+    up = high - _shift_2d(high)
+    dn = _shift_2d(low) - low
+    missing = np.isnan(up) | np.isnan(dn)
+    pos = np.where((up > dn) & (up > 0), up, 0.0)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[np.abs(pos) < _EPS] = 0.0
+    neg[np.abs(neg) < _EPS] = 0.0
+    pos[missing] = np.nan
+    neg[missing] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100.0 / atr_
+        dmp = k * rma_2d(pos, length)
+        dmn = k * rma_2d(neg, length)
+        dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma_2d(dx, length), dmp, dmn
+
+def supertrend_2d(high, low, close, length: int = ST_LEN, multiplier: float = ST_MULT, tr=None):
+    """SuperTrend per riga: ciclo sulle candele, vettoriale sui simboli"""
+    s, n = close.shape
+    if tr is None:
+        tr = true_range_2d(high, low, close)
+    matr = multiplier * rma_2d(tr, length)
+    hl2 = (high + low) / 2.0
+    upper = hl2 + matr
+    lower = hl2 - matr
+
+    trend = np.full((s, n), np.nan)
+    long_ = np.full((s, n), np.nan)
+    short_ = np.full((s, n), np.nan)
+    direction = np.ones((s, n), dtype=np.int64)
+    if n == 0:
+        return trend, direction, long_, short_
+    trend[:, 0] = 0.0
+
+    d = np.ones(s, dtype=np.int64)
+    for i in range(1, n):
+        c = close[:, i]
+        brk_up = c > upper[:, i - 1]
+        brk_dn = ~brk_up & (c < lower[:, i - 1])
+        hold = ~brk_up & ~brk_dn
+        lower[:, i] = np.where(hold & (d > 0) & (lower[:, i] < lower[:, i - 1]), lower[:, i - 1], lower[:, i])
+        upper[:, i] = np.where(hold & (d < 0) & (upper[:, i] > upper[:, i - 1]), upper[:, i - 1], upper[:, i])
+        d = np.where(brk_up, 1, np.where(brk_dn, -1, d))
+        direction[:, i] = d
+        is_long = d > 0
+        trend[:, i] = np.where(is_long, lower[:, i], upper[:, i])
+        long_[:, i] = np.where(is_long, lower[:, i], np.nan)
+        short_[:, i] = np.where(is_long, np.nan, upper[:, i])
+    return trend, direction, long_, short_
+
+def squeeze_2d(high, low, close, tr=None):
+    if tr is None:
+        tr = true_range_2d(high, low, close)
+    mid = rolling_mean_2d(close, SQUEEZE_BB_LEN)
+    dev = SQUEEZE_BB_STD * rolling_std_2d(close, SQUEEZE_BB_LEN, ddof=0)
+    basis = mid if SQUEEZE_KC_LEN == SQUEEZE_BB_LEN else rolling_mean_2d(close, SQUEEZE_KC_LEN)
+    band = SQUEEZE_KC_SCALAR * rolling_mean_2d(tr, SQUEEZE_KC_LEN)
+
+    lower_bb, upper_bb = mid - dev, mid + dev
+    lower_kc, upper_kc = basis - band, basis + band
+
+    mom = close - _shift_2d(close, SQUEEZE_MOM_LEN)
+    sqz = rolling_mean_2d(mom, SQUEEZE_MOM_SMOOTH)
+
+    on = (lower_bb > lower_kc) & (upper_bb < upper_kc)
+    off = (lower_bb < lower_kc) & (upper_bb > upper_kc)
+    no = ~on & ~off
+    return sqz, on.astype(np.int64), off.astype(np.int64), no.astype(np.int64)
+
+# ============================================
+# CALCOLO PANNELLO
+# ============================================
+def compute_panel_indicators(panel: OHLCVPanel) -> Dict[str, np.ndarray]:
+    """
+    Calcola EMA/RSI/ATR/ADX/SuperTrend/Squeeze per tutti i simboli.
+
+    Returns:
+        dict {colonna: matrice (simboli × candele)} con gli stessi nomi
+        colonna di compute_indicators_15m
+    """
+    high = panel.arrays['high']
+    low = panel.arrays['low']
+    close = panel.arrays['close']
+    tr = true_range_2d(high, low, close)
+
+    adx_, dmp, dmn = adx_2d(high, low, close, ADX_LEN, tr=tr)
+    st_trend, st_dir, st_long, st_short = supertrend_2d(high, low, close, ST_LEN, ST_MULT, tr=tr)
+    sqz, sqz_on, sqz_off, no_sqz = squeeze_2d(high, low, close, tr=tr)
+
+    cols = indicator_columns()
+    return {
+        'close': close,
+        'ema20': ema_2d(close, EMA_FAST),
+        'ema50': ema_2d(close, EMA_SLOW),
+        'ema200': ema_2d(close, EMA_VERY_SLOW),
+        'rsi': rsi_2d(close, RSI_LEN),
+        'atr': rma_2d(tr, ATR_LEN),
+        cols['adx']: adx_,
+        cols['dmp']: dmp,
+        cols['dmn']: dmn,
+        cols['st']: st_trend,
+        cols['st_dir']: st_dir,
+        cols['st_long']: st_long,
+        cols['st_short']: st_short,
+        cols['sqz']: sqz,
+        'SQZ_ON': sqz_on,
+        'SQZ_OFF': sqz_off,
+        'NO_SQZ': no_sqz,
+    }
+
+def panel_signal_table(frames: Dict[str, pd.DataFrame], mtf_long=True, mtf_short=True,
+                       max_bars: Optional[int] = None) -> pd.DataFrame:
+    """
+    Tabella segnali sull'ultima candela di ogni simbolo, in una sola chiamata.
+
+    Args:
+        frames: {simbolo: DataFrame OHLCV}
+        mtf_long, mtf_short: bool oppure array di bool per simbolo
+        max_bars: limita lo storico usato per simbolo (None = tutto)
+
+    Returns:
+        DataFrame indicizzato per simbolo con colonne indicatori
+        (nomi di compute_indicators_15m), bars, datetime, slope,
+        signal e strength (regole di decide_signal)
+    """
+    panel = OHLCVPanel.from_frames(frames, max_bars=max_bars)
+    if not panel.symbols:
+        return pd.DataFrame()
+
+    ind = compute_panel_indicators(panel)
+    last = pd.DataFrame({k: v[:, -1] for k, v in ind.items()}, index=pd.Index(panel.symbols, name='symbol'))
+
+    # Pendenza EMA20 come decide_signal: sw = min(5, candele - 1)
+    ema20 = ind['ema20']
+    n = ema20.shape[1]
+    sw = np.minimum(5, panel.bars - 1)
+    ref = n - np.maximum(sw, 1)
+    with np.errstate(invalid="ignore"):
+        slope = np.where(sw > 0, (ema20[:, -1] - ema20[np.arange(len(sw)), ref]) / np.maximum(sw, 1), 0.0)
+
+    sig = classify_signals(last, mtf_long, mtf_short, slope=slope)
+
+    last.insert(0, 'datetime', panel.last_ts)
+    last.insert(1, 'bars', panel.bars)
+    last['slope'] = sig['slope']
+    last['signal'] = sig['signal']
+    last['strength'] = sig['strength']
+    return last
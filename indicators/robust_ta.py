@@ -1,13 +1,11 @@
 # indicators/robust_ta.py
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
 from config import (
     RSI_LEN, ATR_LEN, ADX_LEN, ST_LEN, ST_MULT,
-    SQUEEZE_BB_LEN, SQUEEZE_KC_LEN, ADX_MIN,
-    RSI_LONG_MAX, RSI_SHORT_MIN,
-    WEAK_RSI_LONG_MAX, WEAK_RSI_SHORT_MIN,
-    WEAK_ADX_MIN, WEAK_SLOPE_MIN,
-    ENABLE_SIGNAL_CLASSIFICATION, WEAK_SIGNALS_ENABLED,
+    SQUEEZE_BB_LEN, SQUEEZE_KC_LEN,
+    INDICATOR_BACKEND, INDICATOR_DTYPE,
+    INDICATOR_PARITY_CHECK, INDICATOR_PARITY_TOL,
     COLOR_STRONG_LONG, COLOR_WEAK_LONG,
     COLOR_STRONG_SHORT, COLOR_WEAK_SHORT,
     COLOR_NEUTRAL,
@@ -16,9 +14,43 @@ from config import (
     EMOJI_NEUTRAL
 )
 from utils.helpers import pick_col_by_prefix, safe_last
+from utils.error_handler import error_handler
+from indicators.numpy_kernels import compute_indicators_numpy
+from strategy.params import StrategyParams
+
+def compute_indicators_15m(df_15m: pd.DataFrame, backend: str = None):
+    """
+    Calcola tutti gli indicatori per timeframe 15m
+
+    backend: "numpy" (kernel nativi) o "pandas_ta"; default INDICATOR_BACKEND
+    """
+    backend = (backend or INDICATOR_BACKEND).lower()
+
+    if backend == "pandas_ta":
+        df = _compute_indicators_pandas_ta(df_15m)
+        if df is None:
+            # pandas_ta non disponibile: ripiega sui kernel NumPy
+            df = compute_indicators_numpy(df_15m, dtype=INDICATOR_DTYPE)
+    else:
+        df = compute_indicators_numpy(df_15m, dtype=INDICATOR_DTYPE)
+
+    if INDICATOR_PARITY_CHECK:
+        report = check_backend_parity(df_15m)
+        if report['ok'] is False:
+            error_handler.logger.warning(f"Parità indicatori fuori tolleranza: {report['failed']}")
+        elif report['ok'] is None:
+            error_handler.logger.info("Parità indicatori non verificata: pandas_ta non installato")
+
+    return df
+
+def _compute_indicators_pandas_ta(df_15m: pd.DataFrame):
+    """Calcolo indicatori con pandas_ta (import lazy: None se non installato)"""
+    try:
+        import pandas_ta as ta
+    except ImportError as e:
+        error_handler.logger.error(f"pandas_ta non disponibile: {e}")
+        return None
 
-def compute_indicators_15m(df_15m: pd.DataFrame):
-    """Calcola tutti gli indicatori per timeframe 15m"""
     df = df_15m.copy()
     
     # EMA
@@ -50,9 +82,49 @@ def compute_indicators_15m(df_15m: pd.DataFrame):
 
     return df
 
-def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
+def check_backend_parity(df_15m: pd.DataFrame, tol: float = INDICATOR_PARITY_TOL):
+    """
+    Confronta i kernel NumPy con pandas_ta sulle stesse candele.
+
+    Returns:
+        dict con chiavi:
+        - ok: True se tutte le colonne sono entro la tolleranza relativa,
+          None se il confronto è saltato (nessun riferimento)
+        - available: False se pandas_ta non è installato
+        - diffs: massimo errore relativo per colonna
+        - failed: colonne fuori tolleranza (o con NaN in posizioni diverse)
+    """
+    ref = _compute_indicators_pandas_ta(df_15m)
+    if ref is None:
+        return {'ok': None, 'available': False, 'diffs': {}, 'failed': []}
+
+    fast = compute_indicators_numpy(df_15m, dtype=INDICATOR_DTYPE)
+    # Con float32 la tolleranza non può scendere sotto la precisione del tipo
+    tol = max(tol, float(np.finfo(np.dtype(INDICATOR_DTYPE)).eps) * 10)
+
+    diffs = {}
+    failed = []
+    for col in ref.columns:
+        if col in df_15m.columns or col not in fast.columns:
+            continue
+        a = pd.to_numeric(ref[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        b = pd.to_numeric(fast[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        both = ~np.isnan(a) & ~np.isnan(b)
+        err = 0.0
+        if both.any():
+            err = float(np.max(np.abs(a[both] - b[both]) / np.maximum(1.0, np.abs(a[both]))))
+        diffs[col] = err
+        if err > tol or (np.isnan(a) != np.isnan(b)).any():
+            failed.append(col)
+
+    missing = [c for c in ref.columns if c not in fast.columns]
+    return {'ok': not failed and not missing, 'available': True, 'diffs': diffs, 'failed': failed + missing}
+
+def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool, params: StrategyParams = None):
     """
     Decide il segnale con classificazione STRONG/WEAK
+
+    params: soglie della strategia (default: valori correnti di config)
     
     Returns:
         dict con chiavi:
@@ -64,6 +136,9 @@ def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
         - is_long: True/False/None
         - rsi, atr, slope, adx, sqz_on: valori indicatori
     """
+    if params is None:
+        params = StrategyParams.from_config()
+
     # Estrai valori correnti
     p = float(df_ind["close"].iloc[-1])
     ema20 = float(df_ind["ema20"].iloc[-1])
@@ -116,9 +191,9 @@ def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
         sqz_on = not bool(int(df_ind["NO_SQZ"].iloc[-1]) == 1)
 
     # Se la classificazione è disabilitata, usa solo la logica base
-    if not ENABLE_SIGNAL_CLASSIFICATION:
-        long_ok = up_15m and slope > 0 and rsi <= RSI_LONG_MAX and adx >= ADX_MIN and di_long and st_long_ok and not sqz_on and mtf_long
-        short_ok = dw_15m and slope < 0 and rsi >= RSI_SHORT_MIN and adx >= ADX_MIN and di_short and st_short_ok and not sqz_on and mtf_short
+    if not params.enable_classification:
+        long_ok = up_15m and slope > 0 and rsi <= params.rsi_long_max and adx >= params.adx_min and di_long and st_long_ok and not sqz_on and mtf_long
+        short_ok = dw_15m and slope < 0 and rsi >= params.rsi_short_min and adx >= params.adx_min and di_short and st_short_ok and not sqz_on and mtf_short
         
         if long_ok:
             return {
@@ -167,9 +242,9 @@ def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
     # Condizioni per STRONG LONG (più restrittive)
     strong_long = (
         up_15m and 
-        slope > 1.0 and              # Pendenza significativa
-        rsi <= RSI_LONG_MAX and       # RSI ≤ 55
-        adx >= ADX_MIN and             # ADX ≥ 25
+        slope > params.strong_slope_min and   # Pendenza significativa
+        rsi <= params.rsi_long_max and       # RSI ≤ 55
+        adx >= params.adx_min and             # ADX ≥ 25
         di_long and 
         st_long_ok and 
         not sqz_on and 
@@ -179,22 +254,22 @@ def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
     # Condizioni per WEAK LONG (più lasche)
     weak_long = (
         up_15m and 
-        slope >= WEAK_SLOPE_MIN and    # Pendenza minima 0.2
-        rsi <= WEAK_RSI_LONG_MAX and    # RSI ≤ 65
-        adx >= WEAK_ADX_MIN and          # ADX ≥ 20
+        slope >= params.weak_slope_min and    # Pendenza minima 0.2
+        rsi <= params.weak_rsi_long_max and    # RSI ≤ 65
+        adx >= params.weak_adx_min and          # ADX ≥ 20
         di_long and 
         st_long_ok and 
         not sqz_on and 
         mtf_long and
-        WEAK_SIGNALS_ENABLED            # Solo se abilitati
+        params.weak_enabled            # Solo se abilitati
     )
     
     # Condizioni per STRONG SHORT
     strong_short = (
         dw_15m and 
-        slope < -1.0 and               # Pendenza negativa significativa
-        rsi >= RSI_SHORT_MIN and        # RSI ≥ 45
-        adx >= ADX_MIN and 
+        slope < -params.strong_slope_min and  # Pendenza negativa significativa
+        rsi >= params.rsi_short_min and        # RSI ≥ 45
+        adx >= params.adx_min and 
         di_short and 
         st_short_ok and 
         not sqz_on and 
@@ -204,14 +279,14 @@ def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
     # Condizioni per WEAK SHORT
     weak_short = (
         dw_15m and 
-        slope <= -WEAK_SLOPE_MIN and    # Pendenza negativa minima
-        rsi >= WEAK_RSI_SHORT_MIN and    # RSI ≥ 35
-        adx >= WEAK_ADX_MIN and 
+        slope <= -params.weak_slope_min and    # Pendenza negativa minima
+        rsi >= params.weak_rsi_short_min and    # RSI ≥ 35
+        adx >= params.weak_adx_min and 
         di_short and 
         st_short_ok and 
         not sqz_on and 
         mtf_short and
-        WEAK_SIGNALS_ENABLED
+        params.weak_enabled
     )
 
     # Classificazione con priorità: STRONG > WEAK > NIENTE
@@ -285,3 +360,194 @@ def decide_signal(df_ind: pd.DataFrame, mtf_long: bool, mtf_short: bool):
             'adx': adx,
             'sqz_on': sqz_on
         }
+
+
+def _col_values(df_ind: pd.DataFrame, col, default: float) -> np.ndarray:
+    """Valori float64 di una colonna con NaN/colonna mancante sostituiti dal default"""
+    if col is None or col not in df_ind.columns:
+        return np.full(len(df_ind), default, dtype=np.float64)
+    v = pd.to_numeric(df_ind[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(v), default, v)
+
+def _as_bool_array(x, n: int) -> np.ndarray:
+    """Converte flag MTF scalare o per-candela in array booleano lungo n"""
+    if np.ndim(x) == 0:
+        return np.full(n, bool(x), dtype=bool)
+    arr = np.asarray(pd.Series(x).fillna(False).to_numpy(), dtype=bool)
+    if len(arr) < n:
+        # Stesso comportamento del vecchio loop: oltre la serie MTF vale True
+        arr = np.concatenate([arr, np.ones(n - len(arr), dtype=bool)])
+    return arr[:n]
+
+def signal_features(df_ind: pd.DataFrame, mtf_long, mtf_short, slope=None):
+    """
+    Parte della classificazione che non dipende dalle soglie.
+
+    Calcolata una volta per dataset; classify_features applica poi le
+    soglie di StrategyParams con sola aritmetica di maschere.
+
+    Args:
+        df_ind: DataFrame prodotto da compute_indicators_15m
+        mtf_long, mtf_short: bool oppure array/Series di bool per candela
+        slope: pendenza EMA20 già calcolata (es. righe = simboli del pannello);
+               se None viene calcolata sulle righe di df_ind
+
+    Returns:
+        dict con rsi, atr, slope, adx, sqz_on e le maschere common_long /
+        common_short (trend, DI, SuperTrend, squeeze e MTF)
+    """
+    n = len(df_ind)
+
+    close = df_ind["close"].to_numpy(dtype=np.float64)
+    ema20 = df_ind["ema20"].to_numpy(dtype=np.float64)
+    ema50 = df_ind["ema50"].to_numpy(dtype=np.float64)
+    ema200 = df_ind["ema200"].to_numpy(dtype=np.float64)
+
+    rsi = _col_values(df_ind, "rsi", 50.0)
+    atr = _col_values(df_ind, "atr", 0.0)
+
+    # Pendenza EMA20: sw = min(5, i), confronto con ema20[i + 1 - sw]
+    if slope is None:
+        idx = np.arange(n)
+        sw = np.minimum(5, idx)
+        ref = np.where(sw > 0, idx + 1 - sw, idx)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(sw > 0, (ema20 - ema20[ref]) / np.maximum(sw, 1), 0.0)
+    else:
+        slope = np.asarray(slope, dtype=np.float64)
+
+    # Trend di base
+    up_15m = (close > ema200) & (ema20 > ema50)
+    dw_15m = (close < ema200) & (ema20 < ema50)
+
+    # ADX e DI
+    adx = _col_values(df_ind, pick_col_by_prefix(df_ind, "ADX_"), 0.0)
+    dmp = _col_values(df_ind, pick_col_by_prefix(df_ind, "DMP_"), 0.0)
+    dmn = _col_values(df_ind, pick_col_by_prefix(df_ind, "DMN_"), 0.0)
+
+    di_long = dmp > dmn
+    di_short = dmn > dmp
+
+    # SuperTrend (valore mancante = filtro neutro, come in decide_signal)
+    st_dir_col = pick_col_by_prefix(df_ind, "SUPERTD_")
+    if st_dir_col:
+        st_dir = pd.to_numeric(df_ind[st_dir_col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        st_missing = np.isnan(st_dir)
+        st_int = np.trunc(np.where(st_missing, 0.0, st_dir))
+        st_long_ok = st_missing | (st_int == 1)
+        st_short_ok = st_missing | (st_int == -1)
+    else:
+        st_long_ok = np.ones(n, dtype=bool)
+        st_short_ok = np.ones(n, dtype=bool)
+
+    # Squeeze: SQZ_ON ha priorità, altrimenti NO_SQZ invertito
+    sqz_on = np.zeros(n, dtype=bool)
+    sqz_known = np.zeros(n, dtype=bool)
+    if "SQZ_ON" in df_ind.columns:
+        v = pd.to_numeric(df_ind["SQZ_ON"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        sqz_known = ~np.isnan(v)
+        sqz_on = sqz_known & (np.trunc(np.where(sqz_known, v, 0.0)) == 1)
+    if "NO_SQZ" in df_ind.columns:
+        v = pd.to_numeric(df_ind["NO_SQZ"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        use_no_sqz = ~sqz_known & ~np.isnan(v)
+        sqz_on = np.where(use_no_sqz, np.trunc(np.where(use_no_sqz, v, 0.0)) != 1, sqz_on)
+
+    mtf_l = _as_bool_array(mtf_long, n)
+    mtf_s = _as_bool_array(mtf_short, n)
+
+    return {
+        'common_long': up_15m & di_long & st_long_ok & ~sqz_on & mtf_l,
+        'common_short': dw_15m & di_short & st_short_ok & ~sqz_on & mtf_s,
+        'rsi': rsi,
+        'atr': atr,
+        'slope': slope,
+        'adx': adx,
+        'sqz_on': sqz_on
+    }
+
+def classify_features(feat: dict, params: StrategyParams = None):
+    """Applica le soglie di params alle feature di signal_features (vedi classify_signals)"""
+    if params is None:
+        params = StrategyParams.from_config()
+
+    common_long = feat['common_long']
+    common_short = feat['common_short']
+    rsi, adx, slope = feat['rsi'], feat['adx'], feat['slope']
+    n = len(common_long)
+
+    if not params.enable_classification:
+        strong_long = common_long & (slope > 0) & (rsi <= params.rsi_long_max) & (adx >= params.adx_min)
+        strong_short = common_short & (slope < 0) & (rsi >= params.rsi_short_min) & (adx >= params.adx_min)
+        weak_long = np.zeros(n, dtype=bool)
+        weak_short = np.zeros(n, dtype=bool)
+    else:
+        strong_long = (common_long & (slope > params.strong_slope_min)
+                       & (rsi <= params.rsi_long_max) & (adx >= params.adx_min))
+        strong_short = (common_short & (slope < -params.strong_slope_min)
+                        & (rsi >= params.rsi_short_min) & (adx >= params.adx_min))
+        if params.weak_enabled:
+            weak_long = (common_long & (slope >= params.weak_slope_min)
+                         & (rsi <= params.weak_rsi_long_max) & (adx >= params.weak_adx_min))
+            weak_short = (common_short & (slope <= -params.weak_slope_min)
+                          & (rsi >= params.weak_rsi_short_min) & (adx >= params.weak_adx_min))
+        else:
+            weak_long = np.zeros(n, dtype=bool)
+            weak_short = np.zeros(n, dtype=bool)
+
+    # Priorità: STRONG LONG > WEAK LONG > STRONG SHORT > WEAK SHORT
+    weak_long = weak_long & ~strong_long
+    taken = strong_long | weak_long
+    strong_short = strong_short & ~taken
+    taken = taken | strong_short
+    weak_short = weak_short & ~taken
+
+    is_long = strong_long | weak_long
+    is_short = strong_short | weak_short
+    strong = strong_long | strong_short
+    weak = weak_long | weak_short
+
+    signal = np.where(is_long, "LONG", np.where(is_short, "SHORT", "NONE")).astype(object)
+    strength = np.where(strong, "STRONG", np.where(weak, "WEAK", "NONE")).astype(object)
+
+    return {
+        'strong_long': strong_long,
+        'weak_long': weak_long,
+        'strong_short': strong_short,
+        'weak_short': weak_short,
+        'long': is_long,
+        'short': is_short,
+        'strong': strong,
+        'weak': weak,
+        'signal': signal,
+        'strength': strength,
+        'rsi': rsi,
+        'atr': feat['atr'],
+        'slope': slope,
+        'adx': adx,
+        'sqz_on': feat['sqz_on']
+    }
+
+def classify_signals(df_ind: pd.DataFrame, mtf_long, mtf_short, slope=None, params: StrategyParams = None):
+    """
+    Classificazione STRONG/WEAK vettoriale su tutte le candele.
+
+    Applica le stesse regole di decide_signal, ma per ogni candela i
+    in un solo passaggio NumPy (equivale a chiamare decide_signal su
+    df_ind.iloc[:i+1] per ogni i).
+
+    Args:
+        df_ind: DataFrame prodotto da compute_indicators_15m
+        mtf_long, mtf_short: bool oppure array/Series di bool per candela
+        slope: pendenza EMA20 già calcolata (es. righe = simboli del pannello);
+               se None viene calcolata sulle righe di df_ind
+        params: soglie della strategia (default: valori correnti di config)
+
+    Returns:
+        dict con chiavi:
+        - strong_long, weak_long, strong_short, weak_short: maschere esclusive
+          (priorità STRONG > WEAK, LONG > SHORT come in decide_signal)
+        - long, short, strong, weak: maschere aggregate
+        - signal, strength: array di stringhe "LONG"/"SHORT"/"NONE", "STRONG"/"WEAK"/"NONE"
+        - rsi, atr, slope, adx, sqz_on: valori indicatori per candela
+    """
+    return classify_features(signal_features(df_ind, mtf_long, mtf_short, slope=slope), params)
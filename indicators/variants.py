@@ -0,0 +1,158 @@
+# indicators/variants.py
+# Indicatori per più lunghezze sullo stesso dataset, con intermedi condivisi
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, replace
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    RSI_LEN, ATR_LEN, ADX_LEN, ST_LEN, ST_MULT,
+    EMA_FAST, EMA_SLOW, EMA_VERY_SLOW, LENGTH_VARIANTS_CACHE_SIZE
+)
+from indicators.cache import _frame_bounds
+from indicators.numpy_kernels import (
+    true_range, price_deltas, directional_moves, ema, rma, rsi, adx, supertrend, squeeze,
+    indicator_columns, indicator_frame
+)
+
+@dataclass(frozen=True)
+class IndicatorLengths:
+    """Lunghezze degli indicatori (default: valori di config)"""
+    rsi_len: int = RSI_LEN
+    atr_len: int = ATR_LEN
+    adx_len: int = ADX_LEN
+    st_len: int = ST_LEN
+    st_mult: float = ST_MULT
+    ema_fast: int = EMA_FAST
+    ema_slow: int = EMA_SLOW
+    ema_very_slow: int = EMA_VERY_SLOW
+
+    def with_(self, **changes) -> "IndicatorLengths":
+        return replace(self, **changes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def length_grid(base: Optional[IndicatorLengths] = None, **values: List) -> List[IndicatorLengths]:
+    """Prodotto cartesiano di lunghezze (come strategy.sweep.param_grid)"""
+    if base is None:
+        base = IndicatorLengths()
+    names = list(values)
+    return [base.with_(**dict(zip(names, combo))) for combo in product(*(values[n] for n in names))]
+
+class IndicatorVariants:
+    """
+    Indicatori di un dataset per molte combinazioni di lunghezze.
+
+    True range, variazioni di prezzo (RSI) e movimenti direzionali (ADX)
+    sono calcolati una volta per dataset; per ogni lunghezza gira solo lo
+    stadio di smoothing. Ogni serie è memorizzata per (tipo, lunghezza):
+    la RMA del true range di una lunghezza, ad esempio, è condivisa da
+    ATR, ADX e SuperTrend con quella lunghezza. Il risultato di frame()
+    coincide con compute_indicators_numpy con le stesse lunghezze in config.
+    """
+
+    def __init__(self, df_15m: pd.DataFrame):
+        self.df = df_15m
+        self.high = df_15m["high"].to_numpy(dtype=np.float64)
+        self.low = df_15m["low"].to_numpy(dtype=np.float64)
+        self.close = df_15m["close"].to_numpy(dtype=np.float64)
+        self.tr = true_range(self.high, self.low, self.close)
+        self._series: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    def _get(self, key: Tuple, compute):
+        with self._lock:
+            value = self._series.get(key)
+            if value is not None:
+                self.reused += 1
+                return value
+        value = compute()
+        with self._lock:
+            self._series[key] = value
+            self.computed += 1
+        return value
+
+    # ---------- intermedi indipendenti dalla lunghezza ----------
+
+    def deltas(self):
+        return self._get(('deltas',), lambda: price_deltas(self.close))
+
+    def moves(self):
+        return self._get(('moves',), lambda: directional_moves(self.high, self.low))
+
+    # ---------- stadio di smoothing per lunghezza ----------
+
+    def ema(self, span: int) -> np.ndarray:
+        return self._get(('ema', span), lambda: ema(self.close, span))
+
+    def rma_tr(self, length: int) -> np.ndarray:
+        """RMA del true range (ATR) condivisa da ATR, ADX e SuperTrend"""
+        return self._get(('rma_tr', length), lambda: rma(self.tr, length))
+
+    def rsi(self, length: int) -> np.ndarray:
+        return self._get(('rsi', length), lambda: rsi(self.close, length, deltas=self.deltas()))
+
+    def adx(self, length: int):
+        return self._get(('adx', length), lambda: adx(
+            self.high, self.low, self.close, length, atr_=self.rma_tr(length), moves=self.moves()
+        ))
+
+    def supertrend(self, length: int, multiplier: float):
+        return self._get(('supertrend', length, multiplier), lambda: supertrend(
+            self.high, self.low, self.close, length, multiplier, atr_=self.rma_tr(length)
+        ))
+
+    def squeeze(self):
+        """Squeeze con le lunghezze di config (non oggetto dello sweep)"""
+        return self._get(('squeeze',), lambda: squeeze(self.high, self.low, self.close, tr=self.tr))
+
+    def frame(self, lengths: IndicatorLengths) -> pd.DataFrame:
+        """DataFrame indicatori (schema di compute_indicators_15m) per lengths"""
+        adx_, dmp, dmn = self.adx(lengths.adx_len)
+        st, st_dir, st_long, st_short = self.supertrend(lengths.st_len, lengths.st_mult)
+        sqz, sqz_on, sqz_off, no_sqz = self.squeeze()
+        row = {
+            'ema20': self.ema(lengths.ema_fast),
+            'ema50': self.ema(lengths.ema_slow),
+            'ema200': self.ema(lengths.ema_very_slow),
+            'rsi': self.rsi(lengths.rsi_len),
+            'atr': self.rma_tr(lengths.atr_len),
+            'adx': adx_,
+            'dmp': dmp,
+            'dmn': dmn,
+            'st': st,
+            'st_long': st_long,
+            'st_short': st_short,
+            'sqz': sqz
+        }
+        cols = indicator_columns(lengths.adx_len, lengths.st_len, lengths.st_mult)
+        return indicator_frame(self.df, row, st_dir, (sqz_on, sqz_off, no_sqz), cols)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'series': len(self._series), 'computed': self.computed, 'reused': self.reused}
+
+# Varianti per dataset già visti (ultimi LENGTH_VARIANTS_CACHE_SIZE)
+_VARIANTS = OrderedDict()
+_VARIANTS_LOCK = threading.Lock()
+
+def get_variants(df_15m: pd.DataFrame, symbol: Optional[str] = None) -> IndicatorVariants:
+    """IndicatorVariants del dataset, riusato fra sweep successivi sugli stessi dati"""
+    key = (symbol,) + _frame_bounds(df_15m)
+    with _VARIANTS_LOCK:
+        variants = _VARIANTS.get(key)
+        if variants is not None:
+            _VARIANTS.move_to_end(key)
+            return variants
+    variants = IndicatorVariants(df_15m)
+    with _VARIANTS_LOCK:
+        _VARIANTS[key] = variants
+        while len(_VARIANTS) > LENGTH_VARIANTS_CACHE_SIZE:
+            _VARIANTS.popitem(last=False)
+    return variants
@@ -1,10 +1,10 @@
 # providers/base_provider.py
 import streamlit as st
-import os
-import pickle
 import hashlib
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from utils.error_handler import error_handler
+from storage.ohlcv_store import ohlcv_store
+from providers.provider_cache import ProviderCache
 
 class APIUsageTracker:
     """Traccia l'utilizzo delle API con supporto per tutti i provider"""
@@ -203,35 +203,17 @@ class BaseProvider:
     def __init__(self, name: str, ttl: int = 300):
         self.name = name
         self.ttl = ttl
-        self.cache_dir = os.path.join("cache", name)
-        os.makedirs(self.cache_dir, exist_ok=True)
+        self.cache = ProviderCache(name, ttl)
     
     def get_cache_key(self, *args, **kwargs) -> str:
         key_str = f"{self.name}_{str(args)}_{str(kwargs)}"
         return hashlib.md5(key_str.encode()).hexdigest()
     
     def get_from_cache(self, key: str):
-        cache_file = os.path.join(self.cache_dir, f"{key}.pkl")
-        if not os.path.exists(cache_file):
-            return None
-        mod_time = datetime.fromtimestamp(os.path.getmtime(cache_file))
-        if datetime.now() - mod_time > timedelta(seconds=self.ttl):
-            os.remove(cache_file)
-            return None
-        try:
-            with open(cache_file, 'rb') as f:
-                return pickle.load(f)
-        except Exception as e:
-            error_handler.logger.error(f"Cache read error: {e}")
-            return None
+        return self.cache.get(key)
     
     def save_to_cache(self, key: str, data):
-        cache_file = os.path.join(self.cache_dir, f"{key}.pkl")
-        try:
-            with open(cache_file, 'wb') as f:
-                pickle.dump(data, f)
-        except Exception as e:
-            error_handler.logger.error(f"Cache write error: {e}")
+        self.cache.put(key, data)
     
     def fetch(self, func, *args, **kwargs):
         cache_key = self.get_cache_key(*args, **kwargs)
@@ -246,3 +228,53 @@ class BaseProvider:
         if result is not None:
             self.save_to_cache(cache_key, result)
         return result
+    
+    def fetch_stored(self, fetch, symbol: str, timeframe: str, count: int, label: str, no_new=()):
+        """
+        Candele dall'archivio locale (storage.ohlcv_store) aggiornato in modo incrementale
+        
+        fetch(start=None) -> (df, stato): start None scarica la finestra
+        completa, altrimenti solo le candele da start (UTC) in poi.
+        label: stato di un download riuscito; no_new: stati che indicano
+        solo l'assenza di candele nuove. Restituisce le ultime count
+        candele; se l'aggiornamento fallisce ma l'archivio ha dati, lo
+        stato diventa "<label> (archivio)".
+        """
+        if ohlcv_store is None:
+            return fetch()
+        status = {}
+        
+        def call(start=None):
+            df, status['src'] = fetch(start=start)
+            return df
+        
+        df, _ = ohlcv_store.sync(self.name, symbol, timeframe, None, fetch_full=call, fetch_since=call)
+        return self._stored_result(df, status.get('src'), count, label, no_new)
+    
+    def fetch_stored_many(self, fetch, symbols, timeframe: str, count: int, label: str, no_new=()):
+        """
+        fetch_stored per più simboli con download condivisi (OHLCVStore.sync_many)
+        
+        fetch(simboli, start=None) -> {simbolo: (df, stato)}; restituisce
+        {simbolo: (df, stato)} con le stesse regole di fetch_stored
+        """
+        if ohlcv_store is None:
+            return fetch(symbols)
+        status = {}
+        
+        def call(syms, start=None):
+            got = fetch(syms, start=start)
+            status.update({symbol: src for symbol, (_, src) in got.items()})
+            return {symbol: df for symbol, (df, _) in got.items() if df is not None}
+        
+        synced = ohlcv_store.sync_many(self.name, symbols, timeframe, None, fetch_full=call, fetch_since=call)
+        return {symbol: self._stored_result(df, status.get(symbol), count, label, no_new)
+                for symbol, (df, _) in synced.items()}
+    
+    @staticmethod
+    def _stored_result(df, src, count: int, label: str, no_new):
+        """Ultime count candele e stato: label se il download è riuscito, altrimenti "<label> (archivio)" """
+        if df is None:
+            return None, src
+        df = df.tail(count).reset_index(drop=True)
+        return df, label if src == label or src in no_new else f"{label} (archivio)"
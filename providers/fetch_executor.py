@@ -0,0 +1,128 @@
+# providers/fetch_executor.py
+# Esecuzione concorrente dei fetch: pool di thread condiviso con un token bucket per provider
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.error_handler import error_handler
+from providers.base_provider import tracker
+from config import FETCH_MAX_WORKERS, FETCH_DEFAULT_RATE_PER_MIN
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # Streamlit non disponibile: i task girano senza contesto
+    add_script_run_ctx = get_script_run_ctx = None
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: `rate_per_min` gettoni al minuto, ricaricati
+    con continuità, fino a `capacity` accumulabili (raffica iniziale).
+    rate_per_min None = nessun limite.
+    """
+
+    def __init__(self, rate_per_min: Optional[float], capacity: Optional[float] = None):
+        self.rate = float(rate_per_min) / 60.0 if rate_per_min else None
+        self.capacity = float(capacity if capacity is not None else (rate_per_min or 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _reserve(self, tokens: int = 1) -> float:
+        """Prenota i gettoni; restituisce i secondi da attendere prima di usarli"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens: int = 1):
+        """Blocca finché la quota del provider consente `tokens` nuove chiamate (crediti)"""
+        if self.rate is None:
+            return
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+class FetchExecutor:
+    """
+    Pool di thread condiviso per i fetch dei provider.
+
+    Ogni provider ha un token bucket dimensionato con
+    APIUsageTracker.get_limits (chiamate al minuto); i provider senza
+    limite al minuto (Yahoo) usano FETCH_DEFAULT_RATE_PER_MIN. Così una
+    scansione procede alla velocità consentita dalle quote e non a quella
+    delle pause fisse. I task ereditano il contesto Streamlit del chiamante
+    (st.session_state, contatori API).
+    """
+
+    def __init__(self, max_workers: int = FETCH_MAX_WORKERS,
+                 default_rate_per_min: Optional[float] = FETCH_DEFAULT_RATE_PER_MIN):
+        self.max_workers = int(max_workers)
+        self.default_rate_per_min = default_rate_per_min
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, provider: str) -> TokenBucket:
+        """Token bucket del provider (creato al primo uso dai limiti del tracker)"""
+        with self._lock:
+            if provider not in self._buckets:
+                rate = tracker.get_limits(provider).get('minute')
+                if not isinstance(rate, (int, float)):
+                    rate = self.default_rate_per_min
+                self._buckets[provider] = TokenBucket(rate)
+            return self._buckets[provider]
+
+    def acquire(self, provider: Optional[str], tokens: int = 1):
+        """Attende `tokens` gettoni del provider (None = nessun limite)"""
+        if provider:
+            self.bucket(provider).acquire(tokens)
+
+    def submit(self, provider: Optional[str], fn: Callable, *args, **kwargs) -> Future:
+        """Esegue fn(*args, **kwargs) nel pool dopo aver ottenuto un gettone del provider"""
+        ctx = get_script_run_ctx(suppress_warning=True) if get_script_run_ctx else None
+
+        def task():
+            # Il thread del pool è riusato da altre sessioni: ogni task riaggancia il contesto
+            # della sessione che lo ha inviato (API pubblica, stabile tra le versioni di Streamlit)
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+            self.acquire(provider)
+            return fn(*args, **kwargs)
+
+        return self._pool.submit(task)
+
+    def map(self, provider: Optional[str], fn: Callable, items: Iterable,
+            progress: Optional[Callable[[int, int, Any], None]] = None) -> List[Any]:
+        """
+        fn(item) per ogni item in parallelo, risultati nell'ordine di items.
+
+        Un item che solleva un'eccezione dà None (errore nel log).
+        progress(completati, totale, item) è chiamato dal thread del
+        chiamante a ogni completamento, quindi può aggiornare la UI.
+        """
+        items = list(items)
+        futures = {self.submit(provider, fn, item): i for i, item in enumerate(items)}
+        results: List[Any] = [None] * len(items)
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                error_handler.logger.error(f"Fetch {provider} {items[i]}: {e}")
+            if progress is not None:
+                progress(done, len(items), items[i])
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        """Secondi complessivi di attesa per quota, per provider"""
+        with self._lock:
+            return {name: round(b.waited, 2) for name, b in self._buckets.items()}
+
+# Istanza globale
+fetch_executor = FetchExecutor()
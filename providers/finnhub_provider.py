@@ -74,13 +74,23 @@ class FinnhubProvider(BaseProvider):
         finnhub_symbol = symbol_map.get(symbol, symbol)
         return self.get_quote(finnhub_symbol)
     
-    @count_api_call('finnhub', 'candle')
     def get_historical_candles(self, symbol: str, resolution: str = '15', count: int = 500):
         """
         Ottieni dati storici OHLCV da Finnhub
         resolution: '1', '5', '15', '30', '60', 'D', 'W', 'M'
         count: numero di candles da restituire (max 5000)
+        
+        Le candele passano dall'archivio locale: dopo il primo download
+        si chiedono solo quelle successive all'ultima salvata
         """
+        return self.fetch_stored(
+            lambda start=None: self._fetch_candles(symbol, resolution, count, start=start),
+            symbol, resolution, count, "Finnhub", no_new=("ERROR: no_data",)
+        )
+    
+    @count_api_call('finnhub', 'candle')
+    def _fetch_candles(self, symbol: str, resolution: str = '15', count: int = 500, start=None):
+        """Download candele (start: dal timestamp UTC indicato a ora invece delle ultime count)"""
         if not FINNHUB_KEY:
             return None, "NO_KEY"
         
@@ -91,6 +101,9 @@ class FinnhubProvider(BaseProvider):
             "count": count,
             "token": FINNHUB_KEY
         }
+        if start is not None:
+            params["from"] = int(pd.Timestamp(start).timestamp())
+            params["to"] = int(datetime.now().timestamp())
         
         try:
             response = requests.get(url, params=params, timeout=10)
@@ -1,9 +1,15 @@
 import streamlit as st
 import yfinance as yf
 import pandas as pd
-import time
 from datetime import datetime, timedelta
 from providers.base_provider import count_api_call
+from providers.fetch_executor import fetch_executor
+from providers.multi_provider import fetch_many
+from providers.provider_cache import ProviderCache
+from config import YF_INFO_TTL
+
+# Dati anagrafici dei ticker (nome, capitalizzazione, settore): cambiano di rado
+info_cache = ProviderCache("yahoo_info", ttl=YF_INFO_TTL)
 
 class MarketScanner:
     """
@@ -42,38 +48,39 @@ class MarketScanner:
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        # Raccogli dati
+        # Prezzi e volumi giornalieri di tutti i ticker con un download multi-ticker
+        status_text.text(f"Download di {len(self.popular_tickers)} ticker...")
+        frames = fetch_many(self.popular_tickers, "1d", "5d")
+        
         data = []
-        for i, symbol in enumerate(self.popular_tickers):
-            status_text.text(f"Scanning {i+1}/{len(self.popular_tickers)}: {symbol}")
-            progress_bar.progress((i+1)/len(self.popular_tickers))
+        for symbol in self.popular_tickers:
+            df = frames.get(symbol)
+            if df is None or len(df) < 2:
+                continue
             
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                
-                # Ottieni prezzo e variazioni
-                current_price = info.get('regularMarketPrice', 0)
-                prev_close = info.get('regularMarketPreviousClose', 0)
-                volume = info.get('volume', 0)
-                
-                if current_price > min_price and volume > min_volume and prev_close > 0:
-                    change_percent = ((current_price - prev_close) / prev_close) * 100
-                    
-                    data.append({
-                        'symbol': symbol,
-                        'name': info.get('shortName', symbol),
-                        'price': current_price,
-                        'change': change_percent,
-                        'volume': volume,
-                        'market_cap': info.get('marketCap', 0),
-                        'sector': info.get('sector', 'N/A')
-                    })
-                
-                time.sleep(0.1)  # Rate limiting
+            # Ottieni prezzo e variazioni
+            current_price = float(df['close'].iloc[-1])
+            prev_close = float(df['close'].iloc[-2])
+            volume = float(df['volume'].iloc[-1])
+            
+            if current_price > min_price and volume > min_volume and prev_close > 0:
+                change_percent = ((current_price - prev_close) / prev_close) * 100
                 
-            except Exception as e:
-                continue
+                data.append({
+                    'symbol': symbol,
+                    'price': current_price,
+                    'change': change_percent,
+                    'volume': volume
+                })
+        
+        # Dati anagrafici solo per i ticker che passano i filtri (in cache per un giorno)
+        def show_progress(done, total, symbol):
+            status_text.text(f"Scanning {done}/{total}: {symbol}")
+            progress_bar.progress(done / total)
+        
+        profiles = fetch_executor.map(None, self._profile, [d['symbol'] for d in data], progress=show_progress)
+        for item, profile in zip(data, profiles):
+            item.update(profile or {'name': item['symbol'], 'market_cap': 0, 'sector': 'N/A'})
         
         progress_bar.empty()
         status_text.empty()
@@ -96,6 +103,24 @@ class MarketScanner:
         
         return results
     
+    def _profile(self, symbol):
+        """Nome, capitalizzazione e settore da Ticker.info, con cache giornaliera"""
+        profile = info_cache.get(symbol)
+        if profile is not None:
+            return profile
+        fetch_executor.acquire('yahoo')
+        try:
+            info = yf.Ticker(symbol).info
+        except Exception:
+            return None
+        profile = {
+            'name': info.get('shortName', symbol),
+            'market_cap': info.get('marketCap', 0),
+            'sector': info.get('sector', 'N/A')
+        }
+        info_cache.put(symbol, profile)
+        return profile
+    
     def search_by_criteria(self, min_change=2, max_change=None, min_volume=1000000, 
                           sector=None, limit=20):
         """
@@ -5,6 +5,16 @@ import time
 import streamlit as st
 from datetime import datetime, timedelta
 from providers.base_provider import count_api_call
+from providers.fetch_executor import fetch_executor
+from providers.provider_cache import ProviderCache
+from storage.ohlcv_store import ohlcv_store
+from config import YF_BATCH_SIZE, YF_CACHE_TTL
+
+# Giorni di storico intraday serviti da Yahoo per intervallo (oltre, la richiesta con start fallisce)
+_YF_INTRADAY_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 730, "90m": 60, "1h": 730}
+
+# Candele Yahoo per (simbolo, intervallo, periodo): riempita anche dai download a blocchi di fetch_many
+yahoo_cache = ProviderCache("yahoo", ttl=YF_CACHE_TTL)
 
 def get_api_keys():
     """Recupera chiavi API da st.secrets"""
@@ -24,41 +34,164 @@ def fetch_with_fallback(symbol, interval="15m", period="1mo"):
     # Se Yahoo fallisce, prova altri provider
     alpha_key, td_key = get_api_keys()
     
+    # I fallback rispettano le quote al minuto dei rispettivi provider
     if alpha_key:
+        fetch_executor.acquire('alphavantage')
         df = fetch_alphavantage(symbol, interval, period, alpha_key)
         if df is not None:
             return df
     
     if td_key:
+        fetch_executor.acquire('twelvedata')
         df = fetch_twelvedata(symbol, interval, period, td_key)
         if df is not None:
             return df
     
     return None
 
-@count_api_call('yahoo', 'history')
 def fetch_yahoo(symbol, interval="15m", period="1mo"):
-    """Fetch dati da Yahoo Finance"""
+    """
+    Fetch dati da Yahoo Finance
+
+    Con l'archivio locale attivo (storage.ohlcv_store) scarica solo le
+    candele successive all'ultima salvata e restituisce il periodo
+    richiesto letto dall'archivio
+    """
+    key = f"{symbol}_{interval}_{period}"
+    cached = yahoo_cache.get(key)
+    if cached is not None:
+        return cached
+    if ohlcv_store is None:
+        df = _yahoo_history(symbol, interval, period=period)
+    else:
+        df, _ = ohlcv_store.sync(
+            "yahoo", symbol, interval, period,
+            fetch_full=lambda: _yahoo_history(symbol, interval, period=period),
+            fetch_since=lambda since: _yahoo_history(symbol, interval, **_yahoo_window(interval, period, since))
+        )
+    if df is not None:
+        yahoo_cache.put(key, df)
+    return df
+
+def fetch_many(symbols, interval="15m", period="1mo"):
+    """
+    Fetch Yahoo di più simboli con download multi-ticker (yf.download),
+    a blocchi di YF_BATCH_SIZE simboli invece di una richiesta per simbolo.
+
+    Divide il risultato in DataFrame OHLCV per simbolo, nello stesso
+    formato di fetch_yahoo, e li salva nella cache per simbolo e
+    nell'archivio locale: i successivi fetch_yahoo / scan_symbol sugli
+    stessi simboli non fanno altre richieste.
+
+    Returns:
+        {simbolo: DataFrame} dei soli simboli con dati
+    """
+    frames = {}
+    missing = []
+    for symbol in dict.fromkeys(symbols):
+        cached = yahoo_cache.get(f"{symbol}_{interval}_{period}")
+        if cached is not None:
+            frames[symbol] = cached
+        else:
+            missing.append(symbol)
+    
+    for i in range(0, len(missing), YF_BATCH_SIZE):
+        chunk = missing[i:i + YF_BATCH_SIZE]
+        if ohlcv_store is None:
+            got = _yahoo_download(chunk, interval, period=period) or {}
+        else:
+            synced = ohlcv_store.sync_many(
+                "yahoo", chunk, interval, period,
+                fetch_full=lambda syms: _yahoo_download(syms, interval, period=period),
+                fetch_since=lambda syms, since: _yahoo_download(syms, interval, **_yahoo_window(interval, period, since))
+            )
+            got = {symbol: df for symbol, (df, _) in synced.items() if df is not None}
+        for symbol, df in got.items():
+            yahoo_cache.put(f"{symbol}_{interval}_{period}", df)
+            frames[symbol] = df
+    return frames
+
+def _yahoo_window(interval, period, since):
+    """
+    Argomenti di download per le candele da since in poi: periodo intero se
+    since è oltre lo storico intraday di Yahoo, altrimenti start=since
+    """
+    days = _YF_INTRADAY_DAYS.get(interval)
+    if days is not None and pd.Timestamp.now(tz='UTC') - since > timedelta(days=days - 1):
+        return {'period': period}
+    return {'start': since.to_pydatetime()}
+
+@count_api_call('yahoo', 'download')
+def _yahoo_download(symbols, interval="15m", period="1mo", start=None):
+    """
+    Download multi-ticker Yahoo Finance, {simbolo: DataFrame}; None se la
+    richiesta fallisce (start: dal timestamp indicato invece del periodo)
+    """
+    fetch_executor.acquire('yahoo')
+    try:
+        kwargs = {'start': start} if start is not None else {'period': period}
+        data = yf.download(
+            list(symbols), interval=interval, group_by='ticker', auto_adjust=True,
+            ignore_tz=False, threads=True, progress=False, **kwargs
+        )
+    except Exception as e:
+        print(f"Yahoo download errore: {e}")
+        return None
+    return _split_download(data, symbols)
+
+def _split_download(data, symbols):
+    """Divide il DataFrame largo di yf.download (colonne ticker/campo) in frame OHLCV per simbolo"""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    tickers = data.columns.get_level_values(0) if isinstance(data.columns, pd.MultiIndex) else None
+    for symbol in symbols:
+        if tickers is not None:
+            if symbol not in tickers:
+                continue
+            df = data[symbol]
+        elif len(symbols) == 1:
+            df = data
+        else:
+            continue
+        # L'indice è comune a tutti i ticker: le righe senza prezzo sono di altri mercati
+        df = df.dropna(subset=['Close'])
+        if not df.empty:
+            frames[symbol] = _normalize_yahoo(df)
+    return frames
+
+def _normalize_yahoo(df):
+    """Colonne minuscole e datetime come colonna, come Ticker.history normalizzato"""
+    df = df.rename(columns={
+        'Open': 'open', 'High': 'high', 'Low': 'low',
+        'Close': 'close', 'Volume': 'volume'
+    })
+    df = df.rename_axis(columns=None)
+    df = df.reset_index()
+    
+    # Gestione nome colonna datetime
+    if 'Datetime' in df.columns:
+        df = df.rename(columns={'Datetime': 'datetime'})
+    elif 'Date' in df.columns:
+        df = df.rename(columns={'Date': 'datetime'})
+    
+    return df
+
+@count_api_call('yahoo', 'history')
+def _yahoo_history(symbol, interval="15m", period="1mo", start=None):
+    """Download Yahoo Finance (start: dal timestamp indicato invece del periodo)"""
+    fetch_executor.acquire('yahoo')
     try:
         ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=interval)
+        if start is not None:
+            df = ticker.history(start=start, interval=interval)
+        else:
+            df = ticker.history(period=period, interval=interval)
         
         if df.empty:
             return None
         
-        df = df.rename(columns={
-            'Open': 'open', 'High': 'high', 'Low': 'low',
-            'Close': 'close', 'Volume': 'volume'
-        })
-        df = df.reset_index()
-        
-        # Gestione nome colonna datetime
-        if 'Datetime' in df.columns:
-            df = df.rename(columns={'Datetime': 'datetime'})
-        elif 'Date' in df.columns:
-            df = df.rename(columns={'Date': 'datetime'})
-        
-        return df
+        return _normalize_yahoo(df)
     except Exception as e:
         print(f"Yahoo errore: {e}")
         return None
@@ -223,13 +356,18 @@ def fetch_yf_ohlcv(symbol, interval="15m", period="1mo", tail=None):
     """Compatibile con fetch_yf_ohlcv originale - supporta tail"""
     return fetch_yf(symbol, interval, period, tail)
 
-def run_radar_scan_yahoo(symbols, interval="15m", period="1mo"):
-    """Esegue scansione radar"""
-    results = []
+def scan_many(symbols, interval="15m", period="1mo", progress=None):
+    """
+    scan_symbol su più simboli: un download multi-ticker (fetch_many) per
+    tutti, poi fetch singoli concorrenti solo per i simboli mancanti.
+    Risultati nell'ordine di symbols; progress come in FetchExecutor.map
+    """
+    symbols = list(symbols)
+    frames = fetch_many(symbols, interval, period)
     
-    for symbol in symbols:
-        result = scan_symbol(symbol, interval, period)
-        results.append(result)
-        time.sleep(1)  # Evita rate limiting
-    
-    return results
+    # I fetch singoli dei simboli mancanti prendono il gettone Yahoo in _yahoo_history
+    return fetch_executor.map(None, lambda symbol: scan_symbol(symbol, interval, period), symbols, progress=progress)
+
+def run_radar_scan_yahoo(symbols, interval="15m", period="1mo"):
+    """Esegue scansione radar (download multi-ticker, vedi scan_many)"""
+    return scan_many(symbols, interval, period)
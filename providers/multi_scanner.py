@@ -1,9 +1,9 @@
 import streamlit as st
-import time
 from datetime import datetime
-from providers.multi_provider import fetch_yf_ohlcv
+from providers.multi_provider import fetch_yf_ohlcv, fetch_many
 from providers.finnhub_provider import finnhub_provider
 from providers.base_provider import count_api_call
+from providers.fetch_executor import fetch_executor
 
 class MultiScanner:
     """
@@ -16,34 +16,37 @@ class MultiScanner:
     @count_api_call('scanner', 'scan_symbols_yahoo')
     def scan_symbols_yahoo(self, symbols, interval="15m", period="1d"):
         """Scanner primario usando Yahoo Finance (gratuito e robusto)"""
-        results = []
-        for i, symbol in enumerate(symbols):
+        # Un download multi-ticker per tutti i simboli; i fetch singoli dei mancanti
+        # prendono il gettone Yahoo in _yahoo_history
+        fetch_many(symbols, interval, period)
+        
+        def scan(symbol):
             try:
                 df = fetch_yf_ohlcv(symbol, interval, period)
                 if df is not None and not df.empty:
                     change = ((df['close'].iloc[-1] - df['close'].iloc[0]) / df['close'].iloc[0]) * 100
-                    results.append({
+                    return {
                         'symbol': symbol,
                         'price': df['close'].iloc[-1],
                         'change': change,
                         'volume': df['volume'].iloc[-1],
                         'source': 'Yahoo',
                         'timestamp': datetime.now()
-                    })
-                time.sleep(0.2)  # Rate limiting gentile
+                    }
             except Exception as e:
                 print(f"Yahoo error {symbol}: {e}")
-        return results
+            return None
+        
+        return [r for r in fetch_executor.map(None, scan, symbols) if r is not None]
     
     def enhance_with_finnhub(self, results):
         """Arricchisce i risultati con dati Finnhub (quote real-time)"""
-        enhanced = []
         finnhub_key = st.secrets.get("FINNHUB_KEY", "")
         
         if not finnhub_key:
             return results  # Non possiamo arricchire
         
-        for res in results:
+        def enhance(res):
             symbol = res['symbol']
             try:
                 # Per crypto, usa endpoint specifico
@@ -58,12 +61,12 @@ class MultiScanner:
                     res['change'] = quote_data.get('change_percent', res['change'])
                     res['volume'] = quote_data.get('volume', res['volume'])
                     res['source'] = 'Finnhub'
-                time.sleep(0.5)
             except Exception as e:
                 print(f"Finnhub enhance error {symbol}: {e}")
-            enhanced.append(res)
+            return res
         
-        return enhanced
+        # Quote concorrenti entro il limite Finnhub (60/minuto)
+        return fetch_executor.map('finnhub', enhance, results)
     
     def enhanced_scan(self, market_list, use_finnhub=True):
         """
@@ -0,0 +1,281 @@
+# providers/provider_cache.py
+# Cache dei provider: indice SQLite (WAL) su disco con livello LRU in memoria
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from utils.error_handler import error_handler
+from config import PROVIDER_CACHE_DIR, PROVIDER_CACHE_MAX_MB, PROVIDER_CACHE_MEMORY_ITEMS
+
+class _Unsupported(Exception):
+    """Valore non serializzabile in formato colonnare (non viene messo in cache)"""
+
+def _encode_column(arrays: Dict[str, np.ndarray], name: str, s: pd.Series) -> list:
+    """Salva una colonna in arrays[name]; restituisce [nome, tipo, fuso orario]"""
+    tz = None
+    if pd.api.types.is_datetime64_any_dtype(s):
+        if getattr(s.dt, 'tz', None) is not None:
+            tz = str(s.dt.tz)
+            s = s.dt.tz_convert(None)
+        arrays[name] = s.to_numpy()  # datetime64 nella risoluzione originale
+        kind = 'datetime'
+    elif pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        arrays[name] = s.to_numpy()
+        kind = 'num'
+    else:
+        missing = s.isna().to_numpy()
+        if missing.any():
+            arrays[f"{name}_na"] = missing  # Testo mancante: torna NaN, non "nan"
+        arrays[name] = s.astype(str).to_numpy(dtype=str)
+        kind = 'str'
+    return [name, kind, tz]
+
+def _decode_column(arrays: Dict[str, np.ndarray], name: str, kind: str, tz):
+    values = arrays[name]
+    if kind == 'datetime':
+        values = pd.DatetimeIndex(values)
+        if tz:
+            values = values.tz_localize('UTC').tz_convert(tz)
+    elif kind == 'str':
+        values = values.astype(object)
+        if f"{name}_na" in arrays:
+            values[arrays[f"{name}_na"]] = np.nan
+    return values
+
+def _encode(value) -> bytes:
+    """
+    Serializza tuple/liste/dict di DataFrame, array, stringhe e numeri in un
+    .npz: i DataFrame sono salvati per colonne (date come datetime64, testo
+    come stringhe unicode con maschera dei mancanti), indice compreso, e la
+    struttura come JSON, senza pickle
+    """
+    arrays = {}
+
+    def walk(obj):
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, (tuple, list)):
+            return {'__seq__': [walk(x) for x in obj], 'tuple': isinstance(obj, tuple)}
+        if isinstance(obj, dict) and all(isinstance(k, str) for k in obj):
+            return {'__map__': {k: walk(v) for k, v in obj.items()}}
+        if isinstance(obj, np.ndarray) and obj.dtype != object:
+            name = f"a{len(arrays)}"
+            arrays[name] = obj
+            return {'__array__': name}
+        if isinstance(obj, pd.DataFrame):
+            if isinstance(obj.index, pd.MultiIndex):
+                raise _Unsupported("MultiIndex")
+            prefix = f"d{len(arrays)}_"
+            columns = [[str(col), *_encode_column(arrays, f"{prefix}{i}", obj[col])]
+                       for i, col in enumerate(obj.columns)]
+            index = obj.index
+            if isinstance(index, pd.RangeIndex):
+                index_node = {'range': [index.start, index.stop, index.step]}
+            else:
+                index_node = {'values': _encode_column(arrays, f"{prefix}index", pd.Series(index))}
+            index_node['name'] = index.name if index.name is None or isinstance(index.name, str) else str(index.name)
+            return {'__frame__': columns, 'index': index_node}
+        raise _Unsupported(type(obj).__name__)
+
+    skeleton = walk(value)
+    arrays['__meta__'] = np.array(json.dumps(skeleton))
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+def _decode(blob: bytes):
+    with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files}
+
+    def build(node):
+        if not isinstance(node, dict):
+            return node
+        if '__seq__' in node:
+            items = [build(x) for x in node['__seq__']]
+            return tuple(items) if node['tuple'] else items
+        if '__map__' in node:
+            return {k: build(v) for k, v in node['__map__'].items()}
+        if '__array__' in node:
+            return arrays[node['__array__']]
+        cols = {col: _decode_column(arrays, name, kind, tz) for col, name, kind, tz in node['__frame__']}
+        spec = node.get('index') or {'range': [0, len(next(iter(cols.values()), ())), 1]}
+        if 'range' in spec:
+            index = pd.RangeIndex(*spec['range'], name=spec.get('name'))
+        else:
+            index = pd.Index(_decode_column(arrays, *spec['values']), name=spec['name'])
+        return pd.DataFrame(cols, index=index)
+
+    return build(json.loads(str(arrays['__meta__'])))
+
+def _fresh(value):
+    """Copia superficiale dei DataFrame: chi riceve il valore non modifica quello in memoria"""
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_fresh(v) for v in value)
+    if isinstance(value, list):
+        return [_fresh(v) for v in value]
+    return value
+
+class ProviderCache:
+    """
+    Cache di un provider in un unico database SQLite (journal WAL).
+
+    Una riga per chiave con valore serializzato per colonne (vedi _encode),
+    ora di scrittura, ultimo accesso e dimensione; ogni scrittura è una
+    transazione, quindi sessioni e processi concorrenti non leggono mai
+    valori a metà. Davanti al database un LRU in memoria evita la
+    deserializzazione delle chiavi più usate. Le voci scadute (ttl) sono
+    ignorate e rimosse; oltre max_mb si eliminano le meno usate.
+    """
+
+    def __init__(self, name: str, ttl: float, root: str = PROVIDER_CACHE_DIR,
+                 max_mb: float = PROVIDER_CACHE_MAX_MB, memory_items: int = PROVIDER_CACHE_MEMORY_ITEMS):
+        self.name = name
+        self.ttl = ttl
+        self.path = os.path.join(root, f"{name}.sqlite")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.memory_items = int(memory_items)
+        self._memory = OrderedDict()   # key -> (scritto alle, valore)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, created REAL NOT NULL, accessed REAL NOT NULL, "
+                "size INTEGER NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connessione per thread (sqlite3 non condivide le connessioni fra thread)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, created: float, value):
+        with self._lock:
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Valore per key, None se assente o scaduto"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return _fresh(entry[1])
+            self._memory.pop(key, None)
+
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT created, value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[0] > self.ttl:
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            value = _decode(row[1])
+            with conn:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            error_handler.logger.error(f"Cache read error: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        self._remember(key, row[0], value)
+        with self._lock:
+            self.hits += 1
+        return _fresh(value)
+
+    def put(self, key: str, value):
+        """Salva value (transazione atomica) e applica TTL e limite di dimensione"""
+        try:
+            blob = _encode(value)
+        except _Unsupported as e:
+            error_handler.logger.debug(f"Cache {self.name}: valore non serializzabile ({e})")
+            return
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, created, accessed, size, value) VALUES (?, ?, ?, ?, ?)",
+                    (key, now, now, len(blob), sqlite3.Binary(blob))
+                )
+                conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+            self._evict(conn)
+        except sqlite3.Error as e:
+            error_handler.logger.error(f"Cache write error: {e}")
+            return
+        self._remember(key, now, _fresh(value))
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Elimina le voci meno usate finché la dimensione totale rientra nel limite"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            removed.append((key,))
+            total -= size
+        with conn:
+            conn.executemany("DELETE FROM entries WHERE key = ?", removed)
+        with self._lock:
+            self.evictions += len(removed)
+            for (key,) in removed:
+                self._memory.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+        return {
+            'entries': entries,
+            'mb': round(size / 1024 / 1024, 2),
+            'max_mb': round(self.max_bytes / 1024 / 1024, 2),
+            'memory_entries': len(self._memory),
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
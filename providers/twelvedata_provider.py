@@ -4,12 +4,23 @@ import requests
 import time
 from typing import Optional, Tuple, List, Dict, Any
 from utils.error_handler import error_handler
-from providers.base_provider import BaseProvider, count_api_call
+from providers.base_provider import BaseProvider, count_api_call, tracker
+from providers.fetch_executor import fetch_executor
 from utils.helpers import http_session, normalize_ohlcv_df
+from config import TD_BATCH_SIZE
 
 # Leggi chiave da secrets
 TWELVEDATA_KEY = st.secrets.get("TWELVEDATA_KEY", "")
 
+# Candele scaricate per intervallo (fetch_15m / fetch_1h / fetch_4h)
+INTERVAL_OUTPUTSIZE = {"15min": 5000, "1h": 2000, "4h": 1000}
+
+# Stati che indicano solo l'assenza di candele nuove
+_NO_NEW = ("NO_VALUES", "NO_DATA")
+
+# Errore TwelveData per un intervallo senza candele (start_date oltre l'ultima)
+_NO_DATA_MESSAGE = "no data is available"
+
 def convert_symbol_for_twelvedata(symbol: str) -> str:
     """
     Converte simbolo da formato Yahoo (BTC-USD) a TwelveData (BTC/USD)
@@ -33,13 +44,86 @@ class TwelveDataProvider(BaseProvider):
         self.max_retries = max_retries
     
     @count_api_call('twelvedata', 'time_series')
-    def _fetch_time_series(self, symbol: str, interval: str, outputsize: int):
-        """Fetch interno con retry automatico"""
+    def _fetch_time_series(self, symbol: str, interval: str, outputsize: int, start=None):
+        """Fetch interno con retry automatico (start: solo candele da start UTC in poi)"""
         if not TWELVEDATA_KEY:
             return None, "NO_KEY"
         
-        td_symbol = convert_symbol_for_twelvedata(symbol)
+        fetch_executor.acquire('twelvedata')
+        data, error = self._get_time_series(convert_symbol_for_twelvedata(symbol), interval, outputsize, start)
+        if error:
+            return None, error
+        return self._parse_series(data)
+    
+    def _fetch_time_series_batch(self, symbols: List[str], interval: str, outputsize: int,
+                                 start=None) -> Dict[str, Tuple[Optional[pd.DataFrame], str]]:
+        """
+        Una richiesta time_series per più simboli (lista separata da virgole).
+        
+        Ogni simbolo costa un credito come nella richiesta singola: la quota
+        al minuto del fetch_executor e il contatore API avanzano di
+        len(symbols). Restituisce {simbolo: (df, stato)} come _fetch_time_series.
+        """
+        if not TWELVEDATA_KEY:
+            return {symbol: (None, "NO_KEY") for symbol in symbols}
+        
+        td_symbols = {convert_symbol_for_twelvedata(symbol): symbol for symbol in symbols}
+        fetch_executor.acquire('twelvedata', len(td_symbols))
+        for symbol in symbols:
+            tracker.increment('twelvedata', 'time_series', symbol)
+        
+        data, error = self._get_time_series(",".join(td_symbols), interval, outputsize, start)
+        # Richiesta intera in errore (es. 429): corpo unico, non indicizzato per simbolo
+        error = error or self._api_error(data)
+        if error:
+            return {symbol: (None, error) for symbol in symbols}
+        
+        # Con più simboli la risposta è indicizzata per simbolo, con uno solo no
+        if len(td_symbols) == 1:
+            data = {next(iter(td_symbols)): data}
+        return {symbol: self._parse_series(data[td_symbol]) if td_symbol in data else (None, "ERROR")
+                for td_symbol, symbol in td_symbols.items()}
+    
+    @staticmethod
+    def _api_error(data: Dict[str, Any]) -> Optional[str]:
+        """
+        Stato di un corpo di errore TwelveData (HTTP 200 con status "error"),
+        None se il payload non è un errore. Solo "nessun dato nelle date
+        richieste" è NO_VALUES (nessuna candela nuova); gli altri errori
+        (crediti esauriti, chiave non valida, simbolo sconosciuto) sono API_<code>.
+        """
+        if not isinstance(data, dict) or data.get("status") != "error":
+            return None
+        message = str(data.get("message", ""))
+        if _NO_DATA_MESSAGE in message.lower():
+            return "NO_VALUES"
+        error_handler.logger.warning(f"TwelveData {data.get('code')}: {message}")
+        return f"API_{data.get('code', 'ERROR')}"
+    
+    @staticmethod
+    def _parse_series(data: Dict[str, Any]) -> Tuple[Optional[pd.DataFrame], str]:
+        """Payload time_series di un simbolo -> (DataFrame normalizzato, stato)"""
+        error = TwelveDataProvider._api_error(data)
+        if error:
+            return None, error
+        if "values" not in data:
+            return None, "ERROR"
+        
+        values = data.get("values")
+        if not values:
+            return None, "NO_DATA"
+        
+        try:
+            df = pd.DataFrame(values)
+            df = normalize_ohlcv_df(df)
+        except Exception as e:
+            error_handler.logger.error(f"TwelveData error: {e}")
+            return None, "ERROR"
         
+        return df, "TwelveData"
+    
+    def _get_time_series(self, td_symbol: str, interval: str, outputsize: int, start=None):
+        """GET time_series con retry automatico: (payload JSON, None) o (None, stato di errore)"""
         url = "https://api.twelvedata.com/time_series"
         params = {
             "symbol": td_symbol,
@@ -48,6 +132,8 @@ class TwelveDataProvider(BaseProvider):
             "apikey": TWELVEDATA_KEY,
             "timezone": "UTC"
         }
+        if start is not None:
+            params["start_date"] = pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S")
         
         for attempt in range(self.max_retries):
             try:
@@ -64,19 +150,7 @@ class TwelveDataProvider(BaseProvider):
                 if response.status_code != 200:
                     return None, f"HTTP_{response.status_code}"
                 
-                data = response.json()
-                
-                if "values" not in data:
-                    return None, "NO_VALUES"
-                
-                values = data.get("values")
-                if not values:
-                    return None, "NO_DATA"
-                
-                df = pd.DataFrame(values)
-                df = normalize_ohlcv_df(df)
-                
-                return df, "TwelveData"
+                return response.json(), None
                 
             except requests.exceptions.Timeout:
                 if attempt < self.max_retries - 1:
@@ -94,20 +168,66 @@ class TwelveDataProvider(BaseProvider):
         
         return None, "MAX_RETRIES"
     
+    def _fetch_stored(self, symbol: str, interval: str, outputsize: int):
+        """Ultime outputsize candele dall'archivio locale, scaricando solo quelle nuove"""
+        return self.fetch_stored(
+            lambda start=None: self._fetch_time_series(symbol, interval, outputsize, start=start),
+            symbol, interval, outputsize, "TwelveData", no_new=_NO_NEW
+        )
+    
+    def fetch_many(self, symbols: List[str], interval: str,
+                   outputsize: Optional[int] = None) -> Dict[str, Tuple[Optional[pd.DataFrame], str]]:
+        """
+        Fetch di più simboli con richieste time_series multi-simbolo, fino a
+        TD_BATCH_SIZE simboli per richiesta.
+        
+        Usa e riempie la cache del provider con le stesse chiavi di
+        fetch(_fetch_stored, ...): i successivi fetch_15m / fetch_1h /
+        fetch_4h degli stessi simboli non fanno richieste.
+        
+        Returns:
+            {simbolo: (df, stato)}
+        """
+        outputsize = outputsize or INTERVAL_OUTPUTSIZE[interval]
+        results = {}
+        pending = []
+        for symbol in dict.fromkeys(symbols):
+            cached = self.get_from_cache(self.get_cache_key(symbol, interval, outputsize))
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                pending.append(symbol)
+        
+        def fetch(syms, start=None):
+            return self._fetch_time_series_batch(syms, interval, outputsize, start=start)
+        
+        for i in range(0, len(pending), TD_BATCH_SIZE):
+            chunk = pending[i:i + TD_BATCH_SIZE]
+            got = self.fetch_stored_many(fetch, chunk, interval, outputsize, "TwelveData", no_new=_NO_NEW)
+            for symbol in chunk:
+                results[symbol] = got.get(symbol, (None, "NO_VALUES"))
+                if results[symbol][0] is not None:
+                    self.save_to_cache(self.get_cache_key(symbol, interval, outputsize), results[symbol])
+        return results
+    
+    def refresh_watchlist(self, symbols: List[str]) -> Dict[str, Dict[str, Tuple[Optional[pd.DataFrame], str]]]:
+        """Aggiorna 15m, 1h e 4h di tutti i simboli con richieste multi-simbolo: {intervallo: {simbolo: (df, stato)}}"""
+        return {interval: self.fetch_many(symbols, interval) for interval in INTERVAL_OUTPUTSIZE}
+    
     @st.cache_data(ttl=600, show_spinner=False)
     def fetch_15m(_self, symbol: str) -> Tuple[Optional[pd.DataFrame], str]:
         """Fetch 15m con caching - NOTA: _self per evitare hashing"""
-        return _self.fetch(_self._fetch_time_series, symbol, "15min", 5000)
+        return _self.fetch(_self._fetch_stored, symbol, "15min", INTERVAL_OUTPUTSIZE["15min"])
     
     @st.cache_data(ttl=600, show_spinner=False)
     def fetch_1h(_self, symbol: str) -> Tuple[Optional[pd.DataFrame], str]:
         """Fetch 1h con caching - NOTA: _self per evitare hashing"""
-        return _self.fetch(_self._fetch_time_series, symbol, "1h", 2000)
+        return _self.fetch(_self._fetch_stored, symbol, "1h", INTERVAL_OUTPUTSIZE["1h"])
     
     @st.cache_data(ttl=600, show_spinner=False)
     def fetch_4h(_self, symbol: str) -> Tuple[Optional[pd.DataFrame], str]:
         """Fetch 4h con caching - NOTA: _self per evitare hashing"""
-        return _self.fetch(_self._fetch_time_series, symbol, "4h", 1000)
+        return _self.fetch(_self._fetch_stored, symbol, "4h", INTERVAL_OUTPUTSIZE["4h"])
     
     @st.cache_data(ttl=3600, show_spinner=False)
     def search_symbols(_self, query: str, outputsize: int = 20) -> List[Dict[str, str]]:
@@ -180,5 +300,8 @@ def fetch_td_1h(symbol: str):
 def fetch_td_4h(symbol: str):
     return td_provider.fetch_4h(symbol)
 
+def refresh_td_watchlist(symbols):
+    return td_provider.refresh_watchlist(symbols)
+
 def search_symbols_td(query: str, outputsize: int = 20):
     return td_provider.search_symbols(query, outputsize)
@@ -2,28 +2,15 @@
 import yfinance as yf
 import pandas as pd
 import time
-import random
 from datetime import datetime
+from providers.fetch_executor import TokenBucket, fetch_executor
 
-# Coda per gestire le richieste
-request_timestamps = []
+# Quota prudente di questo provider: 5 richieste al minuto
+rate_limiter = TokenBucket(5)
 
 def wait_for_rate_limit():
     """Aspetta il tempo necessario per non superare il rate limit"""
-    global request_timestamps
-    
-    # Pulisci timestamp più vecchi di 60 secondi
-    now = time.time()
-    request_timestamps = [t for t in request_timestamps if now - t < 60]
-    
-    # Se abbiamo fatto più di 5 richieste nell'ultimo minuto, aspetta
-    if len(request_timestamps) >= 5:
-        wait_time = 60 - (now - request_timestamps[0]) + random.uniform(1, 3)
-        print(f"⏳ Rate limit: aspetto {wait_time:.1f} secondi...")
-        time.sleep(wait_time)
-    
-    # Aggiungi questa richiesta
-    request_timestamps.append(time.time())
+    rate_limiter.acquire()
 
 def fetch_yf_delayed(symbol, interval="15m", period="1mo", tail=None):
     """Fetch dati Yahoo con delay per evitare rate limit"""
@@ -66,14 +53,11 @@ def fetch_yf_delayed(symbol, interval="15m", period="1mo", tail=None):
         return None
 
 def run_radar_scan_delayed(symbols, interval="15m", period="1mo"):
-    """Esegue scansione con delay tra ogni richiesta"""
-    results = []
-    
+    """Esegue scansione concorrente, al ritmo del rate limit del provider"""
     print(f"📡 Avvio scan per {len(symbols)} simboli...")
     
-    for i, symbol in enumerate(symbols):
-        print(f"\n📊 [{i+1}/{len(symbols)}] {symbol}")
-        
+    def scan(symbol):
+        # Il ritmo è dato da wait_for_rate_limit dentro fetch_yf_delayed
         df = fetch_yf_delayed(symbol, interval, period)
         
         if df is not None and not df.empty:
@@ -84,34 +68,31 @@ def run_radar_scan_delayed(symbols, interval="15m", period="1mo"):
             avg_volume = df['volume'].tail(20).mean()
             current_volume = df['volume'].iloc[-1]
             
-            results.append({
+            print(f"  ✅ {symbol}: ${current_price:.2f} ({change:.2f}%)")
+            return {
                 'symbol': symbol,
                 'price': current_price,
                 'change': change,
                 'volume': current_volume,
                 'volume_ratio': current_volume / avg_volume if avg_volume > 0 else 1,
                 'timestamp': datetime.now()
-            })
-            
-            print(f"  ✅ ${current_price:.2f} ({change:.2f}%)")
-        else:
-            print(f"  ❌ Nessun dato")
-            results.append({
-                'symbol': symbol,
-                'price': 0,
-                'change': 0,
-                'volume': 0,
-                'volume_ratio': 0,
-                'timestamp': datetime.now(),
-                'error': 'No data'
-            })
+            }
         
-        # Delay FISSO tra le richieste (12 secondi = 5 al minuto)
-        if i < len(symbols) - 1:  # Non dopo l'ultimo
-            print(f"⏳ Attendo 12 secondi prima del prossimo...")
-            time.sleep(12)
+        print(f"  ❌ {symbol}: Nessun dato")
+        return {
+            'symbol': symbol,
+            'price': 0,
+            'change': 0,
+            'volume': 0,
+            'volume_ratio': 0,
+            'timestamp': datetime.now(),
+            'error': 'No data'
+        }
     
-    return results
+    return fetch_executor.map(
+        None, scan, symbols,
+        progress=lambda done, total, symbol: print(f"📊 [{done}/{total}] {symbol}")
+    )
 
 # ============================================
 # FUNZIONI COMPATIBILI
@@ -11,8 +11,9 @@ def fetch_yf(symbol, interval="15m", period="1mo", tail=None):
     """Compatibile con fetch_yf originale"""
     return multi_fetch_yf(symbol, interval, period, tail)
 
-def fetch_yf_ohlcv(symbol, interval="15m", period="1mo"):
-    return multi_fetch_ohlcv(symbol, interval, period)
+def fetch_yf_ohlcv(symbol, interval="15m", period="1mo", tail=None):
+    """Compatibile con fetch_yf_ohlcv originale - supporta tail"""
+    return multi_fetch_ohlcv(symbol, interval, period, tail)
 
 def run_radar_scan_yahoo(symbols, interval="15m", period="1mo"):
     """Compatibile con vecchio nome"""
@@ -0,0 +1,297 @@
+# storage/ohlcv_store.py
+# Archivio OHLCV locale per (sorgente, simbolo, timeframe): segmenti NumPy in sola aggiunta
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import OHLCV_STORE_ENABLED, OHLCV_STORE_DIR, OHLCV_STORE_MAX_SEGMENTS
+
+# Record di un segmento: timestamp int64 (ns epoch UTC) e colonne OHLCV
+_DTYPE = np.dtype([('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                   ('close', '<f8'), ('volume', '<f8')])
+_COLS = ('open', 'high', 'low', 'close', 'volume')
+
+_PERIOD_RE = re.compile(r"^(\d+)(m|h|d|wk|mo|y)$")
+_PERIOD_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+def period_start(period: Optional[str], now: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """Inizio (UTC) di un periodo stile Yahoo ("5d", "1mo", "2y"); None per "max" o periodo ignoto"""
+    match = _PERIOD_RE.match(str(period or "").strip().lower())
+    if not match:
+        return None
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+    return now - pd.DateOffset(**{_PERIOD_UNITS[match.group(2)]: int(match.group(1))})
+
+def _ns(ts) -> int:
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return ts.tz_convert('UTC').as_unit('ns').value
+
+class OHLCVStore:
+    """
+    Storico OHLCV su disco, una cartella per (sorgente, simbolo, timeframe).
+
+    Ogni aggiornamento aggiunge un segmento .npy (array strutturato con
+    timestamp int64 ns UTC) scritto in modo atomico; la lettura apre i
+    segmenti in memory-map e, a parità di timestamp, tiene la candela del
+    segmento più recente (l'ultima candela salvata può essere ancora in
+    formazione e viene sostituita dal download successivo). Oltre
+    max_segments i segmenti sono compattati in uno solo.
+
+    sync() scarica solo le candele dal timestamp più recente salvato
+    (high-water mark) in poi; il download completo serve solo la prima
+    volta o quando si chiede un periodo più lungo di quello già coperto.
+    """
+
+    def __init__(self, root: str = OHLCV_STORE_DIR, max_segments: int = OHLCV_STORE_MAX_SEGMENTS):
+        self.root = root
+        self.max_segments = int(max_segments)
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self.full_fetches = 0
+        self.delta_fetches = 0
+        self.rows_appended = 0
+
+    # ---------- percorsi e metadati ----------
+
+    def _dir(self, source: str, symbol: str, timeframe: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9._=-]", "_", symbol.upper())
+        return os.path.join(self.root, source, safe, timeframe)
+
+    def _key_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _read_meta(path: str) -> Dict:
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _atomic_write(target: str, write):
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _write_meta(self, path: str, meta: Dict):
+        self._atomic_write(os.path.join(path, "meta.json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    @staticmethod
+    def _segments(path: str):
+        try:
+            return sorted(name for name in os.listdir(path) if name.startswith("seg_") and name.endswith(".npy"))
+        except OSError:
+            return []
+
+    # ---------- lettura ----------
+
+    def _records(self, path: str) -> np.ndarray:
+        """Record ordinati per timestamp, senza duplicati (vince il segmento più recente)"""
+        parts = [np.load(os.path.join(path, name), mmap_mode='r') for name in self._segments(path)]
+        if not parts:
+            return np.empty(0, dtype=_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        rec = np.concatenate(parts)
+        ts = rec['ts']
+        if len(ts) > 1 and np.any(ts[1:] <= ts[:-1]):
+            rec = rec[np.argsort(ts, kind='stable')]
+            ts = rec['ts']
+            rec = rec[np.append(ts[1:] != ts[:-1], True)]
+        return rec
+
+    def high_water_mark(self, source: str, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        """Timestamp (UTC) dell'ultima candela salvata, None se l'archivio è vuoto"""
+        hwm = self._read_meta(self._dir(source, symbol, timeframe)).get('hwm')
+        return pd.Timestamp(hwm, tz='UTC') if hwm is not None else None
+
+    def load(self, source: str, symbol: str, timeframe: str, start=None, end=None,
+             tail: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Candele salvate con start <= datetime < end (ricerca binaria sui
+        timestamp), nel fuso orario originale del provider; None se vuoto
+        """
+        path = self._dir(source, symbol, timeframe)
+        rec = self._records(path)
+        if not len(rec):
+            return None
+        ts = rec['ts']
+        i = 0 if start is None else int(np.searchsorted(ts, _ns(start), side='left'))
+        j = len(ts) if end is None else int(np.searchsorted(ts, _ns(end), side='left'))
+        if tail:
+            i = max(i, j - int(tail))
+        rec = rec[i:j]
+        if not len(rec):
+            return None
+
+        times = pd.to_datetime(np.asarray(rec['ts']), utc=True)
+        tz = self._read_meta(path).get('tz', 'UTC')
+        if tz is None:
+            times = times.tz_convert(None)
+        elif tz != 'UTC':
+            times = times.tz_convert(tz)
+        df = pd.DataFrame({'datetime': times})
+        for col in _COLS:
+            df[col] = np.array(rec[col])
+        return df
+
+    # ---------- scrittura ----------
+
+    def append(self, source: str, symbol: str, timeframe: str, df: Optional[pd.DataFrame],
+               covered_from: Optional[int] = None) -> int:
+        """
+        Aggiunge le candele di df (colonna datetime o indice temporale) dal
+        high-water mark in poi; restituisce le righe scritte.
+
+        covered_from: inizio (ns UTC) del periodo scaricato per intero
+        """
+        if df is None or df.empty:
+            return 0
+        times = pd.to_datetime(df['datetime'] if 'datetime' in df.columns else df.index.to_series())
+        tz = getattr(times.dt, 'tz', None)
+        utc = times.dt.tz_localize('UTC') if tz is None else times.dt.tz_convert('UTC')
+        rec = np.empty(len(df), dtype=_DTYPE)
+        rec['ts'] = pd.DatetimeIndex(utc).as_unit('ns').asi8
+        for col in _COLS:
+            values = pd.to_numeric(df[col], errors='coerce') if col in df.columns else pd.Series(0.0, index=df.index)
+            rec[col] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        rec = rec[~np.isnan(rec['close'])]
+        rec = rec[np.argsort(rec['ts'], kind='stable')]
+        rec = rec[np.append(rec['ts'][1:] != rec['ts'][:-1], True)]
+
+        path = self._dir(source, symbol, timeframe)
+        with self._key_lock(path):
+            os.makedirs(path, exist_ok=True)
+            meta = self._read_meta(path)
+            hwm = meta.get('hwm')
+            if hwm is not None and covered_from is None:
+                rec = rec[rec['ts'] >= hwm]
+            if len(rec):
+                seq = int(meta.get('next_segment', 0))
+                self._atomic_write(os.path.join(path, f"seg_{seq:08d}.npy"), lambda f: np.save(f, rec))
+                meta['next_segment'] = seq + 1
+                meta['hwm'] = int(max(hwm if hwm is not None else rec['ts'][-1], rec['ts'][-1]))
+                meta.setdefault('tz', str(tz) if tz is not None else None)
+            if covered_from is not None:
+                meta['covered_from'] = int(min(covered_from, meta.get('covered_from', covered_from)))
+            self._write_meta(path, meta)
+            if len(self._segments(path)) > self.max_segments:
+                self._compact(path, meta)
+        with self._lock:
+            self.rows_appended += len(rec)
+        return len(rec)
+
+    def _compact(self, path: str, meta: Dict):
+        """Unisce tutti i segmenti in uno (chiamato con il lock della chiave)"""
+        old = self._segments(path)
+        rec = np.array(self._records(path))
+        seq = int(meta.get('next_segment', 0))
+        self._atomic_write(os.path.join(path, f"seg_{seq:08d}.npy"), lambda f: np.save(f, rec))
+        meta['next_segment'] = seq + 1
+        self._write_meta(path, meta)
+        for name in old:
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+    # ---------- download incrementale ----------
+
+    @staticmethod
+    def _needs_full(meta: Dict, want: int) -> bool:
+        """Download completo: archivio vuoto o periodo richiesto più lungo di quello coperto"""
+        covered = meta.get('covered_from')
+        return meta.get('hwm') is None or covered is None or want < covered
+
+    def sync(self, source: str, symbol: str, timeframe: str, period: Optional[str],
+             fetch_full: Callable[[], Optional[pd.DataFrame]],
+             fetch_since: Callable[[pd.Timestamp], Optional[pd.DataFrame]]) -> Tuple[Optional[pd.DataFrame], bool]:
+        """
+        Aggiorna l'archivio e restituisce (candele del periodo, download riuscito).
+
+        fetch_full() scarica l'intero periodo; fetch_since(hwm) le candele
+        dal timestamp hwm (UTC) incluso in poi. period None / "max" indica
+        tutto lo storico.
+        """
+        path = self._dir(source, symbol, timeframe)
+        meta = self._read_meta(path)
+        start = period_start(period)
+        want = _ns(start) if start is not None else 0
+
+        if self._needs_full(meta, want):
+            df = fetch_full()
+            ok = df is not None and not df.empty
+            if ok:
+                self.append(source, symbol, timeframe, df, covered_from=want)
+            with self._lock:
+                self.full_fetches += 1
+        else:
+            df = fetch_since(pd.Timestamp(meta['hwm'], tz='UTC'))
+            ok = df is not None
+            self.append(source, symbol, timeframe, df)
+            with self._lock:
+                self.delta_fetches += 1
+        return self.load(source, symbol, timeframe, start=start), ok
+
+    def sync_many(self, source: str, symbols, timeframe: str, period: Optional[str],
+                  fetch_full: Callable[[list], Optional[Dict[str, pd.DataFrame]]],
+                  fetch_since: Callable[[list, pd.Timestamp], Optional[Dict[str, pd.DataFrame]]]
+                  ) -> Dict[str, Tuple[Optional[pd.DataFrame], bool]]:
+        """
+        sync() di più simboli con al più due download: uno completo per i
+        simboli da scaricare per intero e uno incrementale, dal più vecchio
+        high-water mark, per gli altri (le candele già salvate sono scartate
+        da append).
+
+        fetch_full(simboli) e fetch_since(simboli, hwm) restituiscono
+        {simbolo: DataFrame}, None se il download fallisce.
+        """
+        start = period_start(period)
+        want = _ns(start) if start is not None else 0
+        full, delta = [], {}
+        for symbol in symbols:
+            meta = self._read_meta(self._dir(source, symbol, timeframe))
+            if self._needs_full(meta, want):
+                full.append(symbol)
+            else:
+                delta[symbol] = meta['hwm']
+
+        ok = {}
+        if full:
+            frames = fetch_full(full) or {}
+            for symbol in full:
+                df = frames.get(symbol)
+                ok[symbol] = df is not None and not df.empty
+                if ok[symbol]:
+                    self.append(source, symbol, timeframe, df, covered_from=want)
+            with self._lock:
+                self.full_fetches += 1
+        if delta:
+            frames = fetch_since(list(delta), pd.Timestamp(min(delta.values()), tz='UTC'))
+            for symbol in delta:
+                ok[symbol] = frames is not None
+                self.append(source, symbol, timeframe, (frames or {}).get(symbol))
+            with self._lock:
+                self.delta_fetches += 1
+        return {symbol: (self.load(source, symbol, timeframe, start=start), ok[symbol]) for symbol in symbols}
+
+    def stats(self) -> Dict[str, int]:
+        return {'full_fetches': self.full_fetches, 'delta_fetches': self.delta_fetches,
+                'rows_appended': self.rows_appended}
+
+# Istanza globale (None se l'archivio è disattivato in config)
+ohlcv_store = OHLCVStore() if OHLCV_STORE_ENABLED else None
@@ -4,9 +4,13 @@ import numpy as np
 import streamlit as st
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
-from providers.yahoo_provider import fetch_yf_ohlcv
 from strategy.backtest import backtest_engine
-from config import BT_SL_ATR, BT_TP_ATR
+from indicators.mtf import resample_closes
+from strategy.params import StrategyParams
+from strategy.result_store import backtest_store, data_fingerprint, result_key
+from strategy.history import history_store, year_view, history_until
+from strategy.monte_carlo import render_monte_carlo
+from config import BT_SL_ATR, BT_TP_ATR, BACKTEST_STORE_ENABLED
 
 def calculate_performance_metrics(trades_df):
     """Calcola metriche di performance avanzate"""
@@ -60,42 +64,91 @@ def calculate_performance_metrics(trades_df):
         "largest_loss": round(losses['pnl_pct'].min(), 2) if not losses.empty else 0
     }
 
+def load_annual_history(symbol: str):
+    """
+    Storico 1h completo usato dai backtest annuali, None se insufficiente.
+    Scaricato una volta per simbolo e condiviso (vedi strategy.history).
+    """
+    df = history_store.load(symbol)
+    
+    if df is None or len(df) < 2000:
+        return None
+    return df
+
 def run_annual_backtest(symbol: str, year: int = 2025, use_mtf: bool = True):
     """
     Esegue backtest su un intero anno
     """
-    # Scarica dati annuali da Yahoo
-    df = fetch_yf_ohlcv(symbol, interval="1h", period="2y", tail=10000)
+    # Storico condiviso fra anni e pannelli (un download per simbolo)
+    df = load_annual_history(symbol)
     
-    if df is None or len(df) < 2000:
+    if df is None:
         return None
     
-    # Filtra per anno
-    df['year'] = pd.to_datetime(df['datetime']).dt.year
-    df_year = df[df['year'] == year].copy()
+    return annual_backtest_from_history(df, symbol, year, use_mtf, df_year=history_store.year(symbol, year))
+
+def annual_backtest_from_history(df: pd.DataFrame, symbol: str, year: int = 2025, use_mtf: bool = True,
+                                 df_year: pd.DataFrame = None):
+    """
+    Backtest di un anno su storico già caricato (vedi load_annual_history)
+    
+    df_year: candele dell'anno già estratte (es. history_store.year)
+    """
+    # Anno come vista sullo storico (ricerca binaria sui timestamp)
+    if df_year is None:
+        df_year = year_view(df, year)
     
     if len(df_year) < 500:
         return None
     
+    # Candele successive all'anno escluse: non influiscono sul risultato
+    df = history_until(df, year)
+    
+    # Risultato già calcolato per gli stessi dati e parametri
+    key = None
+    if BACKTEST_STORE_ENABLED:
+        key = result_key(data_fingerprint(df, symbol, "1h"), StrategyParams.from_config(),
+                         kind="annual", year=int(year), use_mtf=bool(use_mtf))
+        cached = backtest_store.get(key)
+        if cached is not None:
+            trades, payload = cached
+            return _annual_result(symbol, year, trades, payload['stats'], df_year)
+    
+    # Trend MTF dallo storico completo (EMA già a regime a inizio anno):
+    # le candele 1h scaricate fanno da 1h, il 4h è aggregato dalle stesse
+    df_1h = df_4h = None
+    if use_mtf:
+        df_1h = df
+        df_4h = resample_closes(df, 4)
+    
     # Esegui backtest
-    results = backtest_engine(df_year, use_mtf=use_mtf)
+    results = backtest_engine(df_year, use_mtf=use_mtf, df_1h=df_1h, df_4h=df_4h, symbol=symbol)
+    
+    trades = pd.DataFrame() if results is None else results['trades']
+    
+    # Calcola metriche
+    stats = calculate_performance_metrics(trades)
     
-    if results is None or results['trades'].empty:
+    if key is not None:
+        backtest_store.put(key, trades, {'stats': stats})
+    
+    return _annual_result(symbol, year, trades, stats, df_year)
+
+def _annual_result(symbol, year, trades, stats, df_year):
+    """Dizionario restituito da run_annual_backtest"""
+    if trades.empty:
         return {
             "symbol": symbol,
             "year": year,
             "trades": pd.DataFrame(),
-            "stats": calculate_performance_metrics(pd.DataFrame()),
+            "stats": stats,
             "message": "Nessun trade generato"
         }
     
-    # Calcola metriche
-    stats = calculate_performance_metrics(results['trades'])
-    
     return {
         "symbol": symbol,
         "year": year,
-        "trades": results['trades'],
+        "trades": trades,
         "stats": stats,
         "df": df_year
     }
@@ -121,7 +174,9 @@ def render_annual_backtest_panel(symbol):
             results = run_annual_backtest(symbol, year, use_mtf)
             
             if results is None:
-                st.warning(f"Dati insufficienti per {symbol} nel {year}")
+                coverage = history_store.coverage(symbol)
+                since = f" (storico 1h disponibile dal {coverage[0]:%d/%m/%Y})" if coverage else ""
+                st.warning(f"Dati insufficienti per {symbol} nel {year}{since}")
                 return
             
             if results['trades'].empty:
@@ -143,6 +198,9 @@ def render_annual_backtest_panel(symbol):
             col_n3.metric("Avg Win", f"{stats['avg_win']:+.2f}%")
             col_n4.metric("Avg Loss", f"{stats['avg_loss']:.2f}%")
             
+            # Distribuzioni delle metriche ricampionando i trade
+            render_monte_carlo(results['trades'])
+            
             # Distribuzione mensile
             if not results['trades'].empty:
                 trades_df = results['trades'].copy()
@@ -1,10 +1,12 @@
 # strategy/auto_trader.py
+import math
 import streamlit as st
 import time
 import threading
 from datetime import datetime, timedelta
-from providers.multi_provider import scan_symbol
+from providers.multi_provider import scan_symbol, scan_many, fetch_many
 from strategy.money_manager import MoneyManager
+from indicators.incremental import get_incremental_state
 
 class AutoTrader:
     """
@@ -64,32 +66,40 @@ class AutoTrader:
             return
         
         self.last_scan = datetime.now()
+        if self._trades_today() >= self.max_trades_per_day:
+            return
+        
+        # Scansiona tutti i simboli con un download multi-ticker
+        symbols = list(st.session_state.watchlist)
+        results = scan_many(symbols, "15m", "1mo")
         
-        # Scansiona ogni simbolo
-        for symbol in st.session_state.watchlist:
+        for symbol, result in zip(symbols, results):
             if not self.is_running:
                 break
                 
             # Verifica limite giornaliero
-            today = datetime.now().date()
-            trades_today = [t for t in st.session_state.get('auto_trades', []) 
-                          if t.get('time') and t['time'].date() == today]
-            
-            if len(trades_today) >= self.max_trades_per_day:
-                continue
-            
-            # Scan simbolo
-            result = scan_symbol(symbol, "15m", "1mo")
+            if self._trades_today() >= self.max_trades_per_day:
+                break
             
             if result and 'error' not in result:
+                # Indicatori aggiornati con le sole candele nuove (l'ultima è ancora in formazione)
+                df = result.get('data')
+                if df is not None and len(df) > 1:
+                    state = get_incremental_state(symbol, "15m", df.iloc[:-1])
+                    result = dict(result, indicators=state.last)
+                
                 # Determina livello segnale (simulato per ora)
                 level = self._calculate_signal_level(result)
                 
                 # Apri trade se livello sufficiente
                 if level >= self.min_signal_level:
                     self._open_trade(symbol, result, level)
-            
-            time.sleep(2)  # Pausa tra simboli
+    
+    def _trades_today(self):
+        """Trade automatici aperti oggi"""
+        today = datetime.now().date()
+        return len([t for t in st.session_state.get('auto_trades', []) 
+                    if t.get('time') and t['time'].date() == today])
     
     def _calculate_signal_level(self, data):
         """Calcola livello segnale (1-5)"""
@@ -115,7 +125,9 @@ class AutoTrader:
         
         mm = st.session_state.auto_money_manager
         price = data.get('price', 0)
-        atr = price * 0.01  # ATR stimato (1% del prezzo)
+        atr = data.get('indicators', {}).get('atr', math.nan)
+        if not atr > 0:
+            atr = price * 0.01  # ATR non ancora disponibile: stimato (1% del prezzo)
         
         # Determina direzione in base al cambio
         direction = "LONG" if data.get('change', 0) > 0 else "SHORT"
@@ -157,6 +169,9 @@ class AutoTrader:
         if 'auto_trades' not in st.session_state:
             return
         
+        # Prezzi di tutti i simboli aperti con un download multi-ticker
+        fetch_many({t['symbol'] for t in st.session_state.auto_trades if t.get('status') == 'open'}, "15m", "1d")
+        
         for trade in st.session_state.auto_trades:
             if trade.get('status') != 'open':
                 continue
@@ -2,190 +2,320 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional
-from indicators.robust_ta import compute_indicators_15m, decide_signal
-from utils.helpers import pick_col_by_prefix
-from config import (
-    BT_SL_ATR, BT_TP_ATR, ADX_MIN, RSI_LONG_MAX, RSI_SHORT_MIN,
-    STRONG_SL_ATR, STRONG_TP_ATR, WEAK_SL_ATR, WEAK_TP_ATR,
-    POSITION_SIZE_PCT
-)
-
-def backtest_engine(df_15m: pd.DataFrame, use_mtf: bool, df_1h=None, df_4h=None):
-    """Motore di backtest completo con supporto weak/strong signals"""
-    if df_15m is None or len(df_15m) < 260:
-        return None
+from indicators.robust_ta import signal_features, classify_features
+from indicators.cache import compute_indicators_cached
+from indicators.numpy_kernels import compute_indicators_numpy, can_resume
+from indicators.mtf import mtf_flags
+from strategy.trade_sim import simulate_trades
+from strategy.params import StrategyParams
+from config import INDICATOR_BACKEND, INDICATOR_DTYPE
 
-    # Inizializzazione serie MTF
-    mtf_long_series = pd.Series(True, index=df_15m.index)
-    mtf_short_series = pd.Series(True, index=df_15m.index)
-
-    if use_mtf and df_1h is not None and df_4h is not None and not df_1h.empty and not df_4h.empty:
-        df1 = df_1h.copy().set_index("datetime")
-        df4 = df_4h.copy().set_index("datetime")
-        
-        # Logica Trend MTF
-        ema1h = df1["close"].ewm(span=50, adjust=False).mean()
-        up_1h = (df1["close"] > ema1h)
-        
-        ema4h = df4["close"].ewm(span=20, adjust=False).mean()
-        up_4h = (df4["close"] > ema4h)
-
-        # Riallineamento timeframe su 15m
-        df1m = pd.DataFrame({"up_1h": up_1h}, index=df1.index).resample("15min").ffill()
-        df4m = pd.DataFrame({"up_4h": up_4h}, index=df4.index).resample("15min").ffill()
-
-        df15 = df_15m.set_index("datetime")
-        joined = df15.join(df1m, how="left").join(df4m, how="left")
-        joined["up_1h"] = joined["up_1h"].ffill().fillna(False)
-        joined["up_4h"] = joined["up_4h"].ffill().fillna(False)
-
-        mtf_long_series = (joined["up_1h"] & joined["up_4h"]).reset_index(drop=True)
-        mtf_short_series = ((~joined["up_1h"]) & (~joined["up_4h"])).reset_index(drop=True)
+# Candele di warm-up prima di aprire il primo trade
+WARMUP_BARS = 210
+
+def prepare_backtest(df_15m: pd.DataFrame, use_mtf: bool, df_1h=None, df_4h=None,
+                     symbol: Optional[str] = None):
+    """
+    Indicatori e feature di segnale indipendenti dai parametri.
+
+    Returns:
+        (df_ind, feat) con feat prodotto da signal_features; riutilizzabile
+        per valutare più StrategyParams sullo stesso dataset
+    """
+    # Flag MTF allineati sulle candele 15m
+    if use_mtf:
+        mtf_long, mtf_short = mtf_flags(df_15m, df_1h, df_4h, symbol)
+    else:
+        mtf_long = mtf_short = np.ones(len(df_15m), dtype=bool)
 
     # Calcolo indicatori su 15m
-    df_ind = compute_indicators_15m(df_15m)
-    
-    # Aggiungi colonne per tracciare la forza del segnale
-    df_ind['signal_strength'] = 'none'
-    df_ind['signal_type'] = 'none'
-
-    adx_col = pick_col_by_prefix(df_ind, "ADX_")
-    dmp_col = pick_col_by_prefix(df_ind, "DMP_")
-    dmn_col = pick_col_by_prefix(df_ind, "DMN_")
-    st_dir_col = pick_col_by_prefix(df_ind, "SUPERTD_")
-
-    in_pos = False
-    side = None
-    entry = sl = tp = None
-    trades = []
-    current_signal_info = None  # Per tracciare info del segnale corrente
-    capital = 10000  # Capitale iniziale fittizio per calcoli
-
-    for i in range(len(df_ind)):
-        if i < 210:
-            continue
-
-        p_close = float(df_ind["close"].iloc[i])
-        p_high = float(df_ind["high"].iloc[i])
-        p_low = float(df_ind["low"].iloc[i])
-        ts = df_ind["datetime"].iloc[i]
-        atr = float(df_ind["atr"].iloc[i])
-
-        # Ottieni info segnale per questo punto
-        signal_info = decide_signal(
-            df_ind.iloc[:i+1],  # Dati fino a questo punto
-            mtf_long_series.iloc[i] if i < len(mtf_long_series) else True,
-            mtf_short_series.iloc[i] if i < len(mtf_short_series) else True
-        )
-        
-        # Salva nel dataframe
-        df_ind.loc[df_ind.index[i], 'signal_strength'] = signal_info['strength']
-        df_ind.loc[df_ind.index[i], 'signal_type'] = signal_info['signal']
-
-        # Gestione uscita
-        if in_pos:
-            exit_price = None
-            exit_reason = None
-
-            if side == "LONG":
-                if p_low <= sl:
-                    exit_price, exit_reason = sl, "SL"
-                elif p_high >= tp:
-                    exit_price, exit_reason = tp, "TP"
-            else:  # SHORT
-                if p_high >= sl:
-                    exit_price, exit_reason = sl, "SL"
-                elif p_low <= tp:
-                    exit_price, exit_reason = tp, "TP"
-
-            if exit_price is not None:
-                pnl = (exit_price - entry) if side == "LONG" else (entry - exit_price)
-                pnl_pct = (pnl / entry) * 100
-                
-                trades.append({
-                    "time_exit": ts,
-                    "side": side,
-                    "entry": entry,
-                    "exit": exit_price,
-                    "reason": exit_reason,
-                    "pnl_pct": pnl_pct,
-                    "signal_strength": current_signal_info['strength'] if current_signal_info else 'unknown',
-                    "signal_type": current_signal_info['signal'] if current_signal_info else 'unknown',
-                    "rsi_entry": current_signal_info['rsi'] if current_signal_info else None,
-                    "adx_entry": current_signal_info['adx'] if current_signal_info else None,
-                    "slope_entry": current_signal_info['slope'] if current_signal_info else None,
-                    "atr_entry": atr
-                })
-                in_pos = False
-                side = entry = sl = tp = None
-                current_signal_info = None
-            
-            continue
-
-        # Gestione entrata - usa signal_info
-        if signal_info['signal'] in ["LONG", "SHORT"]:
-            # Determina moltiplicatori SL/TP in base alla forza
-            if signal_info['strength'] == "STRONG":
-                sl_mult = STRONG_SL_ATR
-                tp_mult = STRONG_TP_ATR
-            elif signal_info['strength'] == "WEAK":
-                sl_mult = WEAK_SL_ATR
-                tp_mult = WEAK_TP_ATR
-            else:
-                sl_mult = BT_SL_ATR
-                tp_mult = BT_TP_ATR
-
-            # Calcola dimensione posizione (simulata)
-            position_size = capital * POSITION_SIZE_PCT
-            quantity = position_size / p_close if p_close > 0 else 0
-
-            in_pos = True
-            side = signal_info['signal']
-            entry = p_close
-            current_signal_info = signal_info.copy() if signal_info else None
-            
-            if side == "LONG":
-                sl = entry - (atr * sl_mult)
-                tp = entry + (atr * tp_mult)
-            else:  # SHORT
-                sl = entry + (atr * sl_mult)
-                tp = entry - (atr * tp_mult)
+    df_ind = compute_indicators_cached(df_15m, symbol)
+    return df_ind, signal_features(df_ind, mtf_long, mtf_short)
 
-    # Report
-    tdf = pd.DataFrame(trades)
-    if tdf.empty:
+def entry_candidates(sig: Dict[str, Any], n: int):
+    """(indici, is_long, forza) delle candele con segnale dopo il warm-up"""
+    warmup = np.arange(n) >= WARMUP_BARS
+    entry_idx = np.flatnonzero(warmup & (sig['long'] | sig['short']))
+    return entry_idx, sig['long'][entry_idx], sig['strength'][entry_idx]
+
+def trades_from_sim(df_ind: pd.DataFrame, sig: Dict[str, Any], sim: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Array per trade (stesse colonne del DataFrame trades) dall'esito di simulate_trades"""
+    close_arr = np.asarray(df_ind["close"], dtype=np.float64)
+    atr_arr = np.asarray(df_ind["atr"], dtype=np.float64)
+    ent = sim['entry_idx']
+    ext = sim['exit_idx']
+    entry_px = close_arr[ent]
+    exit_px = sim['exit_price']
+    pnl = np.where(sim['is_long'], exit_px - entry_px, entry_px - exit_px)
+    side = np.where(sim['is_long'], "LONG", "SHORT").astype(object)
+
+    return {
+        "entry_idx": ent,
+        "exit_idx": ext,
+        "side": side,
+        "entry": entry_px,
+        "exit": exit_px,
+        "reason": np.where(sim['is_sl'], "SL", "TP").astype(object),
+        "pnl_pct": (pnl / entry_px) * 100,
+        "signal_strength": sig['strength'][ent],
+        "signal_type": side,
+        "rsi_entry": sig['rsi'][ent],
+        "adx_entry": sig['adx'][ent],
+        "slope_entry": sig['slope'][ent],
+        "atr_entry": atr_arr[ext],
+        "pruned": sim.get('pruned')
+    }
+
+def simulate_signals(df_ind: pd.DataFrame, sig: Dict[str, Any], params: StrategyParams,
+                     prune=None) -> Dict[str, np.ndarray]:
+    """
+    Entrate dai segnali classificati e uscite a SL/TP.
+
+    df_ind può essere anche un dict di array (colonne close, high, low, atr).
+    prune: regole di interruzione anticipata (strategy.pruning.PruneRules);
+    il motivo dell'eventuale interruzione è in 'pruned'.
+
+    Returns:
+        dict di array per trade (stesse colonne del DataFrame trades)
+    """
+    sim = _simulate_from(df_ind, sig, params, 0, prune)
+    return trades_from_sim(df_ind, sig, sim)
+
+def _simulate_from(df_ind, sig: Dict[str, Any], params: StrategyParams, start: int, prune=None):
+    """simulate_trades sulle entrate candidate dalla candela start in poi"""
+    close_arr = np.asarray(df_ind["close"], dtype=np.float64)
+    atr_arr = np.asarray(df_ind["atr"], dtype=np.float64)
+
+    # Candele di entrata candidate e livelli SL/TP (moltiplicatori per forza segnale)
+    entry_idx, is_long, strength = entry_candidates(sig, len(close_arr))
+    if start:
+        keep = entry_idx >= start
+        entry_idx, is_long, strength = entry_idx[keep], is_long[keep], strength[keep]
+    sl_mult = np.empty(len(entry_idx))
+    tp_mult = np.empty(len(entry_idx))
+    for label in ("STRONG", "WEAK", "NONE"):
+        sl_mult[strength == label], tp_mult[strength == label] = params.exit_mults(label)
+    entry = close_arr[entry_idx]
+    atr = atr_arr[entry_idx]
+    sl = np.where(is_long, entry - (atr * sl_mult), entry + (atr * sl_mult))
+    tp = np.where(is_long, entry + (atr * tp_mult), entry - (atr * tp_mult))
+
+    # Risoluzione uscite: una posizione alla volta, SL prima del TP
+    return simulate_trades(np.asarray(df_ind["high"], dtype=np.float64), np.asarray(df_ind["low"], dtype=np.float64),
+                           entry_idx, is_long, sl, tp, prune=prune, entry_px=entry)
+
+def trade_stats(pnl_pct: np.ndarray, strength: np.ndarray) -> Dict[str, Any]:
+    """Statistiche del backtest da array di PnL % e forza segnale"""
+    n = len(pnl_pct)
+    if n == 0:
         return {
-            "trades": tdf, 
-            "stats": {
-                "n": 0, 
-                "wins": 0,
-                "winrate": 0, 
-                "avg_pnl_pct": 0, 
-                "total_pnl_pct": 0
-            }
+            "n": 0, 
+            "wins": 0,
+            "winrate": 0, 
+            "avg_pnl_pct": 0, 
+            "total_pnl_pct": 0
         }
 
-    wins = int((tdf["pnl_pct"] > 0).sum())
-    n = len(tdf)
-    
+    wins = int((pnl_pct > 0).sum())
+
     # Statistiche per tipo segnale
-    strong_trades = tdf[tdf['signal_strength'] == 'STRONG'] if 'signal_strength' in tdf.columns else pd.DataFrame()
-    weak_trades = tdf[tdf['signal_strength'] == 'WEAK'] if 'signal_strength' in tdf.columns else pd.DataFrame()
+    strong = strength == 'STRONG'
+    weak = strength == 'WEAK'
+    n_strong = int(strong.sum())
+    n_weak = int(weak.sum())
     
-    stats = {
+    return {
         "n": n,
         "wins": wins,
-        "winrate": (wins / n) * 100 if n > 0 else 0,
-        "avg_pnl_pct": float(tdf["pnl_pct"].mean()),
-        "total_pnl_pct": float(tdf["pnl_pct"].sum()),
-        "strong_trades": len(strong_trades),
-        "strong_winrate": (len(strong_trades[strong_trades["pnl_pct"] > 0]) / len(strong_trades) * 100) if len(strong_trades) > 0 else 0,
-        "weak_trades": len(weak_trades),
-        "weak_winrate": (len(weak_trades[weak_trades["pnl_pct"] > 0]) / len(weak_trades) * 100) if len(weak_trades) > 0 else 0,
+        "winrate": (wins / n) * 100,
+        "avg_pnl_pct": float(pnl_pct.mean()),
+        "total_pnl_pct": float(pnl_pct.sum()),
+        "strong_trades": n_strong,
+        "strong_winrate": (int((pnl_pct[strong] > 0).sum()) / n_strong * 100) if n_strong > 0 else 0,
+        "weak_trades": n_weak,
+        "weak_winrate": (int((pnl_pct[weak] > 0).sum()) / n_weak * 100) if n_weak > 0 else 0,
     }
+
+def trades_frame(df_ind: pd.DataFrame, trades: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """DataFrame trades (schema storico: time_exit, side, entry, exit, reason, pnl_pct, ...)"""
+    if len(trades["exit_idx"]) == 0:
+        return pd.DataFrame()
+    cols = {"time_exit": df_ind["datetime"].iloc[trades["exit_idx"]].reset_index(drop=True)}
+    for k in ("side", "entry", "exit", "reason", "pnl_pct", "signal_strength", "signal_type",
+              "rsi_entry", "adx_entry", "slope_entry", "atr_entry"):
+        cols[k] = trades[k]
+    return pd.DataFrame(cols)
+
+def backtest_engine(df_15m: pd.DataFrame, use_mtf: bool, df_1h=None, df_4h=None, symbol: Optional[str] = None,
+                    params: Optional[StrategyParams] = None, prune=None, resumable: bool = False):
+    """Motore di backtest completo con supporto weak/strong signals
+
+    symbol: se indicato, gli indicatori passano dalla cache condivisa
+    params: soglie e moltiplicatori SL/TP (default: valori correnti di config)
+    prune: regole di interruzione anticipata (strategy.pruning.PruneRules);
+    con prune le statistiche riportano il motivo in 'pruned'
+    resumable: il risultato contiene anche 'state' (BacktestState), che con
+    extend(new_bars) prosegue il backtest sulle candele arrivate dopo
+    (prune non è supportato)
+    """
+    if df_15m is None or len(df_15m) < 260:
+        return None
+    if params is None:
+        params = StrategyParams.from_config()
+    if resumable:
+        return BacktestState(df_15m, use_mtf, df_1h, df_4h, symbol, params).result()
+
+    df_ind, feat = prepare_backtest(df_15m, use_mtf, df_1h, df_4h, symbol)
+
+    # Classificazione vettoriale di tutte le candele in un solo passaggio
+    sig = classify_features(feat, params)
+
+    # Aggiungi colonne per tracciare la forza del segnale
+    warmup = np.arange(len(df_ind)) >= WARMUP_BARS
+    df_ind['signal_strength'] = np.where(warmup, sig['strength'], 'none')
+    df_ind['signal_type'] = np.where(warmup, sig['signal'], 'none')
+
+    trades = simulate_signals(df_ind, sig, params, prune)
+
+    # Report
+    tdf = trades_frame(df_ind, trades)
+    stats = trade_stats(trades["pnl_pct"], trades["signal_strength"])
+    if prune is not None:
+        stats["pruned"] = trades["pruned"]
+    if tdf.empty:
+        return {"trades": tdf, "stats": stats}
     
     return {"trades": tdf, "stats": stats, "df_indicators": df_ind}
 
+def _concat_arrays(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Concatena gli array per candela/trade di due dict con le stesse chiavi"""
+    return {k: np.concatenate([v, new[k]]) if isinstance(v, np.ndarray) else new[k] for k, v in old.items()}
+
+class BacktestState:
+    """
+    Stato riprendibile di backtest_engine (vedi resumable=True).
+
+    Conserva lo stato degli indicatori (medie, SuperTrend, ultime candele
+    per le finestre mobili), gli array per candela già classificati, i
+    trade chiusi e la prima candela da cui può partire il prossimo trade:
+    una posizione ancora aperta a fine dati è la prima entrata candidata
+    da lì in poi, e la sua uscita viene cercata anche sulle nuove candele.
+    extend(new_bars) calcola indicatori e segnali solo per le nuove
+    candele e riprende la simulazione; il risultato coincide con
+    backtest_engine sull'intero storico (indicatori calcolati da zero).
+
+    Si ricalcola tutto se gli indicatori non usano i kernel NumPy, se una
+    candela con high == low cambia il true range dell'intera serie o se
+    nuovi dati 1h/4h cambiano i flag MTF di candele già elaborate.
+    """
+
+    def __init__(self, df_15m: pd.DataFrame, use_mtf: bool, df_1h=None, df_4h=None,
+                 symbol: Optional[str] = None, params: Optional[StrategyParams] = None):
+        self.use_mtf = use_mtf
+        self.df_1h = df_1h
+        self.df_4h = df_4h
+        self.symbol = symbol
+        self.params = params if params is not None else StrategyParams.from_config()
+        self.full_runs = 0
+        self.extensions = 0
+        self._build(df_15m)
+
+    def _mtf(self, df_15m: pd.DataFrame):
+        if self.use_mtf:
+            return mtf_flags(df_15m, self.df_1h, self.df_4h, self.symbol)
+        return np.ones(len(df_15m), dtype=bool), np.ones(len(df_15m), dtype=bool)
+
+    def _build(self, df_15m: pd.DataFrame):
+        """Backtest completo (come backtest_engine) con cattura dello stato"""
+        self.df_15m = df_15m
+        self._ind_state = {} if INDICATOR_BACKEND.lower() == "numpy" else None
+        if self._ind_state is not None:
+            df_ind = compute_indicators_numpy(df_15m, dtype=INDICATOR_DTYPE, state=self._ind_state)
+        else:
+            df_ind = compute_indicators_cached(df_15m, self.symbol)
+        self.mtf_long, self.mtf_short = self._mtf(df_15m)
+        self.sig = classify_features(signal_features(df_ind, self.mtf_long, self.mtf_short), self.params)
+        self.df_ind = self._with_signals(df_ind, self.sig, 0)
+        self.cols = {c: df_ind[c].to_numpy(dtype=np.float64) for c in ('close', 'high', 'low', 'atr')}
+
+        sim = _simulate_from(self.cols, self.sig, self.params, 0)
+        self.trades = trades_from_sim(self.cols, self.sig, sim)
+        self.next_bar = int(sim['exit_idx'][-1]) + 1 if len(sim['exit_idx']) else 0
+        self.full_runs += 1
+
+    @staticmethod
+    def _with_signals(df_ind: pd.DataFrame, sig: Dict[str, Any], offset: int) -> pd.DataFrame:
+        """Colonne signal_strength / signal_type di backtest_engine (warm-up sull'indice globale)"""
+        warmup = np.arange(offset, offset + len(df_ind)) >= WARMUP_BARS
+        df_ind['signal_strength'] = np.where(warmup, sig['strength'], 'none')
+        df_ind['signal_type'] = np.where(warmup, sig['signal'], 'none')
+        return df_ind
+
+    def _can_extend(self, new_bars: pd.DataFrame, htf_changed: bool) -> bool:
+        if self._ind_state is None or not can_resume(self._ind_state, new_bars):
+            return False
+        if htf_changed and self.use_mtf:
+            # I flag MTF delle candele già elaborate devono restare quelli usati
+            mtf_long, mtf_short = self._mtf(self.df_ind[['datetime']])
+            return np.array_equal(mtf_long, self.mtf_long) and np.array_equal(mtf_short, self.mtf_short)
+        return True
+
+    def extend(self, new_bars: pd.DataFrame, df_1h=None, df_4h=None) -> Dict[str, Any]:
+        """
+        Aggiunge candele in coda (successive all'ultima già elaborata) e
+        restituisce il risultato aggiornato, come backtest_engine.
+
+        df_1h / df_4h: dati HTF aggiornati (default: quelli già in uso)
+        """
+        if new_bars is None or new_bars.empty:
+            return self.result()
+        htf_changed = df_1h is not None or df_4h is not None
+        if df_1h is not None:
+            self.df_1h = df_1h
+        if df_4h is not None:
+            self.df_4h = df_4h
+
+        if not self._can_extend(new_bars, htf_changed):
+            self._build(pd.concat([self.df_15m, new_bars]))
+            return self.result()
+
+        n = len(self.df_ind)
+        self.df_15m = pd.concat([self.df_15m, new_bars])
+        ind_new = compute_indicators_numpy(new_bars, dtype=INDICATOR_DTYPE, state=self._ind_state)
+        mtf_long, mtf_short = self._mtf(new_bars)
+
+        # Pendenza EMA20 come in signal_features (stesse candele di riferimento sull'indice globale)
+        ema20 = np.concatenate([self.df_ind['ema20'].to_numpy(dtype=np.float64)[-4:],
+                                ind_new['ema20'].to_numpy(dtype=np.float64)])
+        idx = np.arange(n - 4, n + len(new_bars))
+        sw = np.minimum(5, idx)
+        ref = np.where(sw > 0, idx + 1 - sw, idx) - (n - 4)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(sw > 0, (ema20 - ema20[ref]) / np.maximum(sw, 1), 0.0)[4:]
+
+        sig_new = classify_features(signal_features(ind_new, mtf_long, mtf_short, slope=slope), self.params)
+        self.mtf_long = np.concatenate([self.mtf_long, mtf_long])
+        self.mtf_short = np.concatenate([self.mtf_short, mtf_short])
+        self.sig = _concat_arrays(self.sig, sig_new)
+        self.df_ind = pd.concat([self.df_ind, self._with_signals(ind_new, sig_new, n)])
+        self.cols = _concat_arrays(self.cols, {c: ind_new[c].to_numpy(dtype=np.float64) for c in self.cols})
+
+        # Ripresa dalla prima entrata possibile (eventuale posizione ancora aperta inclusa)
+        sim = _simulate_from(self.cols, self.sig, self.params, self.next_bar)
+        if len(sim['exit_idx']):
+            self.trades = _concat_arrays(self.trades, trades_from_sim(self.cols, self.sig, sim))
+            self.next_bar = int(sim['exit_idx'][-1]) + 1
+        self.extensions += 1
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        """Risultato nello stesso formato di backtest_engine, più 'state'"""
+        tdf = trades_frame(self.df_ind, self.trades)
+        stats = trade_stats(self.trades["pnl_pct"], self.trades["signal_strength"])
+        if tdf.empty:
+            return {"trades": tdf, "stats": stats, "state": self}
+        return {"trades": tdf, "stats": stats, "df_indicators": self.df_ind, "state": self}
+
 def load_history_for_backtest(symbol: str, days: int, source: str, fetch_yf, fetch_td_15m):
     """Carica storico per backtest"""
     if source == "Yahoo (gratis)":
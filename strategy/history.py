@@ -0,0 +1,158 @@
+# strategy/history.py
+# Storico per simbolo scaricato una volta e viste per anno/intervallo con ricerca binaria
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators.mtf import _ts_ns
+from providers.yahoo_provider import fetch_yf_ohlcv
+from storage.ohlcv_store import ohlcv_store
+from config import HISTORY_INTERVAL, HISTORY_PERIOD, HISTORY_TTL, HISTORY_CACHE_SIZE
+
+def _fetch_history(symbol: str, interval: str, period: str) -> Optional[pd.DataFrame]:
+    df = fetch_yf_ohlcv(symbol, interval=interval, period=period)
+    # L'archivio locale accumula anche le candele uscite dalla finestra di Yahoo
+    if ohlcv_store is not None:
+        archived = ohlcv_store.load("yahoo", symbol, interval)
+        if archived is not None and (df is None or len(archived) > len(df)):
+            return archived
+    return df
+
+class HistoryStore:
+    """
+    Storico completo di ogni simbolo, caricato una volta e condiviso.
+
+    I timestamp sono tenuti come int64 ns UTC ordinati: anni e intervalli
+    si ottengono con np.searchsorted e iloc, cioè viste sulle stesse
+    colonne senza copia (con Copy-on-Write le scritture sulla vista non
+    toccano lo storico condiviso). Un anno fuori dallo storico disponibile
+    restituisce None, e coverage() dice quale periodo è coperto.
+    """
+
+    def __init__(self, interval: str = HISTORY_INTERVAL, period: str = HISTORY_PERIOD,
+                 ttl: float = HISTORY_TTL, max_entries: int = HISTORY_CACHE_SIZE,
+                 loader: Optional[Callable[[str, str, str], Optional[pd.DataFrame]]] = None):
+        self.interval = interval
+        self.period = period
+        self.ttl = ttl
+        self.max_entries = int(max_entries)
+        self.loader = loader or _fetch_history
+        self._entries = OrderedDict()   # symbol -> (df, times, tz, caricato alle)
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self.fetches = 0
+        self.hits = 0
+
+    def _entry(self, symbol: str):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and time.time() - entry[3] <= self.ttl:
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return entry
+            loading = self._loading.setdefault(symbol, threading.Lock())
+
+        # Un solo download per simbolo anche con richieste concorrenti
+        with loading:
+            with self._lock:
+                entry = self._entries.get(symbol)
+                if entry is not None and time.time() - entry[3] <= self.ttl:
+                    self.hits += 1
+                    return entry
+            df = self.loader(symbol, self.interval, self.period)
+            entry = self._index(df)
+            with self._lock:
+                self.fetches += 1
+                self._entries[symbol] = entry
+                self._entries.move_to_end(symbol)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry
+
+    @staticmethod
+    def _index(df: Optional[pd.DataFrame]):
+        """(df ordinato, timestamp ns UTC, fuso della colonna datetime, ora di caricamento)"""
+        if df is None or df.empty or 'datetime' not in df.columns:
+            return None, np.empty(0, dtype=np.int64), None, time.time()
+        times = _ts_ns(df['datetime'])
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            df, times = df.iloc[order].reset_index(drop=True), times[order]
+        tz = getattr(pd.to_datetime(df['datetime']).dt, 'tz', None)
+        return df, times, tz, time.time()
+
+    def load(self, symbol: str) -> Optional[pd.DataFrame]:
+        """Storico completo del simbolo (None se il provider non restituisce dati)"""
+        return self._entry(symbol)[0]
+
+    def coverage(self, symbol: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """(primo, ultimo) timestamp disponibili in UTC, None senza dati"""
+        times = self._entry(symbol)[1]
+        if not len(times):
+            return None
+        return pd.Timestamp(times[0], tz='UTC'), pd.Timestamp(times[-1], tz='UTC')
+
+    def range(self, symbol: str, start=None, end=None) -> Optional[pd.DataFrame]:
+        """
+        Candele con start <= datetime < end (vista sullo storico).
+        Timestamp naive interpretati nel fuso della colonna datetime.
+        """
+        df, times, tz, _ = self._entry(symbol)
+        if df is None:
+            return None
+        i, j = _bounds(times, tz, start, end)
+        return df.iloc[i:j]
+
+    def year(self, symbol: str, year: int) -> Optional[pd.DataFrame]:
+        """Candele dell'anno (nel fuso della colonna datetime); None se l'anno non è coperto"""
+        view = self.range(symbol, f"{int(year)}-01-01", f"{int(year) + 1}-01-01")
+        return view if view is not None and len(view) else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.fetches = 0
+            self.hits = 0
+
+    def stats(self):
+        return {'symbols': len(self._entries), 'fetches': self.fetches, 'hits': self.hits}
+
+def _bounds(times: np.ndarray, tz, start, end) -> Tuple[int, int]:
+    """Posizioni [i, j) in times (ns UTC) per l'intervallo [start, end)"""
+    def ns(value):
+        ts = pd.Timestamp(value)
+        if ts.tzinfo is None:
+            ts = ts.tz_localize(tz if tz is not None else 'UTC')
+        return ts.tz_convert('UTC').as_unit('ns').value
+
+    i = 0 if start is None else int(np.searchsorted(times, ns(start), side='left'))
+    j = len(times) if end is None else int(np.searchsorted(times, ns(end), side='left'))
+    return i, max(i, j)
+
+def year_view(df: pd.DataFrame, year: int) -> pd.DataFrame:
+    """Candele dell'anno di uno storico già caricato (ricerca binaria, senza copia)"""
+    df, times, tz, _ = HistoryStore._index(df)
+    if df is None:
+        return pd.DataFrame()
+    i, j = _bounds(times, tz, f"{int(year)}-01-01", f"{int(year) + 1}-01-01")
+    return df.iloc[i:j]
+
+def history_until(df: pd.DataFrame, year: int) -> pd.DataFrame:
+    """
+    Storico fino alla fine dell'anno (vista): le candele da cui dipende un
+    backtest dell'anno, warm-up di EMA e trend MTF compresi. Le candele
+    successive non cambiano il risultato, quindi restano fuori anche
+    dall'impronta dei dati (un anno chiuso resta in cache ai ricaricamenti).
+    """
+    df, times, tz, _ = HistoryStore._index(df)
+    if df is None:
+        return pd.DataFrame()
+    _, j = _bounds(times, tz, None, f"{int(year) + 1}-01-01")
+    return df.iloc[:j]
+
+# Istanza globale
+history_store = HistoryStore()
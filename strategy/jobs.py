@@ -0,0 +1,263 @@
+# strategy/jobs.py
+# Job di lunga durata (ottimizzazione, validazione) con checkpoint su disco
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import streamlit as st
+
+from config import JOBS_DIR, JOB_POLL_SECONDS
+from utils.error_handler import error_handler
+
+# Thread dei job in esecuzione in questo processo (sopravvivono ai rerun di Streamlit)
+_THREADS: Dict[str, threading.Thread] = {}
+_THREADS_LOCK = threading.Lock()
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Tipo non serializzabile: {type(obj).__name__}")
+
+def job_id(kind: str, spec: Dict[str, Any]) -> str:
+    """Id deterministico: stessi input -> stesso job (ripresa e ri-aggancio)"""
+    payload = json.dumps({'kind': kind, 'spec': spec}, sort_keys=True, default=_json_default)
+    return f"{kind}_{hashlib.sha1(payload.encode()).hexdigest()[:16]}"
+
+class Job:
+    """
+    Job persistente: meta.json (stato, avanzamento) e cells.jsonl con una
+    riga per cella completata (chiave -> risultato).
+
+    Le celle sono aggiunte in coda man mano, quindi un rerun della
+    sessione, la chiusura della pagina o il riavvio del processo perdono
+    al massimo la cella in corso. La cancellazione è cooperativa: il
+    lavoro controlla cancel_requested() fra una cella e l'altra.
+
+    Stati: 'pending', 'running', 'done', 'cancelled', 'error'.
+    """
+
+    def __init__(self, kind: str, spec: Dict[str, Any], root: str = JOBS_DIR):
+        self.kind = kind
+        self.spec = spec
+        self.id = job_id(kind, spec)
+        self.dir = os.path.join(root, self.id)
+        self._lock = threading.Lock()
+        self._cells: Optional[Dict[str, Any]] = None
+        self.meta = self._read_meta() or {
+            'id': self.id,
+            'kind': kind,
+            'spec': spec,
+            'status': 'pending',
+            'total': 0,
+            'message': None,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'updated': None
+        }
+
+    @classmethod
+    def from_meta(cls, meta: Dict[str, Any], root: str = JOBS_DIR) -> "Job":
+        """Job da un elemento di list_jobs"""
+        return cls(meta['kind'], meta['spec'], root)
+
+    # ---------- persistenza ----------
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.dir, "meta.json")
+
+    @property
+    def _cells_path(self):
+        return os.path.join(self.dir, "cells.jsonl")
+
+    @property
+    def _cancel_path(self):
+        return os.path.join(self.dir, "cancel")
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self):
+        os.makedirs(self.dir, exist_ok=True)
+        self.meta['updated'] = datetime.now().isoformat(timespec='seconds')
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2, default=_json_default)
+        os.replace(tmp, self._meta_path)
+
+    def results(self) -> Dict[str, Any]:
+        """Celle completate {chiave: risultato} (letto dal checkpoint)"""
+        with self._lock:
+            if self._cells is None:
+                cells = {}
+                try:
+                    with open(self._cells_path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            try:
+                                item = json.loads(line)
+                            except ValueError:
+                                continue  # Riga troncata da un'interruzione
+                            cells[item['key']] = item['result']
+                except OSError:
+                    pass
+                self._cells = cells
+            return dict(self._cells)
+
+    def record(self, key: str, result: Any):
+        """Salva una cella completata (append + fsync)"""
+        line = json.dumps({'key': key, 'result': result}, ensure_ascii=False, default=_json_default)
+        self.results()  # Carica le celle esistenti prima di aggiungere
+        with self._lock:
+            os.makedirs(self.dir, exist_ok=True)
+            data = (line + "\n").encode("utf-8")
+            with open(self._cells_path, "ab+") as f:
+                # Riga troncata da un'interruzione: la nuova cella va su una riga propria
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._cells[key] = json.loads(line)['result']
+
+    def reset(self):
+        """Scarta checkpoint e stato (nuovo calcolo da zero)"""
+        with self._lock:
+            for path in (self._cells_path, self._cancel_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._cells = {}
+        self.meta.update({'status': 'pending', 'total': 0, 'message': None})
+        self._write_meta()
+
+    # ---------- stato ----------
+
+    @property
+    def status(self) -> str:
+        return self.meta['status']
+
+    @property
+    def total(self) -> int:
+        return self.meta['total']
+
+    def set_total(self, total: int):
+        self.meta['total'] = int(total)
+        self._write_meta()
+
+    def set_status(self, status: str, message: Optional[str] = None):
+        self.meta['status'] = status
+        self.meta['message'] = message
+        self._write_meta()
+
+    def progress(self):
+        """(celle completate, totale)"""
+        return len(self.results()), self.total
+
+    def is_active(self) -> bool:
+        """True se il job gira in un thread di questo processo"""
+        with _THREADS_LOCK:
+            thread = _THREADS.get(self.id)
+        return thread is not None and thread.is_alive()
+
+    def is_interrupted(self) -> bool:
+        """Job rimasto a metà (annullato o processo riavviato): si può riprendere"""
+        if self.is_active():
+            return False
+        return self.status in ('cancelled', 'running')
+
+    def request_cancel(self):
+        os.makedirs(self.dir, exist_ok=True)
+        with open(self._cancel_path, "w") as f:
+            f.write(datetime.now().isoformat())
+
+    def cancel_requested(self) -> bool:
+        return os.path.exists(self._cancel_path)
+
+def start_job(job: Job, work: Callable[[Job], None]) -> bool:
+    """
+    Esegue work(job) in un thread daemon, saltando le celle già nel checkpoint.
+
+    work registra le celle con job.record e controlla job.cancel_requested().
+    Ritorna False se il job è già in esecuzione (ci si ri-aggancia).
+    """
+    with _THREADS_LOCK:
+        thread = _THREADS.get(job.id)
+        if thread is not None and thread.is_alive():
+            return False
+
+        try:
+            os.remove(job._cancel_path)
+        except OSError:
+            pass
+        job.set_status('running')
+
+        def run():
+            try:
+                work(job)
+                if job.cancel_requested():
+                    job.set_status('cancelled')
+                else:
+                    job.set_status('done')
+            except Exception as e:
+                error_handler.logger.error(f"Job {job.id} error: {e}\n{traceback.format_exc()}")
+                job.set_status('error', str(e))
+
+        thread = threading.Thread(target=run, name=f"job-{job.id}")
+        thread.daemon = True
+        _THREADS[job.id] = thread
+        thread.start()
+    return True
+
+def list_jobs(kind: Optional[str] = None, root: str = JOBS_DIR) -> List[Dict[str, Any]]:
+    """Meta dei job su disco, dal più recente"""
+    metas = []
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return metas
+    for name in names:
+        try:
+            with open(os.path.join(root, name, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if kind is None or meta.get('kind') == kind:
+            metas.append(meta)
+    metas.sort(key=lambda m: m.get('updated') or '', reverse=True)
+    return metas
+
+def render_job_progress(job: Job, key: str, label: str, resume: Callable[[], None]):
+    """
+    Stato del job nel pannello: avanzamento e pulsante di interruzione se
+    in corso (la pagina si aggiorna da sola), ripresa se interrotto.
+    """
+    done, total = job.progress()
+    if job.is_active():
+        st.progress(done / total if total else 0.0, text=f"{label} | {done}/{total} celle")
+        if st.button("⏹️ Interrompi", key=f"{key}_cancel"):
+            job.request_cancel()
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+    elif job.is_interrupted():
+        st.warning(f"⏸️ Job interrotto: {done}/{total} celle salvate")
+        if st.button("▶️ Riprendi", key=f"{key}_resume"):
+            resume()
+            st.rerun()
+    elif job.status == 'error':
+        st.error(f"❌ Job terminato con errore: {job.meta.get('message')}")
@@ -0,0 +1,189 @@
+# strategy/monte_carlo.py
+# Monte Carlo sulla lista dei trade: distribuzioni e intervalli di confidenza delle metriche
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from strategy.money_manager import MoneyManager
+from strategy.params import StrategyParams
+from config import (
+    MONTE_CARLO_SIMS, MONTE_CARLO_BLOCK, MONTE_CARLO_CONFIDENCE, MONTE_CARLO_BATCH, MONTE_CARLO_SEED
+)
+
+# Metodi di ricampionamento
+METHODS = ("bootstrap", "block", "shuffle")
+
+# Metriche per simulazione (stesse definizioni di calculate_performance_metrics)
+METRICS = ("final_pnl", "max_drawdown", "win_rate", "sharpe_ratio", "profit_factor",
+           "final_capital_pct", "capital_drawdown")
+
+def resample_indices(n: int, n_sims: int, method: str = "bootstrap", block: int = MONTE_CARLO_BLOCK,
+                     rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Indici dei trade per n_sims sequenze ricampionate, matrice (n_sims, n).
+
+    bootstrap: estrazione con reinserimento
+    block: blocchi di `block` trade consecutivi (circolari) con reinserimento,
+    conserva le serie di vincite/perdite ravvicinate
+    shuffle: permutazione dell'ordine (stessi trade, PnL finale invariato)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if method == "bootstrap":
+        return rng.integers(0, n, size=(n_sims, n))
+    if method == "block":
+        block = max(1, min(int(block), n))
+        n_blocks = -(-n // block)
+        starts = rng.integers(0, n, size=(n_sims, n_blocks))
+        return ((starts[:, :, None] + np.arange(block)) % n).reshape(n_sims, -1)[:, :n]
+    if method == "shuffle":
+        return np.argsort(rng.random((n_sims, n)), axis=1)
+    raise ValueError(f"Metodo Monte Carlo sconosciuto: {method}")
+
+def exposure_fractions(trades: pd.DataFrame, money_manager: Optional[MoneyManager] = None,
+                       params: Optional[StrategyParams] = None) -> np.ndarray:
+    """
+    Frazione del capitale investita in ogni trade secondo
+    MoneyManager.calculate_position_size (rischio per trade e tetto del 25%).
+
+    Lo stop è preso da risk / size (trade di portafoglio) oppure da
+    atr_entry per il moltiplicatore SL della forza segnale; senza stop
+    noto vale il solo tetto sul capitale.
+    """
+    mm = money_manager or MoneyManager()
+    entry = trades['entry'].to_numpy(dtype=np.float64)
+    if {'risk', 'size'} <= set(trades.columns):
+        stop = trades['risk'].to_numpy(dtype=np.float64) / trades['size'].to_numpy(dtype=np.float64)
+    elif 'atr_entry' in trades.columns:
+        params = params if params is not None else StrategyParams.from_config()
+        strength = trades['signal_strength'].to_numpy() if 'signal_strength' in trades.columns else np.full(len(trades), "NONE")
+        sl_mult = np.array([params.exit_mults(s)[0] for s in strength], dtype=np.float64)
+        stop = trades['atr_entry'].to_numpy(dtype=np.float64) * sl_mult
+    else:
+        stop = np.full(len(trades), np.inf)
+
+    capital = float(mm.current_capital)
+    frac = np.zeros(len(trades))
+    for i, (price, dist) in enumerate(zip(entry.tolist(), stop.tolist())):
+        if price > 0 and dist > 0:
+            frac[i] = mm.calculate_position_size(price, dist)['size'] * price / capital
+    return frac
+
+def _batch_metrics(pnl: np.ndarray, exposure: np.ndarray, ruin_dd: float) -> Dict[str, np.ndarray]:
+    """Metriche per riga di una matrice (simulazioni, trade) di PnL %"""
+    n = pnl.shape[1]
+    cum = np.cumsum(pnl, axis=1)
+    wins = pnl > 0
+    gross_profit = np.where(wins, pnl, 0.0).sum(axis=1)
+    gross_loss = -np.where(pnl < 0, pnl, 0.0).sum(axis=1)
+    mean = pnl.mean(axis=1)
+    std = pnl.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(252), 0.0)
+        profit_factor = np.where(gross_loss > 0, gross_profit / gross_loss, 999.0)
+
+    # Capitale composto con il dimensionamento del MoneyManager: oltre il
+    # drawdown massimo il trading si ferma e il capitale resta congelato
+    equity = np.cumprod(1.0 + exposure * pnl / 100.0, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    cap_dd = (peak - equity) / peak
+    breach = cap_dd > ruin_dd
+    ruined = breach.any(axis=1)
+    stop = np.where(ruined, breach.argmax(axis=1), n - 1)
+    rows = np.arange(len(pnl))
+    cap_dd = np.where(np.arange(n) <= stop[:, None], cap_dd, 0.0).max(axis=1)
+
+    return {
+        'final_pnl': cum[:, -1],
+        'max_drawdown': (cum - np.maximum.accumulate(cum, axis=1)).min(axis=1),
+        'win_rate': wins.sum(axis=1) / n * 100,
+        'sharpe_ratio': sharpe,
+        'profit_factor': profit_factor,
+        'final_capital_pct': (equity[rows, stop] - 1.0) * 100,
+        'capital_drawdown': -cap_dd * 100,
+        'ruined': ruined
+    }
+
+def monte_carlo(trades: pd.DataFrame, n_sims: int = MONTE_CARLO_SIMS, method: str = "bootstrap",
+                block: int = MONTE_CARLO_BLOCK, confidence: float = MONTE_CARLO_CONFIDENCE,
+                money_manager: Optional[MoneyManager] = None, params: Optional[StrategyParams] = None,
+                seed: Optional[int] = MONTE_CARLO_SEED) -> Optional[Dict[str, Any]]:
+    """
+    Distribuzione delle metriche del backtest ricampionando la lista dei trade.
+
+    Le simulazioni sono calcolate a blocchi di MONTE_CARLO_BATCH righe con
+    sole operazioni su matrici. final_pnl, max_drawdown, win_rate,
+    sharpe_ratio e profit_factor seguono calculate_performance_metrics
+    (somma dei PnL %); final_capital_pct e capital_drawdown compongono il
+    capitale con il dimensionamento di money_manager, e il rischio di
+    rovina è la quota di simulazioni che superano max_drawdown_limit.
+
+    Returns:
+        dict con 'intervals' (DataFrame metrica/low/median/high/mean),
+        'risk_of_ruin' e 'prob_loss' in %, 'samples' (array per metrica)
+        e i parametri usati; None con meno di 3 trade
+    """
+    if trades is None or len(trades) < 3:
+        return None
+    mm = money_manager or MoneyManager()
+    pnl = trades['pnl_pct'].to_numpy(dtype=np.float64)
+    exposure = exposure_fractions(trades, mm, params)
+    rng = np.random.default_rng(seed)
+
+    parts = []
+    for start in range(0, n_sims, MONTE_CARLO_BATCH):
+        idx = resample_indices(len(pnl), min(MONTE_CARLO_BATCH, n_sims - start), method, block, rng)
+        parts.append(_batch_metrics(pnl[idx], exposure[idx], mm.max_drawdown_limit))
+    samples = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    tail = (1.0 - confidence) / 2 * 100
+    low, median, high = np.percentile(np.stack([samples[m] for m in METRICS]), [tail, 50, 100 - tail], axis=1)
+    intervals = pd.DataFrame({
+        'metric': METRICS,
+        'low': low,
+        'median': median,
+        'high': high,
+        'mean': [float(samples[m].mean()) for m in METRICS]
+    })
+    return {
+        'method': method,
+        'n_sims': int(n_sims),
+        'n_trades': len(pnl),
+        'confidence': confidence,
+        'intervals': intervals,
+        'risk_of_ruin': float(samples['ruined'].mean() * 100),
+        'prob_loss': float((samples['final_pnl'] < 0).mean() * 100),
+        'ruin_drawdown_pct': mm.max_drawdown_limit * 100,
+        'samples': samples
+    }
+
+# Etichette delle metriche nel pannello
+_LABELS = {
+    'final_pnl': "PnL Totale %",
+    'max_drawdown': "Max DD %",
+    'win_rate': "Win Rate %",
+    'sharpe_ratio': "Sharpe",
+    'profit_factor': "Profit Factor",
+    'final_capital_pct': "Rendimento Capitale %",
+    'capital_drawdown': "DD Capitale %"
+}
+
+def render_monte_carlo(trades: pd.DataFrame):
+    """Intervalli di confidenza Monte Carlo dei trade di un backtest (un tab per metodo)"""
+    with st.expander("🎲 Robustezza Monte Carlo"):
+        if trades is None or len(trades) < 3:
+            st.info("Servono almeno 3 trade")
+            return
+        tabs = st.tabs(["Bootstrap", "A blocchi", "Ordine casuale"])
+        for tab, method in zip(tabs, METHODS):
+            result = monte_carlo(trades, method=method)
+            with tab:
+                col1, col2 = st.columns(2)
+                col1.metric("Rischio di rovina", f"{result['risk_of_ruin']:.1f}%",
+                            help=f"Simulazioni oltre il drawdown massimo del Money Manager ({result['ruin_drawdown_pct']:.0f}%)")
+                col2.metric("Probabilità di perdita", f"{result['prob_loss']:.1f}%")
+                table = result['intervals'].assign(metric=lambda d: d['metric'].map(_LABELS)).round(2)
+                st.caption(f"{result['n_sims']:,} simulazioni su {result['n_trades']} trade, "
+                           f"intervalli al {result['confidence'] * 100:.0f}%")
+                st.dataframe(table, use_container_width=True, hide_index=True)
@@ -2,149 +2,602 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-from itertools import product
 from datetime import datetime
 import plotly.graph_objects as go
-from strategy.backtest import backtest_engine
-from providers.yahoo_provider import fetch_yf_ohlcv
-from config import SL_ATR, TP_ATR, ADX_MIN, RSI_LONG_MAX, RSI_SHORT_MIN
+from strategy.params import StrategyParams
+from strategy.sweep import SweepEngine, param_grid, exit_grid_frame, length_sweep
+from strategy.parallel import parallel_exit_grids
+from strategy.jobs import Job, start_job, render_job_progress
+from strategy.result_store import backtest_store, data_fingerprint, result_key
+from strategy.pruning import PruneRules
+from indicators.mtf import resample_closes
+from indicators.variants import length_grid
+from strategy.history import history_store, history_until
+from config import (
+    SL_ATR, TP_ATR, ADX_MIN, RSI_LONG_MAX, RSI_SHORT_MIN, PARALLEL_ENABLED,
+    OPTIMIZER_BUDGET, BACKTEST_STORE_ENABLED, PRUNE_ENABLED, LENGTH_SWEEP_GRID,
+    RSI_LEN, ATR_LEN, ADX_LEN, ST_LEN, ST_MULT
+)
 
-def optimize_parameters_auto(symbol, year=2025):
+def _widen(values, step):
+    """Valori da min(values) a max(values) con passo `step`"""
+    return np.round(np.arange(min(values), max(values) + step / 2, step), 2).tolist()
+
+def composite_score(stats):
+    """Score composito (0-100) da statistiche di trade_stats"""
+    win_rate_score = min(stats['winrate'] * 1.5, 50)  # Max 50 punti
+    pnl_score = max(0, min(stats['total_pnl_pct'] * 2, 30))  # Max 30 punti
+    sharpe_score = max(0, min(stats.get('sharpe_ratio', 0) * 10, 20))  # Max 20 punti
+    
+    return win_rate_score + pnl_score + sharpe_score
+
+def _result_row(sl, tp, params, stats):
+    """Riga della tabella risultati"""
+    return {
+        'SL': sl,
+        'TP': tp,
+        'ADX': params.adx_min,
+        'RSI_LONG': params.rsi_long_max,
+        'RSI_SHORT': params.rsi_short_min,
+        'trades': stats['n'],
+        'win_rate': stats['winrate'],
+        'pnl_total': stats['total_pnl_pct'],
+        'sharpe': stats.get('sharpe_ratio', 0),
+        'score': composite_score(stats),
+        'pruned': stats.get('pruned')
+    }
+
+def asset_search_space(symbol):
     """
-    Ottimizzazione automatica dei parametri per un asset specifico
+    Valori candidati per tipo di asset: dict con liste 'sl', 'tp' (multipli
+    ATR), 'adx', 'rsi_long', 'rsi_short'
     """
-    # Carica dati specifici per l'asset
-    with st.spinner(f"📥 Caricamento dati {symbol} per {year}..."):
-        df = fetch_yf_ohlcv(symbol, interval="1h", period="2y", tail=5000)
-        
-        if df is None or len(df) < 1000:
-            st.warning(f"⚠️ Dati insufficienti per {symbol}")
-            return None
-        
-        # Filtra per anno
-        df['year'] = pd.to_datetime(df['datetime']).dt.year
-        df_year = df[df['year'] == year].copy()
-        
-        if len(df_year) < 500:
-            st.warning(f"⚠️ Pochi dati per {symbol} nel {year}: {len(df_year)} candele")
-            return None
-    
-    # Griglia parametri specifica per tipo di asset
     asset_upper = symbol.upper()
     
     # Parametri personalizzati in base al tipo di asset
     if "BTC" in asset_upper or "ETH" in asset_upper:
         # Criptovalute - più volatili
-        sl_values = [1.8, 2.0, 2.2, 2.5, 3.0]
-        tp_values = [3.5, 4.0, 4.5, 5.0, 6.0]
-        adx_values = [18, 20, 22, 25]
-        rsi_long_values = [60, 65, 70, 75]
-        rsi_short_values = [25, 30, 35, 40]
+        return {
+            'sl': [1.8, 2.0, 2.2, 2.5, 3.0],
+            'tp': [3.5, 4.0, 4.5, 5.0, 6.0],
+            'adx': [18, 20, 22, 25],
+            'rsi_long': [60, 65, 70, 75],
+            'rsi_short': [25, 30, 35, 40]
+        }
     elif "XAU" in asset_upper or "GC" in asset_upper:
         # Oro - meno volatile
-        sl_values = [1.2, 1.5, 1.8, 2.0, 2.2]
-        tp_values = [2.5, 3.0, 3.5, 4.0, 4.5]
-        adx_values = [20, 22, 25, 28]
-        rsi_long_values = [60, 65, 70]
-        rsi_short_values = [30, 35, 40]
-    else:
-        # Azioni - default
-        sl_values = [1.5, 1.8, 2.0, 2.2, 2.5]
-        tp_values = [3.0, 3.5, 4.0, 4.5, 5.0]
-        adx_values = [18, 20, 22, 25]
-        rsi_long_values = [60, 65, 70]
-        rsi_short_values = [30, 35, 40]
+        return {
+            'sl': [1.2, 1.5, 1.8, 2.0, 2.2],
+            'tp': [2.5, 3.0, 3.5, 4.0, 4.5],
+            'adx': [20, 22, 25, 28],
+            'rsi_long': [60, 65, 70],
+            'rsi_short': [30, 35, 40]
+        }
+    # Azioni - default
+    return {
+        'sl': [1.5, 1.8, 2.0, 2.2, 2.5],
+        'tp': [3.0, 3.5, 4.0, 4.5, 5.0],
+        'adx': [18, 20, 22, 25],
+        'rsi_long': [60, 65, 70],
+        'rsi_short': [30, 35, 40]
+    }
+
+def load_optimizer_data(symbol, year):
+    """
+    Storico 1h fino alla fine dell'anno (vedi history_until) e candele
+    dell'anno da ottimizzare.
     
-    results = []
-    total_combinations = len(sl_values) * len(tp_values) * len(adx_values) * len(rsi_long_values) * len(rsi_short_values)
+    Returns:
+        (df, df_year, None) oppure (None, None, messaggio) se i dati non bastano
+    """
+    df = history_store.load(symbol)
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    count = 0
-    
-    # Salva parametri originali
-    original_params = {
-        'SL_ATR': SL_ATR,
-        'TP_ATR': TP_ATR,
-        'ADX_MIN': ADX_MIN,
-        'RSI_LONG_MAX': RSI_LONG_MAX,
-        'RSI_SHORT_MIN': RSI_SHORT_MIN
+    if df is None or len(df) < 1000:
+        return None, None, f"⚠️ Dati insufficienti per {symbol}"
+    
+    # Anno come vista sullo storico condiviso (ricerca binaria sui timestamp)
+    df_year = history_store.year(symbol, year)
+    
+    if df_year is None or len(df_year) < 500:
+        start = history_store.coverage(symbol)[0]
+        n = 0 if df_year is None else len(df_year)
+        return None, None, f"⚠️ Pochi dati per {symbol} nel {year}: {n} candele (storico dal {start:%d/%m/%Y})"
+    return history_until(df, year), df_year, None
+
+def _entry_key(params):
+    return f"{params.adx_min}|{params.rsi_long_max}|{params.rsi_short_min}"
+
+def _cube_record(params, cube):
+    """Cubo SL x TP in forma serializzabile (una cella di checkpoint)"""
+    return {
+        'adx_min': params.adx_min,
+        'rsi_long_max': params.rsi_long_max,
+        'rsi_short_min': params.rsi_short_min,
+        'cells': [[sl, tp, stats] for (sl, tp), stats in cube['stats'].items()]
     }
+
+def _grid_cubes(engine, entry_grid, sl_values, tp_values, parallel=False, progress=None,
+                on_result=None, should_stop=None, prune=None):
+    """
+    engine.exit_grid per ogni soglia di entrata ({params: cubo o None}).
     
-    for sl, tp, adx, rsi_long, rsi_short in product(
-        sl_values, tp_values, adx_values, rsi_long_values, rsi_short_values
-    ):
-        # Aggiorna progress
-        count += 1
-        progress = count / total_combinations
-        progress_bar.progress(progress)
-        status_text.text(f"🔄 Test combinazione {count}/{total_combinations} | SL:{sl} TP:{tp} ADX:{adx}")
-        
-        # Importa config e modifica parametri temporaneamente
-        import config
-        config.SL_ATR = sl
-        config.TP_ATR = tp
-        config.ADX_MIN = adx
-        config.RSI_LONG_MAX = rsi_long
-        config.RSI_SHORT_MIN = rsi_short
-        
-        # Esegui backtest
+    progress(fatti, totale) e on_result(params, cubo) a ogni combinazione;
+    should_stop() interrompe fra una combinazione e l'altra; prune
+    (PruneRules) ferma in anticipo le celle senza speranza.
+    """
+    if parallel:
+        # Soglie di entrata distribuite sui core, indicatori in memoria condivisa
+        return parallel_exit_grids(engine, entry_grid, sl_values, tp_values, progress=progress,
+                                   on_result=on_result, should_stop=should_stop, prune=prune)
+    
+    grid_cubes = {}
+    for count, params in enumerate(entry_grid, 1):
+        if should_stop and should_stop():
+            break
         try:
-            bt_result = backtest_engine(df_year, use_mtf=True)
-            
-            if bt_result and not bt_result['trades'].empty:
-                stats = bt_result['stats']
-                
-                # Calcola score composito (0-100)
-                win_rate_score = min(stats['winrate'] * 1.5, 50)  # Max 50 punti
-                pnl_score = max(0, min(stats['total_pnl_pct'] * 2, 30))  # Max 30 punti
-                sharpe_score = max(0, min(stats.get('sharpe_ratio', 0) * 10, 20))  # Max 20 punti
-                
-                total_score = win_rate_score + pnl_score + sharpe_score
-                
-                results.append({
-                    'SL': sl,
-                    'TP': tp,
-                    'ADX': adx,
-                    'RSI_LONG': rsi_long,
-                    'RSI_SHORT': rsi_short,
-                    'trades': stats['n'],
-                    'win_rate': stats['winrate'],
-                    'pnl_total': stats['total_pnl_pct'],
-                    'sharpe': stats.get('sharpe_ratio', 0),
-                    'score': total_score
-                })
+            cube = engine.exit_grid(params, sl_values, tp_values, prune=prune)
         except Exception as e:
             # Ignora errori e continua
-            pass
+            cube = None
+        grid_cubes[params] = cube
+        if on_result:
+            on_result(params, cube)
+        if progress:
+            progress(count, len(entry_grid))
+    return grid_cubes
+
+def _grid_records(engine, fingerprint, year, entry_grid, sl_values, tp_values, parallel=False,
+                  progress=None, on_result=None, should_stop=None, prune=None):
+    """
+    Record di _cube_record per ogni soglia di entrata ({params: record o None}).
     
-    # Ripristina parametri originali
-    import config
-    config.SL_ATR = original_params['SL_ATR']
-    config.TP_ATR = original_params['TP_ATR']
-    config.ADX_MIN = original_params['ADX_MIN']
-    config.RSI_LONG_MAX = original_params['RSI_LONG_MAX']
-    config.RSI_SHORT_MIN = original_params['RSI_SHORT_MIN']
+    Le griglie già calcolate sugli stessi dati (fingerprint) sono lette
+    dall'archivio risultati; solo le altre passano da _grid_cubes.
+    """
+    records = {}
+    keys = {}
+    todo = []
+    for params in entry_grid:
+        if BACKTEST_STORE_ENABLED:
+            keys[params] = result_key(fingerprint, params, kind="exit_grid", year=int(year),
+                                      sl=list(sl_values), tp=list(tp_values),
+                                      prune=prune.to_dict() if prune is not None else None)
+            cached = backtest_store.get(keys[params])
+            if cached is not None:
+                records[params] = cached[1]['record']
+                if on_result:
+                    on_result(params, records[params])
+                continue
+        todo.append(params)
     
-    progress_bar.empty()
-    status_text.empty()
+    cached_count = len(records)
+    
+    def computed(params, cube):
+        record = _cube_record(params, cube) if cube else None
+        records[params] = record
+        if record is not None and params in keys:
+            backtest_store.put(keys[params], None, {'record': record})
+        if on_result:
+            on_result(params, record)
     
+    if todo:
+        _grid_cubes(
+            engine, todo, sl_values, tp_values, parallel,
+            progress=(lambda done, total: progress(cached_count + done, len(entry_grid))) if progress else None,
+            on_result=computed, should_stop=should_stop, prune=prune
+        )
+    return records
+
+def _grid_summary(records):
+    """(righe risultati, {(ADX, RSI_LONG, RSI_SHORT): celle}) da record di _cube_record"""
+    results = []
+    by_key = {}
+    for record in records:
+        if record is None:
+            continue
+        params = StrategyParams(adx_min=record['adx_min'], rsi_long_max=record['rsi_long_max'],
+                                rsi_short_min=record['rsi_short_min'])
+        by_key[(params.adx_min, params.rsi_long_max, params.rsi_short_min)] = record['cells']
+        for sl, tp, stats in record['cells']:
+            if stats['n'] == 0 and not stats.get('pruned'):
+                continue
+            results.append(_result_row(sl, tp, params, stats))
+    return results, by_key
+
+def _cells_frame(cells):
+    """Celle [sl, tp, stats] in formato lungo (come exit_grid_frame)"""
+    return pd.DataFrame({
+        'SL': [c[0] for c in cells],
+        'TP': [c[1] for c in cells],
+        'trades': [c[2]['n'] for c in cells],
+        'win_rate': [c[2]['winrate'] for c in cells],
+        'pnl_total': [c[2]['total_pnl_pct'] for c in cells],
+        'avg_pnl': [c[2]['avg_pnl_pct'] for c in cells]
+    })
+
+def _optimizer_result(symbol, year, results, exit_grid_for, search_report=None):
+    """
+    Dizionario dei risultati mostrato dal pannello.
+    
+    exit_grid_for(best): griglia SL x TP delle soglie di entrata migliori (per il grafico)
+    """
     if not results:
         return None
     
+    base = StrategyParams.from_config()
     df_results = pd.DataFrame(results)
-    df_results = df_results.sort_values('score', ascending=False)
+    # Combinazioni interrotte (statistiche parziali) in coda
+    df_results = df_results.assign(_pruned=df_results['pruned'].notna()).sort_values(
+        ['_pruned', 'score'], ascending=[True, False]
+    ).drop(columns='_pruned')
     
     best = df_results.iloc[0].to_dict()
     
     return {
         'best_params': best,
         'all_results': df_results,
+        'exit_grid': exit_grid_for(best),
+        'search_report': search_report,
         'asset': symbol,
         'year': year,
-        'original_params': original_params
+        # Parametri di partenza (solo per confronto in UI)
+        'original_params': {
+            'SL_ATR': SL_ATR,
+            'TP_ATR': TP_ATR,
+            'ADX_MIN': base.adx_min,
+            'RSI_LONG_MAX': base.rsi_long_max,
+            'RSI_SHORT_MIN': base.rsi_short_min
+        }
+    }
+
+def optimize_parameters_auto(symbol, year=2025, parallel=False, mode="grid", budget=None, prune=None):
+    """
+    Ottimizzazione automatica dei parametri per un asset specifico
+    
+    parallel: distribuisce le combinazioni su più processi (vedi strategy.parallel)
+    mode: "grid" (griglia completa) o "adaptive" (successive halving su
+          intervalli più fitti, vedi SweepEngine.halving_search)
+    budget: costo massimo della ricerca adattiva in backtest completi
+            (default OPTIMIZER_BUDGET)
+    prune: PruneRules per fermare in anticipo le celle della griglia completa
+           senza speranza (riportate con 'pruned' nei risultati)
+    
+    Per la griglia completa con checkpoint su disco vedi start_optimizer_job.
+    """
+    # Carica dati specifici per l'asset
+    with st.spinner(f"📥 Caricamento dati {symbol} per {year}..."):
+        df, df_year, message = load_optimizer_data(symbol, year)
+        if df is None:
+            st.warning(message)
+            return None
+    
+    # Griglia parametri specifica per tipo di asset
+    space = asset_search_space(symbol)
+    sl_values = space['sl']
+    tp_values = space['tp']
+    
+    # Indicatori calcolati una volta, ogni combinazione riusa le stesse serie
+    engine = SweepEngine(df_year, use_mtf=True, df_1h=df, df_4h=resample_closes(df, 4), symbol=symbol)
+    base = StrategyParams.from_config()
+    
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    if mode == "adaptive":
+        # Intervalli più fitti: il costo dipende dal budget, non dalla griglia
+        sl_values = _widen(sl_values, 0.1)
+        tp_values = _widen(tp_values, 0.25)
+        candidates = param_grid(
+            base,
+            adx_min=_widen(space['adx'], 1),
+            rsi_long_max=_widen(space['rsi_long'], 2.5),
+            rsi_short_min=_widen(space['rsi_short'], 2.5),
+            sl_atr=sl_values,
+            tp_atr=tp_values
+        )
+        
+        def show_progress(done, total):
+            progress_bar.progress(done / total)
+            status_text.text(f"🔄 Valutazione {done}/{total} | {len(candidates)} combinazioni candidate")
+        
+        survivors, search_report = engine.halving_search(
+            candidates, score=composite_score,
+            budget=budget if budget is not None else OPTIMIZER_BUDGET,
+            progress=show_progress
+        )
+        results = []
+        for _, row in survivors.iterrows():
+            if row['n'] == 0:
+                continue
+            results.append(_result_row(row['sl_atr'], row['tp_atr'], StrategyParams.from_dict(row.to_dict()), row.to_dict()))
+        
+        def exit_grid_for(best):
+            return exit_grid_frame(engine.exit_grid(
+                base.with_(adx_min=best['ADX'], rsi_long_max=best['RSI_LONG'], rsi_short_min=best['RSI_SHORT']),
+                sl_values, tp_values
+            ))
+    else:
+        # SL/TP cambiano solo le uscite: una griglia di uscite per ogni set di soglie di entrata
+        entry_grid = param_grid(
+            base,
+            adx_min=space['adx'],
+            rsi_long_max=space['rsi_long'],
+            rsi_short_min=space['rsi_short']
+        )
+        total_combinations = len(entry_grid) * len(sl_values) * len(tp_values)
+        cells = len(sl_values) * len(tp_values)
+        
+        def show_progress(done, total):
+            progress_bar.progress(done / total)
+            status_text.text(f"🔄 Test combinazione {done * cells}/{total_combinations}")
+        
+        records = _grid_records(engine, data_fingerprint(df, symbol, "1h"), year, entry_grid,
+                                sl_values, tp_values, parallel, progress=show_progress, prune=prune)
+        search_report = None
+        results, by_key = _grid_summary(records.get(p) for p in entry_grid)
+        
+        def exit_grid_for(best):
+            return _cells_frame(by_key[(best['ADX'], best['RSI_LONG'], best['RSI_SHORT'])])
+    
+    progress_bar.empty()
+    status_text.empty()
+    
+    return _optimizer_result(symbol, year, results, exit_grid_for, search_report)
+
+def optimize_indicator_lengths(symbol, year=2025, grid=None):
+    """
+    Sweep delle lunghezze degli indicatori (soglie di config, griglia SL/TP
+    dell'asset). grid: {campo di IndicatorLengths: valori}, default
+    LENGTH_SWEEP_GRID. Intermedi e serie per lunghezza sono condivisi fra
+    le varianti (vedi indicators.variants).
+    
+    Returns:
+        dict con 'all_results' (ordinato per score), 'best', 'variants'
+        (serie calcolate/riusate) oppure None
+    """
+    with st.spinner(f"📥 Caricamento dati {symbol} per {year}..."):
+        df, df_year, message = load_optimizer_data(symbol, year)
+        if df is None:
+            st.warning(message)
+            return None
+    
+    space = asset_search_space(symbol)
+    lengths = length_grid(**(grid or LENGTH_SWEEP_GRID))
+    
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    def show_progress(done, total):
+        progress_bar.progress(done / total)
+        status_text.text(f"🔄 Variante {done}/{total}")
+    
+    df_results, variants = length_sweep(
+        df_year, lengths, StrategyParams.from_config(), space['sl'], space['tp'],
+        use_mtf=True, df_1h=df, df_4h=resample_closes(df, 4), symbol=symbol,
+        progress=show_progress
+    )
+    progress_bar.empty()
+    status_text.empty()
+    
+    df_results = df_results[df_results['n'] > 0]
+    if df_results.empty:
+        return None
+    df_results = df_results.assign(score=df_results.apply(composite_score, axis=1))
+    df_results = df_results.sort_values('score', ascending=False)
+    return {
+        'all_results': df_results,
+        'best': df_results.iloc[0].to_dict(),
+        'variants': variants,
+        'n_variants': len(lengths),
+        'asset': symbol,
+        'year': year
     }
 
+def _render_length_results(symbol, results):
+    """Lunghezze migliori e top 10 di uno sweep delle lunghezze"""
+    best = results['best']
+    variants = results['variants']
+    
+    st.success(f"✅ Sweep lunghezze completato per {symbol}!")
+    st.info(
+        f"🧮 {results['n_variants']} varianti di indicatori: {variants['computed']} serie calcolate, "
+        f"{variants['reused']} riusate"
+    )
+    
+    st.markdown("### 🏆 Lunghezze Ottimali Trovate")
+    current = {'rsi_len': RSI_LEN, 'atr_len': ATR_LEN, 'adx_len': ADX_LEN, 'st_len': ST_LEN, 'st_mult': ST_MULT}
+    labels = {'rsi_len': "RSI", 'atr_len': "ATR", 'adx_len': "ADX", 'st_len': "SuperTrend", 'st_mult': "ST Mult"}
+    for col, (field, label) in zip(st.columns(len(labels)), labels.items()):
+        col.metric(label, best[field], delta=f"{best[field] - current[field]:+g}", delta_color="off")
+    
+    col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+    col_r1.metric("SL / TP (ATR)", f"{best['sl_atr']}x / {best['tp_atr']}x")
+    col_r2.metric("Trades/anno", f"{best['n']:.0f}")
+    col_r3.metric("Win Rate", f"{best['winrate']:.1f}%")
+    col_r4.metric("PnL Atteso", f"{best['total_pnl_pct']:+.2f}%")
+    
+    with st.expander("📋 Top 10 Varianti"):
+        top10 = results['all_results'].head(10)[
+            list(labels) + ['sl_atr', 'tp_atr', 'n', 'winrate', 'total_pnl_pct', 'score']
+        ].round({'winrate': 1, 'total_pnl_pct': 1, 'score': 0})
+        st.dataframe(top10, use_container_width=True, hide_index=True)
+
+# ============================================
+# JOB PERSISTENTI (griglia completa)
+# ============================================
+
+def optimizer_job(symbol, year, prune=False):
+    """
+    Job della griglia completa (stesso asset, anno, parametri e regole di
+    pruning -> stesso job). prune: usa PruneRules.from_config con composite_score
+    """
+    return Job('optimizer', {
+        'symbol': symbol,
+        'year': int(year),
+        'space': asset_search_space(symbol),
+        'params': StrategyParams.from_config().to_dict(),
+        'prune': PruneRules.from_config(score=composite_score).to_dict() if prune else None
+    })
+
+def start_optimizer_job(job, parallel=False, restart=False):
+    """Avvia (o riprende dal checkpoint) la griglia completa in background"""
+    if restart and not job.is_active():
+        job.reset()
+    spec = job.spec
+    
+    def work(job):
+        df, df_year, message = load_optimizer_data(spec['symbol'], spec['year'])
+        if df is None:
+            raise ValueError(message)
+        space = spec['space']
+        engine = SweepEngine(df_year, use_mtf=True, df_1h=df, df_4h=resample_closes(df, 4), symbol=spec['symbol'])
+        entry_grid = param_grid(
+            StrategyParams.from_dict(spec['params']),
+            adx_min=space['adx'],
+            rsi_long_max=space['rsi_long'],
+            rsi_short_min=space['rsi_short']
+        )
+        prune = PruneRules.from_dict(spec['prune'], score=composite_score) if spec.get('prune') else None
+        job.set_total(len(entry_grid))
+        done = job.results()
+        _grid_records(
+            engine, data_fingerprint(df, spec['symbol'], "1h"), spec['year'],
+            [p for p in entry_grid if _entry_key(p) not in done],
+            space['sl'], space['tp'], parallel,
+            on_result=lambda p, record: job.record(_entry_key(p), record),
+            should_stop=job.cancel_requested, prune=prune
+        )
+    
+    return start_job(job, work)
+
+def optimizer_results_from_job(job):
+    """Risultati (come optimize_parameters_auto) dalle celle salvate"""
+    results, by_key = _grid_summary(job.results().values())
+    return _optimizer_result(
+        job.spec['symbol'], job.spec['year'], results,
+        lambda best: _cells_frame(by_key[(best['ADX'], best['RSI_LONG'], best['RSI_SHORT'])])
+    )
+
+def _render_optimizer_results(symbol, results):
+    """Parametri migliori, top 10 e griglia SL x TP di un'ottimizzazione"""
+    best = results['best_params']
+    
+    st.success(f"✅ Ottimizzazione completata per {symbol}!")
+    
+    report = results.get('search_report')
+    if report:
+        st.info(
+            f"🧮 Ricerca adattiva: {report['candidates']} combinazioni candidate, "
+            f"{report['sampled']} esplorate, {report['evaluations']} valutazioni "
+            f"(costo ≈ {report['cost_full_equivalent']} backtest completi) | "
+            f"**{report['avoided_full_backtests']} backtest completi evitati**"
+        )
+    
+    pruned = results['all_results']['pruned'].value_counts()
+    if len(pruned):
+        reasons = {'drawdown': "drawdown", 'trades': "pochi trade", 'score': "score irraggiungibile"}
+        st.info(
+            f"✂️ {int(pruned.sum())} combinazioni interrotte in anticipo ("
+            + ", ".join(f"{reasons.get(r, r)}: {c}" for r, c in pruned.items()) + ")"
+        )
+    
+    # Parametri ottimali
+    st.markdown("### 🏆 Parametri Ottimali Trovati")
+    
+    col_p1, col_p2, col_p3, col_p4, col_p5 = st.columns(5)
+    with col_p1:
+        st.metric(
+            "SL (ATR)", 
+            f"{best['SL']}x",
+            delta=f"{best['SL'] - SL_ATR:+.1f}x",
+            delta_color="off"
+        )
+    with col_p2:
+        st.metric(
+            "TP (ATR)", 
+            f"{best['TP']}x",
+            delta=f"{best['TP'] - TP_ATR:+.1f}x",
+            delta_color="off"
+        )
+    with col_p3:
+        st.metric(
+            "ADX Min", 
+            best['ADX'],
+            delta=f"{best['ADX'] - ADX_MIN:+g}",
+            delta_color="off"
+        )
+    with col_p4:
+        st.metric(
+            "RSI Long Max", 
+            best['RSI_LONG'],
+            delta=f"{best['RSI_LONG'] - RSI_LONG_MAX:+g}",
+            delta_color="off"
+        )
+    with col_p5:
+        st.metric(
+            "RSI Short Min", 
+            best['RSI_SHORT'],
+            delta=f"{best['RSI_SHORT'] - RSI_SHORT_MIN:+g}",
+            delta_color="off"
+        )
+    
+    # Performance attesa
+    st.markdown("### 📈 Performance Attesa")
+    col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+    col_r1.metric("Trades/anno", f"{best['trades']:.0f}")
+    col_r2.metric("Win Rate", f"{best['win_rate']:.1f}%")
+    col_r3.metric("PnL Atteso", f"{best['pnl_total']:+.2f}%")
+    col_r4.metric("Sharpe", f"{best['sharpe']:.2f}")
+    
+    # Top 10 risultati
+    with st.expander("📋 Top 10 Combinazioni"):
+        top10 = results['all_results'].head(10)
+        display_top = top10[['SL', 'TP', 'ADX', 'RSI_LONG', 'RSI_SHORT', 
+                            'win_rate', 'pnl_total', 'sharpe', 'score', 'pruned']].copy()
+        display_top['win_rate'] = display_top['win_rate'].round(1)
+        display_top['pnl_total'] = display_top['pnl_total'].round(1)
+        display_top['sharpe'] = display_top['sharpe'].round(2)
+        display_top['score'] = display_top['score'].round(0)
+        st.dataframe(display_top, use_container_width=True, hide_index=True)
+    
+    # Grafico distribuzione
+    st.markdown("### 📊 Distribuzione Performance")
+    
+    # Matrice SL x TP delle soglie di entrata migliori, direttamente dal cubo
+    grid_df = results.get('exit_grid')
+    if grid_df is None or grid_df.empty:
+        grid_df = results['all_results']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=grid_df['SL'],
+        y=grid_df['TP'],
+        mode='markers',
+        marker=dict(
+            size=grid_df['win_rate'].clip(lower=4),
+            color=grid_df['pnl_total'],
+            colorscale='RdYlGn',
+            showscale=True,
+            colorbar=dict(title="PnL %")
+        ),
+        text=grid_df.apply(
+            lambda x: f"SL:{x['SL']} TP:{x['TP']}<br>Trades:{x['trades']:.0f} "
+                      f"Win:{x['win_rate']:.1f}% PnL:{x['pnl_total']:+.1f}%",
+            axis=1
+        ),
+        hoverinfo='text'
+    ))
+    
+    fig.update_layout(
+        template='plotly_dark',
+        height=400,
+        title=f"Griglia SL/TP (ADX {best['ADX']}, RSI {best['RSI_LONG']}/{best['RSI_SHORT']})",
+        xaxis_title="SL (ATR)",
+        yaxis_title="TP (ATR)"
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+
 def render_optimizer_panel(symbol):
     """Renderizza pannello ottimizzazione automatica"""
     
@@ -170,6 +623,45 @@ def render_optimizer_panel(symbol):
             index=0,
             key="opt_year_auto"
         )
+    with col2:
+        search_mode = st.radio(
+            "Modalità di ricerca",
+            ["Griglia completa", "Adattiva (successive halving)", "Lunghezze indicatori"],
+            horizontal=True,
+            key="opt_search_mode",
+            help="La ricerca adattiva esplora intervalli più fitti scartando presto le combinazioni peggiori"
+        )
+        adaptive = search_mode.startswith("Adattiva")
+        lengths = search_mode.startswith("Lunghezze")
+        if lengths:
+            st.caption("Prova le lunghezze di LENGTH_SWEEP_GRID (RSI, ATR, ADX, SuperTrend) con le soglie attuali")
+            budget = None
+            parallel = prune = False
+        elif adaptive:
+            budget = st.number_input(
+                "Budget (backtest completi equivalenti)",
+                min_value=10,
+                max_value=5000,
+                value=OPTIMIZER_BUDGET,
+                step=10,
+                key="opt_budget"
+            )
+            parallel = prune = False
+        else:
+            budget = None
+            parallel = st.checkbox(
+                "⚡ Esecuzione parallela",
+                value=PARALLEL_ENABLED,
+                key="opt_parallel",
+                help="Distribuisce le combinazioni su tutti i core della CPU"
+            )
+            prune = st.checkbox(
+                "✂️ Interrompi combinazioni senza speranza",
+                value=PRUNE_ENABLED,
+                key="opt_prune",
+                help="Ferma presto le combinazioni con drawdown eccessivo, troppo pochi trade "
+                     "a metà periodo o score minimo ormai irraggiungibile"
+            )
     
     # Bottone ottimizzazione
     col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
@@ -180,101 +672,34 @@ def render_optimizer_panel(symbol):
             type="primary"
         )
     
+    job = optimizer_job(symbol, year, prune)
+    
     if run_opt:
-        results = optimize_parameters_auto(symbol, year)
-        
+        if lengths:
+            results = optimize_indicator_lengths(symbol, year)
+            if results:
+                _render_length_results(symbol, results)
+            else:
+                st.warning(f"⚠️ Nessuna variante con trade per {symbol} nel {year}")
+            return
+        if adaptive:
+            results = optimize_parameters_auto(symbol, year, mode="adaptive", budget=budget)
+            if results:
+                _render_optimizer_results(symbol, results)
+            return
+        # Griglia completa in background: le combinazioni sono salvate man mano
+        start_optimizer_job(job, parallel, restart=not job.is_interrupted())
+    
+    render_job_progress(
+        job, key="opt_job",
+        label=f"🔄 Ottimizzazione {symbol} {year}",
+        resume=lambda: start_optimizer_job(job, parallel)
+    )
+    
+    if job.status == 'done' and not job.is_active():
+        results = optimizer_results_from_job(job)
         if results:
-            best = results['best_params']
-            
-            st.success(f"✅ Ottimizzazione completata per {symbol}!")
-            
-            # Parametri ottimali
-            st.markdown("### 🏆 Parametri Ottimali Trovati")
-            
-            col_p1, col_p2, col_p3, col_p4, col_p5 = st.columns(5)
-            with col_p1:
-                st.metric(
-                    "SL (ATR)", 
-                    f"{best['SL']}x",
-                    delta=f"{best['SL'] - SL_ATR:+.1f}x",
-                    delta_color="off"
-                )
-            with col_p2:
-                st.metric(
-                    "TP (ATR)", 
-                    f"{best['TP']}x",
-                    delta=f"{best['TP'] - TP_ATR:+.1f}x",
-                    delta_color="off"
-                )
-            with col_p3:
-                st.metric(
-                    "ADX Min", 
-                    best['ADX'],
-                    delta=f"{best['ADX'] - ADX_MIN:+d}",
-                    delta_color="off"
-                )
-            with col_p4:
-                st.metric(
-                    "RSI Long Max", 
-                    best['RSI_LONG'],
-                    delta=f"{best['RSI_LONG'] - RSI_LONG_MAX:+d}",
-                    delta_color="off"
-                )
-            with col_p5:
-                st.metric(
-                    "RSI Short Min", 
-                    best['RSI_SHORT'],
-                    delta=f"{best['RSI_SHORT'] - RSI_SHORT_MIN:+d}",
-                    delta_color="off"
-                )
-            
-            # Performance attesa
-            st.markdown("### 📈 Performance Attesa")
-            col_r1, col_r2, col_r3, col_r4 = st.columns(4)
-            col_r1.metric("Trades/anno", f"{best['trades']:.0f}")
-            col_r2.metric("Win Rate", f"{best['win_rate']:.1f}%")
-            col_r3.metric("PnL Atteso", f"{best['pnl_total']:+.2f}%")
-            col_r4.metric("Sharpe", f"{best['sharpe']:.2f}")
-            
-            # Top 10 risultati
-            with st.expander("📋 Top 10 Combinazioni"):
-                top10 = results['all_results'].head(10)
-                display_top = top10[['SL', 'TP', 'ADX', 'RSI_LONG', 'RSI_SHORT', 
-                                    'win_rate', 'pnl_total', 'sharpe', 'score']].copy()
-                display_top['win_rate'] = display_top['win_rate'].round(1)
-                display_top['pnl_total'] = display_top['pnl_total'].round(1)
-                display_top['sharpe'] = display_top['sharpe'].round(2)
-                display_top['score'] = display_top['score'].round(0)
-                st.dataframe(display_top, use_container_width=True, hide_index=True)
-            
-            # Grafico distribuzione
-            st.markdown("### 📊 Distribuzione Performance")
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=results['all_results']['SL'],
-                y=results['all_results']['score'],
-                mode='markers',
-                marker=dict(
-                    size=results['all_results']['win_rate'],
-                    color=results['all_results']['pnl_total'],
-                    colorscale='RdYlGn',
-                    showscale=True,
-                    colorbar=dict(title="PnL %")
-                ),
-                text=results['all_results'].apply(
-                    lambda x: f"SL:{x['SL']} TP:{x['TP']}<br>Win:{x['win_rate']:.1f}% PnL:{x['pnl_total']:+.1f}%",
-                    axis=1
-                ),
-                hoverinfo='text'
-            ))
-            
-            fig.update_layout(
-                template='plotly_dark',
-                height=400,
-                title="Score per combinazione SL/TP",
-                xaxis_title="SL (ATR)",
-                yaxis_title="Score"
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"🕒 Risultati del {job.meta['updated'].replace('T', ' ')}")
+            _render_optimizer_results(symbol, results)
+        else:
+            st.warning(f"⚠️ Nessuna combinazione con trade per {symbol} nel {year}")
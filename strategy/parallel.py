@@ -0,0 +1,236 @@
+# strategy/parallel.py
+# Esecuzione parallela su process pool di ottimizzazione e validazione
+import math
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy.params import StrategyParams
+from strategy.sweep import SweepEngine, SIM_COLUMNS
+from strategy.annual_backtest import annual_backtest_from_history
+from config import PARALLEL_WORKERS, PARALLEL_CHUNKS_PER_WORKER, PARALLEL_START_METHOD
+
+# Colonne OHLCV pubblicate per la validazione
+_OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Stato dei processi worker (impostato dagli initializer)
+_ATTACHED: List[shared_memory.SharedMemory] = []
+_ENGINE: Optional[SweepEngine] = None
+_HISTORY: Dict[str, Dict] = {}
+
+def worker_count(tasks: int, workers: Optional[int] = None) -> int:
+    """Numero di processi per `tasks` unità di lavoro (0/None = tutti i core)"""
+    n = workers or PARALLEL_WORKERS or os.cpu_count() or 1
+    return max(1, min(n, tasks))
+
+def _chunks(items: Sequence, workers: int) -> List[List]:
+    """Blocchi contigui, PARALLEL_CHUNKS_PER_WORKER per worker"""
+    items = list(items)
+    size = max(1, math.ceil(len(items) / (workers * PARALLEL_CHUNKS_PER_WORKER)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _executor(workers: int, initializer, initargs) -> ProcessPoolExecutor:
+    ctx = multiprocessing.get_context(PARALLEL_START_METHOD) if PARALLEL_START_METHOD else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=initializer, initargs=initargs)
+
+class SharedArrays:
+    """
+    Array NumPy pubblicati una volta in memoria condivisa.
+
+    Il processo che li crea li libera all'uscita dal blocco with; `spec`
+    è il descrittore (nome segmento, shape, dtype) da passare ai worker,
+    che con attach() ottengono viste senza copia.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, tuple, str]] = {}
+        try:
+            for key, arr in arrays.items():
+                arr = np.ascontiguousarray(arr)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+                self._blocks.append(shm)
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+                self.spec[key] = (shm.name, arr.shape, arr.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(spec: Dict[str, Tuple[str, tuple, str]]) -> Dict[str, np.ndarray]:
+    """Viste in sola lettura sugli array descritti da SharedArrays.spec"""
+    views = {}
+    for key, (name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _ATTACHED.append(shm)  # Il segmento resta aperto finché vivono le viste
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        views[key] = view
+    return views
+
+# ============================================
+# OTTIMIZZAZIONE: griglie SL x TP per blocchi di soglie di entrata
+# ============================================
+
+def _init_sweep_worker(spec):
+    global _ENGINE
+    arrays = attach(spec)
+    cols = {c: arrays['col_' + c] for c in SIM_COLUMNS}
+    feat = {k[len('feat_'):]: v for k, v in arrays.items() if k.startswith('feat_')}
+    _ENGINE = SweepEngine.from_arrays(cols, feat)
+
+def _sweep_chunk(entry_params: List[StrategyParams], sl_values, tp_values, prune=None):
+    out = []
+    for params in entry_params:
+        try:
+            out.append((params, _ENGINE.exit_grid(params, sl_values, tp_values, prune=prune)))
+        except Exception:
+            out.append((params, None))
+    return out
+
+def parallel_exit_grids(engine: SweepEngine, entry_grid: Sequence[StrategyParams],
+                        sl_values: Sequence[float], tp_values: Sequence[float],
+                        workers: Optional[int] = None,
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        on_result: Optional[Callable[[StrategyParams, Optional[Dict]], None]] = None,
+                        should_stop: Optional[Callable[[], bool]] = None,
+                        prune=None) -> Dict[StrategyParams, Optional[Dict]]:
+    """
+    engine.exit_grid per ogni params di entry_grid, distribuito su processi.
+
+    Colonne e feature dell'engine sono pubblicate una volta in memoria
+    condivisa; i worker ricostruiscono l'engine su viste senza copia.
+    progress(fatti, totale) e on_result(params, cubo) sono chiamati nel
+    processo principale a ogni blocco completato; se should_stop() diventa
+    vero i blocchi non ancora avviati vengono annullati. prune (PruneRules)
+    è passato a ogni exit_grid.
+
+    Returns:
+        {params: cubo o None se la combinazione è fallita}
+    """
+    entry_grid = list(entry_grid)
+    total = len(entry_grid)
+    arrays = {'col_' + c: v for c, v in engine.cols.items()}
+    arrays.update({'feat_' + k: np.asarray(v) for k, v in engine.feat.items()})
+
+    results = {}
+    n_workers = worker_count(total, workers)
+    with SharedArrays(arrays) as shared, _executor(n_workers, _init_sweep_worker, (shared.spec,)) as pool:
+        futures = [pool.submit(_sweep_chunk, chunk, list(sl_values), list(tp_values), prune)
+                   for chunk in _chunks(entry_grid, n_workers)]
+        for fut in as_completed(futures):
+            for params, cube in fut.result():
+                results[params] = cube
+                if on_result:
+                    on_result(params, cube)
+            if progress:
+                progress(len(results), total)
+            if should_stop and should_stop():
+                pool.shutdown(cancel_futures=True)
+                break
+    return results
+
+# ============================================
+# VALIDAZIONE: celle asset x anno
+# ============================================
+
+def _publish_history(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], Optional[str]]:
+    """Array OHLCV (datetime in ns UTC) e fuso orario della colonna datetime"""
+    dt = pd.to_datetime(df['datetime'])
+    tz = getattr(dt.dt, 'tz', None)
+    if tz is not None:
+        dt = dt.dt.tz_convert(None)
+    arrays = {'datetime': dt.values.astype('datetime64[ns]').astype(np.int64)}
+    for c in _OHLCV_COLUMNS:
+        if c in df.columns:
+            arrays[c] = df[c].to_numpy(dtype=np.float64)
+    return arrays, (str(tz) if tz is not None else None)
+
+def _history_frame(symbol: str) -> pd.DataFrame:
+    entry = _HISTORY[symbol]
+    views = entry['arrays']
+    dt = pd.to_datetime(views['datetime'])
+    if entry['tz']:
+        dt = dt.tz_localize('UTC').tz_convert(entry['tz'])
+    cols = {'datetime': dt}
+    cols.update({c: views[c] for c in _OHLCV_COLUMNS if c in views})
+    return pd.DataFrame(cols)
+
+def _init_validation_worker(specs, tzs):
+    for symbol, spec in specs.items():
+        _HISTORY[symbol] = {'arrays': attach(spec), 'tz': tzs[symbol]}
+
+def _validation_cell(symbol: str, year: int, use_mtf: bool):
+    res = annual_backtest_from_history(_history_frame(symbol), symbol, year, use_mtf)
+    # Al processo principale tornano solo le metriche
+    return None if res is None else {k: v for k, v in res.items() if k in ('symbol', 'year', 'stats', 'message')}
+
+def parallel_annual_backtests(histories: Dict[str, pd.DataFrame], years: Sequence[int],
+                              use_mtf: bool = True, workers: Optional[int] = None,
+                              progress: Optional[Callable[[int, int], None]] = None,
+                              cells: Optional[Sequence[Tuple[str, int]]] = None,
+                              on_result: Optional[Callable[[Tuple[str, int], Any], None]] = None,
+                              should_stop: Optional[Callable[[], bool]] = None) -> Dict[Tuple[str, int], Optional[Dict]]:
+    """
+    annual_backtest_from_history per ogni cella asset x anno, su processi.
+
+    Ogni storico (vedi load_annual_history) è pubblicato una volta in
+    memoria condivisa e condiviso da tutti gli anni dello stesso asset.
+    cells limita il lavoro a un sottoinsieme delle celle; on_result e
+    should_stop come in parallel_exit_grids.
+
+    Returns:
+        {(symbol, year): risultato con 'stats' (senza trade/df), None se
+        dati insufficienti; l'eccezione della cella se il backtest fallisce}
+    """
+    if cells is None:
+        cells = [(s, y) for s in histories for y in years]
+    cells = [c for c in cells if c[0] in histories]
+    total = len(cells)
+    published, tzs = {}, {}
+    for symbol, df in histories.items():
+        published[symbol], tzs[symbol] = _publish_history(df)
+
+    shared = {symbol: SharedArrays(arrays) for symbol, arrays in published.items()}
+    results = {}
+    try:
+        specs = {symbol: sh.spec for symbol, sh in shared.items()}
+        n_workers = worker_count(total, workers)
+        with _executor(n_workers, _init_validation_worker, (specs, tzs)) as pool:
+            futures = {pool.submit(_validation_cell, s, y, use_mtf): (s, y) for s, y in cells}
+            for fut in as_completed(futures):
+                try:
+                    results[futures[fut]] = fut.result()
+                except Exception as e:
+                    results[futures[fut]] = e
+                if on_result:
+                    on_result(futures[fut], results[futures[fut]])
+                if progress:
+                    progress(len(results), total)
+                if should_stop and should_stop():
+                    pool.shutdown(cancel_futures=True)
+                    break
+    finally:
+        for sh in shared.values():
+            sh.close()
+    return results
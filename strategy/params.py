@@ -0,0 +1,84 @@
+# strategy/params.py
+# Parametri della strategia passati esplicitamente a segnali e backtest
+from dataclasses import dataclass, asdict, replace, fields
+from typing import Optional, Dict, Any
+
+import config
+
+# Campo -> costante di config da cui leggere il default
+_CONFIG_MAP = {
+    'adx_min': 'ADX_MIN',
+    'rsi_long_max': 'RSI_LONG_MAX',
+    'rsi_short_min': 'RSI_SHORT_MIN',
+    'weak_adx_min': 'WEAK_ADX_MIN',
+    'weak_rsi_long_max': 'WEAK_RSI_LONG_MAX',
+    'weak_rsi_short_min': 'WEAK_RSI_SHORT_MIN',
+    'weak_slope_min': 'WEAK_SLOPE_MIN',
+    'enable_classification': 'ENABLE_SIGNAL_CLASSIFICATION',
+    'weak_enabled': 'WEAK_SIGNALS_ENABLED',
+    'strong_sl_atr': 'STRONG_SL_ATR',
+    'strong_tp_atr': 'STRONG_TP_ATR',
+    'weak_sl_atr': 'WEAK_SL_ATR',
+    'weak_tp_atr': 'WEAK_TP_ATR',
+    'bt_sl_atr': 'BT_SL_ATR',
+    'bt_tp_atr': 'BT_TP_ATR',
+}
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """
+    Soglie di segnale e moltiplicatori SL/TP.
+
+    Valore immutabile e hashabile: sostituisce la modifica a runtime delle
+    costanti di config (che robust_ta e backtest importano per valore).
+    sl_atr/tp_atr, se impostati, valgono per tutti i trade al posto dei
+    moltiplicatori per forza del segnale.
+    """
+    adx_min: float = config.ADX_MIN
+    rsi_long_max: float = config.RSI_LONG_MAX
+    rsi_short_min: float = config.RSI_SHORT_MIN
+    strong_slope_min: float = 1.0
+    weak_adx_min: float = config.WEAK_ADX_MIN
+    weak_rsi_long_max: float = config.WEAK_RSI_LONG_MAX
+    weak_rsi_short_min: float = config.WEAK_RSI_SHORT_MIN
+    weak_slope_min: float = config.WEAK_SLOPE_MIN
+    enable_classification: bool = config.ENABLE_SIGNAL_CLASSIFICATION
+    weak_enabled: bool = config.WEAK_SIGNALS_ENABLED
+    strong_sl_atr: float = config.STRONG_SL_ATR
+    strong_tp_atr: float = config.STRONG_TP_ATR
+    weak_sl_atr: float = config.WEAK_SL_ATR
+    weak_tp_atr: float = config.WEAK_TP_ATR
+    bt_sl_atr: float = config.BT_SL_ATR
+    bt_tp_atr: float = config.BT_TP_ATR
+    sl_atr: Optional[float] = None
+    tp_atr: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, **overrides) -> "StrategyParams":
+        """Parametri dai valori correnti del modulo config, con eventuali override"""
+        values = {name: getattr(config, const) for name, const in _CONFIG_MAP.items() if hasattr(config, const)}
+        values.update(overrides)
+        return cls(**values)
+
+    def with_(self, **changes) -> "StrategyParams":
+        """Copia con alcuni campi modificati"""
+        return replace(self, **changes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StrategyParams":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    def exit_mults(self, strength: str):
+        """(moltiplicatore SL, moltiplicatore TP) per la forza del segnale"""
+        if strength == "STRONG":
+            sl, tp = self.strong_sl_atr, self.strong_tp_atr
+        elif strength == "WEAK":
+            sl, tp = self.weak_sl_atr, self.weak_tp_atr
+        else:
+            sl, tp = self.bt_sl_atr, self.bt_tp_atr
+        return (self.sl_atr if self.sl_atr is not None else sl,
+                self.tp_atr if self.tp_atr is not None else tp)
@@ -0,0 +1,255 @@
+# strategy/portfolio.py
+# Backtest di portafoglio: più asset sullo stesso capitale con i limiti di MoneyManager
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from strategy.params import StrategyParams
+from strategy.sweep import SweepEngine
+from strategy.money_manager import MoneyManager
+from strategy.history import history_store
+from strategy.annual_backtest import load_annual_history
+from indicators.mtf import _ts_ns, resample_closes
+from config import PORTFOLIO_INITIAL_CAPITAL, PORTFOLIO_MAX_ASSETS
+
+# Tipi di evento: a parità di istante le uscite liberano rischio prima delle entrate
+_EXIT, _ENTRY = 0, 1
+
+def asset_trades(engine: SweepEngine, params: Optional[StrategyParams] = None) -> Dict[str, np.ndarray]:
+    """
+    Trade candidati di un asset come array (una posizione alla volta per
+    asset, come backtest_engine) con distanza dello stop all'entrata.
+
+    Returns:
+        dict con 'times' e 'close' per candela, e per trade 'entry_idx',
+        'exit_idx', 'is_long', 'entry', 'exit', 'stop', 'signal_strength'
+    """
+    if params is None:
+        params = StrategyParams.from_config()
+    trades = engine.trades(params)
+    atr = engine.cols['atr']
+    strength = trades['signal_strength']
+    sl_mult = np.zeros(len(strength))
+    for label in ("STRONG", "WEAK", "NONE"):
+        sl_mult[strength == label] = params.exit_mults(label)[0]
+    return {
+        'times': _ts_ns(engine.df_ind['datetime']),
+        'close': engine.cols['close'],
+        'entry_idx': trades['entry_idx'],
+        'exit_idx': trades['exit_idx'],
+        'is_long': trades['side'] == "LONG",
+        'entry': trades['entry'],
+        'exit': trades['exit'],
+        'stop': atr[trades['entry_idx']] * sl_mult,
+        'signal_strength': strength
+    }
+
+def portfolio_backtest(assets: Dict[str, Dict[str, np.ndarray]], initial_capital: float = PORTFOLIO_INITIAL_CAPITAL,
+                       money_manager: Optional[MoneyManager] = None) -> Dict:
+    """
+    Simula i trade di più asset su un capitale comune.
+
+    Entrate e uscite di tutti gli asset (vedi asset_trades) sono unite in
+    un'unica sequenza di eventi ordinata per tempo e scorse una volta.
+    Ogni entrata è dimensionata con MoneyManager.calculate_position_size
+    sul capitale realizzato in quel momento e ridotta se il rischio aperto
+    supererebbe max_risk_total; oltre max_drawdown_limit non si aprono
+    più posizioni (quelle aperte arrivano alla loro uscita).
+
+    Returns:
+        dict con 'trades' (DataFrame dei trade eseguiti), 'equity'
+        (DataFrame datetime/equity/drawdown sull'indice comune, con le
+        posizioni aperte valutate a mercato), 'stats' e 'skipped'
+        (entrate scartate per motivo)
+    """
+    mm = money_manager or MoneyManager(initial_capital=initial_capital)
+    symbols = list(assets)
+
+    # Eventi di tutti gli asset in array paralleli, ordinati per (tempo, tipo, asset)
+    parts = []
+    for a, symbol in enumerate(symbols):
+        data = assets[symbol]
+        n = len(data['entry_idx'])
+        ids = np.arange(n)
+        for kind, idx in ((_ENTRY, data['entry_idx']), (_EXIT, data['exit_idx'])):
+            parts.append(np.stack([data['times'][idx], np.full(n, kind), np.full(n, a), ids]))
+    events = np.concatenate(parts, axis=1) if parts else np.empty((4, 0), dtype=np.int64)
+    events = events[:, np.lexsort((events[3], events[2], events[1], events[0]))]
+
+    size = [np.zeros(len(assets[s]['entry_idx'])) for s in symbols]
+    open_risk = {}
+    skipped = {'risk': 0, 'drawdown': 0}
+    halted = False
+    for _, kind, a, i in events.T.tolist():
+        data = assets[symbols[a]]
+        if kind == _EXIT:
+            if (a, i) not in open_risk:
+                continue
+            del open_risk[(a, i)]
+            direction = 1.0 if data['is_long'][i] else -1.0
+            state = mm.update_after_trade(size[a][i] * direction * (data['exit'][i] - data['entry'][i]))
+            halted = halted or bool(state['stop_trading'])
+            continue
+
+        if halted:
+            skipped['drawdown'] += 1
+            continue
+        stop = data['stop'][i]
+        budget = mm.current_capital * mm.max_risk_total - sum(open_risk.values())
+        if not stop > 0 or budget <= 0:
+            skipped['risk'] += 1
+            continue
+        qty = mm.calculate_position_size(data['entry'][i], stop)['size']
+        qty = min(qty, budget / stop)
+        if qty <= 0:
+            skipped['risk'] += 1
+            continue
+        size[a][i] = qty
+        open_risk[(a, i)] = qty * stop
+
+    return _portfolio_result(assets, symbols, size, mm, skipped, halted)
+
+def _portfolio_result(assets, symbols, size, mm, skipped, halted) -> Dict:
+    """Trade eseguiti, equity a mercato sull'indice comune e statistiche"""
+    rows = []
+    common = np.unique(np.concatenate([assets[s]['times'] for s in symbols])) if symbols else np.empty(0, dtype=np.int64)
+    realized = np.zeros(len(common))
+    unrealized = np.zeros(len(common))
+
+    for a, symbol in enumerate(symbols):
+        data = assets[symbol]
+        taken = np.flatnonzero(size[a] > 0)
+        if not len(taken):
+            continue
+        qty = size[a][taken]
+        direction = np.where(data['is_long'][taken], 1.0, -1.0)
+        entry_idx, exit_idx = data['entry_idx'][taken], data['exit_idx'][taken]
+        pnl = qty * direction * (data['exit'][taken] - data['entry'][taken])
+        rows.append(pd.DataFrame({
+            'asset': symbol,
+            'time_entry': pd.to_datetime(data['times'][entry_idx], utc=True),
+            'time_exit': pd.to_datetime(data['times'][exit_idx], utc=True),
+            'side': np.where(data['is_long'][taken], "LONG", "SHORT"),
+            'entry': data['entry'][taken],
+            'exit': data['exit'][taken],
+            'size': qty,
+            'risk': qty * data['stop'][taken],
+            'pnl': pnl,
+            'pnl_pct': direction * (data['exit'][taken] - data['entry'][taken]) / data['entry'][taken] * 100,
+            'signal_strength': data['signal_strength'][taken]
+        }))
+        np.add.at(realized, np.searchsorted(common, data['times'][exit_idx]), pnl)
+
+        # Valore a mercato sulle candele dell'asset fra entrata e uscita (esclusa)
+        lengths = exit_idx - entry_idx
+        starts = np.repeat(entry_idx, lengths)
+        bars = starts + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        marked = np.zeros(len(data['times']))
+        np.add.at(marked, bars, np.repeat(qty * direction, lengths) * (data['close'][bars] - np.repeat(data['entry'][taken], lengths)))
+        # Ultimo valore noto dell'asset su ogni istante dell'indice comune
+        last = np.searchsorted(data['times'], common, side='right') - 1
+        unrealized += np.where(last >= 0, marked[np.maximum(last, 0)], 0.0)
+
+    equity = mm.initial_capital + np.cumsum(realized) + unrealized
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = np.where(peak > 0, (equity - peak) / peak * 100, 0.0)
+    trades = pd.concat(rows, ignore_index=True).sort_values('time_exit', kind='stable') if rows else pd.DataFrame()
+
+    final = float(equity[-1]) if len(equity) else float(mm.initial_capital)
+    stats = {
+        'trades': len(trades),
+        'win_rate': round(float((trades['pnl'] > 0).mean() * 100), 2) if len(trades) else 0,
+        'final_capital': round(final, 2),
+        'total_return_pct': round((final / mm.initial_capital - 1) * 100, 2),
+        'max_drawdown': round(float(drawdown.min()), 2) if len(drawdown) else 0,
+        'max_open_risk_pct': mm.max_risk_total * 100,
+        'halted': halted
+    }
+    return {
+        'trades': trades.reset_index(drop=True),
+        'equity': pd.DataFrame({
+            'datetime': pd.to_datetime(common, utc=True),
+            'equity': equity,
+            'drawdown': drawdown
+        }),
+        'stats': stats,
+        'skipped': skipped
+    }
+
+def run_portfolio_backtest(symbols: Sequence[str], year: int, use_mtf: bool = True,
+                           initial_capital: float = PORTFOLIO_INITIAL_CAPITAL,
+                           progress: Optional[Callable[[int, int], None]] = None) -> Optional[Dict]:
+    """Backtest di portafoglio di un anno sugli storici condivisi (vedi strategy.history)"""
+    assets = {}
+    for k, symbol in enumerate(symbols, 1):
+        df = load_annual_history(symbol)
+        df_year = history_store.year(symbol, year) if df is not None else None
+        if df_year is not None and len(df_year) >= 500:
+            engine = SweepEngine(df_year, use_mtf=use_mtf, df_1h=df if use_mtf else None,
+                                 df_4h=resample_closes(df, 4) if use_mtf else None, symbol=symbol)
+            assets[symbol] = asset_trades(engine)
+        if progress:
+            progress(k, len(symbols))
+    if not assets:
+        return None
+    result = portfolio_backtest(assets, initial_capital)
+    result['assets'] = list(assets)
+    return result
+
+def render_portfolio_backtest_panel(watchlist):
+    """Renderizza pannello backtest di portafoglio"""
+    st.markdown("### 💼 Backtest di Portafoglio")
+    st.caption("Tutti gli asset sullo stesso capitale, con rischio totale e drawdown limitati dal Money Manager")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        year = st.selectbox("Anno", [2025, 2024, 2023], index=0, key="portfolio_year")
+    with col2:
+        capital = st.number_input("Capitale iniziale", min_value=1000, value=int(PORTFOLIO_INITIAL_CAPITAL),
+                                  step=1000, key="portfolio_capital")
+    with col3:
+        run = st.button("🚀 Avvia Portafoglio", use_container_width=True, type="primary", key="portfolio_btn")
+
+    if not run:
+        return
+
+    progress_bar = st.progress(0)
+    result = run_portfolio_backtest(
+        watchlist[:PORTFOLIO_MAX_ASSETS], year, initial_capital=capital,
+        progress=lambda done, total: progress_bar.progress(done / total)
+    )
+    progress_bar.empty()
+    if result is None:
+        st.warning(f"Dati insufficienti per il {year}")
+        return
+
+    stats = result['stats']
+    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+    col_m1.metric("Capitale Finale", f"${stats['final_capital']:,.2f}", delta=f"{stats['total_return_pct']:+.2f}%")
+    col_m2.metric("Trades", stats['trades'])
+    col_m3.metric("Win Rate", f"{stats['win_rate']:.1f}%")
+    col_m4.metric("Max DD", f"{stats['max_drawdown']:.1f}%")
+
+    skipped = result['skipped']
+    st.caption(
+        f"Asset: {', '.join(result['assets'])} | entrate scartate per rischio totale "
+        f"({stats['max_open_risk_pct']:.0f}%): {skipped['risk']}, per drawdown: {skipped['drawdown']}"
+    )
+    if stats['halted']:
+        st.error("🛑 Limite di drawdown raggiunto: nuove entrate sospese")
+
+    equity = result['equity']
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=equity['datetime'], y=equity['equity'], mode='lines',
+                             line=dict(color='#f0b90b', width=2), name='Equity'))
+    fig.update_layout(template='plotly_dark', height=300, margin=dict(l=0, r=0, t=30, b=0),
+                      yaxis_title="Capitale", showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
+
+    if not result['trades'].empty:
+        with st.expander("📋 Dettaglio Trades"):
+            st.dataframe(result['trades'].round({'size': 4, 'risk': 2, 'pnl': 2, 'pnl_pct': 2}),
+                         use_container_width=True, hide_index=True)
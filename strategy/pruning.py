@@ -0,0 +1,189 @@
+# strategy/pruning.py
+# Regole di interruzione anticipata per le combinazioni senza speranza negli sweep
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from strategy.backtest import WARMUP_BARS
+from config import (
+    PRUNE_MAX_DD_PCT, PRUNE_MIN_TRADES, PRUNE_CHECK_FRACTION, PRUNE_MIN_SCORE, PRUNE_CHECKPOINTS
+)
+
+@dataclass(frozen=True)
+class PruneRules:
+    """
+    Regole per fermare una simulazione prima della fine dei dati.
+
+    max_drawdown_pct: drawdown massimo della somma dei PnL % (come
+    max_drawdown di calculate_performance_metrics)
+    min_trades / check_fraction: trade chiusi minimi entro la candela
+    first_bar + check_fraction del periodo simulato
+    min_score / score: score minimo ancora raggiungibile; score(stats)
+    deve crescere con 'winrate' e 'total_pnl_pct' (come composite_score)
+
+    Una regola a None (o min_trades 0) è disattivata. Le regole sono
+    valutate in `checkpoints` candele equidistanti del periodo (più quella
+    del controllo dei trade) e a fine simulazione; la combinazione
+    interrotta conserva i trade fino a quel punto e il motivo in 'pruned'.
+    """
+    max_drawdown_pct: Optional[float] = None
+    min_trades: int = 0
+    check_fraction: float = 0.5
+    min_score: Optional[float] = None
+    score: Optional[Callable[[Dict], float]] = None
+    checkpoints: int = PRUNE_CHECKPOINTS
+    first_bar: int = WARMUP_BARS
+
+    @classmethod
+    def from_config(cls, score: Optional[Callable[[Dict], float]] = None) -> "PruneRules":
+        """Regole dai valori di config (la regola sullo score solo se score è indicato)"""
+        return cls(
+            max_drawdown_pct=PRUNE_MAX_DD_PCT,
+            min_trades=PRUNE_MIN_TRADES,
+            check_fraction=PRUNE_CHECK_FRACTION,
+            min_score=PRUNE_MIN_SCORE if score is not None else None,
+            score=score
+        )
+
+    def from_bar(self, start: int) -> "PruneRules":
+        """Regole per simulazioni con entrate da start in poi"""
+        return replace(self, first_bar=max(self.first_bar, int(start)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma serializzabile (chiavi di cache e specifiche dei job)"""
+        return {
+            'max_drawdown_pct': self.max_drawdown_pct,
+            'min_trades': self.min_trades,
+            'check_fraction': self.check_fraction,
+            'min_score': self.min_score,
+            'score': getattr(self.score, '__name__', None),
+            'checkpoints': self.checkpoints,
+            'first_bar': self.first_bar
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], score: Optional[Callable[[Dict], float]] = None) -> "PruneRules":
+        """Inverso di to_dict (score va ripassato: nel dict c'è solo il nome)"""
+        values = {k: v for k, v in data.items() if k != 'score'}
+        return cls(score=score if data.get('score') else None, **values)
+
+    def tracker(self, entry_px: np.ndarray, is_long: np.ndarray, sl: np.ndarray, tp: np.ndarray,
+                n_bars: int) -> "PruneTracker":
+        """Stato delle regole per una simulazione (livelli per entrata candidata)"""
+        return PruneTracker(self, entry_px, is_long, sl, tp, n_bars)
+
+class PruneTracker:
+    """
+    Stato delle regole per una simulazione in corso.
+
+    Il kernel chiama check() quando un trade chiude oltre next_check, con
+    le liste dei trade fin lì (posizioni in entry_idx, candele di uscita,
+    uscite a SL): le verifiche sono poche per simulazione e ognuna conta
+    solo i trade nuovi, così il costo resta trascurabile rispetto ai trade
+    simulati. Il PnL di ogni trade è ricavato dai livelli
+    della sua entrata con le stesse operazioni di trades_from_sim.
+    """
+
+    def __init__(self, rules: PruneRules, entry_px, is_long, sl, tp, n_bars: int):
+        self.rules = rules
+        self.n_bars = int(n_bars)
+        self._levels = (entry_px, is_long, sl, tp)
+        self.pnl_sl = self.pnl_tp = self.best_gain = None
+
+        span = max(0, self.n_bars - rules.first_bar)
+        self.check_bar = None
+        if rules.min_trades > 0:
+            self.check_bar = rules.first_bar + int(np.ceil(rules.check_fraction * span))
+        marks = {rules.first_bar + (span * i) // (rules.checkpoints + 1) for i in range(1, rules.checkpoints + 1)}
+        if self.check_bar is not None:
+            marks.add(self.check_bar)
+        self._marks = sorted(marks)
+        self.next_check = self._marks[0] if self._marks else self.n_bars
+
+        self.seen = 0
+        self.wins = 0
+        self.total = 0.0
+        self.peak = -np.inf
+        self.max_dd = 0.0
+        self.by_check = 0
+
+    def _pnl(self):
+        """PnL % per entrata candidata con uscita a SL e a TP (calcolato alla prima verifica)"""
+        if self.pnl_sl is not None:
+            return
+        entry_px, is_long, sl, tp = (np.asarray(a, dtype=np.float64) for a in self._levels)
+        is_long = is_long.astype(bool)
+        self.pnl_sl = (np.where(is_long, sl - entry_px, entry_px - sl) / entry_px) * 100
+        self.pnl_tp = (np.where(is_long, tp - entry_px, entry_px - tp) / entry_px) * 100
+        self._pnl_sl_list = self.pnl_sl.tolist()
+        self._pnl_tp_list = self.pnl_tp.tolist()
+        if self.rules.min_score is not None and self.rules.score is not None:
+            # Miglior guadagno possibile da ogni entrata candidata in poi (bound dello score)
+            gains = np.nan_to_num(np.clip(self.pnl_tp, 0, None), nan=0.0)
+            self.best_gain = np.append(np.maximum.accumulate(gains[::-1])[::-1], 0.0)
+
+    def _update(self, picked, exits, sl_hits):
+        """Aggiunge i trade non ancora contati (pochi per verifica: ciclo Python su liste)"""
+        self._pnl()
+        pnl_sl, pnl_tp = self._pnl_sl_list, self._pnl_tp_list
+        check_bar = self.check_bar if self.check_bar is not None else -1
+        total, peak, max_dd = self.total, self.peak, self.max_dd
+        for i in range(self.seen, len(picked)):
+            pnl = pnl_sl[picked[i]] if sl_hits[i] else pnl_tp[picked[i]]
+            total += pnl
+            if total > peak:
+                peak = total
+            elif peak - total > max_dd:
+                max_dd = peak - total
+            self.wins += pnl > 0
+            self.by_check += exits[i] <= check_bar
+        self.total, self.peak, self.max_dd = total, peak, max_dd
+        self.seen = len(picked)
+
+    def _violation(self, last_exit: Optional[int]) -> Optional[str]:
+        rules = self.rules
+        if rules.max_drawdown_pct is not None and self.max_dd > rules.max_drawdown_pct:
+            return 'drawdown'
+        if (self.check_bar is not None and self.by_check < rules.min_trades
+                and (last_exit if last_exit is not None else self.n_bars - 1) > self.check_bar):
+            return 'trades'
+        return None
+
+    def check(self, picked: List[int], exits: List[int], sl_hits: List[bool], next_pos: int) -> Optional[str]:
+        """
+        Verifica le regole sui trade chiusi finora (la prossima entrata
+        possibile è next_pos in entry_idx) e fissa la verifica successiva.
+
+        Returns:
+            motivo dell'interruzione ('drawdown', 'trades', 'score') o None
+        """
+        self._update(picked, exits, sl_hits)
+        self.next_check = next((b for b in self._marks if b >= exits[-1]), self.n_bars)
+        reason = self._violation(exits[-1])
+        if reason or self.best_gain is None:
+            return reason
+
+        # Ottimistico: ogni trade ancora possibile chiude al TP migliore rimasto
+        # (ogni trade occupa almeno due candele: entrata e uscita successiva)
+        m = len(self.pnl_tp)
+        left = min(m - next_pos, max(0, (self.n_bars - 1 - exits[-1]) // 2))
+        n = self.seen + left
+        wins = self.wins + left
+        total = self.total + left * float(self.best_gain[min(next_pos, m)])
+        bound = self.rules.score({
+            'n': n,
+            'wins': wins,
+            'winrate': (wins / n) * 100,
+            'avg_pnl_pct': total / n,
+            'total_pnl_pct': total
+        })
+        return 'score' if bound < self.rules.min_score else None
+
+    def finish(self, picked: List[int], exits: List[int], sl_hits: List[bool]) -> Optional[str]:
+        """
+        Verifica finale a simulazione completata: drawdown e trade minimi
+        su tutti i trade (lo score è quello effettivo, non serve un bound)
+        """
+        self._update(picked, exits, sl_hits)
+        return self._violation(None)
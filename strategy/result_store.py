@@ -0,0 +1,182 @@
+# strategy/result_store.py
+# Memoizzazione su disco dei risultati di backtest (trade in formato colonnare + statistiche)
+import hashlib
+import json
+import os
+import threading
+import zipfile
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import BACKTEST_STORE_DIR, BACKTEST_STORE_MAX_MB
+from indicators.cache import indicator_config_hash
+from strategy.params import StrategyParams
+
+# Da incrementare quando cambia la logica del backtest (invalida i risultati salvati)
+STORE_VERSION = 1
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Tipo non serializzabile: {type(obj).__name__}")
+
+def data_fingerprint(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
+    """
+    Impronta economica di un DataFrame OHLCV: simbolo, timeframe, primo e
+    ultimo timestamp, numero di righe e CRC32 delle chiusure.
+    """
+    times = pd.to_datetime(df['datetime']) if 'datetime' in df.columns else pd.to_datetime(df.index.to_series())
+    closes = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+    parts = (symbol, timeframe, str(times.iloc[0]), str(times.iloc[-1]), len(df), zlib.crc32(closes.tobytes()))
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+def result_key(fingerprint: str, params: Optional[StrategyParams] = None, **extra) -> str:
+    """Chiave del risultato: impronta dati + hash di parametri, config indicatori e argomenti extra"""
+    payload = json.dumps({
+        'v': STORE_VERSION,
+        'data': fingerprint,
+        'indicators': indicator_config_hash(),
+        'params': params.to_dict() if params is not None else None,
+        'extra': extra
+    }, sort_keys=True, default=_json_default)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+class BacktestResultStore:
+    """
+    Archivio su disco dei risultati, un file .npz per chiave.
+
+    Il DataFrame dei trade è salvato per colonne (array NumPy, senza
+    pickle: date come int64 ns, testo come stringhe unicode); statistiche
+    e metadati come JSON nello stesso file. L'ultimo accesso è la data di
+    modifica del file; oltre max_mb vengono eliminati i meno recenti (LRU).
+    """
+
+    def __init__(self, root: str = BACKTEST_STORE_DIR, max_mb: float = BACKTEST_STORE_MAX_MB):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """(trades, meta) salvati per key, None se assenti"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['__meta__']))
+                cols = {}
+                for name, kind in meta['columns']:
+                    values = data[f"c_{name}"]
+                    if kind == 'datetime':
+                        values = pd.to_datetime(values)
+                        if meta['tz'].get(name):
+                            values = values.tz_localize('UTC').tz_convert(meta['tz'][name])
+                        cols[name] = values
+                    elif kind == 'str':
+                        cols[name] = values.astype(object)
+                    else:
+                        cols[name] = values
+            os.utime(path)  # Accesso recente per l'LRU
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile, EOFError):
+            # File mancante, corrotto o troncato: si ricalcola
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return pd.DataFrame(cols), meta['payload']
+
+    def put(self, key: str, trades: Optional[pd.DataFrame], payload: Dict[str, Any]):
+        """Salva trades (anche vuoto/None) e payload JSON (statistiche ecc.)"""
+        arrays = {}
+        columns = []
+        tz = {}
+        if trades is not None:
+            for name in trades.columns:
+                s = trades[name]
+                if pd.api.types.is_datetime64_any_dtype(s):
+                    if getattr(s.dt, 'tz', None) is not None:
+                        tz[name] = str(s.dt.tz)
+                        s = s.dt.tz_convert(None)
+                    arrays[f"c_{name}"] = s.values.astype('datetime64[ns]').astype(np.int64)
+                    columns.append((name, 'datetime'))
+                elif pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+                    arrays[f"c_{name}"] = s.to_numpy()
+                    columns.append((name, 'num'))
+                else:
+                    arrays[f"c_{name}"] = s.astype(str).to_numpy(dtype=str)
+                    columns.append((name, 'str'))
+        meta = {'columns': columns, 'tz': tz, 'payload': payload}
+        arrays['__meta__'] = np.array(json.dumps(meta, default=_json_default))
+
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)  # Scrittura atomica (anche con più processi)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        """Elimina i risultati meno usati finché la dimensione totale rientra nel limite"""
+        try:
+            entries = []
+            for name in os.listdir(self.root):
+                if name.endswith(".npz"):
+                    info = os.stat(os.path.join(self.root, name))
+                    entries.append((info.st_mtime, info.st_size, name))
+        except OSError:
+            return
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self):
+        try:
+            for name in os.listdir(self.root):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            files = [f for f in os.listdir(self.root) if f.endswith(".npz")]
+            size = sum(os.path.getsize(os.path.join(self.root, f)) for f in files)
+        except OSError:
+            files, size = [], 0
+        return {
+            'entries': len(files),
+            'mb': round(size / 1024 / 1024, 2),
+            'max_mb': round(self.max_bytes / 1024 / 1024, 2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+# Istanza condivisa
+backtest_store = BacktestResultStore()
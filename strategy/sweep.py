@@ -0,0 +1,322 @@
+# strategy/sweep.py
+# Sweep delle soglie di strategia su indicatori calcolati una sola volta
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from indicators.mtf import mtf_flags
+from indicators.robust_ta import signal_features, classify_features
+from indicators.variants import IndicatorLengths, get_variants
+from strategy.backtest import (
+    prepare_backtest, simulate_signals, trade_stats, entry_candidates, trades_from_sim, WARMUP_BARS
+)
+from strategy.params import StrategyParams
+from strategy.pruning import PruneRules
+from strategy.trade_sim import exit_grid
+from config import HALVING_ETA, HALVING_RUNGS
+
+# Colonne di df_ind usate dalla simulazione dei trade
+SIM_COLUMNS = ('close', 'high', 'low', 'atr')
+
+# Campi che influenzano solo le uscite (la classificazione si può riusare)
+_EXIT_FIELDS = ('strong_sl_atr', 'strong_tp_atr', 'weak_sl_atr', 'weak_tp_atr',
+                'bt_sl_atr', 'bt_tp_atr', 'sl_atr', 'tp_atr')
+
+def _head(arrays: Dict, bars: int) -> Dict:
+    """Prime `bars` righe di ogni array per candela"""
+    return {k: v[:bars] if isinstance(v, np.ndarray) else v for k, v in arrays.items()}
+
+def _entry_window(sig: Dict, start: int, end: Optional[int]) -> Dict:
+    """Copia di sig con segnali long/short solo nelle candele [start, end)"""
+    allowed = np.zeros(len(sig['long']), dtype=bool)
+    allowed[start:end] = True
+    return dict(sig, long=sig['long'] & allowed, short=sig['short'] & allowed)
+
+def _prune_from(prune: Optional[PruneRules], start: int) -> Optional[PruneRules]:
+    """Regole riferite alla prima candela di entrata della finestra"""
+    return prune.from_bar(start) if prune is not None and start else prune
+
+def param_grid(base: Optional[StrategyParams] = None, **values: List) -> List[StrategyParams]:
+    """
+    Prodotto cartesiano di valori per campo di StrategyParams.
+
+    Esempio: param_grid(sl_atr=[1.5, 2.0], adx_min=[20, 25]) -> 4 combinazioni
+    """
+    if base is None:
+        base = StrategyParams.from_config()
+    names = list(values)
+    return [base.with_(**dict(zip(names, combo))) for combo in product(*(values[n] for n in names))]
+
+def _signal_key(params: StrategyParams):
+    """Parte di params che determina la classificazione"""
+    return tuple(v for k, v in params.to_dict().items() if k not in _EXIT_FIELDS)
+
+class SweepEngine:
+    """
+    Valuta molte StrategyParams sullo stesso dataset.
+
+    Indicatori e feature di segnale sono calcolati una volta; ogni
+    combinazione costa solo l'aritmetica delle maschere di soglia e la
+    simulazione dei trade. La classificazione è riusata fra combinazioni
+    che differiscono solo per SL/TP.
+    """
+
+    def __init__(self, df_15m: pd.DataFrame, use_mtf: bool = True, df_1h=None, df_4h=None,
+                 symbol: Optional[str] = None):
+        self.df_ind, self.feat = prepare_backtest(df_15m, use_mtf, df_1h, df_4h, symbol)
+        self.cols = {c: self.df_ind[c].to_numpy(dtype=np.float64) for c in SIM_COLUMNS}
+        self._signals = {}
+
+    @classmethod
+    def from_arrays(cls, cols: Dict[str, np.ndarray], feat: Dict[str, np.ndarray]) -> "SweepEngine":
+        """
+        Motore su array già calcolati (colonne SIM_COLUMNS e feature di
+        signal_features), ad es. viste su memoria condivisa nei worker.
+        Senza df_ind: evaluate/trades/exit_grid non ne hanno bisogno.
+        """
+        engine = cls.__new__(cls)
+        engine.df_ind = None
+        engine.cols = cols
+        engine.feat = feat
+        engine._signals = {}
+        return engine
+
+    @classmethod
+    def from_indicators(cls, df_ind: pd.DataFrame, mtf_long, mtf_short) -> "SweepEngine":
+        """Motore su indicatori già calcolati (ad es. una variante di lunghezze)"""
+        engine = cls.from_arrays(
+            {c: df_ind[c].to_numpy(dtype=np.float64) for c in SIM_COLUMNS},
+            signal_features(df_ind, mtf_long, mtf_short)
+        )
+        engine.df_ind = df_ind
+        return engine
+
+    def signals(self, params: StrategyParams) -> Dict:
+        key = _signal_key(params)
+        sig = self._signals.get(key)
+        if sig is None:
+            sig = classify_features(self.feat, params)
+            self._signals[key] = sig
+        return sig
+
+    def _window(self, params: StrategyParams, bars: Optional[int], start: int, hold: bool):
+        """Colonne e segnali ristretti a entrate in [start, bars)"""
+        cols, sig = self.cols, self.signals(params)
+        if bars is not None and bars >= len(cols['close']):
+            bars = None
+        if bars is not None and not hold:
+            cols, sig = _head(cols, bars), _head(sig, bars)
+        if start or (bars is not None and hold):
+            sig = _entry_window(sig, start, bars)
+        return cols, sig
+
+    def trades(self, params: StrategyParams, bars: Optional[int] = None, start: int = 0,
+               hold: bool = False, prune: Optional[PruneRules] = None) -> Dict:
+        """
+        Array dei trade per params (vedi simulate_signals).
+
+        bars: limita il backtest alle prime `bars` candele (indicatori
+        causali: equivale a un backtest sul solo tratto iniziale)
+        start: nessuna entrata prima della candela start
+        hold: con bars, entrate solo prima di bars ma uscite cercate su
+        tutti i dati (le posizioni non vengono troncate a fine finestra)
+        prune: regole di interruzione anticipata (motivo in 'pruned')
+        """
+        cols, sig = self._window(params, bars, start, hold)
+        return simulate_signals(cols, sig, params, _prune_from(prune, start))
+
+    def evaluate(self, params: StrategyParams, bars: Optional[int] = None, start: int = 0,
+                 prune: Optional[PruneRules] = None) -> Dict:
+        """
+        Statistiche del backtest per params (stesse chiavi di backtest_engine);
+        con prune anche 'pruned' (motivo dell'interruzione o None)
+        """
+        trades = self.trades(params, bars, start, prune=prune)
+        stats = trade_stats(trades["pnl_pct"], trades["signal_strength"])
+        if prune is not None:
+            stats['pruned'] = trades['pruned']
+        return stats
+
+    def exit_grid(self, params: StrategyParams, sl_values: Sequence[float],
+                  tp_values: Sequence[float], bars: Optional[int] = None, start: int = 0,
+                  prune: Optional[PruneRules] = None) -> Dict:
+        """
+        Cubo dei risultati per tutte le coppie (SL, TP) con le entrate di params.
+
+        SL/TP sono multipli di ATR applicati a tutti i trade (come
+        params.sl_atr/tp_atr). Le celle coincidono con evaluate() su
+        params.with_(sl_atr=sl, tp_atr=tp), anche con la finestra bars/start.
+        Con prune ogni cella è interrotta indipendentemente dalle altre.
+
+        Returns:
+            dict con 'sl', 'tp' (assi), matrici len(sl) x len(tp) 'n',
+            'winrate', 'total_pnl_pct', 'avg_pnl_pct', 'pruned' (bool) e
+            'stats' {(sl, tp): stats}
+        """
+        df, sig = self._window(params, bars, start, hold=False)
+        entry_idx, is_long, _ = entry_candidates(sig, len(df["close"]))
+        cells = exit_grid(
+            df["high"], df["low"], df["close"], df["atr"],
+            entry_idx, is_long, sl_values, tp_values, prune=_prune_from(prune, start)
+        )
+
+        shape = (len(sl_values), len(tp_values))
+        cube = {
+            'sl': np.asarray(sl_values, dtype=np.float64),
+            'tp': np.asarray(tp_values, dtype=np.float64),
+            'n': np.zeros(shape, dtype=np.int64),
+            'winrate': np.zeros(shape),
+            'total_pnl_pct': np.zeros(shape),
+            'avg_pnl_pct': np.zeros(shape),
+            'pruned': np.zeros(shape, dtype=bool),
+            'stats': {}
+        }
+        for a, sl in enumerate(cube['sl']):
+            for b, tp in enumerate(cube['tp']):
+                trades = trades_from_sim(df, sig, cells[(float(sl), float(tp))])
+                stats = trade_stats(trades["pnl_pct"], trades["signal_strength"])
+                if prune is not None:
+                    stats['pruned'] = trades['pruned']
+                    cube['pruned'][a, b] = trades['pruned'] is not None
+                cube['stats'][(float(sl), float(tp))] = stats
+                cube['n'][a, b] = stats['n']
+                cube['winrate'][a, b] = stats['winrate']
+                cube['total_pnl_pct'][a, b] = stats['total_pnl_pct']
+                cube['avg_pnl_pct'][a, b] = stats['avg_pnl_pct']
+        return cube
+
+    def halving_search(self, candidates: Iterable[StrategyParams], score: Callable[[Dict], float],
+                       budget: Optional[float] = None, eta: int = HALVING_ETA, rungs: int = HALVING_RUNGS,
+                       seed: int = 0, progress: Optional[Callable[[int, int], None]] = None):
+        """
+        Ricerca adattiva (successive halving) su una lista di candidati.
+
+        Tutti i candidati sono valutati su un tratto iniziale breve
+        (1/eta^(rungs-1) delle candele dopo il warm-up); ad ogni livello
+        resta il miglior 1/eta per score(stats) e il tratto si allunga di
+        eta volte, fino all'anno intero.
+
+        budget: costo massimo in backtest completi equivalenti; se la
+        griglia non ci sta, il primo livello usa un campione casuale
+        (riproducibile con seed) dei candidati.
+
+        Returns:
+            (DataFrame dei sopravvissuti valutati sull'intero dataset,
+             campi di params + statistiche + 'score', ordinato per score;
+             report con 'candidates', 'sampled', 'evaluations',
+             'full_backtests', 'avoided_full_backtests', 'cost_full_equivalent')
+        """
+        candidates = list(candidates)
+        n = len(self.cols['close'])
+        span = max(1, n - WARMUP_BARS)
+        fractions = [float(eta) ** -(rungs - 1 - k) for k in range(rungs)]
+
+        pool = candidates
+        if budget is not None:
+            cap = max(1, int(budget / (fractions[0] * rungs)))
+            if cap < len(candidates):
+                pick = np.sort(np.random.default_rng(seed).choice(len(candidates), cap, replace=False))
+                pool = [candidates[i] for i in pick]
+
+        # Valutazioni previste per il progresso
+        sizes = [len(pool)]
+        for _ in range(rungs - 1):
+            sizes.append(max(1, -(-sizes[-1] // eta)))
+        planned = sum(sizes)
+
+        done = 0
+        cost = 0.0
+        rows = []
+        for k, fraction in enumerate(fractions):
+            last = k == rungs - 1
+            bars = None if last else WARMUP_BARS + int(np.ceil(fraction * span))
+            rows = []
+            for params in pool:
+                stats = self.evaluate(params, bars)
+                row = params.to_dict()
+                row.update(stats)
+                row['score'] = score(stats)
+                rows.append((row['score'], row, params))
+                done += 1
+                if progress:
+                    progress(done, planned)
+            cost += len(pool) * (1.0 if last else (bars - WARMUP_BARS) / span)
+            # Ordinamento stabile: a parità di score vince l'ordine della griglia
+            rows.sort(key=lambda r: -r[0])
+            if not last:
+                pool = [r[2] for r in rows[:sizes[k + 1]]]
+
+        report = {
+            'candidates': len(candidates),
+            'sampled': sizes[0],
+            'evaluations': done,
+            'full_backtests': len(rows),
+            'avoided_full_backtests': len(candidates) - len(rows),
+            'cost_full_equivalent': round(cost, 1)
+        }
+        return pd.DataFrame([r[1] for r in rows]), report
+
+    def run(self, grid: Iterable[StrategyParams],
+            progress: Optional[Callable[[int, int], None]] = None,
+            prune: Optional[PruneRules] = None) -> pd.DataFrame:
+        """Una riga per combinazione: campi di params + statistiche (+ 'pruned' con prune)"""
+        grid = list(grid)
+        rows = []
+        for i, params in enumerate(grid, 1):
+            row = params.to_dict()
+            row.update(self.evaluate(params, prune=prune))
+            rows.append(row)
+            if progress:
+                progress(i, len(grid))
+        return pd.DataFrame(rows)
+
+def length_sweep(df_15m: pd.DataFrame, lengths_grid: Iterable[IndicatorLengths],
+                 params: StrategyParams, sl_values: Sequence[float], tp_values: Sequence[float],
+                 use_mtf: bool = True, df_1h=None, df_4h=None, symbol: Optional[str] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 prune: Optional[PruneRules] = None):
+    """
+    Sweep delle lunghezze degli indicatori (con griglia SL/TP per variante).
+
+    Le varianti vengono da get_variants: intermedi comuni calcolati una
+    volta per dataset e ogni serie (tipo, lunghezza) una sola volta per
+    tutta la griglia (e per sweep successivi sugli stessi dati). I flag MTF
+    non dipendono dalle lunghezze e sono calcolati una volta.
+
+    Returns:
+        (DataFrame con campi di IndicatorLengths, 'sl_atr', 'tp_atr' e
+         statistiche per variante e coppia SL/TP; stats() delle varianti)
+    """
+    lengths_grid = list(lengths_grid)
+    variants = get_variants(df_15m, symbol)
+    if use_mtf:
+        mtf_long, mtf_short = mtf_flags(df_15m, df_1h, df_4h, symbol)
+    else:
+        mtf_long = mtf_short = np.ones(len(df_15m), dtype=bool)
+
+    rows = []
+    for i, lengths in enumerate(lengths_grid, 1):
+        engine = SweepEngine.from_indicators(variants.frame(lengths), mtf_long, mtf_short)
+        cube = engine.exit_grid(params, sl_values, tp_values, prune=prune)
+        for (sl, tp), stats in cube['stats'].items():
+            row = lengths.to_dict()
+            row.update(sl_atr=sl, tp_atr=tp)
+            row.update(stats)
+            rows.append(row)
+        if progress:
+            progress(i, len(lengths_grid))
+    return pd.DataFrame(rows), variants.stats()
+
+def exit_grid_frame(cube: Dict) -> pd.DataFrame:
+    """Cubo di SweepEngine.exit_grid in formato lungo (una riga per coppia SL/TP)"""
+    sl, tp = np.meshgrid(cube['sl'], cube['tp'], indexing='ij')
+    return pd.DataFrame({
+        'SL': sl.ravel(),
+        'TP': tp.ravel(),
+        'trades': cube['n'].ravel(),
+        'win_rate': cube['winrate'].ravel(),
+        'pnl_total': cube['total_pnl_pct'].ravel(),
+        'avg_pnl': cube['avg_pnl_pct'].ravel()
+    })
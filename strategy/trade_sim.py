@@ -0,0 +1,195 @@
+# strategy/trade_sim.py
+# Kernel NumPy per la simulazione dei trade con uscita a SL/TP
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Optional, Sequence, Tuple
+
+from config import EXIT_GRID_HORIZON
+
+# Prima finestra della scansione in avanti (raddoppia finché non trova un'uscita)
+_SCAN_CHUNK = 64
+
+def first_exit(high: np.ndarray, low: np.ndarray, start: int, is_long: bool,
+               sl: float, tp: float) -> Tuple[int, bool]:
+    """
+    Prima candela >= start in cui il prezzo tocca SL o TP.
+
+    Scansione vettoriale a finestre crescenti. A parità di candela lo SL ha
+    precedenza sul TP, come nel loop originale del backtest.
+
+    Returns:
+        (indice candela di uscita o -1 se mai toccati, True se uscita a SL)
+    """
+    n = len(high)
+    pos = start
+    chunk = _SCAN_CHUNK
+    while pos < n:
+        end = min(n, pos + chunk)
+        if is_long:
+            hit_sl = low[pos:end] <= sl
+            hit_tp = high[pos:end] >= tp
+        else:
+            hit_sl = high[pos:end] >= sl
+            hit_tp = low[pos:end] <= tp
+        hit = hit_sl | hit_tp
+        if hit.any():
+            k = int(np.argmax(hit))
+            return pos + k, bool(hit_sl[k])
+        pos = end
+        chunk *= 2
+    return -1, False
+
+def simulate_trades(high: np.ndarray, low: np.ndarray, entry_idx: np.ndarray,
+                    is_long: np.ndarray, sl: np.ndarray, tp: np.ndarray,
+                    prune=None, entry_px: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Simula i trade una posizione alla volta.
+
+    Args:
+        high, low: prezzi per candela
+        entry_idx: indici (crescenti) delle candele con segnale di entrata
+        is_long, sl, tp: direzione e livelli per ciascun indice di entry_idx
+
+    Una posizione aperta alla candela i viene controllata da i+1 in poi;
+    la candela di uscita non può aprire un nuovo trade, quindi la prossima
+    entrata valida è il primo segnale dopo l'uscita. Il ciclo Python gira
+    una volta per trade, non per candela.
+
+    prune: regole di strategy.pruning.PruneRules (richiede entry_px, prezzo
+    di entrata per ciascun indice di entry_idx); la simulazione si ferma
+    al primo trade che ne viola una.
+
+    Returns:
+        dict di array per i trade chiusi: 'signal_pos' (posizione in entry_idx),
+        'entry_idx', 'exit_idx', 'is_long', 'is_sl', 'exit_price', più
+        'pruned' (motivo dell'interruzione o None)
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    tracker = prune.tracker(entry_px, is_long, sl, tp, len(high)) if prune is not None else None
+
+    picked, exits, sl_hits = [], [], []
+    pruned = None
+    k = 0
+    m = len(entry_idx)
+    while k < m:
+        i = int(entry_idx[k])
+        j, hit_sl = first_exit(high, low, i + 1, bool(is_long[k]), float(sl[k]), float(tp[k]))
+        if j < 0:
+            break  # Posizione ancora aperta a fine dati
+        picked.append(k)
+        exits.append(j)
+        sl_hits.append(hit_sl)
+        k = int(np.searchsorted(entry_idx, j, side="right"))
+        if tracker is not None and j > tracker.next_check:
+            pruned = tracker.check(picked, exits, sl_hits, k)
+            if pruned:
+                break
+    if tracker is not None and pruned is None:
+        pruned = tracker.finish(picked, exits, sl_hits)
+
+    pos = np.asarray(picked, dtype=np.int64)
+    is_sl = np.asarray(sl_hits, dtype=bool)
+    exit_price = np.where(is_sl, np.asarray(sl, dtype=np.float64)[pos], np.asarray(tp, dtype=np.float64)[pos])
+    return {
+        'signal_pos': pos,
+        'entry_idx': entry_idx[pos],
+        'exit_idx': np.asarray(exits, dtype=np.int64),
+        'is_long': np.asarray(is_long, dtype=bool)[pos],
+        'is_sl': is_sl,
+        'exit_price': exit_price,
+        'pruned': pruned
+    }
+
+def exit_grid(high: np.ndarray, low: np.ndarray, close: np.ndarray, atr: np.ndarray,
+              entry_idx: np.ndarray, is_long: np.ndarray,
+              sl_values: Sequence[float], tp_values: Sequence[float],
+              horizon: int = EXIT_GRID_HORIZON, prune=None) -> Dict[Tuple[float, float], Dict[str, np.ndarray]]:
+    """
+    Esiti dei trade per tutta la matrice SL x TP (multipli di ATR) con entrate fisse.
+
+    Per ogni entrata candidata si calcola una volta il percorso in avanti
+    (minimo dei low e massimo degli high cumulati, cioè massima escursione
+    favorevole/avversa) sulle prossime `horizon` candele; la candela di
+    uscita per ogni livello è il numero di candele prima che il percorso
+    lo attraversi. Le uscite oltre l'orizzonte ripiegano su first_exit.
+    Ogni cella applica poi la regola una-posizione-alla-volta con lo
+    stesso SL-prima-del-TP di simulate_trades, e le stesse regole prune
+    (valutate separatamente per ogni cella).
+
+    Returns:
+        {(sl, tp): dict come simulate_trades}
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    is_long = np.asarray(is_long, dtype=bool)
+    sl_values = np.asarray(sl_values, dtype=np.float64)
+    tp_values = np.asarray(tp_values, dtype=np.float64)
+
+    entry = close[entry_idx]
+    atr_e = atr[entry_idx]
+    # Prezzi dei livelli (stesse operazioni di simulate_signals)
+    sl_px = np.where(is_long[:, None], entry[:, None] - (atr_e[:, None] * sl_values), entry[:, None] + (atr_e[:, None] * sl_values))
+    tp_px = np.where(is_long[:, None], entry[:, None] + (atr_e[:, None] * tp_values), entry[:, None] - (atr_e[:, None] * tp_values))
+
+    # Percorsi cumulati dalla candela successiva all'entrata (padding che non tocca mai i livelli)
+    h = max(1, int(horizon))
+    low_pad = np.concatenate([low, np.full(h + 1, np.inf)])
+    high_pad = np.concatenate([high, np.full(h + 1, -np.inf)])
+    run_low = np.fmin.accumulate(sliding_window_view(low_pad, h)[entry_idx + 1], axis=1)
+    run_high = np.fmax.accumulate(sliding_window_view(high_pad, h)[entry_idx + 1], axis=1)
+
+    # Candele prima dell'attraversamento (== h: non toccato nell'orizzonte)
+    def bars_before(level, long_side_low):
+        # long_side_low: per i long il livello si tocca dal basso (low <=), per gli short dall'alto
+        below = (run_low[:, None, :] > level[:, :, None]).sum(axis=2)
+        above = (run_high[:, None, :] < level[:, :, None]).sum(axis=2)
+        bars = np.where(long_side_low[:, None], below, above)
+        return np.where(np.isnan(level), h, bars)  # Livello NaN (ATR mancante): mai toccato
+
+    sl_bars = bars_before(sl_px, is_long)
+    tp_bars = bars_before(tp_px, ~is_long)
+
+    results = {}
+    m = len(entry_idx)
+    for a, sl_mult in enumerate(sl_values):
+        for b, tp_mult in enumerate(tp_values):
+            tracker = prune.tracker(entry, is_long, sl_px[:, a], tp_px[:, b], len(high)) if prune is not None else None
+            picked, exits, sl_hits = [], [], []
+            pruned = None
+            k = 0
+            while k < m:
+                i = int(entry_idx[k])
+                sb, tb = sl_bars[k, a], tp_bars[k, b]
+                if sb < h or tb < h:
+                    hit_sl = sb <= tb
+                    j = i + 1 + int(min(sb, tb))
+                else:
+                    j, hit_sl = first_exit(high, low, i + 1 + h, bool(is_long[k]), sl_px[k, a], tp_px[k, b])
+                    if j < 0:
+                        break  # Posizione ancora aperta a fine dati
+                picked.append(k)
+                exits.append(j)
+                sl_hits.append(hit_sl)
+                k = int(np.searchsorted(entry_idx, j, side="right"))
+                if tracker is not None and j > tracker.next_check:
+                    pruned = tracker.check(picked, exits, sl_hits, k)
+                    if pruned:
+                        break
+            if tracker is not None and pruned is None:
+                pruned = tracker.finish(picked, exits, sl_hits)
+
+            pos = np.asarray(picked, dtype=np.int64)
+            is_sl = np.asarray(sl_hits, dtype=bool)
+            results[(float(sl_mult), float(tp_mult))] = {
+                'signal_pos': pos,
+                'entry_idx': entry_idx[pos],
+                'exit_idx': np.asarray(exits, dtype=np.int64),
+                'is_long': is_long[pos],
+                'is_sl': is_sl,
+                'exit_price': np.where(is_sl, sl_px[pos, a], tp_px[pos, b]),
+                'pruned': pruned
+            }
+    return results
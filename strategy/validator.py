@@ -4,46 +4,174 @@ import numpy as np
 import streamlit as st
 from datetime import datetime
 import plotly.graph_objects as go
-from strategy.annual_backtest import run_annual_backtest
+from strategy.annual_backtest import run_annual_backtest, load_annual_history
+from strategy.parallel import parallel_annual_backtests
+from strategy.params import StrategyParams
+from strategy.jobs import Job, start_job, list_jobs, render_job_progress
+from utils.error_handler import error_handler
+from config import PARALLEL_ENABLED
 
-def validate_strategy(selected_assets, years=[2023, 2024, 2025]):
+def _result_row(symbol, year, res):
+    """Riga della tabella di validazione, None se il test non ha trade"""
+    if not res or res['stats']['total_trades'] == 0:
+        return None
+    return {
+        'asset': symbol,
+        'anno': year,
+        'trades': res['stats']['total_trades'],
+        'win_rate': res['stats']['win_rate'],
+        'pnl_totale': res['stats']['total_pnl'],
+        'sharpe': res['stats']['sharpe_ratio'],
+        'max_dd': res['stats']['max_drawdown'],
+        'profit_factor': res['stats']['profit_factor'],
+        'avg_win': res['stats']['avg_win'],
+        'avg_loss': res['stats']['avg_loss']
+    }
+
+def run_validation_cells(selected_assets, years, parallel=False, done=(), progress=None,
+                         on_result=None, should_stop=None):
+    """
+    Esegue le celle asset x anno non presenti in `done`.
+    
+    progress(fatti, totale) e on_result((symbol, year), riga o None) sono
+    chiamati a ogni cella completata; should_stop() interrompe fra una
+    cella e l'altra. Le celle fallite (storico non scaricato, eccezione nel
+    backtest) finiscono nel log e non passano da on_result: un job ripreso
+    le ricalcola.
+    
+    Returns:
+        {(symbol, year): riga della tabella o None se senza trade}, solo
+        per le celle completate
+    """
+    pending = [(s, y) for s in selected_assets for y in years if (s, y) not in done]
+    total = len(pending)
+    rows = {}
+    failed = []
+    
+    def finish(cell, row):
+        rows[cell] = row
+        if on_result:
+            on_result(cell, row)
+        if progress:
+            progress(len(rows) + len(failed), total)
+    
+    def fail(cell, reason):
+        error_handler.logger.error(f"Validazione {cell[0]} {cell[1]}: {reason}")
+        failed.append(cell)
+        if progress:
+            progress(len(rows) + len(failed), total)
+    
+    def history(symbol):
+        """Storico del simbolo, None (con le celle segnate come fallite) se non disponibile"""
+        try:
+            df = load_annual_history(symbol)
+            reason = "storico non disponibile"
+        except Exception as e:
+            df, reason = None, e
+        if df is None:
+            for cell in pending:
+                if cell[0] == symbol:
+                    fail(cell, reason)
+        return df
+    
+    if parallel:
+        histories = {}
+        for symbol in dict.fromkeys(s for s, _ in pending):
+            if should_stop and should_stop():
+                return rows
+            df = history(symbol)
+            if df is not None:
+                histories[symbol] = df
+        
+        def on_cell(cell, res):
+            if isinstance(res, Exception):
+                fail(cell, res)
+            else:
+                finish(cell, _result_row(cell[0], cell[1], res))
+        
+        if histories:
+            parallel_annual_backtests(
+                histories, years, use_mtf=True,
+                cells=[c for c in pending if c[0] in histories],
+                on_result=on_cell,
+                should_stop=should_stop
+            )
+        return rows
+    
+    available = {}
+    for symbol, year in pending:
+        if should_stop and should_stop():
+            break
+        if symbol not in available:
+            available[symbol] = history(symbol) is not None
+        if not available[symbol]:
+            continue
+        try:
+            res = run_annual_backtest(symbol, year, use_mtf=True)
+        except Exception as e:
+            fail((symbol, year), e)
+            continue
+        finish((symbol, year), _result_row(symbol, year, res))
+    return rows
+
+def _results_frame(selected_assets, years, rows):
+    """Righe con trade nell'ordine asset x anno"""
+    return pd.DataFrame([rows[(s, y)] for s in selected_assets for y in years if rows.get((s, y))])
+
+def validate_strategy(selected_assets, years=[2023, 2024, 2025], parallel=False):
     """
     Valida la strategia su più asset e anni
+    
+    parallel: storico scaricato una volta per asset e celle asset x anno
+    eseguite su più processi (vedi strategy.parallel)
     """
-    results = []
     progress_bar = st.progress(0)
-    total_tests = len(selected_assets) * len(years)
-    current_test = 0
-    skipped = 0
+    rows = run_validation_cells(
+        selected_assets, years, parallel,
+        progress=lambda done, total: progress_bar.progress(done / total)
+    )
+    progress_bar.empty()
+    return _results_frame(selected_assets, years, rows)
+
+# ============================================
+# JOB PERSISTENTI
+# ============================================
+
+def _cell_key(symbol, year):
+    return f"{symbol}|{year}"
+
+def validation_job(selected_assets, years):
+    """Job di validazione (stessi asset, anni e parametri -> stesso job)"""
+    return Job('validation', {
+        'assets': list(selected_assets),
+        'years': [int(y) for y in years],
+        'params': StrategyParams.from_config().to_dict()
+    })
+
+def start_validation_job(job, parallel=False, restart=False):
+    """Avvia (o riprende dal checkpoint) il job in background"""
+    if restart and not job.is_active():
+        job.reset()
+    assets, years = job.spec['assets'], job.spec['years']
     
-    for symbol in selected_assets:
-        for year in years:
-            try:
-                res = run_annual_backtest(symbol, year, use_mtf=True)
-                
-                if res and res['stats']['total_trades'] > 0:
-                    results.append({
-                        'asset': symbol,
-                        'anno': year,
-                        'trades': res['stats']['total_trades'],
-                        'win_rate': res['stats']['win_rate'],
-                        'pnl_totale': res['stats']['total_pnl'],
-                        'sharpe': res['stats']['sharpe_ratio'],
-                        'max_dd': res['stats']['max_drawdown'],
-                        'profit_factor': res['stats']['profit_factor'],
-                        'avg_win': res['stats']['avg_win'],
-                        'avg_loss': res['stats']['avg_loss']
-                    })
-                else:
-                    skipped += 1
-            except Exception as e:
-                skipped += 1
-            
-            current_test += 1
-            progress_bar.progress(current_test / total_tests)
+    def work(job):
+        job.set_total(len(assets) * len(years))
+        done = {tuple(k.split('|')) for k in job.results()}
+        done = {(s, int(y)) for s, y in done}
+        run_validation_cells(
+            assets, years, parallel, done=done,
+            on_result=lambda cell, row: job.record(_cell_key(*cell), row),
+            should_stop=job.cancel_requested
+        )
     
-    progress_bar.empty()
-    return pd.DataFrame(results)
+    return start_job(job, work)
+
+def validation_results_from_job(job):
+    """DataFrame dei risultati dalle celle salvate"""
+    cells = job.results()
+    assets, years = job.spec['assets'], job.spec['years']
+    rows = {(s, y): cells.get(_cell_key(s, y)) for s in assets for y in years}
+    return _results_frame(assets, years, rows)
 
 def analyze_strategy_quality(df_results):
     """
@@ -140,6 +268,196 @@ def analyze_strategy_quality(df_results):
         'avg_dd': avg_dd
     }
 
+def _render_validation_results(results, min_trades, max_trades):
+    """Riepilogo, tabella e grafici di una validazione completata"""
+    if not results.empty:
+        # Filtra per numero minimo di trades
+        results = results[results['trades'] >= min_trades]
+        results = results[results['trades'] <= max_trades]
+        
+        if results.empty:
+            st.warning(f"⚠️ Nessun test con almeno {min_trades} trades")
+            return
+        
+        # Analizza qualità
+        analysis = analyze_strategy_quality(results)
+        
+        # Metriche principali
+        st.markdown("### 📊 Riepilogo Performance")
+        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+        
+        with col_m1:
+            st.metric(
+                "Score Qualità", 
+                f"{analysis['score']}/100",
+                help="Punteggio composito basato su win rate, sharpe, profit factor e drawdown"
+            )
+        
+        with col_m2:
+            st.metric(
+                "Voto", 
+                analysis['voto'],
+                help="A+ = Eccellente, A = Ottimo, B = Buono, C = Discreto, D = Sufficiente, F = Scarso"
+            )
+        
+        with col_m3:
+            st.metric(
+                "Test Validati", 
+                len(results),
+                help=f"Numero di test con almeno {min_trades} trades"
+            )
+        
+        with col_m4:
+            st.metric(
+                "Asset Testati", 
+                results['asset'].nunique(),
+                help="Numero di asset unici nei test"
+            )
+        
+        # Feedback dettagliato
+        with st.container(border=True):
+            st.markdown("### 📈 Analisi Qualità")
+            
+            col_f1, col_f2 = st.columns(2)
+            
+            with col_f1:
+                for msg in analysis['feedback'][:2]:
+                    st.markdown(msg)
+            
+            with col_f2:
+                for msg in analysis['feedback'][2:]:
+                    st.markdown(msg)
+        
+        # Tabella risultati
+        st.markdown("### 📋 Dettaglio Test")
+        
+        # Formatta dataframe per migliore visualizzazione
+        display_df = results.copy()
+        display_df['win_rate'] = display_df['win_rate'].round(1)
+        display_df['pnl_totale'] = display_df['pnl_totale'].round(1)
+        display_df['sharpe'] = display_df['sharpe'].round(2)
+        display_df['max_dd'] = display_df['max_dd'].round(1)
+        display_df['profit_factor'] = display_df['profit_factor'].round(2)
+        
+        # Colora in base al PnL
+        def color_pnl(val):
+            if val > 0:
+                return 'color: #00ff88'
+            elif val < 0:
+                return 'color: #ff3344'
+            return ''
+        
+        styled_df = display_df.style.map(color_pnl, subset=['pnl_totale'])
+        st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        
+        # Grafico comparativo
+        st.markdown("### 📊 Performance Annuale per Asset")
+        
+        if not results.empty and 'anno' in results.columns and 'pnl_totale' in results.columns:
+            fig = go.Figure()
+            
+            for asset in results['asset'].unique():
+                asset_data = results[results['asset'] == asset]
+                if not asset_data.empty:
+                    fig.add_trace(go.Bar(
+                        name=asset,
+                        x=asset_data['anno'].astype(str),
+                        y=asset_data['pnl_totale'],
+                        text=asset_data['pnl_totale'].round(1),
+                        textposition='outside',
+                        textfont=dict(size=10)
+                    ))
+            
+            if len(fig.data) > 0:
+                fig.update_layout(
+                    template='plotly_dark',
+                    height=400,
+                    margin=dict(l=40, r=40, t=40, b=40),
+                    xaxis_title="Anno",
+                    yaxis_title="PnL %",
+                    barmode='group',
+                    legend=dict(
+                        orientation="h",
+                        yanchor="bottom",
+                        y=1.02,
+                        xanchor="right",
+                        x=1
+                    )
+                )
+                
+                fig.update_yaxes(zeroline=True, zerolinecolor='#30363d')
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("ℹ️ Dati insufficienti per il grafico")
+        
+        # Statistiche aggregate
+        st.markdown("### 📈 Statistiche Aggregate")
+        
+        col_s1, col_s2, col_s3, col_s4 = st.columns(4)
+        
+        with col_s1:
+            st.metric(
+                "Win Rate Medio", 
+                f"{results['win_rate'].mean():.1f}%"
+            )
+        
+        with col_s2:
+            st.metric(
+                "PnL Medio Annuo", 
+                f"{results['pnl_totale'].mean():+.2f}%"
+            )
+        
+        with col_s3:
+            st.metric(
+                "Sharpe Medio", 
+                f"{results['sharpe'].mean():.2f}"
+            )
+        
+        with col_s4:
+            st.metric(
+                "Max Drawdown Medio", 
+                f"{abs(results['max_dd']).mean():.1f}%"
+            )
+        
+        # Best e worst performer
+        col_b1, col_b2 = st.columns(2)
+        
+        with col_b1:
+            best = results.loc[results['pnl_totale'].idxmax()]
+            st.success(
+                f"🏆 **Best Performer**: {best['asset']} {best['anno']} "
+                f"con {best['pnl_totale']:+.2f}% (WR: {best['win_rate']:.1f}%)"
+            )
+        
+        with col_b2:
+            worst = results.loc[results['pnl_totale'].idxmin()]
+            st.error(
+                f"📉 **Worst Performer**: {worst['asset']} {worst['anno']} "
+                f"con {worst['pnl_totale']:.2f}% (WR: {worst['win_rate']:.1f}%)"
+            )
+        
+        # Consiglio finale
+        st.markdown("---")
+        if analysis['voto'] in ['A+', 'A']:
+            st.success("✅ **STRATEGIA ROBUSTA** - I risultati sono eccellenti su più asset e anni. Puoi procedere con paper trading con alta confidenza!")
+        elif analysis['voto'] in ['B', 'C']:
+            st.warning("⚠️ **STRATEGIA ACCETTABILE** - I risultati sono discreti ma non eccellenti. Considera di ottimizzare i parametri prima del paper trading.")
+        else:
+            st.error("❌ **STRATEGIA DEBOLE** - I risultati non sono consistenti. Rivedi i parametri o la logica di trading prima di procedere.")
+        
+        # Download risultati
+        csv = results.to_csv(index=False).encode('utf-8')
+        st.download_button(
+            "📥 Download Report CSV",
+            csv,
+            f"validazione_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+            "text/csv",
+            use_container_width=True
+        )
+        
+    else:
+        st.warning("⚠️ Nessun risultato valido. Prova con parametri diversi o più asset.")
+
 def render_validation_panel(watchlist):
     """Renderizza pannello validazione strategia con selettore manuale"""
     
@@ -194,6 +512,13 @@ def render_validation_panel(watchlist):
                 value=5,
                 help="Numero minimo di trades per considerare valido un test"
             )
+        
+        parallel = st.checkbox(
+            "⚡ Esecuzione parallela",
+            value=PARALLEL_ENABLED,
+            key="val_parallel",
+            help="Esegue le celle asset x anno su tutti i core della CPU"
+        )
     
     # Bottone principale
     col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
@@ -205,6 +530,8 @@ def render_validation_panel(watchlist):
             disabled=not (selected_assets and anni)
         )
     
+    job = validation_job(selected_assets, anni) if (selected_assets and anni) else None
+    
     if run_button:
         if not selected_assets:
             st.warning("⚠️ Seleziona almeno un asset")
@@ -214,194 +541,28 @@ def render_validation_panel(watchlist):
             st.warning("⚠️ Seleziona almeno un anno")
             return
         
-        # Esegui validazione
-        with st.spinner(f"📊 Analisi in corso su {len(selected_assets)} asset per {len(anni)} anni..."):
-            results = validate_strategy(selected_assets, anni)
-            
-            if not results.empty:
-                # Filtra per numero minimo di trades
-                results = results[results['trades'] >= min_trades]
-                results = results[results['trades'] <= max_trades]
-                
-                if results.empty:
-                    st.warning(f"⚠️ Nessun test con almeno {min_trades} trades")
-                    return
-                
-                # Analizza qualità
-                analysis = analyze_strategy_quality(results)
-                
-                # Metriche principali
-                st.markdown("### 📊 Riepilogo Performance")
-                col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-                
-                with col_m1:
-                    st.metric(
-                        "Score Qualità", 
-                        f"{analysis['score']}/100",
-                        help="Punteggio composito basato su win rate, sharpe, profit factor e drawdown"
-                    )
-                
-                with col_m2:
-                    st.metric(
-                        "Voto", 
-                        analysis['voto'],
-                        help="A+ = Eccellente, A = Ottimo, B = Buono, C = Discreto, D = Sufficiente, F = Scarso"
-                    )
-                
-                with col_m3:
-                    st.metric(
-                        "Test Validati", 
-                        len(results),
-                        help=f"Numero di test con almeno {min_trades} trades"
-                    )
-                
-                with col_m4:
-                    st.metric(
-                        "Asset Testati", 
-                        results['asset'].nunique(),
-                        help="Numero di asset unici nei test"
-                    )
-                
-                # Feedback dettagliato
-                with st.container(border=True):
-                    st.markdown("### 📈 Analisi Qualità")
-                    
-                    col_f1, col_f2 = st.columns(2)
-                    
-                    with col_f1:
-                        for msg in analysis['feedback'][:2]:
-                            st.markdown(msg)
-                    
-                    with col_f2:
-                        for msg in analysis['feedback'][2:]:
-                            st.markdown(msg)
-                
-                # Tabella risultati
-                st.markdown("### 📋 Dettaglio Test")
-                
-                # Formatta dataframe per migliore visualizzazione
-                display_df = results.copy()
-                display_df['win_rate'] = display_df['win_rate'].round(1)
-                display_df['pnl_totale'] = display_df['pnl_totale'].round(1)
-                display_df['sharpe'] = display_df['sharpe'].round(2)
-                display_df['max_dd'] = display_df['max_dd'].round(1)
-                display_df['profit_factor'] = display_df['profit_factor'].round(2)
-                
-                # Colora in base al PnL
-                def color_pnl(val):
-                    if val > 0:
-                        return 'color: #00ff88'
-                    elif val < 0:
-                        return 'color: #ff3344'
-                    return ''
-                
-                styled_df = display_df.style.map(color_pnl, subset=['pnl_totale'])
-                st.dataframe(styled_df, use_container_width=True, hide_index=True)
-                
-                # Grafico comparativo
-                st.markdown("### 📊 Performance Annuale per Asset")
-                
-                if not results.empty and 'anno' in results.columns and 'pnl_totale' in results.columns:
-                    fig = go.Figure()
-                    
-                    for asset in results['asset'].unique():
-                        asset_data = results[results['asset'] == asset]
-                        if not asset_data.empty:
-                            fig.add_trace(go.Bar(
-                                name=asset,
-                                x=asset_data['anno'].astype(str),
-                                y=asset_data['pnl_totale'],
-                                text=asset_data['pnl_totale'].round(1),
-                                textposition='outside',
-                                textfont=dict(size=10)
-                            ))
-                    
-                    if len(fig.data) > 0:
-                        fig.update_layout(
-                            template='plotly_dark',
-                            height=400,
-                            margin=dict(l=40, r=40, t=40, b=40),
-                            xaxis_title="Anno",
-                            yaxis_title="PnL %",
-                            barmode='group',
-                            legend=dict(
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1
-                            )
-                        )
-                        
-                        fig.update_yaxes(zeroline=True, zerolinecolor='#30363d')
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info("ℹ️ Dati insufficienti per il grafico")
-                
-                # Statistiche aggregate
-                st.markdown("### 📈 Statistiche Aggregate")
-                
-                col_s1, col_s2, col_s3, col_s4 = st.columns(4)
-                
-                with col_s1:
-                    st.metric(
-                        "Win Rate Medio", 
-                        f"{results['win_rate'].mean():.1f}%"
-                    )
-                
-                with col_s2:
-                    st.metric(
-                        "PnL Medio Annuo", 
-                        f"{results['pnl_totale'].mean():+.2f}%"
-                    )
-                
-                with col_s3:
-                    st.metric(
-                        "Sharpe Medio", 
-                        f"{results['sharpe'].mean():.2f}"
-                    )
-                
-                with col_s4:
-                    st.metric(
-                        "Max Drawdown Medio", 
-                        f"{abs(results['max_dd']).mean():.1f}%"
-                    )
-                
-                # Best e worst performer
-                col_b1, col_b2 = st.columns(2)
-                
-                with col_b1:
-                    best = results.loc[results['pnl_totale'].idxmax()]
-                    st.success(
-                        f"🏆 **Best Performer**: {best['asset']} {best['anno']} "
-                        f"con {best['pnl_totale']:+.2f}% (WR: {best['win_rate']:.1f}%)"
-                    )
-                
-                with col_b2:
-                    worst = results.loc[results['pnl_totale'].idxmin()]
-                    st.error(
-                        f"📉 **Worst Performer**: {worst['asset']} {worst['anno']} "
-                        f"con {worst['pnl_totale']:.2f}% (WR: {worst['win_rate']:.1f}%)"
-                    )
-                
-                # Consiglio finale
-                st.markdown("---")
-                if analysis['voto'] in ['A+', 'A']:
-                    st.success("✅ **STRATEGIA ROBUSTA** - I risultati sono eccellenti su più asset e anni. Puoi procedere con paper trading con alta confidenza!")
-                elif analysis['voto'] in ['B', 'C']:
-                    st.warning("⚠️ **STRATEGIA ACCETTABILE** - I risultati sono discreti ma non eccellenti. Considera di ottimizzare i parametri prima del paper trading.")
-                else:
-                    st.error("❌ **STRATEGIA DEBOLE** - I risultati non sono consistenti. Rivedi i parametri o la logica di trading prima di procedere.")
-                
-                # Download risultati
-                csv = results.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    "📥 Download Report CSV",
-                    csv,
-                    f"validazione_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                    "text/csv",
-                    use_container_width=True
-                )
-                
-            else:
-                st.warning("⚠️ Nessun risultato valido. Prova con parametri diversi o più asset.")
+        # Esegui validazione in background: le celle sono salvate man mano
+        start_validation_job(job, parallel, restart=not job.is_interrupted())
+    
+    # Ri-aggancio a un job in corso o interrotto con altri asset/anni
+    if job is None or job.status == 'pending':
+        for meta in list_jobs('validation'):
+            other = Job.from_meta(meta)
+            if other.is_active() or other.is_interrupted():
+                job = other
+                st.caption(f"🔗 Job di validazione su {', '.join(job.spec['assets'])} "
+                           f"({', '.join(map(str, job.spec['years']))})")
+                break
+    
+    if job is None:
+        return
+    
+    render_job_progress(
+        job, key="val_job",
+        label=f"📊 Analisi in corso su {len(job.spec['assets'])} asset per {len(job.spec['years'])} anni",
+        resume=lambda: start_validation_job(job, parallel)
+    )
+    
+    if job.status == 'done' and not job.is_active():
+        st.caption(f"🕒 Risultati del {job.meta['updated'].replace('T', ' ')}")
+        _render_validation_results(validation_results_from_job(job), min_trades, max_trades)
@@ -0,0 +1,229 @@
+# strategy/walk_forward.py
+# Walk-forward: ottimizzazione su finestre di training scorrevoli, verifica out-of-sample
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from strategy.params import StrategyParams
+from strategy.sweep import SweepEngine, param_grid
+from strategy.backtest import WARMUP_BARS, trades_frame
+from strategy.annual_backtest import load_annual_history, calculate_performance_metrics
+from strategy.optimizer import asset_search_space, composite_score
+from indicators.mtf import resample_closes
+from config import WF_TRAIN_MONTHS, WF_TEST_MONTHS
+
+def window_bounds(times: pd.Series, train_months: int, test_months: int,
+                  start: int = WARMUP_BARS) -> List[Tuple[int, int, int]]:
+    """
+    Finestre (inizio training, inizio test, fine test) come indici di candela.
+
+    Il training copre train_months mesi, il test i test_months successivi;
+    ad ogni passo tutto scorre di test_months, così i test sono contigui.
+    """
+    ts = pd.DatetimeIndex(pd.to_datetime(times))
+    n = len(ts)
+    if n <= start:
+        return []
+    t0 = ts[start]
+    bounds = []
+    k = 0
+    while True:
+        train_start = t0 + pd.DateOffset(months=k * test_months)
+        test_start = train_start + pd.DateOffset(months=train_months)
+        test_end = test_start + pd.DateOffset(months=test_months)
+        a, b, c = (int(ts.searchsorted(t)) for t in (train_start, test_start, test_end))
+        if b >= n:
+            break
+        bounds.append((max(a, start), b, min(c, n)))
+        k += 1
+    return bounds
+
+def walk_forward(engine: SweepEngine, entry_grid: Sequence[StrategyParams],
+                 sl_values: Sequence[float], tp_values: Sequence[float],
+                 train_months: int = WF_TRAIN_MONTHS, test_months: int = WF_TEST_MONTHS,
+                 score: Callable[[Dict], float] = composite_score,
+                 progress: Optional[Callable[[int, int], None]] = None) -> Optional[Dict]:
+    """
+    Ottimizzazione walk-forward su un SweepEngine costruito sull'intero storico.
+
+    Indicatori e classificazione dei segnali sono quelli dell'engine,
+    quindi condivisi da tutte le finestre: ogni finestra di training
+    costa solo la simulazione dei trade sulle sue candele. Il miglior
+    set (soglie di entrata x SL/TP) di ogni training è applicato al test
+    successivo; i trade out-of-sample sono cuciti in un'unica equity,
+    con una posizione alla volta anche a cavallo delle finestre.
+
+    Returns:
+        dict con 'windows' (una riga per finestra), 'trades' (trade
+        out-of-sample con colonna 'window'), 'equity' (time_exit, equity
+        cumulata in %), 'stats' (calculate_performance_metrics), oppure
+        None se lo storico non basta per una finestra
+    """
+    times = engine.df_ind['datetime']
+    bounds = window_bounds(times, train_months, test_months)
+    if not bounds:
+        return None
+
+    rows = []
+    oos = []
+    free_from = 0  # Prima candela utile dopo l'ultima uscita out-of-sample
+    for w, (train_start, test_start, test_end) in enumerate(bounds, 1):
+        # Training: migliore cella del cubo SL x TP per ogni set di soglie
+        best = None
+        for params in entry_grid:
+            cube = engine.exit_grid(params, sl_values, tp_values, bars=test_start, start=train_start)
+            for (sl, tp), stats in cube['stats'].items():
+                if stats['n'] == 0:
+                    continue
+                s = score(stats)
+                if best is None or s > best[0]:
+                    best = (s, params.with_(sl_atr=sl, tp_atr=tp), stats)
+
+        row = {
+            'window': w,
+            'train_start': times.iloc[train_start],
+            'test_start': times.iloc[test_start],
+            'test_end': times.iloc[test_end - 1],
+        }
+        if best is not None:
+            s, params, train_stats = best
+            # Test: entrate solo nella finestra, uscite anche dopo la sua fine
+            trades = engine.trades(params, bars=test_end, start=max(test_start, free_from), hold=True)
+            if len(trades['exit_idx']):
+                free_from = int(trades['exit_idx'][-1]) + 1
+                tdf = trades_frame(engine.df_ind, trades)
+                tdf['window'] = w
+                oos.append(tdf)
+            test_pnl = trades['pnl_pct']
+            row.update({
+                'ADX': params.adx_min,
+                'RSI_LONG': params.rsi_long_max,
+                'RSI_SHORT': params.rsi_short_min,
+                'SL': params.sl_atr,
+                'TP': params.tp_atr,
+                'train_trades': train_stats['n'],
+                'train_pnl': train_stats['total_pnl_pct'],
+                'train_score': s,
+                'test_trades': len(test_pnl),
+                'test_win_rate': float((test_pnl > 0).mean() * 100) if len(test_pnl) else 0.0,
+                'test_pnl': float(test_pnl.sum())
+            })
+        rows.append(row)
+        if progress:
+            progress(w, len(bounds))
+
+    trades_oos = pd.concat(oos, ignore_index=True) if oos else pd.DataFrame()
+    equity = pd.DataFrame({
+        'time_exit': trades_oos['time_exit'] if not trades_oos.empty else [],
+        'equity': trades_oos['pnl_pct'].cumsum() if not trades_oos.empty else []
+    })
+    return {
+        'windows': pd.DataFrame(rows),
+        'trades': trades_oos,
+        'equity': equity,
+        'stats': calculate_performance_metrics(trades_oos)
+    }
+
+def run_walk_forward(symbol: str, train_months: int = WF_TRAIN_MONTHS,
+                     test_months: int = WF_TEST_MONTHS, use_mtf: bool = True,
+                     progress: Optional[Callable[[int, int], None]] = None) -> Optional[Dict]:
+    """Walk-forward sullo storico 1h dell'asset con la griglia di asset_search_space"""
+    df = load_annual_history(symbol)
+    if df is None:
+        return None
+
+    df_1h = df_4h = None
+    if use_mtf:
+        df_1h = df
+        df_4h = resample_closes(df, 4)
+    engine = SweepEngine(df, use_mtf=use_mtf, df_1h=df_1h, df_4h=df_4h, symbol=symbol)
+
+    space = asset_search_space(symbol)
+    entry_grid = param_grid(
+        StrategyParams.from_config(),
+        adx_min=space['adx'],
+        rsi_long_max=space['rsi_long'],
+        rsi_short_min=space['rsi_short']
+    )
+    return walk_forward(engine, entry_grid, space['sl'], space['tp'],
+                        train_months, test_months, progress=progress)
+
+def render_walk_forward_panel(symbol):
+    """Renderizza pannello walk-forward"""
+
+    st.markdown("## 🔁 Walk-Forward")
+    st.caption(f"Ottimizzazione su finestre scorrevoli e verifica out-of-sample per **{symbol}**")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        train_months = st.selectbox("Mesi di training", [3, 6, 9, 12],
+                                    index=[3, 6, 9, 12].index(WF_TRAIN_MONTHS) if WF_TRAIN_MONTHS in [3, 6, 9, 12] else 1,
+                                    key="wf_train")
+    with col2:
+        test_months = st.selectbox("Mesi di test", [1, 2, 3],
+                                   index=[1, 2, 3].index(WF_TEST_MONTHS) if WF_TEST_MONTHS in [1, 2, 3] else 0,
+                                   key="wf_test")
+    with col3:
+        run_wf = st.button("🚀 AVVIA WALK-FORWARD", use_container_width=True, type="primary", key="wf_btn")
+
+    if not run_wf:
+        return
+
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    def show_progress(done, total):
+        progress_bar.progress(done / total)
+        status_text.text(f"🔄 Finestra {done}/{total}")
+
+    with st.spinner(f"📥 Caricamento storico {symbol}..."):
+        results = run_walk_forward(symbol, train_months, test_months, progress=show_progress)
+
+    progress_bar.empty()
+    status_text.empty()
+
+    if results is None:
+        st.warning(f"⚠️ Storico insufficiente per {symbol}")
+        return
+
+    stats = results['stats']
+    windows = results['windows']
+
+    st.success(f"✅ Walk-forward completato: {len(windows)} finestre")
+
+    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+    col_m1.metric("Trades OOS", stats['total_trades'])
+    col_m2.metric("Win Rate OOS", f"{stats['win_rate']:.1f}%")
+    col_m3.metric("PnL OOS", f"{stats['total_pnl']:+.2f}%")
+    col_m4.metric("Max DD", f"{stats['max_drawdown']:.1f}%")
+
+    equity = results['equity']
+    if not equity.empty:
+        st.markdown("#### 📈 Equity Out-of-Sample")
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=equity['time_exit'],
+            y=equity['equity'],
+            mode='lines',
+            line=dict(color='#f0b90b', width=3),
+            fill='tozeroy',
+            name='Equity OOS'
+        ))
+        # Inizio di ogni finestra di test
+        for t in windows['test_start']:
+            fig.add_vline(x=t, line_width=1, line_dash="dot", line_color="gray")
+
+        fig.update_layout(
+            template='plotly_dark',
+            height=300,
+            margin=dict(l=0, r=0, t=0, b=0),
+            yaxis_title="PnL Cumulativo %",
+            showlegend=False
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("📋 Parametri per finestra"):
+        st.dataframe(windows, use_container_width=True, hide_index=True)
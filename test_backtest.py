@@ -18,11 +18,47 @@ except Exception as e:
     print(f"❌ Errore import strategy.backtest: {e}")
 
 try:
-    from indicators.robust_ta import decide_signal, compute_indicators_15m
+    from indicators.robust_ta import decide_signal, compute_indicators_15m, classify_signals, check_backend_parity
     print("✅ indicators.robust_ta importato")
 except Exception as e:
     print(f"❌ Errore import indicators.robust_ta: {e}")
 
+try:
+    from indicators.panel import panel_signal_table
+    print("✅ indicators.panel importato")
+except Exception as e:
+    print(f"❌ Errore import indicators.panel: {e}")
+
+try:
+    from strategy.sweep import SweepEngine, param_grid
+    from strategy.parallel import parallel_exit_grids
+    from strategy.walk_forward import walk_forward
+    from strategy.result_store import BacktestResultStore, data_fingerprint, result_key
+    from strategy.pruning import PruneRules
+    from strategy.sweep import length_sweep
+    from strategy.history import HistoryStore
+    from strategy.portfolio import asset_trades, portfolio_backtest
+    from strategy.monte_carlo import monte_carlo
+    from storage.ohlcv_store import OHLCVStore
+    from providers.provider_cache import ProviderCache
+    from providers.fetch_executor import TokenBucket, FetchExecutor
+    from indicators.mtf import align_to, mtf_flags, resample_closes, mtf_cache
+    import providers.multi_provider as multi_provider
+    import providers.base_provider as base_provider
+    import providers.twelvedata_provider as twelvedata_provider
+    from strategy.money_manager import MoneyManager
+    from indicators.variants import IndicatorVariants, IndicatorLengths, length_grid
+    from indicators.numpy_kernels import compute_indicators_numpy, ewm_mean
+    import indicators.incremental as incremental
+    from indicators.cache import IndicatorCache
+    import strategy.jobs as jobs
+    import strategy.validator as validator
+    from strategy.trade_sim import first_exit, simulate_trades, exit_grid
+    from strategy.backtest import entry_candidates
+    print("✅ strategy.parallel importato")
+except Exception as e:
+    print(f"❌ Errore import strategy.parallel: {e}")
+
 try:
     from config import *
     print("✅ config importato")
@@ -107,6 +143,54 @@ def test_indicators(df):
         traceback.print_exc()
         return None
 
+# Test 1b: Parità backend indicatori
+def test_backend_parity(df):
+    """Confronta i kernel NumPy con pandas_ta"""
+    print("\n" + "-"*50)
+    print("TEST 1b: Parità Backend NumPy / pandas_ta")
+    print("-"*50)
+    
+    try:
+        # EWM: identica a pandas sia da zero sia ripresa a pezzi dallo stato
+        close = df['close'].to_numpy(dtype=np.float64).copy()
+        close[:3] = np.nan
+        close[len(close) // 3] = np.nan
+        half = len(close) // 2
+        for alpha, adjust, minp in [(2 / 201, False, 0), (1 / 14, True, 14)]:
+            ref = pd.Series(close).ewm(alpha=alpha, adjust=adjust, min_periods=minp).mean().to_numpy()
+            state = {}
+            head = ewm_mean(close[:half], alpha, adjust, minp, state=state)
+            tail = ewm_mean(close[half:], alpha, adjust, minp, state=state)
+            if not np.array_equal(ewm_mean(close, alpha, adjust, minp), ref, equal_nan=True):
+                print(f"❌ ewm_mean diversa da pandas (alpha={alpha:.4f}, adjust={adjust})")
+                return False
+            if not np.array_equal(np.concatenate([head, tail]), ref, equal_nan=True):
+                print(f"❌ ewm_mean ripresa dallo stato diversa (alpha={alpha:.4f}, adjust={adjust})")
+                return False
+        print("✅ ewm_mean identica a pandas, anche ripresa dallo stato")
+
+        report = check_backend_parity(df)
+        if not report['available']:
+            if report['ok'] is not None:
+                print("❌ Confronto senza pandas_ta riportato come superato")
+                return False
+            print("⚠️ pandas_ta non installato, confronto saltato")
+            return True
+        
+        for col, err in report['diffs'].items():
+            print(f"   {col}: errore max {err:.2e}")
+        
+        if not report['ok']:
+            print(f"❌ Colonne fuori tolleranza: {report['failed']}")
+            return False
+        print("✅ Backend NumPy allineato a pandas_ta")
+        return True
+    except Exception as e:
+        print(f"❌ Errore confronto backend: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 # Test 2: Classificazione segnali
 def test_signal_classification(df_ind):
     """Test classificazione segnali STRONG/WEAK"""
@@ -141,6 +225,73 @@ def test_signal_classification(df_ind):
         traceback.print_exc()
         return False
 
+# Test 2b: Classificazione vettoriale
+def test_classify_signals(df_ind):
+    """Verifica che classify_signals coincida con decide_signal candela per candela"""
+    print("\n" + "-"*50)
+    print("TEST 2b: Classificazione Vettoriale")
+    print("-"*50)
+    
+    try:
+        mtf_long = np.array([i % 3 != 0 for i in range(len(df_ind))])
+        mtf_short = np.array([i % 4 != 0 for i in range(len(df_ind))])
+        sig = classify_signals(df_ind, mtf_long, mtf_short)
+        
+        mismatches = 0
+        for i in range(210, len(df_ind)):
+            ref = decide_signal(df_ind.iloc[:i+1], mtf_long[i], mtf_short[i])
+            if ref['signal'] != sig['signal'][i] or ref['strength'] != sig['strength'][i]:
+                mismatches += 1
+        
+        n_signals = int((sig['signal'][210:] != "NONE").sum())
+        print(f"   Segnali: {n_signals} | Differenze: {mismatches}")
+        
+        if mismatches:
+            print("❌ classify_signals diverge da decide_signal")
+            return False
+        print("✅ classify_signals coincide con decide_signal")
+        return True
+    except Exception as e:
+        print(f"❌ Errore classificazione vettoriale: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+# Test 2c: Pannello multi-simbolo
+def test_panel_signals(df):
+    """Verifica che la tabella del pannello coincida con il calcolo per simbolo"""
+    print("\n" + "-"*50)
+    print("TEST 2c: Pannello Multi-Simbolo")
+    print("-"*50)
+    
+    try:
+        # Storici di lunghezza diversa per verificare l'allineamento
+        frames = {f"SYM{k}": df.iloc[:len(df) - k * 37].reset_index(drop=True) for k in range(5)}
+        table = panel_signal_table(frames)
+        
+        mismatches = 0
+        for sym, frame in frames.items():
+            ind = compute_indicators_15m(frame)
+            ref = decide_signal(ind, True, True)
+            row = table.loc[sym]
+            if ref['signal'] != row['signal'] or ref['strength'] != row['strength']:
+                mismatches += 1
+            for col in ['ema200', 'rsi', 'atr', 'ADX_14']:
+                if not np.isclose(ind[col].iloc[-1], row[col], rtol=1e-9, equal_nan=True):
+                    mismatches += 1
+        
+        print(f"   Simboli: {len(table)} | Differenze: {mismatches}")
+        if mismatches:
+            print("❌ Il pannello diverge dal calcolo per simbolo")
+            return False
+        print("✅ Pannello coincide con il calcolo per simbolo")
+        return True
+    except Exception as e:
+        print(f"❌ Errore pannello multi-simbolo: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 # Test 3: Backtest engine
 def test_backtest_engine(df):
     """Test esecuzione backtest"""
@@ -189,6 +340,1372 @@ def test_backtest_engine(df):
         traceback.print_exc()
         return None
 
+# Test 3b: Ottimizzazione parallela
+def test_parallel_sweep(df):
+    """Verifica che il process pool dia gli stessi cubi SL/TP della modalità seriale"""
+    print("\n" + "-"*50)
+    print("TEST 3b: Ottimizzazione Parallela")
+    print("-"*50)
+    
+    try:
+        engine = SweepEngine(df, use_mtf=False)
+        grid = param_grid(adx_min=[18, 22], rsi_long_max=[65, 70])
+        sl_values, tp_values = [1.5, 2.0], [3.0, 4.0]
+        
+        serial = {p: engine.exit_grid(p, sl_values, tp_values) for p in grid}
+        parallel = parallel_exit_grids(engine, grid, sl_values, tp_values, workers=2)
+        
+        mismatches = sum(1 for p in grid if parallel[p] is None or parallel[p]['stats'] != serial[p]['stats'])
+        print(f"   Combinazioni: {len(grid)} | Differenze: {mismatches}")
+        if mismatches:
+            print("❌ La modalità parallela diverge da quella seriale")
+            return False
+        print("✅ Modalità parallela coincide con quella seriale")
+        return True
+    except Exception as e:
+        print(f"❌ Errore ottimizzazione parallela: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+# Test 3c: Ricerca adattiva
+def test_halving_search(df):
+    """Verifica valutazione su tratto iniziale e report della ricerca adattiva"""
+    print("\n" + "-"*50)
+    print("TEST 3c: Ricerca Adattiva")
+    print("-"*50)
+    
+    try:
+        engine = SweepEngine(df, use_mtf=False)
+        params = param_grid()[0]
+        
+        # Il tratto iniziale equivale a un backtest sulle sole prime candele
+        bars = len(df) // 2
+        head = backtest_engine(df.iloc[:bars].reset_index(drop=True), use_mtf=False)['stats']
+        if engine.evaluate(params, bars) != head:
+            print("❌ Valutazione su tratto iniziale diversa dal backtest troncato")
+            return False
+        
+        grid = param_grid(adx_min=[18, 20, 22, 25], sl_atr=[1.5, 2.0, 2.5], tp_atr=[3.0, 4.0, 5.0])
+        survivors, report = engine.halving_search(grid, lambda s: s['total_pnl_pct'], budget=10)
+        print(f"   Candidati: {report['candidates']} | Esplorati: {report['sampled']} | "
+              f"Backtest completi evitati: {report['avoided_full_backtests']}")
+        if report['full_backtests'] != len(survivors) or report['cost_full_equivalent'] > 10.5:
+            print("❌ Report della ricerca adattiva incoerente")
+            return False
+        
+        # Soglie della ricerca adattiva su intervalli fitti (float): il pannello risultati le formatta
+        from strategy.params import StrategyParams
+        from strategy.optimizer import _widen, _result_row, _optimizer_result, _render_optimizer_results
+        grid = param_grid(adx_min=_widen([18, 22], 1), rsi_long_max=_widen([65, 70], 2.5),
+                          sl_atr=_widen([1.5, 2.0], 0.1), tp_atr=[3.0, 4.0])
+        survivors, report = engine.halving_search(grid, lambda s: s['total_pnl_pct'], budget=6)
+        rows = [_result_row(r['sl_atr'], r['tp_atr'], StrategyParams.from_dict(r.to_dict()), r.to_dict())
+                for _, r in survivors.iterrows()]
+        _render_optimizer_results("TEST", _optimizer_result("TEST", 2025, rows, lambda best: None, report))
+        print("✅ Ricerca adattiva coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore ricerca adattiva: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+# Test 3d: Walk-forward
+def test_walk_forward(df):
+    """Verifica finestre walk-forward e continuità dei trade out-of-sample"""
+    print("\n" + "-"*50)
+    print("TEST 3d: Walk-Forward")
+    print("-"*50)
+    
+    try:
+        engine = SweepEngine(df, use_mtf=False)
+        grid = param_grid(adx_min=[18, 22])
+        results = walk_forward(engine, grid, [1.5, 2.0], [3.0, 4.0], train_months=1, test_months=1)
+        
+        # Dati troppo corti: nessuna finestra è un esito valido
+        if results is None:
+            print("⚠️ Storico troppo corto per una finestra walk-forward")
+            return True
+        
+        windows, trades = results['windows'], results['trades']
+        print(f"   Finestre: {len(windows)} | Trades OOS: {results['stats']['total_trades']}")
+        if not trades.empty and not trades['time_exit'].is_monotonic_increasing:
+            print("❌ Trade out-of-sample sovrapposti fra finestre")
+            return False
+        if not (windows['test_start'] > windows['train_start']).all():
+            print("❌ Finestre di test non successive al training")
+            return False
+        print("✅ Walk-forward coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore walk-forward: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_result_store(df):
+    """Verifica round-trip dell'archivio risultati e chiavi per dati/parametri"""
+    print("\n" + "-"*50)
+    print("TEST 3e: Archivio Risultati")
+    print("-"*50)
+    
+    import tempfile
+    try:
+        from strategy.params import StrategyParams
+        engine = SweepEngine(df, use_mtf=False)
+        params = StrategyParams.from_config()
+        trades = engine.trades(params)
+        from strategy.backtest import trades_frame
+        tdf = trades_frame(engine.df_ind, trades)
+        
+        with tempfile.TemporaryDirectory() as root:
+            store = BacktestResultStore(root, max_mb=16)
+            fp = data_fingerprint(df, "TEST", "15m")
+            key = result_key(fp, params, kind="test")
+            if store.get(key) is not None:
+                print("❌ Risultato presente prima del salvataggio")
+                return False
+            store.put(key, tdf, {'n': len(tdf)})
+            cached = store.get(key)
+            if cached is None:
+                print("❌ Risultato non trovato dopo il salvataggio")
+                return False
+            loaded, payload = cached
+            pd.testing.assert_frame_equal(loaded.reset_index(drop=True), tdf.reset_index(drop=True),
+                                          check_dtype=False)
+            print(f"   Trades salvati: {payload['n']} | {store.stats()}")
+            
+            # File troncato o corrotto: conta come assente
+            with open(store._path(key), "rb") as f:
+                blob = f.read()
+            for broken in (blob[:len(blob) // 2], b"non un npz"):
+                with open(store._path(key), "wb") as f:
+                    f.write(broken)
+                if store.get(key) is not None:
+                    print("❌ File corrotto restituito come risultato")
+                    return False
+        
+        # Anno chiuso: candele arrivate dopo la fine dell'anno non cambiano l'impronta
+        from strategy.history import history_until
+        shifted = df.assign(datetime=pd.date_range("2024-12-01", periods=len(df), freq="15min"))
+        until = history_until(shifted, 2024)
+        if len(until) != 31 * 96 or history_until(shifted.iloc[:-96], 2024).shape != until.shape:
+            print(f"❌ Storico fino a fine anno errato: {len(until)} candele")
+            return False
+        if data_fingerprint(history_until(shifted.iloc[:-96], 2024), "TEST", "1h") != data_fingerprint(until, "TEST", "1h"):
+            print("❌ Impronta dell'anno chiuso cambiata dal ricaricamento dello storico")
+            return False
+        
+        # Dati o parametri diversi -> chiave diversa
+        if result_key(fp, params.with_(adx_min=params.adx_min + 5), kind="test") == key:
+            print("❌ Chiave invariata al variare dei parametri")
+            return False
+        if result_key(data_fingerprint(df.iloc[:-1], "TEST", "15m"), params, kind="test") == key:
+            print("❌ Chiave invariata al variare dei dati")
+            return False
+        print("✅ Archivio risultati coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore archivio risultati: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_pruning(df):
+    """Verifica che le combinazioni interrotte coincidano fra exit_grid ed evaluate"""
+    print("\n" + "-"*50)
+    print("TEST 3f: Pruning Combinazioni")
+    print("-"*50)
+    
+    try:
+        engine = SweepEngine(df, use_mtf=False)
+        params = param_grid(adx_min=[18])[0]
+        sl_values, tp_values = [1.5, 2.0], [3.0, 4.0]
+        
+        # Regole disattivate: stessi risultati dello sweep senza pruning
+        plain = engine.exit_grid(params, sl_values, tp_values)
+        off = engine.exit_grid(params, sl_values, tp_values, prune=PruneRules())
+        if any(off['stats'][k]['n'] != s['n'] or off['stats'][k]['pruned'] for k, s in plain['stats'].items()):
+            print("❌ Regole disattivate cambiano i risultati")
+            return False
+        
+        # Regole severe: stessa interruzione nella griglia e nel backtest singolo
+        rules = PruneRules(max_drawdown_pct=2.0, min_trades=1000)
+        cube = engine.exit_grid(params, sl_values, tp_values, prune=rules)
+        for (sl, tp), stats in cube['stats'].items():
+            single = engine.evaluate(params.with_(sl_atr=sl, tp_atr=tp), prune=rules)
+            if single['pruned'] != stats['pruned'] or single['n'] != stats['n']:
+                print(f"❌ SL {sl} / TP {tp}: griglia {stats['pruned']} ({stats['n']}), "
+                      f"singolo {single['pruned']} ({single['n']})")
+                return False
+        print(f"   Celle interrotte: {int(cube['pruned'].sum())}/{cube['pruned'].size}")
+        print("✅ Pruning coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore pruning: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_length_sweep(df):
+    """Verifica che le varianti di lunghezza coincidano con il calcolo diretto"""
+    print("\n" + "-"*50)
+    print("TEST 3g: Sweep Lunghezze Indicatori")
+    print("-"*50)
+    
+    try:
+        # Lunghezze di config: stesso DataFrame di compute_indicators_numpy
+        variants = IndicatorVariants(df)
+        pd.testing.assert_frame_equal(variants.frame(IndicatorLengths()), compute_indicators_numpy(df))
+        
+        grid = length_grid(rsi_len=[10, 14], adx_len=[10, 14], st_mult=[2.0, 3.0])
+        params = param_grid()[0]
+        results, report = length_sweep(df, grid, params, [2.0], [4.0], use_mtf=False)
+        if len(results) != len(grid):
+            print(f"❌ Righe attese {len(grid)}, ottenute {len(results)}")
+            return False
+        
+        # Variante di default uguale al motore standard
+        row = results[(results['rsi_len'] == 14) & (results['adx_len'] == 14) & (results['st_mult'] == 3.0)].iloc[0]
+        stats = SweepEngine(df, use_mtf=False).evaluate(params.with_(sl_atr=2.0, tp_atr=4.0))
+        if row['n'] != stats['n'] or abs(row['total_pnl_pct'] - stats['total_pnl_pct']) > 1e-9:
+            print(f"❌ Variante di default: {row['n']} trade vs {stats['n']}")
+            return False
+        print(f"   Varianti: {len(grid)} | serie calcolate {report['computed']}, riusate {report['reused']}")
+        print("✅ Sweep lunghezze coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore sweep lunghezze: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_history_store(df):
+    """Verifica un solo download per simbolo e viste per anno uguali al filtro"""
+    print("\n" + "-"*50)
+    print("TEST 3h: Storico Condiviso")
+    print("-"*50)
+    
+    try:
+        fetched = []
+        store = HistoryStore(loader=lambda symbol, interval, period: fetched.append(symbol) or df)
+        times = pd.to_datetime(df['datetime'])
+        for year in sorted(times.dt.year.unique()):
+            view = store.year("TEST", year)
+            expected = df[times.dt.year == year]
+            if view is None or not view.index.equals(expected.index):
+                print(f"❌ Vista {year} diversa dal filtro per anno")
+                return False
+        if store.year("TEST", 1990) is not None:
+            print("❌ Anno fuori dallo storico non segnalato")
+            return False
+        if len(fetched) != 1:
+            print(f"❌ Download ripetuti: {len(fetched)}")
+            return False
+        print(f"   Storico {store.coverage('TEST')[0]:%Y-%m-%d} → {store.coverage('TEST')[1]:%Y-%m-%d}, download: {len(fetched)}")
+        print("✅ Storico condiviso coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore storico condiviso: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_portfolio_backtest(df):
+    """Verifica limiti di rischio e drawdown del backtest di portafoglio"""
+    print("\n" + "-"*50)
+    print("TEST 3i: Backtest di Portafoglio")
+    print("-"*50)
+    
+    try:
+        # Stesso asset con prezzi scalati: entrate simultanee che competono per il rischio
+        assets = {}
+        for k, scale in enumerate((1.0, 2.0, 0.5)):
+            df_k = df.copy()
+            df_k[['open', 'high', 'low', 'close']] *= scale
+            assets[f"T{k}"] = asset_trades(SweepEngine(df_k, use_mtf=False))
+        
+        mm = MoneyManager(initial_capital=10000)
+        mm.max_risk_total = 0.005
+        result = portfolio_backtest(assets, money_manager=mm)
+        trades = result['trades']
+        if trades.empty:
+            print("❌ Nessun trade eseguito")
+            return False
+        
+        # Rischio aperto sempre entro il limite (sul capitale realizzato)
+        events = sorted(
+            [(t, 1, r, 0.0) for t, r in zip(trades['time_entry'], trades['risk'])]
+            + [(t, 0, -r, p) for t, r, p in zip(trades['time_exit'], trades['risk'], trades['pnl'])],
+            key=lambda e: (e[0], e[1])
+        )
+        capital, open_risk = 10000.0, 0.0
+        for _, kind, risk, pnl in events:
+            open_risk += risk
+            capital += pnl
+            if kind == 1 and open_risk > capital * mm.max_risk_total + 1e-6:
+                print(f"❌ Rischio aperto {open_risk:.2f} oltre il limite")
+                return False
+        if abs(result['equity']['equity'].iloc[-1] - (10000 + trades['pnl'].sum())) > 1e-6:
+            print("❌ Equity finale diversa dalla somma dei PnL")
+            return False
+        
+        # Drawdown minimo: nuove entrate sospese
+        mm = MoneyManager(initial_capital=10000)
+        mm.max_drawdown_limit = 0.0001
+        halted = portfolio_backtest(assets, money_manager=mm)
+        if halted['stats']['halted'] and halted['skipped']['drawdown'] == 0:
+            print("❌ Sospensione per drawdown senza entrate scartate")
+            return False
+        
+        print(f"   Trade eseguiti: {len(trades)} | scartati per rischio: {result['skipped']['risk']} | "
+              f"sospeso: {halted['stats']['halted']}")
+        print("✅ Portafoglio coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore portafoglio: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_resumable_backtest(df):
+    """Verifica che extend() su nuove candele coincida con il backtest completo"""
+    print("\n" + "-"*50)
+    print("TEST 3j: Backtest Incrementale")
+    print("-"*50)
+    
+    try:
+        full = backtest_engine(df, use_mtf=False)
+        split = len(df) * 2 // 3
+        state = backtest_engine(df.iloc[:split], use_mtf=False, resumable=True)['state']
+        
+        # Un blocco e poi candela per candela
+        step = split + (len(df) - split) // 2
+        result = state.extend(df.iloc[split:step])
+        for i in range(step, len(df)):
+            result = state.extend(df.iloc[i:i + 1])
+        
+        pd.testing.assert_frame_equal(result['trades'], full['trades'], check_exact=True)
+        if result['stats'] != full['stats'] or state.full_runs != 1:
+            print(f"❌ Statistiche diverse o ricalcoli inattesi ({state.full_runs})")
+            return False
+        
+        # Candela con high == low: il true range cambia, ricalcolo completo
+        flat = df.copy()
+        flat.loc[flat.index[step], ['high', 'low']] = flat['close'].iloc[step]
+        state = backtest_engine(flat.iloc[:split], use_mtf=False, resumable=True)['state']
+        result = state.extend(flat.iloc[split:])
+        pd.testing.assert_frame_equal(result['trades'], backtest_engine(flat, use_mtf=False)['trades'], check_exact=True)
+        if state.full_runs != 2:
+            print("❌ Candela con high == low non ha forzato il ricalcolo")
+            return False
+        
+        print(f"   Trade: {full['stats']['n']} | estensioni: {len(df) - step + 1}")
+        print("✅ Backtest incrementale identico al completo")
+        return True
+    except Exception as e:
+        print(f"❌ Errore backtest incrementale: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_monte_carlo(df):
+    """Verifica intervalli Monte Carlo e rischio di rovina"""
+    print("\n" + "-"*50)
+    print("TEST 3k: Monte Carlo")
+    print("-"*50)
+    
+    try:
+        import time
+        trades = backtest_engine(df, use_mtf=False)['trades']
+        total = trades['pnl_pct'].sum()
+        
+        start = time.perf_counter()
+        boot = monte_carlo(trades, n_sims=10000, method="bootstrap", seed=1)
+        elapsed = time.perf_counter() - start
+        final = boot['intervals'].set_index('metric').loc['final_pnl']
+        if not final['low'] <= total <= final['high']:
+            print(f"❌ PnL osservato {total:.2f} fuori dall'intervallo [{final['low']:.2f}, {final['high']:.2f}]")
+            return False
+        
+        # Il rimescolamento cambia solo l'ordine: PnL finale costante
+        shuffle = monte_carlo(trades, n_sims=2000, method="shuffle", seed=1)
+        if np.ptp(shuffle['samples']['final_pnl']) > 1e-9:
+            print("❌ Shuffle con PnL finale variabile")
+            return False
+        block = monte_carlo(trades, n_sims=2000, method="block", seed=1)
+        if block['samples']['final_pnl'].shape != (2000,):
+            print("❌ Numero di simulazioni errato")
+            return False
+        
+        # Solo perdite: rovina certa oltre il drawdown del Money Manager
+        losing = trades.assign(pnl_pct=-abs(trades['pnl_pct']) - 1)
+        ruin = monte_carlo(losing, n_sims=1000, seed=1)
+        if ruin['risk_of_ruin'] != 100 or boot['risk_of_ruin'] > ruin['risk_of_ruin']:
+            print(f"❌ Rischio di rovina incoerente: {ruin['risk_of_ruin']}")
+            return False
+        if ruin['intervals'].set_index('metric').loc['capital_drawdown', 'high'] > -MoneyManager().max_drawdown_limit * 100:
+            print("❌ Drawdown del capitale sotto il limite nonostante la rovina")
+            return False
+        
+        print(f"   10000 bootstrap su {len(trades)} trade in {elapsed:.2f}s | "
+              f"PnL {final['low']:.1f}% .. {final['high']:.1f}% | rovina {boot['risk_of_ruin']:.1f}%")
+        print("✅ Monte Carlo coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore Monte Carlo: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_ohlcv_store(df):
+    """Verifica archivio OHLCV locale con download incrementali"""
+    print("\n" + "-"*50)
+    print("TEST 3l: Archivio OHLCV Locale")
+    print("-"*50)
+    
+    try:
+        import tempfile
+        source = df.copy()
+        source['datetime'] = pd.to_datetime(source['datetime'], utc=True).dt.tz_convert('America/New_York')
+        times = pd.to_datetime(source['datetime'], utc=True)
+        end = [len(source) // 2]
+        calls = []
+        
+        def fetch_full():
+            calls.append('full')
+            return source.iloc[:end[0]].copy()
+        
+        def fetch_since(since):
+            calls.append('since')
+            return source.iloc[:end[0]][times.iloc[:end[0]] >= since].copy()
+        
+        with tempfile.TemporaryDirectory() as root:
+            store = OHLCVStore(root, max_segments=4)
+            store.sync("test", "BTC-USD", "15m", None, fetch_full, fetch_since)
+            
+            # L'ultima candela salvata era ancora in formazione: il delta la sostituisce
+            source.loc[source.index[end[0] - 1], 'close'] += 1.0
+            while end[0] < len(source):
+                end[0] = min(end[0] + 100, len(source))
+                stored, ok = store.sync("test", "BTC-USD", "15m", None, fetch_full, fetch_since)
+            
+            expected = source[['datetime', 'open', 'high', 'low', 'close', 'volume']].reset_index(drop=True)
+            pd.testing.assert_frame_equal(stored, expected, check_dtype=False)
+            if calls.count('full') != 1 or not ok:
+                print(f"❌ Download completi inattesi: {calls.count('full')}")
+                return False
+            if len(store._segments(store._dir("test", "BTC-USD", "15m"))) > 4:
+                print("❌ Segmenti non compattati")
+                return False
+            
+            tail = store.load("test", "BTC-USD", "15m", start=expected['datetime'].iloc[-10])
+            if len(tail) != 10 or store.high_water_mark("test", "BTC-USD", "15m") != times.iloc[-1]:
+                print("❌ Lettura per intervallo o high-water mark errati")
+                return False
+        
+        stats = store.stats()
+        print(f"   Download: {stats['full_fetches']} completo, {stats['delta_fetches']} incrementali | "
+              f"righe scritte: {stats['rows_appended']}")
+        print("✅ Archivio OHLCV coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore archivio OHLCV: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_provider_cache(df):
+    """Verifica cache SQLite dei provider: round-trip, TTL, limite di dimensione e concorrenza"""
+    print("\n" + "-"*50)
+    print("TEST 3m: Cache Provider")
+    print("-"*50)
+    
+    try:
+        import tempfile
+        import threading
+        import time
+        frame = df.copy()
+        frame['datetime'] = pd.to_datetime(frame['datetime'], utc=True)
+        
+        with tempfile.TemporaryDirectory() as root:
+            cache = ProviderCache("test", ttl=60, root=root, max_mb=1, memory_items=2)
+            cache.put("k", (frame, "TwelveData"))
+            cache.put("err", (None, "NO_KEY"))
+            
+            # Lettura dal database (nuova istanza, memoria vuota) e dalla memoria
+            disk = ProviderCache("test", ttl=60, root=root, max_mb=1, memory_items=2)
+            for source in (disk, disk):
+                value, status = source.get("k")
+                pd.testing.assert_frame_equal(value, frame)
+                if status != "TwelveData":
+                    print("❌ Stato non conservato")
+                    return False
+                value['extra'] = 1.0  # Non deve toccare la copia in cache
+            if 'extra' in disk.get("k")[0].columns or disk.get("err") != (None, "NO_KEY"):
+                print("❌ Valore in cache alterato")
+                return False
+            if disk.memory_hits < 2 or disk.get("assente") is not None or disk.misses != 1:
+                print(f"❌ Contatori errati: {disk.stats()}")
+                return False
+            
+            # Indice (DatetimeIndex) e testo mancante conservati dal database
+            indexed = frame.iloc[:50].set_index('datetime')
+            indexed['note'] = ['x', None] * 25
+            cache.put("idx", indexed)
+            restored = ProviderCache("test", ttl=60, root=root, max_mb=1, memory_items=2).get("idx")
+            pd.testing.assert_frame_equal(restored, indexed)
+            
+            # La voce in memoria non condivide il DataFrame del chiamante
+            mutable = frame.iloc[:10].copy()
+            cache.put("mut", mutable)
+            mutable.loc[mutable.index[0], 'close'] = -1.0
+            if cache.get("mut")['close'].iloc[0] == -1.0:
+                print("❌ Modifica del chiamante propagata alla cache in memoria")
+                return False
+            
+            # TTL scaduto
+            expired = ProviderCache("ttl", ttl=0.05, root=root)
+            expired.put("k", 1)
+            time.sleep(0.1)
+            if expired.get("k") is not None:
+                print("❌ Voce scaduta restituita")
+                return False
+            
+            # Limite di dimensione: restano le voci usate più di recente
+            small = ProviderCache("small", ttl=60, root=root, max_mb=0.2, memory_items=0)
+            block = np.random.default_rng(0).random(10000)
+            for i in range(5):
+                small.put(f"b{i}", block)
+                small.get("b0")
+            stats = small.stats()
+            if stats['evictions'] == 0 or stats['mb'] > 0.2 or small.get("b0") is None or small.get("b4") is None:
+                print(f"❌ Evizione LRU errata: {stats}")
+                return False
+            
+            # Scritture e letture concorrenti: mai valori parziali
+            errors = []
+            def worker(n):
+                try:
+                    for i in range(20):
+                        disk.put(f"c{n}_{i}", (frame.iloc[:100], str(i)))
+                        got = disk.get(f"c{(n + 1) % 4}_{i}")
+                        if got is not None and len(got[0]) != 100:
+                            errors.append(len(got[0]))
+                except Exception as e:
+                    errors.append(e)
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            if errors:
+                print(f"❌ Errori concorrenti: {errors[:3]}")
+                return False
+            stats = disk.stats()
+        
+        print(f"   Voci: {stats['entries']} | hit: {stats['hits']} (memoria {stats['memory_hits']}) | "
+              f"miss: {stats['misses']} | evizioni LRU: {small.stats()['evictions']}")
+        print("✅ Cache provider coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore cache provider: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_fetch_executor(df):
+    """Verifica token bucket e fetch concorrenti: quote, ordine dei risultati, errori e progresso"""
+    print("\n" + "-"*50)
+    print("TEST 3n: Fetch Concorrenti")
+    print("-"*50)
+    
+    try:
+        import time
+        
+        # Token bucket: raffica fino alla capacità, poi un gettone ogni 0.1s (600/minuto)
+        bucket = TokenBucket(600, capacity=2)
+        start = time.perf_counter()
+        for _ in range(7):
+            bucket.acquire()
+        bucket_elapsed = time.perf_counter() - start
+        if not 0.4 <= bucket_elapsed < 1.0:
+            print(f"❌ Ritmo del token bucket errato: {bucket_elapsed:.2f}s per 7 gettoni")
+            return False
+        
+        executor = FetchExecutor(max_workers=4, default_rate_per_min=6000)
+        if executor.bucket('finnhub').rate != 1.0 or executor.bucket('yahoo').rate != 100.0:
+            print("❌ Quote non prese da APIUsageTracker.get_limits")
+            return False
+        
+        # Ordine conservato, errori isolati, progresso chiamato per ogni simbolo
+        def fetch(i):
+            time.sleep(0.05 * (i % 3))
+            if i == 5:
+                raise ValueError("simbolo non valido")
+            return i * 2
+        calls = []
+        start = time.perf_counter()
+        results = executor.map('yahoo', fetch, range(12), progress=lambda done, total, item: calls.append((done, total)))
+        elapsed = time.perf_counter() - start
+        expected = [i * 2 if i != 5 else None for i in range(12)]
+        if results != expected:
+            print(f"❌ Risultati errati: {results}")
+            return False
+        if [c[0] for c in calls] != list(range(1, 13)) or any(c[1] != 12 for c in calls):
+            print(f"❌ Progresso errato: {calls}")
+            return False
+        
+        # Parallelo: molto meno della somma delle attese (0.55s in sequenza)
+        if elapsed > 0.4:
+            print(f"❌ Fetch non concorrenti: {elapsed:.2f}s")
+            return False
+        
+        print(f"   7 gettoni a 600/min in {bucket_elapsed:.2f}s | 12 fetch su 4 thread in {elapsed:.2f}s")
+        print("✅ Fetch concorrenti entro le quote")
+        return True
+    except Exception as e:
+        print(f"❌ Errore fetch concorrenti: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_fetch_many(df):
+    """Verifica download multi-ticker: divisione per simbolo, cache per simbolo e archivio incrementale"""
+    print("\n" + "-"*50)
+    print("TEST 3o: Download Multi-Ticker")
+    print("-"*50)
+    
+    try:
+        import tempfile
+        symbols = ["AAA", "BBB", "CCC"]
+        bars = df.copy()
+        bars.index = pd.DatetimeIndex(pd.to_datetime(bars.pop('datetime'), utc=True), name='Datetime')
+        bars = bars[['open', 'high', 'low', 'close', 'volume']].rename(columns=str.title)
+        # Formato largo di yf.download(group_by='ticker'); CCC quota solo metà delle candele
+        wide = pd.concat({s: bars * (i + 1) for i, s in enumerate(symbols)}, axis=1)
+        wide.loc[wide.index[:len(wide) // 2], "CCC"] = np.nan
+        end = [len(wide) - 200]
+        calls = []
+        
+        def fake_download(syms, interval="15m", period="1mo", start=None):
+            calls.append((tuple(syms), start))
+            part = wide.iloc[:end[0]]
+            if start is not None:
+                part = part[part.index >= start]
+            return multi_provider._split_download(part[list(syms)], syms)
+        
+        saved = (multi_provider._yahoo_download, multi_provider.ohlcv_store, multi_provider.yahoo_cache)
+        with tempfile.TemporaryDirectory() as root:
+            try:
+                multi_provider._yahoo_download = fake_download
+                multi_provider.ohlcv_store = OHLCVStore(root)
+                multi_provider.yahoo_cache = ProviderCache("yahoo", ttl=60, root=root)
+                
+                frames = multi_provider.fetch_many(symbols + ["AAA"], "15m", "max")
+                if len(calls) != 1 or set(frames) != set(symbols) or len(frames["CCC"]) != end[0] - len(wide) // 2:
+                    print(f"❌ Download o divisione errati: {len(calls)} richieste")
+                    return False
+                if list(frames["BBB"].columns[:6]) != ['datetime', 'open', 'high', 'low', 'close', 'volume']:
+                    print(f"❌ Colonne non normalizzate: {list(frames['BBB'].columns)}")
+                    return False
+                
+                # Cache per simbolo: fetch_yahoo non fa richieste
+                cached = multi_provider.fetch_yahoo("BBB", "15m", "max")
+                pd.testing.assert_frame_equal(cached, frames["BBB"])
+                if len(calls) != 1:
+                    print("❌ fetch_yahoo non usa la cache del download multi-ticker")
+                    return False
+                
+                # Cache scaduta: un solo download incrementale dall'archivio
+                multi_provider.yahoo_cache.clear()
+                end[0] = len(wide)
+                frames = multi_provider.fetch_many(symbols, "15m", "max")
+                if len(calls) != 2 or calls[1][1] is None:
+                    print(f"❌ Download incrementale atteso: {calls}")
+                    return False
+                expected = bars * 2
+                if len(frames["BBB"]) != len(wide) or not np.allclose(frames["BBB"]['close'], expected['Close']):
+                    print("❌ Archivio non aggiornato con il delta")
+                    return False
+
+                # Delta oltre lo storico intraday di Yahoo: periodo intero
+                now = pd.Timestamp.now(tz='UTC')
+                if multi_provider._yahoo_window("15m", "max", now - pd.Timedelta(days=90)) != {'period': 'max'} \
+                        or 'start' not in multi_provider._yahoo_window("15m", "max", now - pd.Timedelta(days=1)):
+                    print("❌ Scelta periodo intero / delta errata")
+                    return False
+            finally:
+                multi_provider._yahoo_download, multi_provider.ohlcv_store, multi_provider.yahoo_cache = saved
+
+        # Fetch singolo: un gettone Yahoo preso da _yahoo_history stesso
+        acquired = []
+        saved = (multi_provider.yf, multi_provider.fetch_executor.acquire)
+        try:
+            history = bars.rename_axis('Datetime')
+            multi_provider.yf = type("FakeYF", (), {"Ticker": staticmethod(
+                lambda symbol: type("FakeTicker", (), {"history": staticmethod(lambda **kw: history)})())})
+            multi_provider.fetch_executor.acquire = lambda provider, tokens=1: acquired.append(provider)
+            single = multi_provider._yahoo_history("AAA", "15m", period="max")
+        finally:
+            multi_provider.yf, multi_provider.fetch_executor.acquire = saved
+        if acquired != ['yahoo'] or single is None or len(single) != len(bars):
+            print(f"❌ Gettoni Yahoo per fetch singolo: {acquired}")
+            return False
+        
+        print(f"   {len(symbols)} simboli in {len(calls)} richieste (1 completa, 1 incrementale)")
+        print("✅ Download multi-ticker coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore download multi-ticker: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_twelvedata_batch(df):
+    """Verifica time_series multi-simbolo TwelveData: blocchi, crediti, cache e archivio incrementale"""
+    print("\n" + "-"*50)
+    print("TEST 3p: TwelveData Multi-Simbolo")
+    print("-"*50)
+    
+    try:
+        import tempfile
+        symbols = ["BTC-USD", "ETH-USD", "AAPL", "NOPE"]
+        bars = df.copy()
+        bars['datetime'] = pd.to_datetime(bars['datetime'], utc=True).dt.strftime("%Y-%m-%d %H:%M:%S")
+        end = [len(bars) - 100]
+        requests_made = []
+        errors = {}  # simbolo TwelveData -> corpo di errore da restituire
+        
+        def fake_get(td_symbol, interval, outputsize, start=None):
+            requests_made.append((td_symbol, start))
+            if "*" in errors:
+                return errors["*"], None  # Richiesta intera in errore
+            part = bars.iloc[:end[0]]
+            if start is not None:
+                part = part[pd.to_datetime(part['datetime'], utc=True) >= start]
+            # Formato TwelveData: valori stringa dal più recente; simboli sconosciuti in errore
+            payload = {
+                td: errors.get(td) or
+                    ({"meta": {"symbol": td}, "values": part.iloc[::-1].astype(str).to_dict('records'), "status": "ok"}
+                     if td != "NOPE" else {"code": 400, "message": "symbol not found", "status": "error"})
+                for td in td_symbol.split(",")
+            }
+            return (payload if len(payload) > 1 else next(iter(payload.values()))), None
+        
+        saved = (twelvedata_provider.TWELVEDATA_KEY, twelvedata_provider.TD_BATCH_SIZE,
+                 twelvedata_provider.fetch_executor, base_provider.ohlcv_store)
+        with tempfile.TemporaryDirectory() as root:
+            try:
+                executor = FetchExecutor(max_workers=1)
+                twelvedata_provider.TWELVEDATA_KEY = "test"
+                twelvedata_provider.TD_BATCH_SIZE = 3
+                twelvedata_provider.fetch_executor = executor
+                base_provider.ohlcv_store = OHLCVStore(root)
+                td = twelvedata_provider.TwelveDataProvider()
+                td.cache = ProviderCache("td_test", ttl=60, root=root)
+                td._get_time_series = fake_get
+                
+                results = td.fetch_many(symbols, "15min")
+                if [r[0] for r in requests_made] != ["BTC/USD,ETH/USD,AAPL", "NOPE"]:
+                    print(f"❌ Blocchi di simboli errati: {requests_made}")
+                    return False
+                if results["NOPE"] != (None, "API_400") or results["AAPL"][1] != "TwelveData":
+                    print(f"❌ Stati per simbolo errati: {[(s, r[1]) for s, r in results.items()]}")
+                    return False
+                expected = twelvedata_provider.normalize_ohlcv_df(bars.iloc[:end[0]].copy())
+                if not np.allclose(results["ETH-USD"][0]['close'], expected['close']):
+                    print("❌ Serie del simbolo non corrispondente al payload")
+                    return False
+                
+                # Cache con le stesse chiavi del fetch singolo: nessuna richiesta
+                single, src = td.fetch(td._fetch_stored, "BTC-USD", "15min", 5000)
+                if len(requests_made) != 2 or src != "TwelveData" or len(single) != end[0]:
+                    print("❌ fetch singolo non servito dalla cache del batch")
+                    return False
+                
+                # Cache scaduta: solo candele nuove dall'archivio, ancora a blocchi
+                td.cache.clear()
+                end[0] = len(bars)
+                results = td.fetch_many(symbols[:3], "15min")
+                if len(requests_made) != 3 or requests_made[2][1] is None:
+                    print(f"❌ Download incrementale atteso: {requests_made[2:]}")
+                    return False
+                if len(results["AAPL"][0]) != len(bars) or results["AAPL"][1] != "TwelveData":
+                    print("❌ Archivio non aggiornato con il delta")
+                    return False
+                
+                # Un credito per simbolo: 4 + 3 gettoni su 8
+                tokens = executor.bucket('twelvedata').tokens
+                if not 0.9 <= tokens < 1.5:
+                    print(f"❌ Crediti non scalati per simbolo: {tokens:.2f} gettoni residui")
+                    return False
+                executor._buckets['twelvedata'] = TokenBucket(None)
+                
+                # Nessuna candela nuova nelle date richieste: errore "no data", archivio aggiornato
+                no_data = {"code": 400, "message": "No data is available on the specified dates. "
+                           "Try setting different start/end dates.", "status": "error"}
+                errors.update({td: no_data for td in ["BTC/USD", "ETH/USD", "AAPL"]})
+                td.cache.clear()
+                results = td.fetch_many(symbols[:3], "15min")
+                if any(results[s][1] != "TwelveData" or len(results[s][0]) != len(bars) for s in symbols[:3]):
+                    print(f"❌ 'no data' non trattato come assenza di candele nuove: {[results[s][1] for s in symbols[:3]]}")
+                    return False
+                
+                # Corpo di errore con HTTP 200 (crediti esauriti): stato d'errore, dati dall'archivio
+                errors["AAPL"] = {"code": 429, "message": "You have run out of API credits", "status": "error"}
+                td.cache.clear()
+                if td._fetch_time_series("AAPL", "15min", 5000) != (None, "API_429"):
+                    print("❌ Errore API non riportato con il suo codice")
+                    return False
+                single, src = td.fetch(td._fetch_stored, "AAPL", "15min", 5000)
+                if src != "TwelveData (archivio)" or len(single) != len(bars):
+                    print(f"❌ Errore API etichettato come download riuscito: {src}")
+                    return False
+                
+                # Blocco intero limitato (errore unico, non per simbolo): errore per ogni simbolo
+                errors.clear()
+                errors["*"] = {"code": 429, "message": "You have run out of API credits for the current minute",
+                               "status": "error"}
+                if set(td._fetch_time_series_batch(symbols, "15min", 5000).values()) != {(None, "API_429")}:
+                    print("❌ Errore del blocco non propagato ai simboli")
+                    return False
+                td.cache.clear()
+                results = td.fetch_many(symbols[:3], "15min")
+                if any(results[s][1] != "TwelveData (archivio)" for s in symbols[:3]):
+                    print(f"❌ Blocco limitato riportato come aggiornato: {[results[s][1] for s in symbols[:3]]}")
+                    return False
+            finally:
+                (twelvedata_provider.TWELVEDATA_KEY, twelvedata_provider.TD_BATCH_SIZE,
+                 twelvedata_provider.fetch_executor, base_provider.ohlcv_store) = saved
+        
+        print(f"   {len(symbols)} simboli | {len(requests_made)} richieste (2 complete, incrementali ed errori)")
+        print("✅ TwelveData multi-simbolo coerente")
+        return True
+    except Exception as e:
+        print(f"❌ Errore TwelveData multi-simbolo: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_mtf_no_lookahead(df):
+    """Verifica che nessuna candela veda il valore di una candela HTF non ancora chiusa"""
+    print("\n" + "-"*50)
+    print("TEST 3q: MTF Senza Look-Ahead")
+    print("-"*50)
+    
+    try:
+        hour = 3600 * 10**9
+        quarter = hour // 4
+        
+        # 4h aggregato dalle 1h: la chiusura delle 00:00 è nota solo alle 04:00
+        ts1h = np.arange(48, dtype=np.int64) * hour
+        df_1h = pd.DataFrame({'datetime': pd.to_datetime(ts1h, utc=True), 'close': np.arange(48.0)})
+        df_4h = resample_closes(df_1h, 4)
+        ts4h = pd.DatetimeIndex(df_4h['datetime']).as_unit('ns').asi8
+        seen = align_to(ts1h, ts4h, df_4h['close'].to_numpy(), default=-1.0, base_period=hour, htf_period=4 * hour)
+        if seen[0] != -1.0 or seen[2] != -1.0 or seen[3] != 3.0 or seen[6] != 3.0 or seen[7] != 7.0:
+            print(f"❌ 4h visibile prima della chiusura: {seen[:8].tolist()}")
+            return False
+        if (seen > np.arange(48.0)).any():
+            print("❌ Chiusura futura vista da una candela 1h")
+            return False
+        
+        # Ogni candela 15m vede solo candele 1h chiuse entro la sua chiusura, e l'ultima di queste
+        ts_base = ts1h[0] + np.arange(4 * 48, dtype=np.int64) * quarter
+        got = align_to(ts_base, ts1h, np.arange(48), default=-1, base_period=quarter, htf_period=hour)
+        expected = (ts_base + quarter) // hour - 1
+        if not np.array_equal(got, expected):
+            print("❌ Allineamento 15m/1h non sulle chiusure")
+            return False
+        
+        # mtf_flags: cambiare la chiusura di una candela HTF non altera le candele chiuse prima di lei
+        frame = df.iloc[:2000].copy()
+        times = pd.to_datetime(frame['datetime'], utc=True)
+        h1 = frame.set_index(times)['close'].resample('1h').last().dropna().reset_index()
+        h1.columns = ['datetime', 'close']
+        mtf_cache.clear()
+        base_long, _ = mtf_flags(frame, h1, resample_closes(h1, 4))
+        k = len(h1) // 2
+        moved = h1.copy()
+        moved.loc[k:, 'close'] = moved.loc[k:, 'close'] * 10
+        mtf_cache.clear()
+        moved_long, _ = mtf_flags(frame, moved, resample_closes(moved, 4))
+        closes = pd.DatetimeIndex(times).as_unit('ns').asi8 + quarter
+        bucket_start = (h1['datetime'].iloc[k].value // (4 * hour)) * 4 * hour
+        closed_before = (closes < h1['datetime'].iloc[k].value + hour) & (closes < bucket_start + 4 * hour)
+        if not np.array_equal(base_long[closed_before], moved_long[closed_before]):
+            print("❌ Flag MTF influenzati da candele HTF future")
+            return False
+        
+        print(f"   {len(ts_base)} candele 15m e {len(ts1h)} 1h allineate sulle chiusure | "
+              f"{int(closed_before.sum())} flag invariati alla modifica del futuro")
+        print("✅ Nessun look-ahead MTF")
+        return True
+    except Exception as e:
+        print(f"❌ Errore allineamento MTF: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_incremental_state(df):
+    """Verifica lo stato incrementale contro compute_indicators_15m su candele aggiunte"""
+    print("\n" + "-"*50)
+    print("TEST 3r: Stato Indicatori Incrementale")
+    print("-"*50)
+    
+    try:
+        import json
+        frame = df.iloc[:1500].reset_index(drop=True)
+        seed = 1200
+        ref = compute_indicators_15m(frame)
+        cols = [c for c in ref.columns if c not in ('datetime', 'open', 'high', 'low', 'close', 'volume')]
+        
+        # Seme sullo storico, poi una candela alla volta (con risincronizzazioni ripetute)
+        state = incremental.IncrementalIndicatorState.from_history(frame.iloc[:seed], "TEST")
+        rows = []
+        for i in range(seed, len(frame)):
+            state.sync(frame.iloc[:i + 1])
+            state.sync(frame.iloc[:i + 1])
+            rows.append(dict(state.last))
+        got = pd.DataFrame(rows)
+        expected = ref.iloc[seed:].reset_index(drop=True)
+        worst = 0.0
+        for col in cols:
+            a = pd.to_numeric(expected[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            b = pd.to_numeric(got[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            if (np.isnan(a) != np.isnan(b)).any():
+                print(f"❌ {col}: NaN in posizioni diverse")
+                return False
+            both = ~np.isnan(a)
+            if both.any():
+                worst = max(worst, float(np.max(np.abs(a[both] - b[both]) / np.maximum(1.0, np.abs(a[both])))))
+        if worst > 1e-9 or state.n != len(frame):
+            print(f"❌ Stato incrementale diverso: errore {worst:.2e}, candele {state.n}/{len(frame)}")
+            return False
+        
+        # Senza colonna datetime le candele già viste si riconoscono dall'indice
+        no_ts = frame.drop(columns=['datetime'])
+        by_index = incremental.IncrementalIndicatorState.from_history(no_ts.iloc[:seed])
+        by_index.sync(no_ts.iloc[:seed + 10])
+        by_index.sync(no_ts.iloc[:seed + 10])
+        if by_index.n != seed + 10 or abs(by_index.last['ema200'] - ref['ema200'].iloc[seed + 9]) > 1e-9:
+            print(f"❌ Candele riapplicate senza datetime: {by_index.n} invece di {seed + 10}")
+            return False
+        
+        # Serializzazione: lo stato ripristinato prosegue come l'originale
+        restored = incremental.IncrementalIndicatorState.from_dict(json.loads(json.dumps(by_index.to_dict(), default=str)))
+        restored.sync(no_ts.iloc[:seed + 11])
+        by_index.sync(no_ts.iloc[:seed + 11])
+        if restored.n != by_index.n or restored.last['atr'] != by_index.last['atr']:
+            print("❌ Stato ripristinato diverso dall'originale")
+            return False
+
+        # Tabella segnali dello scanner: uguale a panel_signal_table a ogni scansione;
+        # la candela in formazione (valori che cambiano) non entra nello stato
+        incremental.clear_states()
+        try:
+            offsets = {"X": 0, "Y": 200}
+            for end, forming in ((1250, True), (1251, False), (1252, False), (1257, False)):
+                frames = {sym: frame.iloc[off:off + end].copy() for sym, off in offsets.items()}
+                if forming:
+                    for f in frames.values():
+                        f.loc[f.index[-1], 'close'] *= 1.01
+                got = incremental.incremental_signal_table(frames)
+                expected = panel_signal_table(frames)
+                if list(got.columns) != list(expected.columns) or list(got.index) != list(expected.index):
+                    print("❌ Schema tabella incrementale diverso da panel_signal_table")
+                    return False
+                for col in ('close', 'ema20', 'ema200', 'rsi', 'atr', 'ADX_14', 'slope'):
+                    if not np.allclose(got[col].astype(float), expected[col].astype(float), rtol=1e-9, equal_nan=True):
+                        print(f"❌ {col}: tabella incrementale diversa da panel_signal_table")
+                        return False
+                if list(got['signal']) != list(expected['signal']) or list(got['strength']) != list(expected['strength']):
+                    print("❌ Segnali incrementali diversi da panel_signal_table")
+                    return False
+                if incremental.get_incremental_state("X", "15m", frames["X"].iloc[:-1]).n != len(frames["X"]) - 1:
+                    print("❌ Candela in formazione registrata nello stato")
+                    return False
+        finally:
+            incremental.clear_states()
+
+        # Registro limitato: restano solo gli stati usati più di recente
+        limit = incremental.INCREMENTAL_MAX_STATES
+        incremental.INCREMENTAL_MAX_STATES = 3
+        try:
+            incremental.clear_states()
+            for sym in ["A", "B", "C", "D"]:
+                incremental.get_incremental_state(sym, "15m", frame.iloc[:50])
+            incremental.get_incremental_state("B", "15m", frame.iloc[:51])
+            incremental.get_incremental_state("E", "15m", frame.iloc[:50])
+            kept = sorted(key.split("|")[0] for key in incremental.export_states())
+        finally:
+            incremental.INCREMENTAL_MAX_STATES = limit
+            incremental.clear_states()
+        if kept != ["B", "D", "E"]:
+            print(f"❌ Registro stati non limitato: {kept}")
+            return False
+        
+        print(f"   {len(frame) - seed} candele aggiunte | errore max {worst:.2e} su {len(cols)} colonne")
+        print("✅ Stato incrementale allineato a compute_indicators_15m")
+        return True
+    except Exception as e:
+        print(f"❌ Errore stato incrementale: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_indicator_cache(df):
+    """Verifica che la cache estenda gli indicatori con lo stesso risultato del calcolo completo"""
+    print("\n" + "-"*50)
+    print("TEST 3s: Cache Indicatori con Ripresa Esatta")
+    print("-"*50)
+    
+    try:
+        cache = IndicatorCache()
+        n = len(df)
+        base = df.iloc[:n - 40]
+        cache.get_or_compute(base, "TEST")
+        
+        # Candele aggiunte in coda a più riprese: solo le nuove vengono calcolate
+        for end in (n - 30, n - 29, n):
+            got = cache.get_or_compute(df.iloc[:end], "TEST")
+            full = compute_indicators_15m(df.iloc[:end])
+            if list(got.columns) != list(full.columns) or not got.index.equals(full.index):
+                print("❌ Schema della cache diverso dal calcolo completo")
+                return False
+            for col in full.columns:
+                if not got[col].equals(full[col]):
+                    diff = np.nanmax(np.abs(pd.to_numeric(got[col], errors="coerce") - pd.to_numeric(full[col], errors="coerce")))
+                    print(f"❌ {col} diversa dopo l'aggiunta di candele (differenza {diff:.2e})")
+                    return False
+        
+        stats = cache.stats()
+        if stats['partial_hits'] != 3 or stats['misses'] != 1:
+            print(f"❌ Ricalcoli inattesi: {stats}")
+            return False
+        
+        # La stessa richiesta è servita dalla cache
+        cache.get_or_compute(df, "TEST")
+        if cache.stats()['hits'] != 1:
+            print("❌ Richiesta ripetuta non servita dalla cache")
+            return False
+        
+        print(f"   {stats['partial_hits']} estensioni identiche al calcolo completo | "
+              f"ema200 finale {got['ema200'].iloc[-1]:.4f}")
+        print("✅ Cache indicatori esatta dopo l'aggiunta di candele")
+        return True
+    except Exception as e:
+        print(f"❌ Errore cache indicatori: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_jobs(df):
+    """Verifica avvio, interruzione e ripresa dei job con checkpoint"""
+    print("\n" + "-"*50)
+    print("TEST 3t: Job con Checkpoint e Ripresa")
+    print("-"*50)
+    
+    import tempfile
+    import shutil
+    import threading
+    import time
+    root = tempfile.mkdtemp(prefix="jobs_test_")
+    try:
+        spec = {'symbol': 'TEST', 'year': 2025, 'grid': [1, 2, 3]}
+        
+        # Id stabile: stessi input (anche in altro ordine) -> stesso job
+        same = jobs.job_id('test', {'grid': [1, 2, 3], 'year': 2025, 'symbol': 'TEST'})
+        other = jobs.job_id('test', dict(spec, year=2024))
+        if jobs.job_id('test', spec) != same or same == other:
+            print("❌ job_id non deterministico")
+            return False
+        
+        computed = []
+        paused = threading.Event()
+        cells = [f"c{i}" for i in range(10)]
+        
+        def work(job):
+            job.set_total(len(cells))
+            done = job.results()
+            for key in cells:
+                if key in done:
+                    continue
+                if job.cancel_requested():
+                    return
+                computed.append(key)
+                job.record(key, {'value': int(key[1:]) ** 2})
+                if len(computed) == 4 and not paused.is_set():
+                    # Attende l'interruzione richiesta dal test
+                    paused.set()
+                    deadline = time.time() + 10
+                    while not job.cancel_requested() and time.time() < deadline:
+                        time.sleep(0.01)
+        
+        def wait(job):
+            jobs._THREADS[job.id].join(timeout=10)
+        
+        # Avvio e interruzione dopo 4 celle
+        job = jobs.Job('test', spec, root)
+        if not jobs.start_job(job, work) or jobs.start_job(job, work):
+            print("❌ Job non avviato o avviato due volte")
+            return False
+        paused.wait(timeout=10)
+        job.request_cancel()
+        wait(job)
+        if job.status != 'cancelled' or job.progress() != (4, 10) or not job.is_interrupted():
+            print(f"❌ Interruzione non registrata: {job.status} {job.progress()}")
+            return False
+        
+        # Processo riavviato a metà scrittura: ultima riga troncata
+        with open(job._cells_path, "a", encoding="utf-8") as f:
+            f.write('{"key": "c4", "res')
+        
+        # Ripresa da un nuovo oggetto (stesso id): le celle salvate non si ricalcolano
+        resumed = jobs.Job('test', dict(reversed(list(spec.items()))), root)
+        if resumed.id != job.id or resumed.status != 'cancelled' or len(resumed.results()) != 4:
+            print(f"❌ Checkpoint non riletto: {resumed.id} {len(resumed.results())} celle")
+            return False
+        jobs.start_job(resumed, work)
+        wait(resumed)
+        results = jobs.Job('test', spec, root).results()
+        if resumed.status != 'done' or computed != cells:
+            print(f"❌ Celle ricalcolate o mancanti: {computed}")
+            return False
+        if results != {key: {'value': int(key[1:]) ** 2} for key in cells}:
+            print(f"❌ Risultati dopo la ripresa errati: {sorted(results)}")
+            return False
+        
+        # Errore nel lavoro: stato 'error' con il messaggio
+        def fail(job):
+            raise RuntimeError("guasto di prova")
+        broken = jobs.Job('broken', spec, root)
+        jobs.start_job(broken, fail)
+        wait(broken)
+        if broken.status != 'error' or broken.meta['message'] != "guasto di prova":
+            print(f"❌ Errore del job non registrato: {broken.status}")
+            return False
+        
+        # Validazione: le celle fallite non vanno nel checkpoint e la ripresa le ricalcola
+        stats = {'total_trades': 5, 'win_rate': 60.0, 'total_pnl': 3.0, 'sharpe_ratio': 1.0,
+                 'max_drawdown': -1.0, 'profit_factor': 1.5, 'avg_win': 1.0, 'avg_loss': -0.5}
+        glitch = {'history': True, 'backtest': True}
+        
+        def fake_history(symbol):
+            if symbol == "NET" and glitch['history']:
+                raise ConnectionError("rete assente")
+            return df
+        
+        def fake_backtest(symbol, year, use_mtf=True):
+            if (symbol, year) == ("BOOM", 2024) and glitch['backtest']:
+                raise RuntimeError("backtest fallito")
+            return None if year == 2023 else {'stats': stats}
+        
+        saved = validator.load_annual_history, validator.run_annual_backtest
+        validator.load_annual_history, validator.run_annual_backtest = fake_history, fake_backtest
+        try:
+            vjob = jobs.Job('validation', {'assets': ["OK", "NET", "BOOM"], 'years': [2023, 2024]}, root)
+            validator.start_validation_job(vjob)
+            wait(vjob)
+            saved_cells = set(vjob.results())
+            if saved_cells != {"OK|2023", "OK|2024", "BOOM|2023"} or vjob.results()["OK|2023"] is not None:
+                print(f"❌ Celle fallite salvate nel checkpoint: {sorted(saved_cells)}")
+                return False
+            glitch.update(history=False, backtest=False)
+            validator.start_validation_job(jobs.Job('validation', vjob.spec, root))
+            wait(vjob)
+            resumed_cells = jobs.Job('validation', vjob.spec, root).results()
+            if (len(resumed_cells) != 6 or resumed_cells["NET|2024"]['trades'] != 5
+                    or resumed_cells["BOOM|2024"] is None):
+                print(f"❌ Celle fallite non ricalcolate alla ripresa: {sorted(resumed_cells)}")
+                return False
+        finally:
+            validator.load_annual_history, validator.run_annual_backtest = saved
+        
+        print(f"   {len(cells)} celle: 4 prima dell'interruzione, {len(computed) - 4} dopo la ripresa | "
+              f"riga troncata ignorata")
+        print("✅ Job interrotti e ripresi senza ricalcoli")
+        return True
+    except Exception as e:
+        print(f"❌ Errore job: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def test_trade_sim_edges(df):
+    """Verifica i casi limite di first_exit e simulate_trades su candele calcolate a mano"""
+    print("\n" + "-"*50)
+    print("TEST 3u: Simulazione Trade, Casi Limite")
+    print("-"*50)
+    
+    try:
+        # Candele piatte 99-101, con tre eccezioni:
+        # 3: high 111 (TP long a 110), 6: low 89 e high 112 (SL e TP nella stessa candela)
+        high = np.full(10, 101.0)
+        low = np.full(10, 99.0)
+        high[3] = 111.0
+        high[6], low[6] = 112.0, 89.0
+        
+        # Stessa candela: SL prima del TP, long e short
+        if first_exit(high, low, 4, True, 90.0, 110.0) != (6, True):
+            print("❌ Long: SL e TP nella stessa candela, atteso SL")
+            return False
+        if first_exit(high, low, 4, False, 110.0, 90.0) != (6, True):
+            print("❌ Short: SL e TP nella stessa candela, atteso SL")
+            return False
+        if first_exit(high, low, 1, True, 90.0, 110.0) != (3, False):
+            print("❌ Long: TP alla candela 3 non trovato")
+            return False
+        if first_exit(high, low, 7, True, 90.0, 110.0) != (-1, False):
+            print("❌ Livelli mai toccati: attesa posizione aperta (-1)")
+            return False
+        
+        # Uscita oltre la prima finestra di scansione
+        long_high = np.full(300, 101.0)
+        long_low = np.full(300, 99.0)
+        long_low[200] = 80.0
+        if first_exit(long_high, long_low, 1, True, 90.0, 110.0) != (200, True):
+            print("❌ Uscita oltre la prima finestra non trovata")
+            return False
+        
+        # Entrate 0, 2, 3, 5, 8:
+        # 0 long esce a TP alla 3; 2 scartata (posizione aperta); 3 scartata (candela di uscita);
+        # 5 short esce a SL alla 6 (stessa candela del TP); 8 ancora aperta a fine dati
+        entry_idx = np.array([0, 2, 3, 5, 8])
+        is_long = np.array([True, True, True, False, True])
+        sl = np.array([90.0, 90.0, 90.0, 110.0, 90.0])
+        tp = np.array([110.0, 110.0, 110.0, 90.0, 110.0])
+        sim = simulate_trades(high, low, entry_idx, is_long, sl, tp)
+        expected = {
+            'signal_pos': [0, 3],
+            'entry_idx': [0, 5],
+            'exit_idx': [3, 6],
+            'is_long': [True, False],
+            'is_sl': [False, True],
+            'exit_price': [110.0, 110.0],
+        }
+        for name, values in expected.items():
+            if sim[name].tolist() != values:
+                print(f"❌ {name}: {sim[name].tolist()} invece di {values}")
+                return False
+        if sim['pruned'] is not None:
+            print("❌ Interruzione inattesa senza regole prune")
+            return False
+        
+        # Prima posizione mai chiusa: nessun trade e nessuna entrata successiva
+        sim = simulate_trades(high, low, np.array([7, 8]), np.array([True, True]),
+                              np.array([90.0, 50.0]), np.array([110.0, 150.0]))
+        if len(sim['exit_idx']) != 0 or len(sim['signal_pos']) != 0:
+            print(f"❌ Posizione aperta a fine dati contata come trade: {sim['exit_idx'].tolist()}")
+            return False
+        
+        print("   SL prima del TP nella stessa candela | nessuna entrata sulla candela di uscita | "
+              "posizione aperta a fine dati esclusa")
+        print("✅ Casi limite della simulazione corretti")
+        return True
+    except Exception as e:
+        print(f"❌ Errore simulazione trade: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_sweep_matches_backtest(df):
+    """Verifica che SweepEngine dia gli stessi risultati di backtest_engine con StrategyParams non di default"""
+    print("\n" + "-"*50)
+    print("TEST 3v: SweepEngine = backtest_engine")
+    print("-"*50)
+    
+    try:
+        from strategy.params import StrategyParams
+        engine = SweepEngine(df, use_mtf=False)
+        base = StrategyParams.from_config()
+        variants = {
+            'soglie e SL/TP per forza': base.with_(adx_min=18, rsi_long_max=68, rsi_short_min=32,
+                                                   strong_sl_atr=1.5, strong_tp_atr=3.0,
+                                                   weak_sl_atr=2.5, weak_tp_atr=2.0),
+            'senza classificazione': base.with_(enable_classification=False, adx_min=15, rsi_long_max=70,
+                                                rsi_short_min=30, bt_sl_atr=1.0, bt_tp_atr=2.5),
+            'solo strong, SL/TP fissi': base.with_(weak_enabled=False, weak_adx_min=12, sl_atr=1.2, tp_atr=1.8),
+        }
+        default_stats = backtest_engine(df, use_mtf=False, params=base)['stats']
+        
+        total = 0
+        for name, params in variants.items():
+            result = backtest_engine(df, use_mtf=False, params=params)
+            stats = engine.evaluate(params)
+            if stats != result['stats']:
+                print(f"❌ {name}: statistiche diverse\n   sweep: {stats}\n   backtest: {result['stats']}")
+                return False
+            trades = engine.trades(params)
+            expected = result['trades']['pnl_pct'].to_numpy() if not result['trades'].empty else np.empty(0)
+            if not np.array_equal(trades['pnl_pct'], expected):
+                print(f"❌ {name}: trade diversi")
+                return False
+            if stats == default_stats:
+                print(f"❌ {name}: parametri ignorati (stesso risultato dei default)")
+                return False
+            total += stats['n']
+            print(f"   {name}: {stats['n']} trade, PnL {stats['total_pnl_pct']:.2f}%")
+        
+        if total == 0:
+            print("❌ Nessun trade: confronto non significativo")
+            return False
+        print("✅ SweepEngine allineato a backtest_engine")
+        return True
+    except Exception as e:
+        print(f"❌ Errore confronto sweep/backtest: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_exit_grid_matches_simulation(df):
+    """Verifica exit_grid cella per cella contro simulate_trades, con uscite oltre l'orizzonte"""
+    print("\n" + "-"*50)
+    print("TEST 3w: exit_grid = simulate_trades")
+    print("-"*50)
+    
+    try:
+        from strategy.params import StrategyParams
+        engine = SweepEngine(df, use_mtf=False)
+        cols = engine.cols
+        entry_idx, is_long, _ = entry_candidates(engine.signals(StrategyParams.from_config()), len(cols['close']))
+        entry, atr_e = cols['close'][entry_idx], cols['atr'][entry_idx]
+        sl_values = [0.5, 2.0, 8.0, 25.0]
+        tp_values = [0.75, 3.0, 12.0, 40.0]
+        
+        for horizon in (EXIT_GRID_HORIZON, 8):
+            grid = exit_grid(cols['high'], cols['low'], cols['close'], cols['atr'],
+                             entry_idx, is_long, sl_values, tp_values, horizon=horizon)
+            beyond = 0
+            for sl in sl_values:
+                for tp in tp_values:
+                    sl_px = np.where(is_long, entry - (atr_e * sl), entry + (atr_e * sl))
+                    tp_px = np.where(is_long, entry + (atr_e * tp), entry - (atr_e * tp))
+                    ref = simulate_trades(cols['high'], cols['low'], entry_idx, is_long, sl_px, tp_px)
+                    cell = grid[(sl, tp)]
+                    for name in ('signal_pos', 'entry_idx', 'exit_idx', 'is_long', 'is_sl', 'exit_price'):
+                        if not np.array_equal(cell[name], ref[name]):
+                            print(f"❌ Orizzonte {horizon}, cella SL {sl} / TP {tp}: {name} diverso")
+                            return False
+                    beyond += int((ref['exit_idx'] - ref['entry_idx'] > horizon).sum())
+            if beyond == 0:
+                print(f"❌ Orizzonte {horizon}: nessuna uscita oltre l'orizzonte, caso non coperto")
+                return False
+            print(f"   orizzonte {horizon}: {len(sl_values) * len(tp_values)} celle identiche, "
+                  f"{beyond} uscite oltre l'orizzonte")
+        
+        print("✅ exit_grid allineato a simulate_trades")
+        return True
+    except Exception as e:
+        print(f"❌ Errore confronto exit_grid: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 # Test 4: Verifica configurazione
 def test_config_integration():
     """Test integrazione configurazione"""
@@ -238,16 +1755,141 @@ def main():
         print("\n❌ TEST FALLITO: Indicatori non calcolati")
         return 1
     
+    # Test 1b: Parità backend
+    if not test_backend_parity(df):
+        print("\n❌ TEST FALLITO: Parità backend indicatori")
+        return 1
+    
     # Test 2: Classificazione
     if not test_signal_classification(df_ind):
         print("\n❌ TEST FALLITO: Classificazione segnali")
         return 1
     
+    # Test 2b: Classificazione vettoriale
+    if not test_classify_signals(df_ind):
+        print("\n❌ TEST FALLITO: Classificazione vettoriale")
+        return 1
+    
+    # Test 2c: Pannello multi-simbolo
+    if not test_panel_signals(df):
+        print("\n❌ TEST FALLITO: Pannello multi-simbolo")
+        return 1
+    
     # Test 3: Backtest
     results = test_backtest_engine(df)
     if results is None:
         print("\n⚠️ Backtest senza risultati (può essere normale)")
     
+    # Test 3b: Ottimizzazione parallela
+    if not test_parallel_sweep(df):
+        print("\n❌ TEST FALLITO: Ottimizzazione parallela")
+        return 1
+    
+    # Test 3c: Ricerca adattiva
+    if not test_halving_search(df):
+        print("\n❌ TEST FALLITO: Ricerca adattiva")
+        return 1
+    
+    # Test 3d: Walk-forward
+    if not test_walk_forward(df):
+        print("\n❌ TEST FALLITO: Walk-forward")
+        return 1
+    
+    # Test 3e: Archivio risultati
+    if not test_result_store(df):
+        print("\n❌ TEST FALLITO: Archivio risultati")
+        return 1
+    
+    # Test 3f: Pruning
+    if not test_pruning(df):
+        print("\n❌ TEST FALLITO: Pruning combinazioni")
+        return 1
+    
+    # Test 3g: Sweep lunghezze
+    if not test_length_sweep(df):
+        print("\n❌ TEST FALLITO: Sweep lunghezze indicatori")
+        return 1
+    
+    # Test 3h: Storico condiviso
+    if not test_history_store(df):
+        print("\n❌ TEST FALLITO: Storico condiviso")
+        return 1
+    
+    # Test 3i: Portafoglio
+    if not test_portfolio_backtest(df):
+        print("\n❌ TEST FALLITO: Backtest di portafoglio")
+        return 1
+    
+    # Test 3j: Backtest incrementale
+    if not test_resumable_backtest(df):
+        print("\n❌ TEST FALLITO: Backtest incrementale")
+        return 1
+    
+    # Test 3k: Monte Carlo
+    if not test_monte_carlo(df):
+        print("\n❌ TEST FALLITO: Monte Carlo")
+        return 1
+    
+    # Test 3l: Archivio OHLCV
+    if not test_ohlcv_store(df):
+        print("\n❌ TEST FALLITO: Archivio OHLCV locale")
+        return 1
+    
+    # Test 3m: Cache provider
+    if not test_provider_cache(df):
+        print("\n❌ TEST FALLITO: Cache provider")
+        return 1
+    
+    # Test 3n: Fetch concorrenti
+    if not test_fetch_executor(df):
+        print("\n❌ TEST FALLITO: Fetch concorrenti")
+        return 1
+    
+    # Test 3o: Download multi-ticker
+    if not test_fetch_many(df):
+        print("\n❌ TEST FALLITO: Download multi-ticker")
+        return 1
+    
+    # Test 3p: TwelveData multi-simbolo
+    if not test_twelvedata_batch(df):
+        print("\n❌ TEST FALLITO: TwelveData multi-simbolo")
+        return 1
+    
+    # Test 3q: MTF senza look-ahead
+    if not test_mtf_no_lookahead(df):
+        print("\n❌ TEST FALLITO: MTF senza look-ahead")
+        return 1
+    
+    # Test 3r: Stato indicatori incrementale
+    if not test_incremental_state(df):
+        print("\n❌ TEST FALLITO: Stato indicatori incrementale")
+        return 1
+    
+    # Test 3s: Cache indicatori con ripresa esatta
+    if not test_indicator_cache(df):
+        print("\n❌ TEST FALLITO: Cache indicatori")
+        return 1
+    
+    # Test 3t: Job con checkpoint
+    if not test_jobs(df):
+        print("\n❌ TEST FALLITO: Job con checkpoint")
+        return 1
+    
+    # Test 3u: Casi limite della simulazione dei trade
+    if not test_trade_sim_edges(df):
+        print("\n❌ TEST FALLITO: Casi limite simulazione trade")
+        return 1
+    
+    # Test 3v: SweepEngine contro backtest_engine
+    if not test_sweep_matches_backtest(df):
+        print("\n❌ TEST FALLITO: SweepEngine diverso da backtest_engine")
+        return 1
+    
+    # Test 3w: exit_grid contro simulate_trades
+    if not test_exit_grid_matches_simulation(df):
+        print("\n❌ TEST FALLITO: exit_grid diverso da simulate_trades")
+        return 1
+    
     # Test 4: Config
     if not test_config_integration():
         print("\n⚠️ Problemi configurazione")
@@ -3,6 +3,7 @@ import streamlit as st
 import pandas as pd
 from strategy.backtest import backtest_engine, load_history_for_backtest
 from strategy.annual_backtest import render_annual_backtest_panel, simulate_multi_asset_backtest
+from strategy.portfolio import render_portfolio_backtest_panel
 from providers.yahoo_provider import fetch_yf_ohlcv
 from providers.twelvedata_provider import fetch_td_15m, fetch_td_1h, fetch_td_4h
 
@@ -12,7 +13,7 @@ def render_backtest_panel(focus):
     st.markdown("---")
     st.markdown("## Backtest")
     
-    tab1, tab2, tab3 = st.tabs(["📊 Backtest Rapido", "📅 Backtest Annuale", "📈 Multi-Asset"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Backtest Rapido", "📅 Backtest Annuale", "📈 Multi-Asset", "💼 Portafoglio"])
     
     with tab1:
         # Backtest rapido
@@ -47,7 +48,7 @@ def render_backtest_panel(focus):
                 df1h_bt, _ = fetch_td_1h(focus)
                 df4h_bt, _ = fetch_td_4h(focus)
             
-            bt = backtest_engine(df_bt, use_mtf=use_mtf, df_1h=df1h_bt, df_4h=df4h_bt)
+            bt = backtest_engine(df_bt, use_mtf=use_mtf, df_1h=df1h_bt, df_4h=df4h_bt, symbol=focus)
             
             if bt:
                 stats = bt["stats"]
@@ -88,4 +89,8 @@ def render_backtest_panel(focus):
                     best = results_df.loc[results_df['pnl_totale'].idxmax()]
                     st.success(f"🏆 Best Performer: {best['asset']} {best['anno']} con {best['pnl_totale']:+.2f}%")
                 else:
-                    st.warning("Nessun risultato significativo")
\ No newline at end of file
+                    st.warning("Nessun risultato significativo")
+    
+    with tab4:
+        # Portafoglio su capitale condiviso
+        render_portfolio_backtest_panel(st.session_state.watchlist)
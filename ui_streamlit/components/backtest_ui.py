@@ -117,7 +117,7 @@ def render_backtest_ui(fetch_yf, fetch_td_15m, fetch_td_1h, fetch_td_4h):
                 
                 # Esegui backtest
                 start_time = time.time()
-                results = backtest_engine(df_15m, use_mtf, df_1h, df_4h)
+                results = backtest_engine(df_15m, use_mtf, df_1h, df_4h, symbol=symbol)
                 elapsed = time.time() - start_time
                 
                 progress_bar.progress(100)
@@ -6,7 +6,9 @@ from datetime import datetime, timedelta
 from providers.twelvedata_provider import fetch_td_15m, fetch_td_1h, fetch_td_4h
 from providers.marketaux_provider import fetch_marketaux_sentiment
 from providers.multi_provider import fetch_yf_ohlcv
-from indicators.robust_ta import compute_indicators_15m, decide_signal
+from indicators.robust_ta import decide_signal
+from indicators.cache import compute_indicators_cached
+from indicators.mtf import current_mtf
 from ui_streamlit.components.validation_panel import validate_data_quality
 from ui_streamlit.components.position_panel import render_position_panel
 from ai.asset_analyzer import render_ai_suggestions
@@ -71,18 +73,10 @@ def run_detail(symbol: str, use_td: bool = True):
         st.session_state.validation_log = validate_data_quality(df15, df1h, df4h)
     
     # Analisi MTF
-    up1h = True
-    up4h = True
-    if df1h is not None and len(df1h) > 50:
-        up1h = df1h["close"].iloc[-1] > df1h["close"].ewm(50).mean().iloc[-1]
-    if df4h is not None and len(df4h) > 20:
-        up4h = df4h["close"].iloc[-1] > df4h["close"].ewm(20).mean().iloc[-1]
-    
-    mtf_long = up1h and up4h
-    mtf_short = (not up1h) and (not up4h)
+    mtf_long, mtf_short = current_mtf(df1h, df4h, symbol)
     
     # Indicatori
-    ind = compute_indicators_15m(df15)
+    ind = compute_indicators_cached(df15, symbol)
     signal = decide_signal(ind, mtf_long, mtf_short)
     
     p = float(df15["close"].iloc[-1])
@@ -1,8 +1,7 @@
 # ui_streamlit/components/radar_panel.py
 import streamlit as st
-import time
 from datetime import datetime
-from providers.multi_provider import scan_symbol
+from providers.multi_provider import scan_many
 from providers.twelvedata_provider import search_symbols_td
 from storage.watchlist_store import save_watchlist
 from ui_streamlit.components.scan_filters import render_scan_filters
@@ -27,14 +26,12 @@ def render_radar_panel():
     # Bottone SCAN
     if st.button("🔍 AVVIA SCAN", use_container_width=True, type="primary"):
         with st.spinner("Scansionando..."):
-            results = []
-            total = len(st.session_state.watchlist)
             progress_bar = st.progress(0, text="Avvio scan...")
             
-            for i, symbol in enumerate(st.session_state.watchlist):
-                progress_bar.progress((i + 1) / total, text=f"📡 Scan {i+1}/{total}: {symbol}")
-                results.append(scan_symbol(symbol, "15m", "1mo"))
-                time.sleep(0.5)
+            results = scan_many(
+                st.session_state.watchlist, "15m", "1mo",
+                progress=lambda done, total, symbol: progress_bar.progress(done / total, text=f"📡 Scan {done}/{total}: {symbol}")
+            )
             
             progress_bar.empty()
             st.session_state.radar_results = results
@@ -8,11 +8,11 @@ from datetime import datetime
 
 from config import (
     TTL_YF, YF_15M_PERIOD, YF_15M_INTERVAL,
-    SL_ATR, TP_ATR, ADX_MIN, RSI_LONG_MAX, RSI_SHORT_MIN, SCORE_FORTE_MIN
+    SL_ATR, TP_ATR, ADX_LEN, ADX_MIN, RSI_LONG_MAX, RSI_SHORT_MIN, SCORE_FORTE_MIN
 )
-from providers.yahoo_provider import fetch_yahoo_ohlcv
-from indicators.robust_ta import compute_basic_ta
-from ui_streamlit.components.indicators import atr_wilder_last, rischio_stopout
+from providers.yahoo_provider import fetch_yf_ohlcv
+from indicators.incremental import incremental_signal_table
+from ui_streamlit.components.indicators import rischio_stopout
 
 def _norm_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
     """Normalizza colonne OHLCV"""
@@ -42,12 +42,12 @@ def _norm_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
 
 @st.cache_data(ttl=TTL_YF)
 def cached_yahoo_fast(symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
-    """Versione cached di fetch_yahoo_ohlcv"""
-    return fetch_yahoo_ohlcv(symbol, period=period, interval=interval)
+    """Versione cached di fetch_yf_ohlcv"""
+    return fetch_yf_ohlcv(symbol, interval=interval, period=period)
 
-def _compute_signal(sym: str, df: pd.DataFrame) -> Dict[str, Any]:
-    """Calcola segnale per un asset"""
-    if df is None or len(df) < 30:
+def _compute_signal(sym: str, ind: Optional[pd.Series]) -> Dict[str, Any]:
+    """Calcola segnale per un asset dalla riga della tabella incremental_signal_table"""
+    if ind is None or ind.get('bars', 0) < 30:
         return {
             "asset": sym,
             "azione": "NO_DATA",
@@ -64,18 +64,14 @@ def _compute_signal(sym: str, df: pd.DataFrame) -> Dict[str, Any]:
         }
     
     try:
-        ta = compute_basic_ta(df)
-        if not ta:
-            raise ValueError("No TA data")
-        
-        last = float(df['close'].iloc[-1])
-        ema20 = float(ta['ema_fast'].iloc[-1])
-        ema200 = float(ta['ema_trend'].iloc[-1])
-        rsi = float(ta['rsi'].iloc[-1])
-        adx = float(ta['adx'].iloc[-1])
-        
-        # Calcola ATR
-        atr = atr_wilder_last(df)
+        last = float(ind['close'])
+        ema20 = float(ind['ema20'])
+        ema200 = float(ind['ema200'])
+        rsi = float(ind['rsi'])
+        adx = float(ind[f"ADX_{ADX_LEN}"])
+        atr = float(ind['atr'])
+        if np.isnan(atr):
+            atr = 0.0
         
         action = "WAIT"
         flow = None
@@ -134,74 +130,65 @@ def _compute_signal(sym: str, df: pd.DataFrame) -> Dict[str, Any]:
             "flow": flow,
             "atr": atr,
             "rsi": rsi,
-            "adx": adx
+            "adx": adx,
+            "segnale": ind.get('signal', 'NONE'),
+            "forza": ind.get('strength', 'NONE')
         }
         
     except Exception as e:
-        return {
-            "asset": sym,
-            "azione": "ERROR",
-            "score": 0,
-            "TRADE_OK": False,
-            "last": 0,
-            "sl": None,
-            "tp": None,
-            "rischio_sl": "N/D",
-            "flow": None,
-            "atr": 0,
-            "rsi": 0,
-            "adx": 0,
-            "error": str(e)
-        }
+        return _error_row(sym, e)
+
+def _error_row(sym: str, e: Exception) -> Dict[str, Any]:
+    """Riga di errore per un asset"""
+    return {
+        "asset": sym,
+        "azione": "ERROR",
+        "score": 0,
+        "TRADE_OK": False,
+        "last": 0,
+        "sl": None,
+        "tp": None,
+        "rischio_sl": "N/D",
+        "flow": None,
+        "atr": 0,
+        "rsi": 0,
+        "adx": 0,
+        "error": str(e)
+    }
 
 def run_scan(assets: List[str], refresh_tick: int = 0, f: Optional[Dict] = None) -> pd.DataFrame:
-    """Esegue scan completo"""
-    rows = []
-    total = len(assets)
+    """Esegue scan completo: fetch per simbolo, indicatori in un solo passaggio sul pannello"""
+    rows = {}
+    frames = {}
     
-    for i, sym in enumerate(assets, 1):
+    for sym in assets:
         try:
             df = cached_yahoo_fast(sym, period=YF_15M_PERIOD, interval=YF_15M_INTERVAL)
             
             if df is None or df.empty:
-                rows.append({
-                    "asset": sym,
-                    "azione": "NO_DATA",
-                    "score": 0,
-                    "TRADE_OK": False,
-                    "rischio_sl": "N/D",
-                    "last": 0,
-                    "sl": None,
-                    "tp": None,
-                    "flow": None,
-                    "atr": 0,
-                    "rsi": 0,
-                    "adx": 0
-                })
+                rows[sym] = _compute_signal(sym, None)
                 continue
             
-            df = _norm_ohlcv(df)
-            signal = _compute_signal(sym, df)
-            rows.append(signal)
+            frames[sym] = _norm_ohlcv(df)
             
         except Exception as e:
-            rows.append({
-                "asset": sym,
-                "azione": "ERROR",
-                "score": 0,
-                "TRADE_OK": False,
-                "rischio_sl": "N/D",
-                "last": 0,
-                "sl": None,
-                "tp": None,
-                "flow": None,
-                "atr": 0,
-                "rsi": 0,
-                "adx": 0,
-                "error": str(e)
-            })
+            rows[sym] = _error_row(sym, e)
+    
+    # Indicatori dagli stati incrementali: solo le candele nuove per simbolo
+    try:
+        table = incremental_signal_table(frames, timeframe=YF_15M_INTERVAL)
+    except Exception as e:
+        table = pd.DataFrame()
+        for sym in frames:
+            rows[sym] = _error_row(sym, e)
+    
+    for sym in frames:
+        if sym in rows:
+            continue
+        ind = table.loc[sym] if sym in table.index else None
+        rows[sym] = _compute_signal(sym, ind)
     
-    return pd.DataFrame(rows)
+    return pd.DataFrame([rows[sym] for sym in assets if sym in rows])
 
 def apply_ui_filters(df: pd.DataFrame, f: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """Applica filtri UI"""
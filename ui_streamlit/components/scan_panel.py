@@ -1,8 +1,7 @@
 # ui_streamlit/components/scan_panel.py
 import streamlit as st
-import time
 from datetime import datetime
-from providers.multi_provider import scan_symbol
+from providers.multi_provider import scan_many
 from providers.twelvedata_provider import search_symbols_td
 from storage.watchlist_store import save_watchlist
 from ui_streamlit.components.scan_filters import render_scan_filters
@@ -34,18 +33,13 @@ def render_scan_panel():
             if st.button("📡 AVVIA SCAN", use_container_width=True, type="primary", key="start_scan"):
                 with st.spinner("Scansionando..."):
                     progress_bar = st.progress(0, text="Avvio scan...")
-                    results = []
-                    total = len(st.session_state.watchlist)
-                    
                     st.session_state.last_scan_time = datetime.now()
                     
-                    for i, symbol in enumerate(st.session_state.watchlist):
-                        progress_text = f"📡 Scan {i+1}/{total}: {symbol}"
-                        progress_bar.progress((i + 1) / total, text=progress_text)
-                        
-                        result = scan_symbol(symbol, "15m", "1mo")
-                        results.append(result)
-                        time.sleep(0.5)
+                    def show_progress(done, total, symbol):
+                        progress_text = f"📡 Scan {done}/{total}: {symbol}"
+                        progress_bar.progress(done / total, text=progress_text)
+                    
+                    results = scan_many(st.session_state.watchlist, "15m", "1mo", progress=show_progress)
                     
                     progress_bar.empty()
                     st.session_state.radar_results = results
@@ -6,7 +6,9 @@ from providers.twelvedata_provider import fetch_td_15m, fetch_td_1h, fetch_td_4h
 from providers.marketaux_provider import fetch_marketaux_sentiment
 from providers.finnhub_provider import finnhub_provider
 from providers.multi_provider import fetch_yf_ohlcv
-from indicators.robust_ta import compute_indicators_15m, decide_signal
+from indicators.robust_ta import decide_signal
+from indicators.cache import compute_indicators_cached
+from indicators.mtf import current_mtf
 from ai.asset_analyzer import render_ai_suggestions
 
 def get_combined_news(symbol):
@@ -187,18 +189,10 @@ def show_page(symbol=None):
                 else:
                     finnhub_quote, _ = finnhub_provider.get_quote(symbol)
             
-            df_ind = compute_indicators_15m(df_15m)
+            df_ind = compute_indicators_cached(df_15m, symbol)
             
             # Analisi MTF
-            up_1h = True
-            up_4h = True
-            if df_1h is not None and len(df_1h) > 50:
-                up_1h = df_1h['close'].iloc[-1] > df_1h['close'].ewm(50).mean().iloc[-1]
-            if df_4h is not None and len(df_4h) > 20:
-                up_4h = df_4h['close'].iloc[-1] > df_4h['close'].ewm(20).mean().iloc[-1]
-            
-            mtf_long = up_1h and up_4h
-            mtf_short = (not up_1h) and (not up_4h)
+            mtf_long, mtf_short = current_mtf(df_1h, df_4h, symbol)
             
             signal = decide_signal(df_ind, mtf_long, mtf_short)
             
@@ -1,5 +1,6 @@
 import streamlit as st
 from strategy.optimizer import render_optimizer_panel
+from strategy.walk_forward import render_walk_forward_panel
 
 def render():
     st.subheader("⚙️ Ottimizzazione Parametri")
@@ -21,3 +22,6 @@ def render():
         # st.rerun()
     
     render_optimizer_panel(selected_asset)
+    
+    st.markdown("---")
+    render_walk_forward_panel(selected_asset)
@@ -1,12 +1,13 @@
 import streamlit as st
 import pandas as pd
-import time
 from datetime import datetime
-from providers.multi_provider import scan_symbol, fetch_yf_ohlcv
+from providers.multi_provider import scan_symbol, scan_many, fetch_yf_ohlcv
 from providers.finnhub_provider import finnhub_provider
+from providers.fetch_executor import fetch_executor
 from providers.market_scanner import market_scanner
 from ui_streamlit.components.scan_filters import render_scan_filters
 from ui_streamlit.components.card import render_result_card
+from indicators.incremental import incremental_signal_table
 
 # Liste predefinite
 MARKET_LISTS = {
@@ -107,50 +108,64 @@ def show_page():
         
         status_text.info(f"Provider attivi: {', '.join(providers_used)}")
         
-        for i, symbol in enumerate(symbols_to_scan[:30]):  # Limite 30 per performance
-            status_text.text(f"Scan {i+1}/{min(len(symbols_to_scan),30)}: {symbol}")
-            progress_bar.progress((i+1)/min(len(symbols_to_scan),30))
-            
-            # Scan base con Yahoo
-            result = scan_symbol(symbol, "15m", "1d")
+        def show_progress(done, total, symbol):
+            status_text.text(f"Scan {done}/{total}: {symbol}")
+            progress_bar.progress(done / total)
+        
+        # Scan base con Yahoo, un download multi-ticker per tutti i simboli
+        scanned = scan_many(symbols_to_scan[:30], "15m", "1d", progress=show_progress)  # Limite 30 per performance
+        scanned = [r for r in scanned if r and 'error' not in r]
+        
+        # Arricchisci con Finnhub se richiesto
+        if use_finnhub and st.secrets.get("FINNHUB_KEY", ""):
+            def enrich(result):
+                symbol = result['symbol']
+                try:
+                    if symbol.endswith('USD') and len(symbol) > 4:
+                        quote, _ = finnhub_provider.get_crypto_quote(symbol)
+                    else:
+                        quote, _ = finnhub_provider.get_quote(symbol)
+                    if quote:
+                        result['price'] = quote.get('price', result['price'])
+                        result['change'] = quote.get('change_percent', result['change'])
+                        result['source'] = 'Finnhub'
+                except:
+                    pass
+                return result
             
-            if result and 'error' not in result:
-                # Arricchisci con Finnhub se richiesto
-                if use_finnhub and st.secrets.get("FINNHUB_KEY", ""):
-                    try:
-                        if symbol.endswith('USD') and len(symbol) > 4:
-                            quote, _ = finnhub_provider.get_crypto_quote(symbol)
-                        else:
-                            quote, _ = finnhub_provider.get_quote(symbol)
-                        if quote:
-                            result['price'] = quote.get('price', result['price'])
-                            result['change'] = quote.get('change_percent', result['change'])
-                            result['source'] = 'Finnhub'
-                    except:
-                        pass
-                
-                # Calcola livello
-                change = result.get('change', 0)
-                if abs(change) > 2:
-                    level = 5
-                elif abs(change) > 1:
-                    level = 4
-                elif abs(change) > 0.5:
-                    level = 3
-                elif abs(change) > 0.1:
-                    level = 2
-                else:
-                    level = 1
-                
-                result['level'] = level
-                result['score'] = min(100, abs(change) * 10)
-                results.append(result)
+            scanned = fetch_executor.map('finnhub', enrich, scanned)
+        
+        for result in scanned:
+            # Calcola livello
+            change = result.get('change', 0)
+            if abs(change) > 2:
+                level = 5
+            elif abs(change) > 1:
+                level = 4
+            elif abs(change) > 0.5:
+                level = 3
+            elif abs(change) > 0.1:
+                level = 2
+            else:
+                level = 1
             
-            time.sleep(0.2)
+            result['level'] = level
+            result['score'] = min(100, abs(change) * 10)
+            results.append(result)
         
         progress_bar.empty()
         status_text.empty()
         
+        # Segnali dagli stati incrementali dei simboli (solo candele nuove)
+        table = incremental_signal_table({r['symbol']: r['data'] for r in results if r.get('data') is not None},
+                                         timeframe="15m")
+        for r in results:
+            if r['symbol'] in table.index:
+                r['signal'] = table.at[r['symbol'], 'signal']
+                r['strength'] = table.at[r['symbol'], 'strength']
+            else:
+                r['signal'] = r['strength'] = 'NONE'
+        
         if results:
             st.success(f"✅ Scansione completata! {len(results)} risultati")
             
@@ -183,13 +198,14 @@ def show_page():
                 if view_mode == "📊 Tabella":
                     df = pd.DataFrame(filtered)
                     st.dataframe(
-                        df[['symbol', 'price', 'change', 'level', 'score', 'source']],
+                        df[['symbol', 'price', 'change', 'level', 'score', 'signal', 'source']],
                         column_config={
                             "symbol": "Simbolo",
                             "price": st.column_config.NumberColumn("Prezzo", format="$%.2f"),
                             "change": st.column_config.NumberColumn("Variazione", format="%+.2f%%"),
                             "level": "Livello",
                             "score": "Score",
+                            "signal": "Segnale",
                             "source": "Fonte"
                         },
                         use_container_width=True
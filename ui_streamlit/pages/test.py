@@ -19,6 +19,7 @@ from providers.finnhub_provider import finnhub_provider
 
 # Indicatori
 from indicators.robust_ta import compute_indicators_15m, decide_signal
+from indicators.cache import compute_indicators_cached
 
 # AI
 from ai.asset_analyzer import AssetAIAnalyzer
@@ -250,7 +251,7 @@ def render():
             with st.spinner("Caricamento dati..."):
                 df, src = fetch_td_15m("BTC/USD")
                 if df is not None:
-                    df_ind = compute_indicators_15m(df)
+                    df_ind = compute_indicators_cached(df, "BTC/USD")
                     cols = st.columns(4)
                     with cols[0]:
                         st.metric("RSI", f"{df_ind['rsi'].iloc[-1]:.1f}")
@@ -320,7 +321,7 @@ def render():
             with st.spinner("Scaricamento dati e backtest..."):
                 df_bt = fetch_yf_ohlcv("BTC-USD", interval="15m", period="30d")
                 if df_bt is not None and len(df_bt) > 200:
-                    result = backtest_engine(df_bt, use_mtf=False)
+                    result = backtest_engine(df_bt, use_mtf=False, symbol="BTC-USD")
                     if result and result['trades'] is not None and not result['trades'].empty:
                         stats = result['stats']
                         st.success(f"Trades: {stats['n']}, Win Rate: {stats['winrate']:.1f}%")
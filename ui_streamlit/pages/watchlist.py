@@ -1,6 +1,6 @@
 import streamlit as st
 import time
-from providers.twelvedata_provider import search_symbols_td
+from providers.twelvedata_provider import search_symbols_td, refresh_td_watchlist
 from storage.watchlist_store import save_watchlist
 from config import WATCHLIST_FILE, DEFAULT_WATCHLIST
 
@@ -33,6 +33,13 @@ def show_page():
                         st.rerun()
             st.caption(f"Totale: {len(st.session_state.watchlist)} asset")
 
+            if st.button("📥 Aggiorna dati TwelveData", use_container_width=True,
+                         help="15m, 1h e 4h di tutta la watchlist con richieste multi-simbolo"):
+                with st.spinner("Aggiornamento in corso (8 crediti/minuto)..."):
+                    refreshed = refresh_td_watchlist(st.session_state.watchlist)
+                ok = sum(df is not None for df, _ in refreshed["15min"].values())
+                st.success(f"✅ Dati aggiornati per {ok}/{len(st.session_state.watchlist)} asset")
+
         if st.button("🔄 Reset a default", use_container_width=True):
             # ✅ CORRETTO: passa solo la watchlist
             st.session_state.watchlist = DEFAULT_WATCHLIST.copy()